@@ -0,0 +1,235 @@
+"""
+Recommendation Analytics Rollups
+--------------------------------
+- recommendation_rollup holds one row per day × product category ×
+  shipping mode × top material: request count and sums of the top
+  material's predicted cost, CO2 and sustainability score (sums, so
+  every update is a single additive upsert and averages stay exact)
+- save_recommendation() updates it in the same transaction as the
+  history insert; query_rollups() answers /api/analytics from it without
+  touching recommendation_history
+- Backfill rebuilds it from existing history:
+    python backend/analytics.py backfill [--batch 5000]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from db import get_db, upsert_add_sql
+from history_store import decode_results
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TABLE = "recommendation_rollup"
+BACKFILL_BATCH_ROWS = int(os.getenv("ANALYTICS_BACKFILL_BATCH", 5000))
+DEFAULT_RANGE_DAYS = int(os.getenv("ANALYTICS_DEFAULT_DAYS", 30))
+MAX_RANGE_DAYS = 366
+UNKNOWN = "Unknown"
+
+# API group_by name → rollup column
+DIMENSIONS = {
+    "day": "day",
+    "category": "product_category",
+    "shipping_mode": "shipping_mode",
+    "material": "top_material",
+}
+
+# Additive upsert in the configured backend's dialect (db.DB_BACKEND)
+_UPSERT = upsert_add_sql(
+    ROLLUP_TABLE,
+    ("day", "product_category", "shipping_mode", "top_material"),
+    ("requests", "sum_pred_cost", "sum_pred_co2", "sum_sustainability"),
+)
+
+
+# ======================================================
+# Row → rollup contribution
+# ======================================================
+def _number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if value != value else value
+
+
+def rollup_entry(day, category, shipping_mode, recommendations):
+    """
+    (key, measures) one history row adds to the rollup, or None when it
+    has no recommendations. Shared by the live path and the backfill.
+    """
+    if isinstance(recommendations, (str, bytes)):
+        recommendations = json.loads(recommendations or "[]")
+    if not recommendations:
+        return None
+    top = recommendations[0]
+    if isinstance(day, datetime):
+        day = day.date()
+    key = (day, category or UNKNOWN, shipping_mode or UNKNOWN, top.get("Material_Name") or UNKNOWN)
+    measures = (1, _number(top.get("Pred_Cost")), _number(top.get("Pred_CO2")),
+                _number(top.get("Sustainability")))
+    return key, measures
+
+
+def apply_rollup(cur, entries):
+    """Upserts [(key, measures), ...] through an open cursor."""
+    rows = [key + measures for key, measures in entries]
+    if rows:
+        cur.executemany(_UPSERT, rows)
+    return len(rows)
+
+
+# ======================================================
+# Queries (/api/analytics)
+# ======================================================
+def _parse_day(value, default):
+    if not value:
+        return default
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date {value!r} (expected YYYY-MM-DD)")
+
+
+def build_query(args):
+    """
+    SQL + params over the rollup for the dashboard's filters:
+    from / to (inclusive days), category, shipping_mode, material and
+    group_by (comma list of day, category, shipping_mode, material).
+    """
+    end = _parse_day(args.get("to"), date.today())
+    start = _parse_day(args.get("from"), end - timedelta(days=DEFAULT_RANGE_DAYS - 1))
+    if start > end:
+        raise ValueError("'from' is after 'to'")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise ValueError(f"Date range is limited to {MAX_RANGE_DAYS} days")
+
+    raw = args.get("group_by")
+    group_by = [g.strip() for g in ("day" if raw is None else raw).split(",") if g.strip()]
+    unknown = [g for g in group_by if g not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown group_by {unknown}; use {sorted(DIMENSIONS)}")
+
+    where, params = ["day BETWEEN %s AND %s"], [start, end]
+    for arg, column in (("category", "product_category"), ("shipping_mode", "shipping_mode"),
+                        ("material", "top_material")):
+        if args.get(arg):
+            where.append(f"{column} = %s")
+            params.append(args[arg])
+
+    columns = [f"{DIMENSIONS[g]} AS {g}" for g in group_by] + [
+        f"SUM({m}) AS {m}" for m in ("requests", "sum_pred_cost", "sum_pred_co2", "sum_sustainability")
+    ]
+    sql = f"SELECT {', '.join(columns)} FROM {ROLLUP_TABLE} WHERE {' AND '.join(where)}"
+    if group_by:
+        order = ", ".join(group_by) if group_by == ["day"] else "requests DESC"
+        sql += f" GROUP BY {', '.join(DIMENSIONS[g] for g in group_by)} ORDER BY {order}"
+    return sql, params, {"from": start.isoformat(), "to": end.isoformat(), "group_by": group_by}
+
+
+def _averages(row):
+    requests = int(row.pop("requests") or 0)
+    sums = {k: float(row.pop(f"sum_{k}") or 0.0) for k in ("pred_cost", "pred_co2", "sustainability")}
+    row["requests"] = requests
+    for k, total in sums.items():
+        row[f"avg_{k}"] = round(total / requests, 4) if requests else None
+    if isinstance(row.get("day"), date):
+        row["day"] = row["day"].isoformat()
+    return row
+
+
+def query_rollups(args):
+    sql, params, query = build_query(args)
+    totals_sql, totals_params, _ = build_query({**args, "group_by": ""})
+    db = get_db()
+    try:
+        with db.cursor() as cur:
+            cur.execute(sql, params)
+            rows = [_averages(r) for r in cur.fetchall()]
+            cur.execute(totals_sql, totals_params)
+            totals = _averages(cur.fetchone() or {})
+    finally:
+        db.close()
+    return {"query": query, "rows": rows, "totals": totals}
+
+
+# ======================================================
+# Backfill
+# ======================================================
+def backfill(batch_rows=BACKFILL_BATCH_ROWS, log=print):
+    """
+    Rebuilds the rollup from recommendation_history. History is scanned in
+    id-keyed pages and aggregated in memory (the rollup is small), then
+    the table is replaced in one transaction. Rows saved during the scan
+    are folded in inside that transaction; their live upserts wait on
+    the rollup's row locks, so nothing is counted twice or lost.
+    """
+    t0 = time.perf_counter()
+    totals, scanned = {}, 0
+
+    def fold(rows):
+        for r in rows:
+            entry = rollup_entry(r["created_at"], r["product_category"], r["shipping_mode"],
+                                 decode_results(r["results"], r["recommendations"]))
+            if entry:
+                key, measures = entry
+                acc = totals.get(key, (0, 0.0, 0.0, 0.0))
+                totals[key] = tuple(a + m for a, m in zip(acc, measures))
+
+    select = (
+        "SELECT h.id, h.created_at, s.product_category, s.shipping_mode, h.results, h.recommendations "
+        "FROM recommendation_history h LEFT JOIN shipment_fingerprints s ON s.id = h.shipment_id "
+    )
+    page_sql = select + "WHERE h.id > %s AND h.id <= %s ORDER BY h.id LIMIT %s"
+    db = get_db()
+    try:
+        with db.cursor() as cur:
+            cur.execute("SELECT COALESCE(MAX(id), 0) AS max_id FROM recommendation_history")
+            max_id, last_id = cur.fetchone()["max_id"], 0
+            while last_id < max_id:
+                cur.execute(page_sql, (last_id, max_id, batch_rows))
+                rows = cur.fetchall()
+                if not rows:
+                    break
+                fold(rows)
+                scanned += len(rows)
+                last_id = rows[-1]["id"]
+
+            db.begin()
+            try:
+                cur.execute(f"DELETE FROM {ROLLUP_TABLE}")
+                cur.execute(select + "WHERE h.id > %s", (max_id,))
+                late = cur.fetchall()
+                fold(late)
+                apply_rollup(cur, totals.items())
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+    finally:
+        db.close()
+
+    log(f"✅ Rollup rebuilt: {scanned + len(late):,} history rows → {len(totals):,} rollup rows "
+        f"in {time.perf_counter() - t0:.1f}s")
+    return {"history_rows": scanned + len(late), "rollup_rows": len(totals)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Recommendation analytics rollups")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("backfill", help="rebuild the rollup from recommendation_history")
+    p.add_argument("--batch", type=int, default=BACKFILL_BATCH_ROWS)
+    args = ap.parse_args()
+
+    if args.command == "backfill":
+        backfill(args.batch)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,27 +9,23 @@ FIXES APPLIED:
 4. BI dashboard path kept relative via PROJECT_ROOT
 """
 
-from flask import Flask, request, jsonify, session, send_file
+from flask import Flask, Response, request, jsonify, session, send_file
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from datetime import datetime, timedelta
 import secrets
+import json
 import logging
 import os
+import threading
+import time
 from dotenv import load_dotenv
 from io import BytesIO
 from pathlib import Path
 import sys
 import pandas as pd
 
-# PDF imports
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-
 # ==========================================================
 # PATH FIX
 # ==========================================================
@@ -46,12 +42,73 @@ try:
         co2_model,
         cost_model,
         FEATURES_COST,
-        FEATURES_CO2
+        FEATURES_CO2,
+        recommendation_grid,
+        score_reference,
+        sharded_scorer,
+        drift_reference,
+        MODEL_INFO
+    )
+    from ml.notebooks.rerank import (
+        result_store,
+        parse_weights,
+        rerank_records
+    )
+    from ml.notebooks.sweep import (
+        run_sweep,
+        iter_sweep,
+        count_scenarios,
+        SWEEP_STREAM_MIN_SCENARIOS
     )
     ML_AVAILABLE = True
 except ImportError:
     ML_AVAILABLE = False
 
+# ==========================================================
+# AUTH IMPORT (auth.py / db.py use backend-relative imports)
+# ==========================================================
+sys.path.append(str(PROJECT_ROOT / "backend"))
+try:
+    from auth import login_user
+    AUTH_AVAILABLE = True
+except ImportError:
+    AUTH_AVAILABLE = False
+
+try:
+    from analytics import query_rollups
+    ANALYTICS_AVAILABLE = True
+except ImportError:
+    ANALYTICS_AVAILABLE = False
+
+try:
+    from history_export import export_history
+    EXPORT_AVAILABLE = True
+except ImportError:
+    EXPORT_AVAILABLE = False
+
+try:
+    from drift_store import drift_recorder, drift_metrics, prometheus_text
+    DRIFT_AVAILABLE = True
+except ImportError:
+    DRIFT_AVAILABLE = False
+
+try:
+    import jobs
+    from jobs import JobLimitError, JOB_WORKERS
+    JOBS_AVAILABLE = True
+except ImportError:
+    JOBS_AVAILABLE = False
+
+from static_assets import StaticAsset
+from history_store import parse_shipment
+from reports import render_report_pdf
+from structured_logging import (
+    configure_logging, new_request_id, current_request_id, end_request, stage, request_stages, SAMPLED
+)
+from ml.notebooks.catalogue import load_frame
+from ml.notebooks.similar_materials import SimilarityIndex
+from ml.notebooks.results import RecommendationSet, REPORT_COLUMNS
+
 # ==========================================================
 # ENV + APP
 # ==========================================================
@@ -75,7 +132,8 @@ CORS(app,
          "https://ecopackai-web.vercel.app",
          "https://*.vercel.app"
      ],
-     allow_headers=["Content-Type"],
+     allow_headers=["Content-Type", "X-Request-ID"],
+     expose_headers=["X-Request-ID"],
      max_age=3600)
 
 # ==========================================================
@@ -91,16 +149,57 @@ def _set_cookie_policy():
     app.config["SESSION_COOKIE_SAMESITE"] = "Lax"  if is_local else "None"
     app.config["SESSION_COOKIE_SECURE"]   = False   if is_local else True
 
+# ==========================================================
+# REQUEST IDS + ACCESS LOG
+# X-Request-ID is accepted from the client/proxy or generated, stamped
+# on every log record of the request and echoed on the response. One
+# sampled access line per request carries status, duration and stages.
+# ==========================================================
+@app.before_request
+def _start_request_log():
+    request.environ["ecopack.t0"] = time.perf_counter()
+    new_request_id(request.headers.get("X-Request-ID"))
+
+@app.after_request
+def _access_log(response):
+    rid = current_request_id()
+    if rid:
+        response.headers["X-Request-ID"] = rid
+    if not logger.isEnabledFor(logging.INFO):
+        return response
+    t0 = request.environ.get("ecopack.t0")
+    duration_ms = round((time.perf_counter() - t0) * 1000, 3) if t0 else None
+    fields = {**SAMPLED, "method": request.method, "path": request.path,
+              "status": response.status_code, "duration_ms": duration_ms}
+    stages = request_stages()
+    if stages:
+        fields["stages_ms"] = stages
+    logger.info("%s %s %s %sms", request.method, request.path, response.status_code, duration_ms,
+                extra=fields)
+    return response
+
+@app.teardown_request
+def _end_request_log(exc):
+    end_request()
+
+# Load tests only (benchmarks/loadtest.py): turns off both the global
+# limiter and the per-IP recommendation quota. Never set in production.
+RATE_LIMITS_DISABLED = os.getenv("DISABLE_RATE_LIMITS", "0") == "1"
+
 # Rate limiter (global guard — session-based IP limit is the main one)
 limiter = Limiter(
     app=app,
     key_func=get_remote_address,
     default_limits=["200 per day", "100 per hour"],
-    storage_uri="memory://"
+    storage_uri="memory://",
+    enabled=not RATE_LIMITS_DISABLED
 )
 
-logging.basicConfig(level=logging.INFO)
+# Queue-backed structured logging (LOG_FORMAT / LOG_LEVEL / LOG_SAMPLE_RATE)
+configure_logging()
 logger = logging.getLogger("EcoPackAI")
+if RATE_LIMITS_DISABLED:
+    logger.warning("⚠️ DISABLE_RATE_LIMITS=1: rate limits and the recommendation quota are off")
 
 # ==========================================================
 # RATE LIMIT CONFIG (PER CLIENT IP)
@@ -116,17 +215,48 @@ RATE_LIMITS = {}
 # ==========================================================
 MATERIALS_CSV_PATH = PROJECT_ROOT / "data" / "processed" / "clean_materials.csv"
 _materials_cache = None
+_materials_mtime = None
+_similarity_index = None
+_similarity_lock = threading.Lock()
 
 def load_materials_data():
-    global _materials_cache
-    if _materials_cache is None and MATERIALS_CSV_PATH.exists():
+    global _materials_cache, _materials_mtime
+    if not MATERIALS_CSV_PATH.exists():
+        return _materials_cache if _materials_cache is not None else pd.DataFrame()
+    # Reload when the CSV is replaced
+    mtime = MATERIALS_CSV_PATH.stat().st_mtime_ns
+    if _materials_cache is None or mtime != _materials_mtime:
         try:
-            _materials_cache = pd.read_csv(MATERIALS_CSV_PATH)
-            logger.info(f"Loaded {len(_materials_cache)} materials from CSV")
+            # Compiled Arrow artifact when fresh, CSV otherwise
+            _materials_cache = load_frame(MATERIALS_CSV_PATH)
+            logger.info(f"Loaded {len(_materials_cache)} materials")
         except Exception as e:
             logger.error(f"Error loading materials CSV: {e}")
             _materials_cache = pd.DataFrame()
-    return _materials_cache if _materials_cache is not None else pd.DataFrame()
+        _materials_mtime = mtime
+    return _materials_cache
+
+def get_similarity_index():
+    """KD-tree over the current catalogue; rebuilt whenever the catalogue reloads."""
+    global _similarity_index
+    mat_df = load_materials_data()
+    if mat_df.empty:
+        return None
+    with _similarity_lock:
+        if _similarity_index is None or _similarity_index.materials is not mat_df:
+            t0 = time.perf_counter()
+            _similarity_index = SimilarityIndex(mat_df)
+            logger.info(f"Built similarity index over {len(mat_df)} materials "
+                        f"in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    return _similarity_index
+
+def _json_safe(records):
+    # Sanitise NaN → None so JSON serialisation never breaks
+    for m in records:
+        for k, v in m.items():
+            if isinstance(v, float) and (v != v):  # NaN check
+                m[k] = None
+    return records
 
 # ==========================================================
 # SESSION INIT
@@ -138,7 +268,7 @@ def init_session():
         session.permanent = True
         session["session_id"] = secrets.token_urlsafe(16)
         session["session_start"] = now.isoformat()
-        logger.info(f"New session: {session['session_id']}")
+        logger.info("New session: %s", session["session_id"], extra=SAMPLED)
     else:
         session.setdefault("session_start", now.isoformat())
 
@@ -147,6 +277,8 @@ def init_session():
 # ==========================================================
 def check_recommendation_limit():
     """Returns (allowed, error_msg, used, remaining)"""
+    if RATE_LIMITS_DISABLED:
+        return True, None, 0, MAX_RECOMMENDATIONS_PER_WINDOW
     now = datetime.now()
     client_key = get_remote_address()
     record = RATE_LIMITS.get(client_key)
@@ -171,7 +303,7 @@ def check_recommendation_limit():
     RATE_LIMITS[client_key] = record
     used = record["count"]
     remaining = max(0, MAX_RECOMMENDATIONS_PER_WINDOW - used)
-    logger.info(f"Rate limit for {client_key}: {used}/{MAX_RECOMMENDATIONS_PER_WINDOW}")
+    logger.info("Rate limit for %s: %d/%d", client_key, used, MAX_RECOMMENDATIONS_PER_WINDOW, extra=SAMPLED)
     return True, None, used, remaining
 
 # ==========================================================
@@ -197,6 +329,29 @@ def auth_status():
         "recommendations_remaining": remaining
     })
 
+# ==========================================================
+# LOGIN (email/password — bcrypt runs on a bounded pool in auth.py)
+# ==========================================================
+@app.route("/api/auth/login", methods=["POST"])
+def login():
+    if not AUTH_AVAILABLE:
+        return jsonify({"error": "Authentication not available"}), 503
+
+    data     = request.get_json() or {}
+    email    = (data.get("email") or "").strip()
+    password = data.get("password") or ""
+    if not email or not password:
+        return jsonify({"error": "Email and password are required"}), 400
+
+    result, status = login_user(email, password)
+    response = jsonify(result)
+    if status in (429, 503):
+        response.headers["Retry-After"] = "1"
+    elif status == 200:
+        init_session()
+        session["user_email"] = email
+    return response, status
+
 # ==========================================================
 # LOGOUT
 # ==========================================================
@@ -227,162 +382,193 @@ def recommend():
 
     data = request.get_json() or {}
 
-    required = [
-        "Category_item", "Weight_kg", "Fragility",
-        "Moisture_Sens", "Distance_km", "Shipping_Mode",
-        "Length_cm", "Width_cm", "Height_cm"
-    ]
-    for field in required:
-        if field not in data:
-            return jsonify({"error": f"Missing field: {field}"}), 400
-
-    shipment = {
-        "Category_item": data["Category_item"],
-        "Weight_kg":     float(data["Weight_kg"]),
-        "Fragility":     int(data["Fragility"]),
-        "Moisture_Sens": bool(data["Moisture_Sens"]),
-        "Distance_km":   float(data["Distance_km"]),
-        "Shipping_Mode": data["Shipping_Mode"],
-        "Length_cm":     float(data["Length_cm"]),
-        "Width_cm":      float(data["Width_cm"]),
-        "Height_cm":     float(data["Height_cm"]),
-    }
+    shipment, error = parse_shipment(data)
+    if error:
+        return jsonify({"error": error}), 400
 
     top_k  = int(data.get("top_k", 5))
     sort_by = data.get("sort_by", "Sustainability")
+    explain = bool(data.get("explain", False))
+    constraints = data.get("constraints") or None
+    prefilter   = bool(data.get("prefilter", True))
+    exact       = bool(data.get("exact", False))
+    normalization = data.get("normalization", "candidates")
+    # Every candidate's scores for /api/rerank (result_id): opt-in, since they're held
+    # in memory per result and, in global mode, turn off early termination
+    keep_scores = bool(data.get("rerank", False))
 
     try:
+        prefilter_stats = grid_info = norm_info = result_id = None
         if ML_AVAILABLE:
-            df = generate_recommendations(
-                materials_df, co2_model, cost_model,
-                shipment, FEATURES_COST, FEATURES_CO2, top_k, sort_by
-            )
-            recommendations = df.to_dict("records")
+            with stage("rank"):
+                results = generate_recommendations(
+                    materials_df, co2_model, cost_model,
+                    shipment, FEATURES_COST, FEATURES_CO2, top_k, sort_by,
+                    explain=explain, constraints=constraints, prefilter=prefilter,
+                    grid=None if exact else recommendation_grid,
+                    normalization=normalization, reference=score_reference,
+                    keep_scores=keep_scores, keep_predictions=DRIFT_AVAILABLE,
+                    scorer=sharded_scorer, as_frame=False
+                )
+            scores = results.attrs.pop("scores", None)
+            predictions = results.attrs.pop("predictions", None)
+            with stage("store"):
+                if scores is not None:
+                    # Stored results belong to a session; a first request may not have one yet
+                    init_session()
+                    result_id = result_store.put(scores, owner=session["session_id"])
+                recommendations = results.records()
+            if DRIFT_AVAILABLE:
+                with stage("monitor"):
+                    drift_recorder.observe(shipment, *(predictions or ()))
+            prefilter_stats = results.attrs.get("prefilter")
+            grid_info = results.attrs.get("grid")
+            norm_info = results.attrs.get("normalization")
+            # The cookie session keeps the report columns only, column-wise
+            session["last_recommendation"] = results.select(REPORT_COLUMNS).to_dict()
         else:
             logger.warning("ML models not available, returning empty recommendations")
             recommendations = []
+            session["last_recommendation"] = []
 
-        session["last_recommendation"] = recommendations
         session["last_shipment"]        = shipment
 
         return jsonify({
             "status": "success",
             "recommendations": recommendations,
+            "prefilter": prefilter_stats,
+            "grid": grid_info,
+            "normalization": norm_info,
+            "result_id": result_id,
             "session_info": {"used": used, "remaining": remaining}
         })
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     except Exception as e:
         logger.error(f"Error generating recommendations: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
+# ==========================================================
+# RE-RANK A PREVIOUS RESULT (no model calls, no quota)
+# Body: {"result_id": "...", "top_k": 3,
+#        "weights": {"Env_Impact": 0.4, "Cost_Eff": 0.2,
+#                    "Biodegradable": 0.2, "Mat_Suit": 0.2}}
+# "weights" may also be a list → one ranking per weight vector.
+# ==========================================================
+@app.route("/api/rerank", methods=["POST"])
+@limiter.limit("60 per minute")
+def rerank_result():
+    if not ML_AVAILABLE:
+        return jsonify({"error": "ML models not available"}), 503
+
+    data = request.get_json() or {}
+    scores = result_store.get(data.get("result_id"), owner=session.get("session_id"))
+    if scores is None:
+        return jsonify({"error": "Unknown or expired result_id; run /api/recommend again"}), 404
+
+    try:
+        top_k = int(data.get("top_k", 3))
+        weights = data.get("weights")
+        if weights is None:
+            return jsonify({"error": "Missing field: weights"}), 400
+        W = parse_weights(weights)
+        t0 = time.perf_counter()
+        rankings = rerank_records(scores, W, top_k)
+        elapsed_us = (time.perf_counter() - t0) * 1e6
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "status": "success",
+        "result_id": data["result_id"],
+        "rankings": rankings if isinstance(weights, list) else rankings[0],
+        "timing": {
+            "weight_vectors": len(W),
+            "candidates": int(scores["matrix"].shape[1]),
+            "rerank_us": round(elapsed_us, 1),
+            "per_vector_us": round(elapsed_us / len(W), 2),
+        }
+    })
+
+# ==========================================================
+# WHAT-IF SWEEP (one quota call for a whole scenario grid)
+# Body: base shipment fields (top level or under "base") +
+#   "sweep": {"Distance_km": {"start": 500, "stop": 5000, "num": 10},
+#             "Shipping_Mode": ["Air", "Road", "Sea"], ...}
+# Large grids (or "stream": true) come back as NDJSON.
+# ==========================================================
+@app.route("/api/recommend/sweep", methods=["POST"])
+def recommend_sweep():
+    allowed, error, used, remaining = check_recommendation_limit()
+    if not allowed:
+        return jsonify({
+            "error": error,
+            "limit_reached": True,
+            "session_info": {"used": used, "remaining": remaining}
+        }), 429
+
+    if not ML_AVAILABLE:
+        return jsonify({"error": "ML models not available"}), 503
+
+    data  = request.get_json() or {}
+    sweep = data.get("sweep")
+    if not isinstance(sweep, dict) or not sweep:
+        return jsonify({"error": "Missing field: sweep"}), 400
+
+    base, error = parse_shipment(data.get("base") or data, optional=tuple(sweep))
+    if error:
+        return jsonify({"error": error}), 400
+
+    args = (materials_df, cost_model, co2_model, base, sweep, FEATURES_COST, FEATURES_CO2)
+    kwargs = {
+        "top_k":       int(data.get("top_k", 3)),
+        "sort_by":     data.get("sort_by", "Sustainability"),
+        "constraints": data.get("constraints") or None,
+    }
+
+    try:
+        stream = data.get("stream")
+        if stream is None:
+            stream = count_scenarios(sweep) >= SWEEP_STREAM_MIN_SCENARIOS
+
+        if stream:
+            records = iter_sweep(*args, **kwargs)
+            meta = next(records)  # validates grid size before headers go out
+
+            def generate():
+                yield json.dumps(meta) + "\n"
+                for rec in records:
+                    yield json.dumps(rec) + "\n"
+
+            return Response(generate(), mimetype="application/x-ndjson")
+
+        result = run_sweep(*args, **kwargs)
+        result["status"] = "success"
+        result["session_info"] = {"used": used, "remaining": remaining}
+        return jsonify(result)
+
+    except (ValueError, TypeError, KeyError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    except Exception as e:
+        logger.error(f"Sweep error: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
 # ==========================================================
 # PDF — EcoPackAI header + Shipment Details + Recommendations
 # ==========================================================
 @app.route("/api/generate-pdf", methods=["POST"])
 def generate_pdf():
-    data     = session.get("last_recommendation")
+    # RecommendationSet.to_dict() columns (older sessions: a list of dicts)
+    data     = RecommendationSet.coerce(session.get("last_recommendation"))
     shipment = session.get("last_shipment")
 
     if not data:
         return jsonify({"error": "Generate recommendation first"}), 400
 
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(
-        buffer, pagesize=letter,
-        topMargin=0.75*inch, bottomMargin=0.75*inch,
-        leftMargin=0.75*inch, rightMargin=0.75*inch
-    )
-    elements = []
-    styles   = getSampleStyleSheet()
-
-    # App title — green
-    title_style = ParagraphStyle(
-        "CustomTitle", parent=styles["Title"],
-        fontSize=20, textColor=colors.HexColor("#10b981"), alignment=1
-    )
-    section_style = ParagraphStyle(
-        "Section", parent=styles["Heading2"],
-        fontSize=13, textColor=colors.HexColor("#047857")
-    )
-
-    elements.append(Paragraph("<b>EcoPackAI</b>", title_style))
-    elements.append(Spacer(1, 20))
-
-    # Shipment Details
-    if shipment:
-        elements.append(Paragraph("<b>Shipment Details:</b>", section_style))
-        elements.append(Spacer(1, 8))
-
-        shipment_rows = [
-            ["Category",         str(shipment.get("Category_item", "N/A"))],
-            ["Weight (kg)",      f"{shipment.get('Weight_kg', 0):.2f}"],
-            ["Distance (km)",    f"{shipment.get('Distance_km', 0):.2f}"],
-            ["Shipping Mode",    str(shipment.get("Shipping_Mode", "N/A"))],
-            ["Fragility",        str(shipment.get("Fragility", "N/A"))],
-            ["Moisture Sens.",   "Yes" if shipment.get("Moisture_Sens") else "No"],
-            ["Dimensions (cm)",  (f"{shipment.get('Length_cm', 0)} x "
-                                  f"{shipment.get('Width_cm', 0)} x "
-                                  f"{shipment.get('Height_cm', 0)}")],
-        ]
-
-        st = Table(shipment_rows, colWidths=[2*inch, 4*inch])
-        st.setStyle(TableStyle([
-            ("FONTNAME",  (0, 0), (0, -1), "Helvetica-Bold"),
-            ("FONTSIZE",  (0, 0), (-1, -1), 10),
-            ("ALIGN",     (0, 0), (0, -1), "LEFT"),
-            ("ALIGN",     (1, 0), (1, -1), "CENTER"),
-            ("GRID",      (0, 0), (-1, -1), 0.5, colors.grey),
-            ("VALIGN",    (0, 0), (-1, -1), "MIDDLE"),
-            ("ROWBACKGROUNDS", (0, 0), (-1, -1),
-             [colors.HexColor("#f0fdf4"), colors.white]),
-        ]))
-        elements.append(st)
-        elements.append(Spacer(1, 20))
-
-    # Recommendations table
-    elements.append(Paragraph("<b>Recommendations:</b>", section_style))
-    elements.append(Spacer(1, 8))
-
-    table_data = [["#", "Material", "Cost ($)", "CO₂ (kg)", "Sustainability"]]
-    for i, r in enumerate(data, 1):
-        table_data.append([
-            str(i),
-            str(r.get("Material_Name", "N/A"))[:30],
-            f"{r.get('Pred_Cost', 0):.2f}",
-            f"{r.get('Pred_CO2', 0):.2f}",
-            f"{r.get('Sustainability', 0):.4f}",
-        ])
-
-    rec_table = Table(
-        table_data,
-        colWidths=[0.4*inch, 2.5*inch, 1*inch, 1*inch, 1.3*inch]
-    )
-    rec_table.setStyle(TableStyle([
-        ("BACKGROUND",  (0, 0), (-1, 0),  colors.HexColor("#10b981")),
-        ("TEXTCOLOR",   (0, 0), (-1, 0),  colors.white),
-        ("FONTNAME",    (0, 0), (-1, 0),  "Helvetica-Bold"),
-        ("FONTSIZE",    (0, 0), (-1, 0),  10),
-        ("ALIGN",       (0, 0), (-1, -1), "CENTER"),
-        ("FONTSIZE",    (0, 1), (-1, -1), 9),
-        ("GRID",        (0, 0), (-1, -1), 0.5, colors.grey),
-        ("VALIGN",      (0, 0), (-1, -1), "MIDDLE"),
-        ("ROWBACKGROUNDS", (0, 1), (-1, -1),
-         [colors.HexColor("#f0fdf4"), colors.white]),
-    ]))
-    elements.append(rec_table)
-
-    # Faint watermark
-    def add_watermark(c, doc):
-        c.saveState()
-        c.setFillColor(colors.Color(0.1, 0.6, 0.4, alpha=0.05))
-        c.setFont("Helvetica-Bold", 50)
-        c.translate(letter[0] / 2, letter[1] / 2)
-        c.rotate(30)
-        c.drawCentredString(0, 0, "EcoPackAI")
-        c.restoreState()
-
-    doc.build(elements, onFirstPage=add_watermark, onLaterPages=add_watermark)
-    buffer.seek(0)
+    buffer = BytesIO(render_report_pdf(shipment, data))
 
     return send_file(
         buffer,
@@ -417,12 +603,7 @@ def get_materials():
     page_df  = mat_df.iloc[start_idx:end_idx]
     has_more = end_idx < len(mat_df)
 
-    materials_list = page_df.to_dict("records")
-    # Sanitise NaN → None so JSON serialisation never breaks
-    for m in materials_list:
-        for k, v in m.items():
-            if isinstance(v, float) and (v != v):  # NaN check
-                m[k] = None
+    materials_list = _json_safe(page_df.to_dict("records"))
 
     return jsonify({
         "materials": materials_list,
@@ -432,12 +613,46 @@ def get_materials():
         "has_more":  has_more
     })
 
+# ==========================================================
+# SIMILAR MATERIALS (substitutes for an out-of-stock material)
+# ?k=5&category=Eco&biodegradable=true
+# ==========================================================
+@app.route("/api/materials/<int:material_id>/similar", methods=["GET"])
+def similar_materials(material_id):
+    index = get_similarity_index()
+    if index is None:
+        return jsonify({"error": "Materials catalogue not available"}), 503
+
+    biodegradable = request.args.get("biodegradable")
+    if biodegradable is not None:
+        biodegradable = biodegradable.lower() in ("1", "true", "yes")
+    category = request.args.get("category") or None
+
+    try:
+        k = int(request.args.get("k", 5))
+        t0 = time.perf_counter()
+        similar = index.similar_records(material_id, k, category=category, biodegradable=biodegradable)
+        query_ms = (time.perf_counter() - t0) * 1000
+    except KeyError:
+        return jsonify({"error": f"Unknown material: {material_id}"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    material = index.record(index.positions.get_loc(material_id))
+    return jsonify({
+        "material": _json_safe([material])[0],
+        "similar":  _json_safe(similar),
+        "k":        k,
+        "filters":  {"category": category, "biodegradable": biodegradable},
+        "query_ms": round(query_ms, 3)
+    })
+
 # ==========================================================
 # EXCEL EXPORT
 # ==========================================================
 @app.route("/api/export-excel", methods=["POST"])
 def export_excel():
-    data     = session.get("last_recommendation")
+    data     = RecommendationSet.coerce(session.get("last_recommendation"))
     shipment = session.get("last_shipment")
 
     if not data:
@@ -527,20 +742,272 @@ def export_excel():
 # BI DASHBOARD
 # Path: PROJECT_ROOT/bi/EcoPackAI_BI_Dashboard.html
 # Relative to this file (backend/app.py): ../bi/EcoPackAI_BI_Dashboard.html
+# Served from memory, precompressed (gzip / brotli), with ETag + 304.
+# The file is re-read only when it changes (static_assets.py).
 # ==========================================================
 BI_DASHBOARD_HTML = PROJECT_ROOT / "bi" / "EcoPackAI_BI_Dashboard.html"
+bi_dashboard_asset = StaticAsset(BI_DASHBOARD_HTML, "text/html")
+bi_dashboard_asset.current()   # load + compress at startup
 
 
 @app.route("/api/bi-dashboard-available", methods=["GET"])
 def bi_dashboard_available():
-    return jsonify({"available": BI_DASHBOARD_HTML.exists()})
+    asset = bi_dashboard_asset.current()
+    if asset is None:
+        return jsonify({"available": False})
+    # Content-hashed URL: cacheable for a year, changes when the file does
+    return jsonify({"available": True, "url": asset.url("/bi/dashboard"), "version": asset.version})
 
 
 @app.route("/bi/dashboard", methods=["GET"])
 def bi_dashboard():
-    if not BI_DASHBOARD_HTML.exists():
+    asset = bi_dashboard_asset.current()
+    if asset is None:
         return jsonify({"error": "BI dashboard HTML not found at expected path"}), 404
-    return send_file(BI_DASHBOARD_HTML, mimetype="text/html")
+    return asset.response(request)
+
+
+# ==========================================================
+# ANALYTICS (served from recommendation_rollup, never the raw history)
+# GET /api/analytics?from=2026-01-01&to=2026-01-31
+#                   &group_by=category,material&shipping_mode=Air
+# ==========================================================
+@app.route("/api/analytics", methods=["GET"])
+@limiter.limit("60 per minute")
+def analytics():
+    if not ANALYTICS_AVAILABLE:
+        return jsonify({"error": "Analytics not available"}), 503
+    try:
+        return jsonify({"status": "success", **query_rollups(request.args)})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Analytics error: {e}", exc_info=True)
+        return jsonify({"error": "Analytics query failed"}), 500
+
+
+# ==========================================================
+# HISTORY EXPORT (streamed CSV / NDJSON / Parquet, constant memory)
+# GET /api/history/export?format=csv&from=2026-01-01&to=2026-03-31
+#                        &email=&category=&shipping_mode=
+# Analysts (HISTORY_EXPORT_ANALYSTS, comma-separated emails) may export
+# any user's history; everyone else only their own
+# ==========================================================
+HISTORY_EXPORT_ANALYSTS = {
+    e.strip().lower() for e in os.getenv("HISTORY_EXPORT_ANALYSTS", "").split(",") if e.strip()
+}
+
+def history_filters(user, source):
+    """Export filters from `source`, limited to the user's own history unless an analyst; None if not allowed."""
+    filters = {k: source.get(k) for k in ("email", "from", "to", "category", "shipping_mode")}
+    if user.lower() not in HISTORY_EXPORT_ANALYSTS:
+        if filters["email"] and filters["email"] != user:
+            return None
+        filters["email"] = user
+    return filters
+
+@app.route("/api/history/export", methods=["GET"])
+@limiter.limit("10 per minute")
+def history_export():
+    if not EXPORT_AVAILABLE:
+        return jsonify({"error": "History export not available"}), 503
+
+    user = session.get("user_email")
+    if not user:
+        return jsonify({"error": "Login required"}), 401
+
+    filters = history_filters(user, request.args)
+    if filters is None:
+        return jsonify({"error": "You can only export your own history"}), 403
+
+    try:
+        chunks, mimetype, ext = export_history(filters, request.args.get("format", "csv"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"History export error: {e}", exc_info=True)
+        return jsonify({"error": "History export failed"}), 500
+
+    filename = f"recommendation_history_{datetime.now():%Y%m%d}.{ext}"
+    return Response(chunks, mimetype=mimetype, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Accel-Buffering": "no",      # let proxies pass chunks through as they come
+    })
+
+
+# ==========================================================
+# DRIFT MONITOR (live inputs / predictions vs the training data)
+# GET /api/monitor/drift?windows=24&format=json|prometheus
+# Bearer METRICS_TOKEN (scrapers) or an analyst session
+# ==========================================================
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+@app.route("/api/monitor/drift", methods=["GET"])
+@limiter.limit("60 per minute")
+def drift_monitor():
+    if not DRIFT_AVAILABLE:
+        return jsonify({"error": "Drift monitor not available"}), 503
+
+    auth = request.headers.get("Authorization", "")
+    token_ok = bool(METRICS_TOKEN) and secrets.compare_digest(auth, f"Bearer {METRICS_TOKEN}")
+    user = (session.get("user_email") or "").lower()
+    if not token_ok and user not in HISTORY_EXPORT_ANALYSTS:
+        return jsonify({"error": "Metrics token or analyst login required"}), 401 if not user else 403
+
+    try:
+        windows = int(request.args.get("windows", 1))
+        report = drift_metrics(drift_reference if ML_AVAILABLE else None, windows)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Drift monitor error: {e}", exc_info=True)
+        return jsonify({"error": "Drift report failed"}), 500
+
+    if request.args.get("format") == "prometheus":
+        return Response(prometheus_text(report), mimetype="text/plain; version=0.0.4")
+    return jsonify({"status": "success", **report})
+
+
+# ==========================================================
+# BATCH JOBS (jobs.py / job_handlers.py)
+# POST /api/jobs                  JSON {"kind": ..., ...params} or multipart
+#                                 kind=recommend, manifest=<file>, params=<JSON>
+# GET  /api/jobs[/<id>]           status + progress
+# GET  /api/jobs/<id>/result      download (404 until done, 410 once expired)
+# POST /api/jobs/<id>/cancel | /retry
+# ==========================================================
+JOBS_MAX_UPLOAD_MB = float(os.getenv("JOBS_MAX_UPLOAD_MB", 50))
+# Werkzeug enforces this while the body is read, chunked uploads (no Content-Length) included
+app.config["MAX_CONTENT_LENGTH"] = int(JOBS_MAX_UPLOAD_MB * 1024 * 1024)
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"error": f"Request body larger than {JOBS_MAX_UPLOAD_MB:g} MB"}), 413
+
+def _job_response(job, status=200):
+    job["links"] = {
+        "self":   f"/api/jobs/{job['job_id']}",
+        "result": f"/api/jobs/{job['job_id']}/result" if job["status"] == "succeeded" else None,
+    }
+    return jsonify({"status": "success", "job": job}), status
+
+@app.route("/api/jobs", methods=["POST"])
+@limiter.limit("20 per hour")
+def submit_job():
+    if not JOBS_AVAILABLE:
+        return jsonify({"error": "Batch jobs not available"}), 503
+
+    user = session.get("user_email")
+    if not user:
+        return jsonify({"error": "Login required"}), 401
+    if not jobs.pool_running():
+        # Queued work would never run; say so instead of a 202
+        return jsonify({"error": "No job workers are running; try again later", "retry": True}), 503
+    upload = request.files.get("manifest")
+    if upload is not None or request.form:
+        kind = request.form.get("kind", "recommend")
+        try:
+            params = json.loads(request.form.get("params") or "{}")
+        except ValueError:
+            return jsonify({"error": "params must be JSON"}), 400
+    else:
+        params = request.get_json(silent=True) or {}
+        kind = params.pop("kind", None)
+    if not isinstance(params, dict):
+        return jsonify({"error": "params must be an object"}), 400
+
+    if kind == "history_export":
+        filters = history_filters(user, params)
+        if filters is None:
+            return jsonify({"error": "You can only export your own history"}), 403
+        params.update(filters)
+
+    try:
+        job = jobs.submit(user, kind, params, upload)
+    except JobLimitError as e:
+        return jsonify({"error": str(e)}), 429
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Job submit error: {e}", exc_info=True)
+        return jsonify({"error": "Job could not be created"}), 500
+
+    response, status = _job_response(job, 202)
+    response.headers["Location"] = job["links"]["self"]
+    return response, status
+
+@app.route("/api/jobs", methods=["GET"])
+@limiter.limit("120 per minute")
+def list_jobs():
+    if not JOBS_AVAILABLE:
+        return jsonify({"error": "Batch jobs not available"}), 503
+    user = session.get("user_email")
+    if not user:
+        return jsonify({"error": "Login required"}), 401
+    return jsonify({"status": "success", "jobs": jobs.list_jobs(user)})
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+@limiter.limit("120 per minute")      # clients poll this
+def job_status(job_id):
+    if not JOBS_AVAILABLE:
+        return jsonify({"error": "Batch jobs not available"}), 503
+    user = session.get("user_email")
+    if not user:
+        return jsonify({"error": "Login required"}), 401
+    job = jobs.get_job(user, job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return _job_response(job)
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+@limiter.limit("30 per minute")
+def job_result(job_id):
+    if not JOBS_AVAILABLE:
+        return jsonify({"error": "Batch jobs not available"}), 503
+    user = session.get("user_email")
+    if not user:
+        return jsonify({"error": "Login required"}), 401
+    job = jobs.get_job(user, job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] == "expired":
+        return jsonify({"error": "Job result has expired"}), 410
+    result = jobs.result_file(user, job_id)
+    if result is None:
+        return jsonify({"error": f"Job is {job['status']}; no result to download", "job": job}), 404
+    path, name, mimetype = result
+    return send_file(path, mimetype=mimetype, as_attachment=True, download_name=name)
+
+@app.route("/api/jobs/<job_id>/cancel", methods=["POST"])
+@limiter.limit("30 per minute")
+def cancel_job(job_id):
+    if not JOBS_AVAILABLE:
+        return jsonify({"error": "Batch jobs not available"}), 503
+    user = session.get("user_email")
+    if not user:
+        return jsonify({"error": "Login required"}), 401
+    job = jobs.cancel(user, job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return _job_response(job)
+
+@app.route("/api/jobs/<job_id>/retry", methods=["POST"])
+@limiter.limit("30 per minute")
+def retry_job(job_id):
+    if not JOBS_AVAILABLE:
+        return jsonify({"error": "Batch jobs not available"}), 503
+    user = session.get("user_email")
+    if not user:
+        return jsonify({"error": "Login required"}), 401
+    try:
+        job = jobs.retry(user, job_id)
+    except JobLimitError as e:
+        return jsonify({"error": str(e)}), 429
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return _job_response(job)
 
 
 # ==========================================================
@@ -552,6 +1019,7 @@ def health():
     return jsonify({
         "status":                        "healthy",
         "ml_available":                  ML_AVAILABLE,
+        "model_version":                 (MODEL_INFO or {}).get("version", "unversioned") if ML_AVAILABLE else None,
         "environment":                   "local" if host in ("localhost", "127.0.0.1") else "production",
         "max_recommendations_per_window": MAX_RECOMMENDATIONS_PER_WINDOW,
         "rate_limit_window_minutes":     RATE_LIMIT_WINDOW_MINUTES,
@@ -571,4 +1039,6 @@ if __name__ == "__main__":
     logger.info(f"   BI dashboard: {BI_DASHBOARD_HTML}")
     logger.info("=" * 60)
     load_materials_data()  # Pre-warm cache
+    if JOBS_AVAILABLE:
+        jobs.watch_workers(JOB_WORKERS)     # JOB_WORKERS=N: a worker pool next to the dev server
     app.run(debug=True, host="0.0.0.0", port=5000)
\ No newline at end of file
@@ -2,41 +2,118 @@
 Authentication Module
 ---------------------
 - Email/password authentication
-- Bcrypt password hashing
+- Bcrypt password hashing (bounded worker pool, load shedding)
+- Configurable bcrypt work factor with rehash-on-login
 - 3-attempt lockout mechanism
 - First-time password setup
 """
 
+import os
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 import bcrypt
-import pymysql
 from typing import Tuple, Dict
 
-from db import get_db
+from db import get_db, IntegrityError
 
 logger = logging.getLogger(__name__)
 
 MAX_ATTEMPTS = 3
 
+# ======================================================
+# ⚙️ Hashing pool config
+# ======================================================
+# bcrypt costs ~100-300 ms of CPU per call. Hashing runs on a small
+# dedicated pool so a login burst cannot take every CPU away from the
+# recommendation endpoints. When all workers are busy and the queue is
+# full, new logins are shed with a 429 instead of piling up.
+BCRYPT_ROUNDS          = int(os.getenv("BCRYPT_ROUNDS", 12))
+HASH_POOL_WORKERS      = int(os.getenv("AUTH_HASH_WORKERS", 2))
+HASH_POOL_QUEUE_LIMIT  = int(os.getenv("AUTH_HASH_QUEUE_LIMIT", 8))
+HASH_TIMEOUT_SECONDS   = float(os.getenv("AUTH_HASH_TIMEOUT_SECONDS", 10))
+
+_hash_executor = ThreadPoolExecutor(
+    max_workers=HASH_POOL_WORKERS,
+    thread_name_prefix="bcrypt"
+)
+# Running + queued jobs; acquired without blocking so saturation is
+# detected immediately on the request thread.
+_hash_slots = threading.BoundedSemaphore(HASH_POOL_WORKERS + HASH_POOL_QUEUE_LIMIT)
+
+
+class HashPoolSaturated(Exception):
+    """Raised when the bcrypt pool has no free worker or queue slot."""
+
+
+class HashPoolTimeout(Exception):
+    """Raised when a hash waited HASH_TIMEOUT_SECONDS without finishing (it still runs and frees its slot)."""
+
+
+def _run_on_hash_pool(fn, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise HashPoolSaturated("Password hashing pool is saturated")
+    try:
+        future = _hash_executor.submit(fn, *args)
+    except Exception:
+        _hash_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hash_slots.release())
+    try:
+        return future.result(timeout=HASH_TIMEOUT_SECONDS)
+    except FutureTimeout:
+        raise HashPoolTimeout(f"Password hashing took longer than {HASH_TIMEOUT_SECONDS:g}s")
+
 
 # ======================================================
 # 🔐 Helpers
 # ======================================================
 
-def hash_password(password: str) -> str:
+def _hashpw(password: str) -> str:
     return bcrypt.hashpw(
         password.encode("utf-8"),
-        bcrypt.gensalt()
+        bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     ).decode("utf-8")
 
 
-def verify_password(password: str, hashed: str) -> bool:
+def _checkpw(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(
         password.encode("utf-8"),
         hashed.encode("utf-8")
     )
 
 
+def hash_password(password: str) -> str:
+    """Hash on the bounded pool. Raises HashPoolSaturated when full, HashPoolTimeout when slow."""
+    return _run_on_hash_pool(_hashpw, password)
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    """Verify on the bounded pool. Raises HashPoolSaturated when full, HashPoolTimeout when slow."""
+    return _run_on_hash_pool(_checkpw, password, hashed)
+
+
+def needs_rehash(hashed: str) -> bool:
+    """True when a stored hash was made with a different work factor."""
+    try:
+        # Format: $2b$<cost>$<salt+hash>
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+def _saturated_response():
+    logger.warning("⏳ Login shed: password hashing pool saturated")
+    return {"error": "Too many login attempts in progress, try again shortly",
+            "retry": True}, 429
+
+
+def _timeout_response():
+    logger.warning(f"⏳ Login timed out: password hashing took over {HASH_TIMEOUT_SECONDS:g}s")
+    return {"error": "Login is taking too long, try again shortly",
+            "retry": True}, 503
+
+
 # ======================================================
 # 🧾 Registration
 # ======================================================
@@ -60,7 +137,7 @@ def register_email(email: str) -> Tuple[Dict, int]:
         logger.info(f"✅ Email registered: {email}")
         return {"success": True, "message": "Email registered"}, 201
 
-    except pymysql.err.IntegrityError:
+    except IntegrityError:
         logger.warning(f"⚠️ Email already exists: {email}")
         return {"error": "Email already exists"}, 409
 
@@ -86,7 +163,6 @@ Authentication Module
 
 import bcrypt
 import logging
-import pymysql
 from db import get_db
 
 logger = logging.getLogger(__name__)
@@ -99,28 +175,42 @@ def login_user(email, password):
     Unified login flow:
     - If email does not exist → create user + set password
     - If exists & no password → set password
-    - If exists & password → verify
+    - If exists & password → verify (rehash if BCRYPT_ROUNDS changed)
+
+    A SELECT plus an UPDATE: bcrypt checks the password in Python, so the
+    stored hash has to be read before the outcome is known. A wrong
+    password increments failed_attempts in SQL and derives is_locked in
+    the same UPDATE, then reads the counter back, so concurrent failures
+    are all counted.
+    Hashing runs on the bounded bcrypt pool; 429 when it is saturated,
+    503 when a hash outlasts AUTH_HASH_TIMEOUT_SECONDS.
     """
 
     db = get_db()
     try:
         with db.cursor() as cur:
-            # Fetch user
-            cur.execute("SELECT * FROM users WHERE email=%s", (email,))
+            # Fetch only what the flow needs
+            cur.execute(
+                """
+                SELECT password_hash, failed_attempts, is_locked
+                FROM users WHERE email=%s
+                """,
+                (email,)
+            )
             user = cur.fetchone()
 
             # ==================================================
             # CASE 1: USER DOES NOT EXIST → AUTO REGISTER
             # ==================================================
             if not user:
-                hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+                hashed = hash_password(password)
 
                 cur.execute(
                     """
                     INSERT INTO users (email, password_hash, failed_attempts, is_locked, last_login)
                     VALUES (%s, %s, 0, FALSE, NOW())
                     """,
-                    (email, hashed.decode())
+                    (email, hashed)
                 )
 
                 logger.info(f"🆕 Auto-registered new user: {email}")
@@ -143,7 +233,7 @@ def login_user(email, password):
             # CASE 3: FIRST LOGIN (PASSWORD NOT SET)
             # ==================================================
             if user["password_hash"] is None:
-                hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+                hashed = hash_password(password)
 
                 cur.execute(
                     """
@@ -151,7 +241,7 @@ def login_user(email, password):
                     SET password_hash=%s, last_login=NOW()
                     WHERE email=%s
                     """,
-                    (hashed.decode(), email)
+                    (hashed, email)
                 )
 
                 logger.info(f"🔐 Password set for first-time user: {email}")
@@ -166,16 +256,28 @@ def login_user(email, password):
             # ==================================================
             # CASE 4: NORMAL LOGIN → VERIFY PASSWORD
             # ==================================================
-            if bcrypt.checkpw(password.encode(), user["password_hash"].encode()):
+            if verify_password(password, user["password_hash"]):
+                new_hash = None
+                if needs_rehash(user["password_hash"]):
+                    try:
+                        new_hash = hash_password(password)
+                    except (HashPoolSaturated, HashPoolTimeout):
+                        # Login already verified; upgrade on a later login
+                        new_hash = None
+
+                # Rehash rides along in the same UPDATE
                 cur.execute(
                     """
                     UPDATE users
-                    SET failed_attempts=0, last_login=NOW()
+                    SET failed_attempts=0, last_login=NOW(),
+                        password_hash=COALESCE(%s, password_hash)
                     WHERE email=%s
                     """,
-                    (email,)
+                    (new_hash, email)
                 )
 
+                if new_hash:
+                    logger.info(f"🔁 Password rehashed to cost {BCRYPT_ROUNDS}: {email}")
                 logger.info(f"✅ Login successful: {email}")
 
                 return {
@@ -187,17 +289,19 @@ def login_user(email, password):
             # ==================================================
             # CASE 5: WRONG PASSWORD
             # ==================================================
-            attempts = user["failed_attempts"] + 1
-            locked = attempts >= MAX_ATTEMPTS
-
+            # is_locked first: MySQL applies SET assignments left to right
             cur.execute(
                 """
                 UPDATE users
-                SET failed_attempts=%s, is_locked=%s
+                SET is_locked = (is_locked OR failed_attempts + 1 >= %s),
+                    failed_attempts = failed_attempts + 1
                 WHERE email=%s
                 """,
-                (attempts, locked, email)
+                (MAX_ATTEMPTS, email)
             )
+            cur.execute("SELECT failed_attempts, is_locked FROM users WHERE email=%s", (email,))
+            user = cur.fetchone()
+            attempts, locked = user["failed_attempts"], bool(user["is_locked"])
 
             if locked:
                 logger.warning(f"🔒 Account locked after {MAX_ATTEMPTS} attempts: {email}")
@@ -205,9 +309,15 @@ def login_user(email, password):
 
             return {
                 "error": "Invalid password",
-                "attempts_remaining": MAX_ATTEMPTS - attempts
+                "attempts_remaining": max(MAX_ATTEMPTS - attempts, 0)
             }, 401
 
+    except HashPoolSaturated:
+        return _saturated_response()
+
+    except HashPoolTimeout:
+        return _timeout_response()
+
     except Exception as e:
         logger.exception("Authentication error")
         return {"error": "Authentication failed"}, 500
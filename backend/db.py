@@ -1,10 +1,28 @@
 """
 Database Module
-MySQL connection utilities for EcoPackAI
+Connection utilities for EcoPackAI
+- DB_BACKEND=mysql (default): pymysql, one connection per get_db() call
+- DB_BACKEND=sqlite: embedded SQLite file (SQLITE_PATH) in WAL mode,
+  schema translated from sql/schema.sql on first use. Connections are
+  kept per thread so sqlite3's statement cache acts as prepared
+  statements across calls
+- Both return the same surface: cursor() as a context manager, %s
+  placeholders, dict rows, lastrowid, executemany, begin / commit /
+  rollback / close
+- streaming_cursor() reads a large result without buffering it:
+  pymysql's unbuffered server-side SSDictCursor, or SQLite's cursor,
+  which already steps row by row
 """
 
-import pymysql
 import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+
+import pymysql
 from dotenv import load_dotenv
 import logging
 
@@ -12,10 +30,21 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-def get_db():
-    """
-    Returns a MySQL connection
-    """
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SCHEMA_PATH = PROJECT_ROOT / "sql" / "schema.sql"
+
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").lower()
+SQLITE_PATH = Path(os.getenv("SQLITE_PATH", PROJECT_ROOT / "data" / "ecopackai.sqlite3"))
+SQLITE_STATEMENT_CACHE = 256
+
+# Callers catch these regardless of backend
+IntegrityError = (pymysql.err.IntegrityError, sqlite3.IntegrityError)
+
+
+# ======================================================
+# MySQL
+# ======================================================
+def _mysql_connection():
     return pymysql.connect(
         host=os.getenv("DB_HOST"),
         port=int(os.getenv("DB_PORT", 3306)),
@@ -26,9 +55,208 @@ def get_db():
         autocommit=True
     )
 
+
+# ======================================================
+# SQLite
+# ======================================================
+def translate_schema(mysql_sql):
+    """sql/schema.sql (MySQL) → the equivalent SQLite DDL."""
+    sql = re.sub(r"^\s*USE\s+\w+\s*;", "", mysql_sql, flags=re.IGNORECASE | re.MULTILINE)
+    sql = re.sub(r"\b(?:BIG)?INT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", "INTEGER PRIMARY KEY AUTOINCREMENT",
+                 sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bCREATE\s+TABLE\s+(?!IF\s+NOT\s+EXISTS)", "CREATE TABLE IF NOT EXISTS ",
+                 sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bJSON\b", "TEXT", sql)
+
+    # Inline "INDEX name (cols)" → CREATE INDEX after the table
+    def split_indexes(m):
+        table, body = m.group(1), m.group(2)
+        indexes = re.findall(r",\s*INDEX\s+(\w+)\s*(\([^)]*\))", body, flags=re.IGNORECASE)
+        body = re.sub(r",\s*INDEX\s+\w+\s*\([^)]*\)", "", body, flags=re.IGNORECASE)
+        creates = "".join(f"\nCREATE INDEX IF NOT EXISTS {name} ON {table} {cols};" for name, cols in indexes)
+        return f"CREATE TABLE IF NOT EXISTS {table} ({body}\n);{creates}"
+
+    return re.sub(r"CREATE TABLE IF NOT EXISTS (\w+) \((.*?)\n\);", split_indexes, sql, flags=re.DOTALL)
+
+
+@lru_cache(maxsize=SQLITE_STATEMENT_CACHE)
+def translate_sql(sql):
+    """MySQL statement → SQLite (cached, so repeated statements reuse the compiled form)."""
+    sql = sql.replace("%s", "?")
+    return re.sub(r"\bNOW\(\)", "CURRENT_TIMESTAMP", sql, flags=re.IGNORECASE)
+
+
+# Explicit adapters / converters (the sqlite3 defaults are deprecated)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(" "))
+sqlite3.register_adapter(bool, int)
+sqlite3.register_converter("DATE", lambda b: date.fromisoformat(b.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda b: datetime.fromisoformat(b.decode()))
+
+
+class SQLiteCursor:
+    def __init__(self, conn):
+        self._cur = conn.cursor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._cur.close()
+
+    def execute(self, sql, params=()):
+        self._cur.execute(translate_sql(sql), tuple(params or ()))
+        return self._cur.rowcount
+
+    def executemany(self, sql, rows):
+        self._cur.executemany(translate_sql(sql), [tuple(r) for r in rows])
+        return self._cur.rowcount
+
+    def fetchone(self):
+        row = self._cur.fetchone()
+        return dict(row) if row is not None else None
+
+    def fetchmany(self, size):
+        return [dict(r) for r in self._cur.fetchmany(size)]
+
+    def fetchall(self):
+        return [dict(r) for r in self._cur.fetchall()]
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    @property
+    def description(self):
+        return self._cur.description
+
+
+class SQLiteConnection:
+    """Thread-local sqlite3 connection; close() ends the unit of work but keeps it open."""
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES, cached_statements=SQLITE_STATEMENT_CACHE
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")     # WAL: durable at checkpoints, no fsync per commit
+        self._conn.execute("PRAGMA foreign_keys=ON")
+
+    def cursor(self, cursor=None):
+        # `cursor` mirrors pymysql's cursor class argument; sqlite3 cursors are already unbuffered
+        return SQLiteCursor(self._conn)
+
+    def begin(self):
+        # Take the write lock up front, like InnoDB row locks for our upserts
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        if self._conn.in_transaction:
+            self._conn.execute("COMMIT")
+
+    def rollback(self):
+        if self._conn.in_transaction:
+            self._conn.execute("ROLLBACK")
+
+    def close(self):
+        self.rollback()
+
+
+_sqlite_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+
+def _sqlite_connection(path=None):
+    path = str(path or SQLITE_PATH)
+    conns = getattr(_sqlite_local, "conns", None)
+    if conns is None or _sqlite_local.pid != os.getpid():   # fresh after fork
+        conns = _sqlite_local.conns = {}
+        _sqlite_local.pid = os.getpid()
+    conn = conns.get(path)
+    if conn is None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = conns[path] = SQLiteConnection(path)
+        with _schema_lock:
+            if path not in _schema_ready:
+                _apply_schema(conn._conn)
+                _schema_ready.add(path)
+    return conn
+
+
+def _apply_schema(conn):
+    script = translate_schema(SCHEMA_PATH.read_text())
+    indexes = re.findall(r"^CREATE INDEX IF NOT EXISTS .*?;$", script, flags=re.MULTILINE)
+    conn.executescript(re.sub(r"^CREATE INDEX IF NOT EXISTS .*?;$", "", script, flags=re.MULTILINE))
+    for statement in indexes:
+        try:
+            conn.execute(statement)
+        except sqlite3.OperationalError as e:
+            # e.g. an index on a column an older database doesn't have yet (history_store.py migrate)
+            logger.warning(f"⚠️ Schema index skipped ({e}): {statement}")
+
+
+# ======================================================
+# Public
+# ======================================================
+def get_db():
+    """
+    Returns a connection for the configured backend (DB_BACKEND)
+    """
+    if DB_BACKEND == "sqlite":
+        return _sqlite_connection()
+    return _mysql_connection()
+
+
+def streaming_cursor(conn):
+    """Cursor that fetches rows as they are consumed instead of buffering the whole result."""
+    if DB_BACKEND == "sqlite":
+        return conn.cursor()
+    return conn.cursor(pymysql.cursors.SSDictCursor)
+
+
+def upsert_add_sql(table, key_columns, add_columns):
+    """INSERT that adds add_columns onto an existing row with the same key, in this backend's dialect."""
+    columns = list(key_columns) + list(add_columns)
+    insert = (f"INSERT INTO {table} ({', '.join(columns)}) "
+              f"VALUES ({', '.join(['%s'] * len(columns))})")
+    if DB_BACKEND == "sqlite":
+        updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in add_columns)
+        return f"{insert} ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {updates}"
+    updates = ", ".join(f"{c} = {c} + VALUES({c})" for c in add_columns)
+    return f"{insert} ON DUPLICATE KEY UPDATE {updates}"
+
+
+def upsert_replace_sql(table, key_columns, value_columns):
+    """INSERT that overwrites value_columns of an existing row with the same key, in this backend's dialect."""
+    columns = list(key_columns) + list(value_columns)
+    insert = (f"INSERT INTO {table} ({', '.join(columns)}) "
+              f"VALUES ({', '.join(['%s'] * len(columns))})")
+    if DB_BACKEND == "sqlite":
+        updates = ", ".join(f"{c} = excluded.{c}" for c in value_columns)
+        return f"{insert} ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {updates}"
+    updates = ", ".join(f"{c} = VALUES({c})" for c in value_columns)
+    return f"{insert} ON DUPLICATE KEY UPDATE {updates}"
+
+
+def insert_ignore_sql(table, columns):
+    """INSERT that skips rows colliding with a unique key, in this backend's dialect."""
+    verb = "INSERT OR IGNORE" if DB_BACKEND == "sqlite" else "INSERT IGNORE"
+    return f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+
+
 def test_connection():
     """
-    Tests MySQL connectivity
+    Tests database connectivity
     Returns True / False
     """
     try:
@@ -36,10 +264,10 @@ def test_connection():
         with db.cursor() as cur:
             cur.execute("SELECT 1")
         db.close()
-        logger.info("✅ Database connection successful")
+        logger.info(f"✅ Database connection successful ({DB_BACKEND})")
         return True
     except Exception as e:
-        logger.error(f"❌ Database connection failed: {e}")
+        logger.error(f"❌ Database connection failed ({DB_BACKEND}): {e}")
         return False
 
 # Allow standalone test
@@ -47,4 +275,4 @@ if __name__ == "__main__":
     if test_connection():
         print("✅ Database connection successful!")
     else:
-        print("❌ Database connection failed!")
\ No newline at end of file
+        print("❌ Database connection failed!")
@@ -0,0 +1,221 @@
+"""
+Drift Monitor State (shared across workers)
+-------------------------------------------
+- Each process feeds /api/recommend traffic into one DriftMonitor
+  (ml/notebooks/drift_monitor.py) per window. Windows are
+  DRIFT_WINDOW_SECONDS long and aligned to the epoch, so every worker's
+  windows line up
+- A background thread writes the sketches to drift_monitor_state every
+  DRIFT_FLUSH_SECONDS (one row per worker × window, replaced in place)
+  and at exit; rows older than DRIFT_RETAIN_WINDOWS windows are deleted
+- drift_metrics() merges every worker's rows for the last N windows
+  (this worker's own unwritten state from memory) and scores the result
+  against the training reference. If the database is unreachable the
+  report covers this worker only ("shared": false)
+- DRIFT_MONITOR=0 turns observation off
+"""
+
+import atexit
+import json
+import logging
+import os
+import secrets
+import socket
+import threading
+import time
+from datetime import datetime
+
+from db import get_db, upsert_replace_sql
+from ml.notebooks.drift_monitor import DriftMonitor, drift_report
+
+logger = logging.getLogger(__name__)
+
+DRIFT_MONITOR = os.getenv("DRIFT_MONITOR", "1") != "0"
+DRIFT_WINDOW_SECONDS = int(os.getenv("DRIFT_WINDOW_SECONDS", 3600))
+DRIFT_FLUSH_SECONDS = float(os.getenv("DRIFT_FLUSH_SECONDS", 30))
+DRIFT_RETAIN_WINDOWS = int(os.getenv("DRIFT_RETAIN_WINDOWS", 48))
+DRIFT_MIN_SAMPLES = int(os.getenv("DRIFT_MIN_SAMPLES", 100))   # per feature, before it gets a status
+
+STATE_TABLE = "drift_monitor_state"
+_UPSERT = upsert_replace_sql(STATE_TABLE, ("worker_id", "window_start"), ("updated_at", "state"))
+
+
+def window_start(ts, window_seconds=DRIFT_WINDOW_SECONDS):
+    return int(ts // window_seconds) * window_seconds
+
+
+class DriftRecorder:
+    def __init__(self, window_seconds=DRIFT_WINDOW_SECONDS, flush_seconds=DRIFT_FLUSH_SECONDS,
+                 retain_windows=DRIFT_RETAIN_WINDOWS):
+        self.window_seconds = window_seconds
+        self.flush_seconds = flush_seconds
+        self.retain_windows = retain_windows
+        self._lock = threading.Lock()
+        self._pid = None
+        self.worker_id = None
+        self.window_start = window_start(time.time(), window_seconds)
+        self.monitor = DriftMonitor()
+        self._finished = []      # (window_start, monitor) not written yet
+
+    # --------------------------------------------------
+    # Request path
+    # --------------------------------------------------
+    def _ensure_worker(self):
+        # First use in this process (also after a fork): own id, empty state, own flusher
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.worker_id = f"{socket.gethostname()[:40]}:{self._pid}:{secrets.token_hex(3)}"
+            self.window_start = window_start(time.time(), self.window_seconds)
+            self.monitor = DriftMonitor()
+            self._finished = []
+            threading.Thread(target=self._flush_loop, name="drift-flush", daemon=True).start()
+
+    def _current(self):
+        start = window_start(time.time(), self.window_seconds)
+        if start != self.window_start:
+            with self._lock:
+                if start != self.window_start:
+                    self._finished.append((self.window_start, self.monitor))
+                    self.window_start, self.monitor = start, DriftMonitor()
+        return self.monitor
+
+    def observe(self, shipment, pred_cost=None, pred_co2=None):
+        """One scored shipment + its candidates' predictions; a few tens of µs."""
+        if not DRIFT_MONITOR:
+            return
+        self._ensure_worker()
+        self._current().observe(shipment, pred_cost, pred_co2)
+
+    # --------------------------------------------------
+    # Persistence
+    # --------------------------------------------------
+    def _pending(self):
+        with self._lock:
+            current = self.window_start
+            pending = self._finished + [(current, self.monitor)]
+            self._finished = []
+        return current, [(start, m) for start, m in pending if m.shipments]
+
+    def flush(self):
+        """Writes this worker's states; they're put back for the next try if that fails."""
+        if self.worker_id is None:
+            return
+        current, pending = self._pending()
+        oldest = window_start(time.time(), self.window_seconds) - self.retain_windows * self.window_seconds
+        db = get_db()
+        try:
+            db.begin()
+            with db.cursor() as cur:
+                if pending:
+                    cur.executemany(_UPSERT, [
+                        (self.worker_id, start, datetime.now(), json.dumps(m.to_dict()))
+                        for start, m in pending
+                    ])
+                cur.execute(f"DELETE FROM {STATE_TABLE} WHERE window_start < %s", (oldest,))
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self._finished = [(s, m) for s, m in pending if s != current] + self._finished
+            raise
+        finally:
+            db.close()
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"⚠️ Drift state not written: {e}")
+
+    def states(self, windows=1):
+        """
+        (states, workers, shared): every worker's sketches for the last
+        `windows` windows; this worker's own come from memory.
+        """
+        first = window_start(time.time(), self.window_seconds) - (windows - 1) * self.window_seconds
+        with self._lock:
+            local = [(s, m) for s, m in self._finished + [(self.window_start, self.monitor)] if s >= first]
+        states = [m for _, m in local]
+        mine = {s for s, _ in local}
+        workers = {self.worker_id} if self.worker_id and any(m.shipments for m in states) else set()
+        try:
+            db = get_db()
+            try:
+                with db.cursor() as cur:
+                    cur.execute(f"SELECT worker_id, window_start, state FROM {STATE_TABLE} "
+                                f"WHERE window_start >= %s", (first,))
+                    rows = cur.fetchall()
+            finally:
+                db.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Drift state not readable, reporting this worker only: {e}")
+            return states, workers, False
+        for row in rows:
+            if row["worker_id"] == self.worker_id and row["window_start"] in mine:
+                continue
+            state = row["state"]
+            states.append(json.loads(state) if isinstance(state, (str, bytes)) else state)
+            workers.add(row["worker_id"])
+        return states, workers, True
+
+
+drift_recorder = DriftRecorder()
+
+
+@atexit.register
+def _flush_at_exit():
+    if DRIFT_MONITOR and drift_recorder._pid == os.getpid():
+        try:
+            drift_recorder.flush()
+        except Exception as e:
+            logger.warning(f"⚠️ Drift state not written at exit: {e}")
+
+
+# ======================================================
+# Report
+# ======================================================
+def drift_metrics(reference=None, windows=1, recorder=None):
+    """Drift report over the last `windows` windows, merged across workers."""
+    recorder = recorder or drift_recorder
+    if not 1 <= windows <= recorder.retain_windows:
+        raise ValueError(f"windows must be between 1 and {recorder.retain_windows}")
+    states, workers, shared = recorder.states(windows)
+    report = drift_report(DriftMonitor.merged(states), reference, DRIFT_MIN_SAMPLES)
+    now = time.time()
+    report["window"] = {
+        "seconds": recorder.window_seconds,
+        "windows": windows,
+        "from": window_start(now, recorder.window_seconds) - (windows - 1) * recorder.window_seconds,
+        "to": int(now),
+    }
+    report["workers"] = len(workers)
+    report["shared"] = shared
+    report["reference"] = None if reference is None else {
+        "built_at": reference["built_at"], "training_rows": reference["training_rows"],
+    }
+    return report
+
+
+def prometheus_text(report):
+    """The report's scalar drift metrics in the Prometheus text exposition format."""
+    lines = [
+        "# TYPE ecopack_drift_shipments gauge",
+        f"ecopack_drift_shipments {report['shipments']}",
+        "# TYPE ecopack_drift_workers gauge",
+        f"ecopack_drift_workers {report['workers']}",
+    ]
+    metrics = (("psi", "ecopack_drift_psi"), ("out_of_range", "ecopack_drift_out_of_range_ratio"),
+               ("unseen_share", "ecopack_drift_unseen_ratio"), ("mean_shift_std", "ecopack_drift_mean_shift_std"))
+    for key, metric in metrics:
+        values = [(name, f[key]) for name, f in report["features"].items() if f.get(key) is not None]
+        if values:
+            lines.append(f"# TYPE {metric} gauge")
+            lines += [f'{metric}{{feature="{name}"}} {value}' for name, value in values]
+    return "\n".join(lines) + "\n"
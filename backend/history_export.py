@@ -0,0 +1,367 @@
+"""
+Streaming History Export
+------------------------
+- Streams recommendation_history as CSV, NDJSON or Parquet without
+  holding the result set: db.streaming_cursor() reads through MySQL's
+  unbuffered server-side cursor (SQLite steps its cursor row by row)
+- Each row's recommendations are decoded as it arrives (packed results
+  or JSON, see history_store.py) and output leaves in ~64 KB chunks, so
+  memory stays flat however many rows match
+- Filters go into the SQL: email + from/to use idx_history_email_created,
+  from/to alone idx_history_created, category / shipping_mode the
+  shipment join (idx_shipment_category_mode → idx_history_shipment)
+- CSV / Parquet: one line per recommendation (rank 1..k) with its
+  history and shipment columns; NDJSON: one object per saved result
+- GET /api/history/export, or the CLI:
+    python backend/history_export.py --format csv --out history.csv \\
+        [--email a@b.c] [--from 2026-01-01] [--to 2026-03-31] \\
+        [--category Electronics] [--shipping-mode Air]
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT))
+
+import db
+from db import get_db, streaming_cursor
+from history_store import SHIPMENT_COLUMNS, decode_results, shipment_from_columns
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", 64 * 1024))
+EXPORT_FETCH_ROWS = int(os.getenv("EXPORT_FETCH_ROWS", 1000))
+PARQUET_ROW_GROUP = int(os.getenv("EXPORT_PARQUET_ROW_GROUP", 20_000))
+
+FORMATS = {
+    "csv":     ("text/csv", "csv"),
+    "ndjson":  ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+HISTORY_FIELDS = ["history_id", "created_at", "email", "session_id", "product_category", "weight_kg",
+                  "fragility", "shipping_mode", "distance_km", "moisture_sensitive", "length_cm",
+                  "width_cm", "height_cm", "k_value", "sort_by"]
+# Recommendation key → flat column (CSV / Parquet); Explanation only goes to NDJSON
+RECOMMENDATION_FIELDS = {
+    "Material_Name": "material_name", "Pred_Cost": "pred_cost", "Pred_CO2": "pred_co2",
+    "Biodegradable": "biodegradable", "Tensile_Strength_MPa": "tensile_strength_mpa",
+    "Sustainability": "sustainability", "Pareto_Rank": "pareto_rank",
+}
+FLAT_FIELDS = HISTORY_FIELDS + ["rank"] + list(RECOMMENDATION_FIELDS.values())
+
+_SELECT = """
+    SELECT h.id, h.created_at, h.email, h.session_id, h.k_value, h.sort_by,
+           h.results, h.recommendations,
+           s.product_category, s.weight_kg, s.fragility, s.shipping_mode, s.distance_km,
+           s.moisture_sensitive, s.length_cm, s.width_cm, s.height_cm
+    FROM recommendation_history h
+    LEFT JOIN shipment_fingerprints s ON s.id = h.shipment_id
+"""
+
+
+# ======================================================
+# Query
+# ======================================================
+def _parse_day(value, name):
+    if not value:
+        return None
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name} {value!r} (expected YYYY-MM-DD)")
+
+
+def build_query(filters):
+    """
+    SQL + params for the filters: email, from / to (inclusive days),
+    category, shipping_mode. Rows come in (created_at, id) order, which
+    is the order of the created_at indexes, so nothing is sorted.
+    """
+    start = _parse_day(filters.get("from"), "from")
+    end = _parse_day(filters.get("to"), "to")
+    if start and end and start > end:
+        raise ValueError("'from' is after 'to'")
+
+    where, params = [], []
+    if filters.get("email"):
+        where.append("h.email = %s")
+        params.append(filters["email"])
+    if start:
+        where.append("h.created_at >= %s")
+        params.append(datetime.combine(start, datetime.min.time()))
+    if end:
+        # half-open upper bound keeps the range sargable
+        where.append("h.created_at < %s")
+        params.append(datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    for arg, column in (("category", "s.product_category"), ("shipping_mode", "s.shipping_mode")):
+        if filters.get(arg):
+            where.append(f"{column} = %s")
+            params.append(filters[arg])
+
+    sql = _SELECT + (f"WHERE {' AND '.join(where)}\n" if where else "") + "ORDER BY h.created_at, h.id"
+    return sql, params
+
+
+def decode_row(row):
+    """Joined history row → export record with its recommendations in the API shape."""
+    shipment = shipment_from_columns(row)
+    created_at = row["created_at"]
+    return {
+        "history_id": row["id"],
+        "created_at": created_at.isoformat(sep=" ") if isinstance(created_at, datetime) else created_at,
+        "email": row["email"],
+        "session_id": row["session_id"],
+        **{col: shipment[key] for key, col in SHIPMENT_COLUMNS.items()},
+        "k_value": row["k_value"],
+        "sort_by": row["sort_by"],
+        "recommendations": decode_results(row["results"], row["recommendations"]),
+    }
+
+
+class HistoryRows:
+    """
+    Matching history rows, decoded one at a time. The query runs on
+    construction (so bad filters / DB errors surface before a response
+    starts); iterate once, then close() (iteration closes on exhaustion).
+    """
+
+    def __init__(self, filters):
+        sql, params = build_query(filters)
+        self._conn = get_db()
+        try:
+            self._cur = streaming_cursor(self._conn)
+            if db.DB_BACKEND != "sqlite":
+                # A slow reader keeps the server-side result open; don't let MySQL drop it
+                self._cur.execute("SET SESSION net_write_timeout = 3600")
+            self._cur.execute(sql, params)
+        except Exception:
+            self._conn.close()
+            raise
+        self.count = 0
+
+    def __iter__(self):
+        try:
+            while True:
+                batch = self._cur.fetchmany(EXPORT_FETCH_ROWS)
+                if not batch:
+                    break
+                for row in batch:
+                    self.count += 1
+                    yield decode_row(row)
+        finally:
+            self.close()
+
+    def close(self):
+        if self._conn is None:
+            return
+        try:
+            self._cur.close()
+        finally:
+            self._conn.close()
+            self._conn = None
+
+
+def _flag(value):
+    # The engine's 0/1; older JSON rows may hold the catalogue's "Yes" / "No"
+    if isinstance(value, str):
+        return {"yes": 1, "no": 0}.get(value.strip().lower())
+    return None if value is None else int(value)
+
+
+def flat_rows(rows):
+    """One list per recommendation, in FLAT_FIELDS order: history columns, rank, recommendation fields."""
+    for row in rows:
+        base = [row[k] for k in HISTORY_FIELDS]
+        for rank, rec in enumerate(row["recommendations"], start=1):
+            values = {k: rec.get(k) for k in RECOMMENDATION_FIELDS}
+            values["Biodegradable"] = _flag(values["Biodegradable"])
+            yield base + [rank] + list(values.values())
+
+
+# ======================================================
+# Writers (generators of bytes chunks)
+# ======================================================
+def _chunked(pieces):
+    """Joins small str pieces into ~EXPORT_CHUNK_BYTES bytes chunks."""
+    buf, size = [], 0
+    for piece in pieces:
+        buf.append(piece)
+        size += len(piece)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield "".join(buf).encode()
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf).encode()
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if hasattr(value, "item"):          # numpy scalars in JSON-stored results
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def write_ndjson(rows):
+    return _chunked(json.dumps(row, default=_json_default) + "\n" for row in rows)
+
+
+def write_csv(rows):
+    line = io.StringIO()
+    writer = csv.writer(line)
+
+    def lines():
+        writer.writerow(FLAT_FIELDS)
+        for values in flat_rows(rows):
+            writer.writerow(values)
+            if line.tell() >= EXPORT_CHUNK_BYTES:
+                yield line.getvalue()
+                line.seek(0)
+                line.truncate()
+        yield line.getvalue()
+
+    return _chunked(lines())
+
+
+class _DrainSink(io.RawIOBase):
+    """Write-only file for ParquetWriter that hands its bytes out instead of keeping them."""
+
+    def __init__(self):
+        self._chunks, self._pos = [], 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self):
+        out, self._chunks = b"".join(self._chunks), []
+        return out
+
+
+def _parquet_schema():
+    return pa.schema([
+        ("history_id", pa.int64()), ("created_at", pa.string()), ("email", pa.string()),
+        ("session_id", pa.string()), ("product_category", pa.string()), ("weight_kg", pa.float64()),
+        ("fragility", pa.int32()), ("shipping_mode", pa.string()), ("distance_km", pa.float64()),
+        ("moisture_sensitive", pa.bool_()), ("length_cm", pa.float64()), ("width_cm", pa.float64()),
+        ("height_cm", pa.float64()), ("k_value", pa.int32()), ("sort_by", pa.string()),
+        ("rank", pa.int32()), ("material_name", pa.string()), ("pred_cost", pa.float64()),
+        ("pred_co2", pa.float64()), ("biodegradable", pa.int8()), ("tensile_strength_mpa", pa.float64()),
+        ("sustainability", pa.float64()), ("pareto_rank", pa.int32()),
+    ])
+
+
+def write_parquet(rows):
+    """Row groups of PARQUET_ROW_GROUP recommendation lines, each yielded once written."""
+    if not PARQUET_AVAILABLE:
+        raise ValueError("Parquet export needs pyarrow (pip install pyarrow)")
+    schema = _parquet_schema()
+    sink = _DrainSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    pending = []
+
+    def flush():
+        writer.write_table(pa.table(dict(zip(FLAT_FIELDS, map(list, zip(*pending)))), schema=schema))
+        pending.clear()
+        return sink.drain()
+
+    try:
+        for values in flat_rows(rows):
+            pending.append(values)
+            if len(pending) >= PARQUET_ROW_GROUP:
+                yield flush()
+        if pending:
+            yield flush()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+WRITERS = {"csv": write_csv, "ndjson": write_ndjson, "parquet": write_parquet}
+
+
+def export_history(filters, fmt="csv"):
+    """
+    (chunks, mimetype, extension). Filters are validated and the query
+    started before this returns; chunks is a generator of bytes.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown format {fmt!r}; use {sorted(WRITERS)}")
+    if fmt == "parquet" and not PARQUET_AVAILABLE:
+        raise ValueError("Parquet export needs pyarrow (pip install pyarrow)")
+    rows = HistoryRows(filters)
+    mimetype, ext = FORMATS[fmt]
+
+    def chunks():
+        try:
+            yield from WRITERS[fmt](rows)
+        finally:
+            rows.close()
+
+    return chunks(), mimetype, ext
+
+
+# ======================================================
+# CLI
+# ======================================================
+def main():
+    ap = argparse.ArgumentParser(description="Stream recommendation history to CSV / NDJSON / Parquet")
+    ap.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    ap.add_argument("--out", help="output file (default: stdout)")
+    ap.add_argument("--email")
+    ap.add_argument("--from", dest="start", help="first day, YYYY-MM-DD")
+    ap.add_argument("--to", dest="end", help="last day, YYYY-MM-DD (inclusive)")
+    ap.add_argument("--category")
+    ap.add_argument("--shipping-mode")
+    args = ap.parse_args()
+
+    filters = {"email": args.email, "from": args.start, "to": args.end,
+               "category": args.category, "shipping_mode": args.shipping_mode}
+    t0 = time.perf_counter()
+    try:
+        chunks, _, _ = export_history(filters, args.format)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    out = open(args.out, "wb") if args.out else sys.stdout.buffer
+    written = 0
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.out:
+            out.close()
+    print(f"✅ Exported {written:,} bytes of {args.format} in {time.perf_counter() - t0:.1f}s",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+"""
+Compact Recommendation History Storage
+--------------------------------------
+- shipment_fingerprints: one row per distinct shipment (sha1 of its
+  canonical form); history rows reference it via shipment_id instead of
+  repeating the nine shipment columns
+- results: each recommendation packed as (pred_cost, pred_co2,
+  tensile_strength, sustainability float64, biodegradable 0/1 uint8,
+  name length uint8) + the UTF-8 name after a one-byte layout id, 34
+  bytes + the name per material (+4 with Pareto_Rank). Records are
+  self-contained: editing clean_materials.csv doesn't change saved history
+- Results that don't fit a packed layout (Explanation, non-0/1
+  Biodegradable, names over 255 bytes) keep the JSON in `recommendations`
+- Migration of history written in the old layout (resumable, batched):
+    python backend/history_store.py migrate [--batch 1000] [--dry-run]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import struct
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT))
+
+import db
+from db import get_db, insert_ignore_sql
+from ml.notebooks.results import RecommendationSet
+
+logger = logging.getLogger(__name__)
+
+MIGRATE_BATCH_ROWS = int(os.getenv("HISTORY_MIGRATE_BATCH", 1000))
+
+BASE_KEYS = ("Material_Name", "Pred_Cost", "Pred_CO2", "Biodegradable", "Tensile_Strength_MPa", "Sustainability")
+
+# layout id → (record struct, extra keys stored after the base fields).
+# Each record is followed by its name_len bytes of UTF-8 Material_Name.
+LAYOUTS = {
+    3: (struct.Struct("<4dBB"), ()),
+    4: (struct.Struct("<4dBBi"), ("Pareto_Rank",)),
+}
+_LAYOUT_BY_KEYS = {frozenset(BASE_KEYS + extra): (lid, rec, extra) for lid, (rec, extra) in LAYOUTS.items()}
+
+# API shipment key → shipment_fingerprints column, and the canonical form hashed
+SHIPMENT_COLUMNS = {
+    "Category_item": "product_category",
+    "Weight_kg": "weight_kg",
+    "Fragility": "fragility",
+    "Shipping_Mode": "shipping_mode",
+    "Distance_km": "distance_km",
+    "Moisture_Sens": "moisture_sensitive",
+    "Length_cm": "length_cm",
+    "Width_cm": "width_cm",
+    "Height_cm": "height_cm",
+}
+_CANONICAL = {
+    "Category_item": str, "Shipping_Mode": str,
+    "Fragility": int, "Moisture_Sens": bool,
+    # FLOAT columns hold ~7 significant digits; 4 decimals survives the round trip
+    "Weight_kg": lambda v: round(float(v), 4), "Distance_km": lambda v: round(float(v), 4),
+    "Length_cm": lambda v: round(float(v), 4), "Width_cm": lambda v: round(float(v), 4),
+    "Height_cm": lambda v: round(float(v), 4),
+}
+
+
+# ======================================================
+# Shipments
+# ======================================================
+# Request fields (shared by /api/recommend, the sweep and batch jobs)
+SHIPMENT_FIELDS = [
+    "Category_item", "Weight_kg", "Fragility",
+    "Moisture_Sens", "Distance_km", "Shipping_Mode",
+    "Length_cm", "Width_cm", "Height_cm"
+]
+
+
+def parse_shipment(data, optional=()):
+    """Returns (shipment, error_msg). Fields in `optional` may be absent."""
+    for field in SHIPMENT_FIELDS:
+        if field not in data and field not in optional:
+            return None, f"Missing field: {field}"
+
+    casts = {
+        "Category_item": str,   "Weight_kg":     float,
+        "Fragility":     int,   "Moisture_Sens": bool,
+        "Distance_km":   float, "Shipping_Mode": str,
+        "Length_cm":     float, "Width_cm":      float,
+        "Height_cm":     float,
+    }
+    shipment = {}
+    for field in SHIPMENT_FIELDS:
+        if field in data:
+            shipment[field] = casts[field](data[field])
+    return shipment, None
+
+
+def canonical_shipment(shipment):
+    return {k: (None if shipment.get(k) is None else cast(shipment[k])) for k, cast in _CANONICAL.items()}
+
+
+def fingerprint(canonical):
+    return hashlib.sha1(json.dumps(canonical, sort_keys=True, separators=(",", ":")).encode()).digest()
+
+
+def shipment_from_columns(row):
+    """shipment_fingerprints row → the API's shipment dict."""
+    shipment = {key: row.get(col) for key, col in SHIPMENT_COLUMNS.items()}
+    if shipment["Moisture_Sens"] is not None:
+        shipment["Moisture_Sens"] = bool(shipment["Moisture_Sens"])
+    return shipment
+
+
+def _lookup(cur, prints):
+    cur.execute(f"SELECT id, fingerprint FROM shipment_fingerprints "
+                f"WHERE fingerprint IN ({', '.join(['%s'] * len(prints))})", list(prints))
+    return {bytes(r["fingerprint"]): r["id"] for r in cur.fetchall()}
+
+
+def intern_shipments(cur, shipments):
+    """
+    shipment_fingerprints ids for the shipments. Repeat shipments are the
+    common case, so they are looked up first and only new ones inserted
+    (INSERT IGNORE: a concurrent writer may add the same one first).
+    """
+    canon = [canonical_shipment(s) for s in shipments]
+    prints = [fingerprint(c) for c in canon]
+    unique = dict(zip(prints, canon))
+    ids = _lookup(cur, unique)
+    missing = [fp for fp in unique if fp not in ids]
+    if missing:
+        columns = ["fingerprint"] + list(SHIPMENT_COLUMNS.values())
+        cur.executemany(insert_ignore_sql("shipment_fingerprints", columns),
+                        [(fp, *[unique[fp][k] for k in SHIPMENT_COLUMNS]) for fp in missing])
+        ids.update(_lookup(cur, missing))
+    return [ids[fp] for fp in prints]
+
+
+# ======================================================
+# Recommendations
+# ======================================================
+def pack_recommendations(recommendations):
+    """
+    Packed bytes, or None when a record can't be rebuilt exactly from a
+    packed layout. recommendations: RecommendationSet or list of dicts.
+    """
+    results = RecommendationSet.coerce(recommendations)
+    layout = _LAYOUT_BY_KEYS.get(frozenset(results.columns)) if len(results) else _LAYOUT_BY_KEYS[frozenset(BASE_KEYS)]
+    if layout is None:
+        return None
+    layout_id, record, extra = layout
+    out = [bytes([layout_id])]
+    # A key missing from some records comes through as None and fails the pack
+    for name, cost, co2, bio, tensile, score, *rest in results.rows(*BASE_KEYS, *extra):
+        # The engine's Biodegradable is 0/1; anything else wouldn't come back as it went in
+        if not isinstance(name, str) or type(bio) is not int or bio not in (0, 1):
+            return None
+        encoded = name.encode("utf-8")
+        if len(encoded) > 255:
+            return None
+        try:
+            out.append(record.pack(float(cost), float(co2), float(tensile), float(score),
+                                   bio, len(encoded), *(int(v) for v in rest)))
+        except (TypeError, ValueError, struct.error):
+            return None
+        out.append(encoded)
+    return b"".join(out)
+
+
+def unpack_recommendations(blob):
+    blob = bytes(blob)
+    if blob[0] not in LAYOUTS:
+        raise ValueError(f"Unknown packed results layout {blob[0]}")
+    record, extra = LAYOUTS[blob[0]]
+    recs, pos = [], 1
+    while pos < len(blob):
+        cost, co2, tensile, score, bio, name_len, *rest = record.unpack_from(blob, pos)
+        pos += record.size
+        rec = {
+            "Material_Name": blob[pos:pos + name_len].decode("utf-8"),
+            "Pred_Cost": cost,
+            "Pred_CO2": co2,
+            "Biodegradable": bio,
+            "Tensile_Strength_MPa": tensile,
+            "Sustainability": score,
+        }
+        pos += name_len
+        rec.update(zip(extra, rest))
+        recs.append(rec)
+    return recs
+
+
+def encode_results(recommendations):
+    """(results blob, recommendations JSON): exactly one of them is set."""
+    packed = pack_recommendations(recommendations)
+    if packed is not None:
+        return packed, None
+    if isinstance(recommendations, RecommendationSet):
+        recommendations = recommendations.records()
+    return None, json.dumps(recommendations)
+
+
+def decode_results(results, recommendations_json):
+    if results is not None:
+        return unpack_recommendations(results)
+    return json.loads(recommendations_json or "[]")
+
+
+# ======================================================
+# Migration from the old layout
+# ======================================================
+def _columns(cur, table):
+    cur.execute(f"SELECT * FROM {table} LIMIT 0")
+    cur.fetchall()
+    return {d[0] for d in cur.description}
+
+
+def _ddl(table):
+    """The CREATE TABLE for `table` from sql/schema.sql, in this backend's dialect."""
+    import re
+    schema = db.SCHEMA_PATH.read_text()
+    if db.DB_BACKEND == "sqlite":
+        schema = db.translate_schema(schema)
+    match = re.search(rf"CREATE TABLE IF NOT EXISTS {table} \(.*?\n\);", schema, flags=re.DOTALL)
+    return match.group(0)
+
+
+def migrate(batch_rows=MIGRATE_BATCH_ROWS, dry_run=False, log=print):
+    """
+    Moves history rows to shipment_id + packed results, batch by batch
+    (each batch one transaction, so an interrupted run resumes), then
+    drops the old per-row shipment columns.
+    """
+    t0 = time.perf_counter()
+    legacy = list(SHIPMENT_COLUMNS.values())
+    conn = get_db()
+    stats = {"rows": 0, "packed": 0, "json": 0, "bytes_before": 0, "bytes_after": 0, "shipments": set()}
+    try:
+        with conn.cursor() as cur:
+            columns = _columns(cur, "recommendation_history")
+            if not set(legacy) & columns:
+                log("✓ recommendation_history already uses the compact layout")
+                return stats
+            if not dry_run:
+                cur.execute(_ddl("shipment_fingerprints"))
+                for column, kind in (("shipment_id", "BIGINT"), ("results", "BLOB")):
+                    if column not in columns:
+                        cur.execute(f"ALTER TABLE recommendation_history ADD COLUMN {column} {kind}")
+                if "shipment_id" not in columns:
+                    cur.execute("CREATE INDEX idx_history_shipment ON recommendation_history (shipment_id)")
+
+            last_id = 0
+            pending = "shipment_id IS NULL AND " if not dry_run else ""
+            while True:
+                cur.execute(
+                    f"SELECT id, {', '.join(legacy)}, recommendations FROM recommendation_history "
+                    f"WHERE {pending}id > %s ORDER BY id LIMIT %s", (last_id, batch_rows)
+                )
+                rows = cur.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1]["id"]
+                shipments = [shipment_from_columns(r) for r in rows]
+                encoded = []
+                for r in rows:
+                    recs = json.loads(r["recommendations"] or "[]")
+                    results, recs_json = encode_results(recs)
+                    encoded.append((results, recs_json))
+                    stats["packed" if results is not None else "json"] += 1
+                    stats["bytes_before"] += len((r["recommendations"] or "").encode())
+                    stats["bytes_after"] += len(results) if results is not None else len(recs_json.encode())
+                stats["shipments"].update(fingerprint(canonical_shipment(s)) for s in shipments)
+                stats["rows"] += len(rows)
+                if dry_run:
+                    continue
+
+                conn.begin()
+                try:
+                    ids = intern_shipments(cur, shipments)
+                    cur.executemany(
+                        "UPDATE recommendation_history SET shipment_id = %s, results = %s, recommendations = %s "
+                        "WHERE id = %s",
+                        [(sid, results, recs_json, r["id"]) for sid, (results, recs_json), r in zip(ids, encoded, rows)]
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                log(f"  … migrated through id {last_id:,} ({stats['rows']:,} rows)")
+
+            if not dry_run:
+                if db.DB_BACKEND == "sqlite":       # one column per ALTER on SQLite
+                    for column in legacy:
+                        cur.execute(f"ALTER TABLE recommendation_history DROP COLUMN {column}")
+                else:                               # one table rebuild on MySQL
+                    cur.execute("ALTER TABLE recommendation_history "
+                                + ", ".join(f"DROP COLUMN {c}" for c in legacy))
+    finally:
+        conn.close()
+
+    stats["shipments"] = len(stats["shipments"])
+    n = max(stats["rows"], 1)
+    log(f"{'🔎 Dry run' if dry_run else '✅ Migrated'}: {stats['rows']:,} rows "
+        f"({stats['packed']:,} packed, {stats['json']:,} kept as JSON), "
+        f"{stats['shipments']:,} distinct shipments, recommendations "
+        f"{stats['bytes_before'] / n:.0f} → {stats['bytes_after'] / n:.0f} bytes/row "
+        f"in {time.perf_counter() - t0:.1f}s")
+    return stats
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compact recommendation history storage")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("migrate", help="convert history rows written in the old layout")
+    p.add_argument("--batch", type=int, default=MIGRATE_BATCH_ROWS)
+    p.add_argument("--dry-run", action="store_true", help="only report what would change")
+    args = ap.parse_args()
+
+    if args.command == "migrate":
+        migrate(args.batch, args.dry_run)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+"""
+Batch Job Kinds
+---------------
+Each kind splits its input into chunks when the job is submitted
+(prepare), runs one chunk in a worker process into a part file
+(run_chunk) and joins the parts into the downloadable result (assemble):
+
+- recommend: a shipment manifest — CSV with a header row of the
+  /api/recommend fields, NDJSON, or a JSON list under "shipments" —
+  scored line by line with the engine. Result: CSV with one row per
+  recommendation; a line that can't be scored gets an error row
+  instead of failing the job. Options: top_k, sort_by, constraints,
+  normalization (as /api/recommend)
+- pdf_reports: saved recommendations (history_ids, or from / to over
+  the user's history) rendered as the /api/generate-pdf report. Result:
+  ZIP of PDFs (+ missing.txt for ids that weren't found)
+- history_export: recommendation history as CSV / NDJSON / Parquet with
+  the history_export.py filters, in one chunk
+"""
+
+import csv
+import io
+import json
+import os
+import shutil
+import zipfile
+
+from history_store import SHIPMENT_FIELDS, parse_shipment
+
+JOB_CHUNK_ROWS = int(os.getenv("JOB_CHUNK_ROWS", 500))
+JOB_CHUNK_REPORTS = int(os.getenv("JOB_CHUNK_REPORTS", 50))
+JOBS_MAX_MANIFEST_ROWS = int(os.getenv("JOBS_MAX_MANIFEST_ROWS", 200_000))
+JOBS_MAX_REPORTS = int(os.getenv("JOBS_MAX_REPORTS", 2000))
+MAX_TOP_K = 50
+
+SORTS = ("Sustainability", "Pred_Cost", "Pred_CO2", "Pareto")
+NORMALIZATIONS = ("candidates", "global")
+TRUE_STRINGS = {"1", "true", "yes", "y"}
+
+
+def _concat(parts, result_path, head=b""):
+    with open(result_path, "wb") as out:
+        out.write(head)
+        for part in parts:
+            with open(part, "rb") as f:
+                shutil.copyfileobj(f, out)
+
+
+# ======================================================
+# recommend
+# ======================================================
+RESULT_FIELDS = (["line"] + SHIPMENT_FIELDS +
+                 ["rank", "Material_Name", "Pred_Cost", "Pred_CO2", "Biodegradable",
+                  "Tensile_Strength_MPa", "Sustainability", "error"])
+REC_FIELDS = RESULT_FIELDS[len(SHIPMENT_FIELDS) + 2:-1]
+
+
+def _split_lines(path, has_header):
+    """(header line, [(spec, lines)], total lines): byte offsets every JOB_CHUNK_ROWS lines."""
+    chunks, total = [], 0
+    with open(path, "rb") as f:
+        header = f.readline().decode("utf-8-sig").strip() if has_header else None
+        start, lines = f.tell(), 0
+        for _ in iter(f.readline, b""):
+            lines += 1
+            total += 1
+            if total > JOBS_MAX_MANIFEST_ROWS:
+                raise ValueError(f"Manifest has more than {JOBS_MAX_MANIFEST_ROWS} lines")
+            if lines == JOB_CHUNK_ROWS:
+                chunks.append(({"offset": start, "lines": lines, "first_line": total - lines + 1}, lines))
+                start, lines = f.tell(), 0
+        if lines:
+            chunks.append(({"offset": start, "lines": lines, "first_line": total - lines + 1}, lines))
+    return header, chunks, total
+
+
+class RecommendJob:
+    name = "recommend"
+
+    def prepare(self, job_dir, email, params, upload):
+        try:
+            top_k = int(params.get("top_k", 5))
+        except (TypeError, ValueError):
+            raise ValueError("top_k must be an integer")
+        if not 1 <= top_k <= MAX_TOP_K:
+            raise ValueError(f"top_k must be between 1 and {MAX_TOP_K}")
+        sort_by = params.get("sort_by", "Sustainability")
+        if sort_by not in SORTS:
+            raise ValueError(f"sort_by must be one of {SORTS}")
+        normalization = params.get("normalization", "candidates")
+        if normalization not in NORMALIZATIONS:
+            raise ValueError(f"normalization must be one of {NORMALIZATIONS}")
+        constraints = params.get("constraints") or None
+        if constraints is not None and not isinstance(constraints, dict):
+            raise ValueError("constraints must be an object")
+
+        if upload is not None:
+            fmt = "csv" if (upload.filename or "").lower().endswith(".csv") else "ndjson"
+            path = job_dir / f"manifest.{fmt}"
+            upload.save(str(path))
+        elif isinstance(params.get("shipments"), list):
+            fmt, path = "ndjson", job_dir / "manifest.ndjson"
+            with open(path, "w") as f:
+                for shipment in params["shipments"]:
+                    f.write(json.dumps(shipment) + "\n")
+        else:
+            raise ValueError("Upload a manifest file or pass a 'shipments' list")
+
+        header, chunks, total = _split_lines(path, fmt == "csv")
+        if fmt == "csv":
+            columns = next(csv.reader([header or ""]))
+            missing = [f for f in SHIPMENT_FIELDS if f not in columns]
+            if missing:
+                raise ValueError(f"Manifest is missing columns: {', '.join(missing)}")
+        options = {"top_k": top_k, "sort_by": sort_by, "constraints": constraints,
+                   "normalization": normalization, "manifest": path.name, "format": fmt, "header": header}
+        return options, chunks, total
+
+    def _record(self, raw, params, columns):
+        if params["format"] == "ndjson":
+            record = json.loads(raw)
+            if not isinstance(record, dict):
+                raise ValueError("Line is not a JSON object")
+        else:
+            record = dict(zip(columns, next(csv.reader([raw]))))
+        if isinstance(record.get("Moisture_Sens"), str):      # bool("False") is True
+            record["Moisture_Sens"] = record["Moisture_Sens"].strip().lower() in TRUE_STRINGS
+        return record
+
+    def _rows(self, line_no, raw, params, columns, get_recommendations):
+        record = {}
+        try:
+            record = self._record(raw, params, columns)
+            shipment, error = parse_shipment(record)
+            if error:
+                raise ValueError(error)
+            recommendations = get_recommendations(
+                shipment, top_k=params["top_k"], sort_by=params["sort_by"],
+                constraints=params["constraints"], normalization=params["normalization"]
+            )
+        except (ValueError, TypeError, KeyError) as e:
+            base = [line_no] + [record.get(f) for f in SHIPMENT_FIELDS]
+            return [base + [None] * (len(REC_FIELDS) + 1) + [str(e)]]
+        base = [line_no] + [shipment[f] for f in SHIPMENT_FIELDS]
+        return [base + [rank, *row, None]
+                for rank, row in enumerate(recommendations.rows(*REC_FIELDS), start=1)]
+
+    def run_chunk(self, job, spec, out_path, progress):
+        from recommender import get_recommendations
+
+        params = job["params"]
+        columns = next(csv.reader([params["header"]])) if params["format"] == "csv" else None
+        with open(job["dir"] / params["manifest"], "rb") as f, open(out_path, "w", newline="") as out:
+            f.seek(spec["offset"])
+            writer = csv.writer(out)
+            for i in range(spec["lines"]):
+                raw = f.readline().decode("utf-8").strip()
+                if raw:
+                    writer.writerows(self._rows(spec["first_line"] + i, raw, params, columns, get_recommendations))
+                progress(i + 1)
+
+    def assemble(self, job, parts, result_path):
+        head = io.StringIO()
+        csv.writer(head).writerow(RESULT_FIELDS)
+        _concat(parts, result_path, head.getvalue().encode())
+
+    def result_name(self, job):
+        return f"recommendations_{job['id']}.csv"
+
+    def mimetype(self, params):
+        return "text/csv"
+
+
+# ======================================================
+# pdf_reports
+# ======================================================
+MISSING_ENTRY = "_missing.txt"
+
+
+class PdfReportsJob:
+    name = "pdf_reports"
+
+    def prepare(self, job_dir, email, params, upload):
+        ids = params.get("history_ids")
+        if ids is not None:
+            if not isinstance(ids, list):
+                raise ValueError("history_ids must be a list")
+            try:
+                ids = list(dict.fromkeys(int(i) for i in ids))
+            except (TypeError, ValueError):
+                raise ValueError("history_ids must be integers")
+        else:
+            from db import get_db
+            from history_export import build_query
+
+            sql, args = build_query({"email": email, "from": params.get("from"), "to": params.get("to")})
+            db = get_db()
+            try:
+                with db.cursor() as cur:
+                    cur.execute(f"SELECT q.id FROM ({sql}) q LIMIT {JOBS_MAX_REPORTS + 1}", args)
+                    ids = [row["id"] for row in cur.fetchall()]
+            finally:
+                db.close()
+        if len(ids) > JOBS_MAX_REPORTS:
+            raise ValueError(f"At most {JOBS_MAX_REPORTS} reports per job")
+        if not ids:
+            raise ValueError("No saved recommendations selected")
+        chunks = [({"ids": ids[i:i + JOB_CHUNK_REPORTS]}, len(ids[i:i + JOB_CHUNK_REPORTS]))
+                  for i in range(0, len(ids), JOB_CHUNK_REPORTS)]
+        return {"history_ids": ids}, chunks, len(ids)
+
+    def run_chunk(self, job, spec, out_path, progress):
+        from recommender import get_recommendation
+        from reports import render_report_pdf
+
+        missing = []
+        with zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED) as z:
+            for i, history_id in enumerate(spec["ids"]):
+                saved = get_recommendation(job["email"], history_id)
+                if saved is None:
+                    missing.append(str(history_id))
+                else:
+                    pdf = render_report_pdf(saved["shipment"], saved["recommendations"])
+                    z.writestr(f"report_{history_id}.pdf", pdf)
+                progress(i + 1)
+            if missing:
+                z.writestr(MISSING_ENTRY, "\n".join(missing) + "\n")
+
+    def assemble(self, job, parts, result_path):
+        missing = []
+        with zipfile.ZipFile(result_path, "w", zipfile.ZIP_DEFLATED) as out:
+            for part in parts:
+                with zipfile.ZipFile(part) as z:
+                    for info in z.infolist():
+                        if info.filename == MISSING_ENTRY:
+                            missing.append(z.read(info).decode())
+                        else:
+                            out.writestr(info, z.read(info))
+            if missing:
+                out.writestr("missing.txt", "History ids not found:\n" + "".join(missing))
+
+    def result_name(self, job):
+        return f"reports_{job['id']}.zip"
+
+    def mimetype(self, params):
+        return "application/zip"
+
+
+# ======================================================
+# history_export
+# ======================================================
+EXPORT_FILTERS = ("email", "from", "to", "category", "shipping_mode")
+
+
+class HistoryExportJob:
+    name = "history_export"
+
+    def prepare(self, job_dir, email, params, upload):
+        from db import get_db
+        from history_export import PARQUET_AVAILABLE, WRITERS, build_query
+
+        fmt = params.get("format", "csv")
+        if fmt not in WRITERS:
+            raise ValueError(f"Unknown format {fmt!r}; use {sorted(WRITERS)}")
+        if fmt == "parquet" and not PARQUET_AVAILABLE:
+            raise ValueError("Parquet export needs pyarrow (pip install pyarrow)")
+        filters = {k: params.get(k) for k in EXPORT_FILTERS}
+        sql, args = build_query(filters)
+        db = get_db()
+        try:
+            with db.cursor() as cur:
+                cur.execute(f"SELECT COUNT(*) AS n FROM ({sql}) q", args)
+                total = cur.fetchone()["n"]
+        finally:
+            db.close()
+        return {"format": fmt, "filters": filters}, [({}, total)], total
+
+    def run_chunk(self, job, spec, out_path, progress):
+        from history_export import WRITERS, HistoryRows
+
+        rows = HistoryRows(job["params"]["filters"])
+        try:
+            with open(out_path, "wb") as out:
+                for piece in WRITERS[job["params"]["format"]](rows):
+                    out.write(piece)
+                    progress(rows.count)
+        finally:
+            rows.close()
+
+    def assemble(self, job, parts, result_path):
+        shutil.copyfile(parts[0], result_path)
+
+    def result_name(self, job):
+        from history_export import FORMATS
+
+        return f"recommendation_history_{job['id']}.{FORMATS[job['params']['format']][1]}"
+
+    def mimetype(self, params):
+        from history_export import FORMATS
+
+        return FORMATS[params["format"]][0]
+
+
+JOB_KINDS = {kind.name: kind for kind in (RecommendJob(), PdfReportsJob(), HistoryExportJob())}
+
+
+def job_kind(name):
+    if name not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind {name!r}; use {sorted(JOB_KINDS)}")
+    return JOB_KINDS[name]
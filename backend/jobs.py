@@ -0,0 +1,685 @@
+"""
+Batch Jobs
+----------
+- Work too long for a request (scoring a large manifest, rendering
+  hundreds of PDF reports, exporting all history) runs as a job:
+  POST /api/jobs stores it split into chunks, worker processes run the
+  chunks, GET /api/jobs/<id> reports progress, /result downloads the
+  output. Job kinds (split / run / assemble) are in job_handlers.py
+- Job store: a local SQLite file (JOBS_DB_PATH, WAL), no broker. A worker
+  claims one chunk at a time in a BEGIN IMMEDIATE transaction and holds
+  a lease (JOB_LEASE_SECONDS) that its progress updates renew, so the
+  chunk of a worker that died is picked up again once the lease runs out
+- A failing chunk is retried up to JOB_MAX_ATTEMPTS times before the job
+  fails; POST /api/jobs/<id>/retry re-queues its failed (or cancelled)
+  chunks, keeping the finished ones. POST /api/jobs/<id>/cancel drops
+  queued chunks at once and stops running ones at their next progress
+  update
+- Per user: at most JOBS_MAX_ACTIVE_PER_USER unfinished jobs (429 past
+  that) and JOBS_MAX_RUNNING_PER_USER chunks running at once, so one big
+  job can't hold every worker
+- Inputs, parts and results live in JOBS_DIR/<job id>/ and are deleted
+  JOB_RESULT_TTL_HOURS after the job finishes
+- Workers: a pool of processes, one per machine (held by a file lock),
+  on the machine that serves the app, since they share its job store.
+  The gunicorn master starts and watches one (gunicorn.conf.py,
+  JOB_WORKERS, default 1); `python backend/app.py` (the dev server)
+  does with JOB_WORKERS=N; or run it yourself:
+    python backend/jobs.py worker [--processes 2]
+    python backend/jobs.py cleanup
+  Importing the app never starts one (each pool process loads its own
+  copy of the models). POST /api/jobs answers 503 while no pool runs
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import secrets
+import shutil
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:      # no pool lock on Windows; run one pool yourself
+    fcntl = None
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT))
+
+logger = logging.getLogger(__name__)
+
+JOBS_DIR = Path(os.getenv("JOBS_DIR", PROJECT_ROOT / "data" / "jobs"))
+JOBS_DB_PATH = Path(os.getenv("JOBS_DB_PATH", JOBS_DIR / "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 0))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 120))
+JOB_RESULT_TTL_HOURS = float(os.getenv("JOB_RESULT_TTL_HOURS", 24))
+JOBS_MAX_ACTIVE_PER_USER = int(os.getenv("JOBS_MAX_ACTIVE_PER_USER", 3))
+JOBS_MAX_RUNNING_PER_USER = int(os.getenv("JOBS_MAX_RUNNING_PER_USER", 2))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 1.0))
+JOB_CLEANUP_SECONDS = float(os.getenv("JOB_CLEANUP_SECONDS", 300))
+PROGRESS_WRITE_SECONDS = 0.5     # a chunk's progress is written at most this often
+
+ACTIVE = ("queued", "running", "assembling")
+FINISHED = ("succeeded", "failed", "cancelled")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    email TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,             -- queued | running | assembling | succeeded | failed | cancelled | expired
+    total_chunks INTEGER NOT NULL,
+    total_items INTEGER,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL,                 -- while assembling
+    result_name TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_email_created ON jobs (email, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+
+CREATE TABLE IF NOT EXISTS job_chunks (
+    job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    spec TEXT NOT NULL,
+    items INTEGER NOT NULL,
+    items_done INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,             -- queued | running | done | failed | cancelled
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    error TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_status ON job_chunks (status, lease_until);
+"""
+
+
+class JobLimitError(Exception):
+    """The user already has JOBS_MAX_ACTIVE_PER_USER unfinished jobs."""
+
+
+class JobCancelled(Exception):
+    """Raised from a progress update: the job was cancelled or the chunk's lease lost."""
+
+
+class WorkerStopping(Exception):
+    """Raised from a progress update: the pool is shutting down; the chunk goes back to the queue."""
+
+
+# ======================================================
+# Store
+# ======================================================
+_local = threading.local()
+
+
+def _conn():
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.pid != os.getpid():     # fresh after fork
+        JOBS_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(JOBS_DB_PATH), timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.executescript(SCHEMA)
+        _local.conn, _local.pid = conn, os.getpid()
+    return conn
+
+
+@contextmanager
+def _tx():
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def job_dir(job_id):
+    return JOBS_DIR / job_id
+
+
+def part_path(job_id, idx):
+    return job_dir(job_id) / "parts" / f"{idx:05d}.part"
+
+
+def _iso(ts):
+    return None if ts is None else datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="seconds")
+
+
+def _active_jobs(conn, email):
+    return conn.execute(f"SELECT COUNT(*) FROM jobs WHERE email = ? AND status IN ({', '.join('?' * len(ACTIVE))})",
+                        (email, *ACTIVE)).fetchone()[0]
+
+
+def _describe(conn, job):
+    chunks = conn.execute("SELECT idx, status, items, items_done, attempts, error FROM job_chunks "
+                          "WHERE job_id = ? ORDER BY idx", (job["id"],)).fetchall()
+    counts, items_done, errors = {}, 0, []
+    for c in chunks:
+        counts[c["status"]] = counts.get(c["status"], 0) + 1
+        items_done += c["items"] if c["status"] == "done" else c["items_done"]
+        if c["error"]:
+            errors.append({"chunk": c["idx"], "status": c["status"], "attempts": c["attempts"], "error": c["error"]})
+    total = job["total_items"]
+    out = {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "created_at": _iso(job["created_at"]),
+        "started_at": _iso(job["started_at"]),
+        "finished_at": _iso(job["finished_at"]),
+        "expires_at": _iso(job["expires_at"]),
+        "progress": {
+            "chunks_total": job["total_chunks"],
+            "chunks_done": counts.get("done", 0),
+            "chunks_running": counts.get("running", 0),
+            "chunks_failed": counts.get("failed", 0),
+            "items_done": items_done,
+            "items_total": total,
+            "percent": round(100 * items_done / total, 1) if total else None,
+        },
+        "error": job["error"],
+        "chunk_errors": errors[:10],
+    }
+    if job["status"] == "succeeded":
+        path = job_dir(job["id"]) / job["result_name"]
+        out["result"] = {"filename": job["result_name"],
+                         "bytes": path.stat().st_size if path.exists() else None}
+    return out
+
+
+def submit(email, kind, params, upload=None):
+    """
+    Stores a job and its chunks; returns its description. Raises
+    ValueError for bad input (job_handlers' prepare) and JobLimitError.
+    """
+    from job_handlers import job_kind
+
+    handler = job_kind(kind)
+    if _active_jobs(_conn(), email) >= JOBS_MAX_ACTIVE_PER_USER:
+        raise JobLimitError(f"You already have {JOBS_MAX_ACTIVE_PER_USER} unfinished jobs")
+    job_id = secrets.token_hex(8)
+    path = job_dir(job_id)
+    (path / "parts").mkdir(parents=True)
+    try:
+        params, chunks, total_items = handler.prepare(path, email, dict(params or {}), upload)
+        if not chunks:
+            raise ValueError("Nothing to do")
+        with _tx() as conn:
+            # Checked again inside the write lock: concurrent submits can't both slip under the limit
+            if _active_jobs(conn, email) >= JOBS_MAX_ACTIVE_PER_USER:
+                raise JobLimitError(f"You already have {JOBS_MAX_ACTIVE_PER_USER} unfinished jobs")
+            conn.execute(
+                "INSERT INTO jobs (id, email, kind, params, status, total_chunks, total_items, created_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, email, kind, json.dumps(params), len(chunks), total_items, time.time())
+            )
+            conn.executemany(
+                "INSERT INTO job_chunks (job_id, idx, spec, items, status) VALUES (?, ?, ?, ?, 'queued')",
+                [(job_id, i, json.dumps(spec), items) for i, (spec, items) in enumerate(chunks)]
+            )
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            described = _describe(conn, job)
+    except Exception:
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+    logger.info("🗂️ Job %s (%s) queued: %d chunks, %s items", job_id, kind, len(chunks), total_items)
+    return described
+
+
+def get_job(email, job_id):
+    conn = _conn()
+    job = conn.execute("SELECT * FROM jobs WHERE id = ? AND email = ?", (job_id, email)).fetchone()
+    return None if job is None else _describe(conn, job)
+
+
+def list_jobs(email, limit=20):
+    conn = _conn()
+    jobs = conn.execute("SELECT * FROM jobs WHERE email = ? ORDER BY created_at DESC LIMIT ?",
+                        (email, limit)).fetchall()
+    return [_describe(conn, job) for job in jobs]
+
+
+def result_file(email, job_id):
+    """(path, download name, mimetype) of a finished job's result, or None."""
+    from job_handlers import job_kind
+
+    job = _conn().execute("SELECT * FROM jobs WHERE id = ? AND email = ?", (job_id, email)).fetchone()
+    if job is None or job["status"] != "succeeded":
+        return None
+    path = job_dir(job_id) / job["result_name"]
+    if not path.exists():
+        return None
+    return path, job["result_name"], job_kind(job["kind"]).mimetype(json.loads(job["params"]))
+
+
+def cancel(email, job_id):
+    with _tx() as conn:
+        job = conn.execute("SELECT * FROM jobs WHERE id = ? AND email = ?", (job_id, email)).fetchone()
+        if job is None:
+            return None
+        if job["status"] in ("queued", "running"):
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            _settle(conn, job_id)
+        return _describe(conn, conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+
+def retry(email, job_id):
+    """Re-queues a failed / cancelled job's unfinished chunks; finished ones are kept."""
+    with _tx() as conn:
+        job = conn.execute("SELECT * FROM jobs WHERE id = ? AND email = ?", (job_id, email)).fetchone()
+        if job is None:
+            return None
+        if job["status"] not in ("failed", "cancelled"):
+            raise ValueError(f"Only failed or cancelled jobs can be retried (this one is {job['status']})")
+        if _active_jobs(conn, email) >= JOBS_MAX_ACTIVE_PER_USER:
+            raise JobLimitError(f"You already have {JOBS_MAX_ACTIVE_PER_USER} unfinished jobs")
+        conn.execute("UPDATE job_chunks SET status = 'queued', attempts = 0, items_done = 0, error = NULL "
+                     "WHERE job_id = ? AND status IN ('failed', 'cancelled')", (job_id,))
+        conn.execute("UPDATE jobs SET status = 'queued', cancel_requested = 0, error = NULL, "
+                     "finished_at = NULL, expires_at = NULL WHERE id = ?", (job_id,))
+        return _describe(conn, conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+
+# ======================================================
+# State transitions (inside a transaction)
+# ======================================================
+def _finish_job(conn, job_id, status, error=None, result_name=None):
+    now = time.time()
+    conn.execute("UPDATE jobs SET status = ?, error = ?, result_name = ?, lease_until = NULL, "
+                 "finished_at = ?, expires_at = ? WHERE id = ?",
+                 (status, error, result_name, now, now + JOB_RESULT_TTL_HOURS * 3600, job_id))
+
+
+def _settle(conn, job_id):
+    """
+    Moves the job on after a chunk changed state. Returns True when all
+    chunks are done and the caller should assemble the result.
+    """
+    job = conn.execute("SELECT status, cancel_requested, total_chunks FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if job is None or job["status"] not in ("queued", "running"):
+        return False
+    counts = dict(conn.execute("SELECT status, COUNT(*) FROM job_chunks WHERE job_id = ? GROUP BY status",
+                               (job_id,)).fetchall())
+    if job["cancel_requested"]:
+        conn.execute("UPDATE job_chunks SET status = 'cancelled' WHERE job_id = ? AND status = 'queued'", (job_id,))
+        if not counts.get("running"):
+            _finish_job(conn, job_id, "cancelled")
+        return False
+    if counts.get("queued") or counts.get("running"):
+        return False
+    if counts.get("failed"):
+        _finish_job(conn, job_id, "failed",
+                    error=f"{counts['failed']} of {job['total_chunks']} chunks failed after {JOB_MAX_ATTEMPTS} attempts")
+        return False
+    conn.execute("UPDATE jobs SET status = 'assembling', lease_until = ? WHERE id = ?",
+                 (time.time() + JOB_LEASE_SECONDS, job_id))
+    return True
+
+
+def _reap(conn, now):
+    """Chunks whose worker vanished on their last attempt fail; their jobs move on."""
+    lost = conn.execute("SELECT job_id, idx FROM job_chunks WHERE status = 'running' AND lease_until < ? "
+                        "AND attempts >= ?", (now, JOB_MAX_ATTEMPTS)).fetchall()
+    for c in lost:
+        conn.execute("UPDATE job_chunks SET status = 'failed', lease_until = NULL, "
+                     "error = 'worker stopped responding (lease expired)' WHERE job_id = ? AND idx = ?",
+                     (c["job_id"], c["idx"]))
+    for job_id in {c["job_id"] for c in lost}:
+        if _settle(conn, job_id):
+            # Nobody is holding this assembly yet: let the next claim pick it up
+            conn.execute("UPDATE jobs SET lease_until = 0 WHERE id = ?", (job_id,))
+
+
+_CLAIM_CHUNK = """
+    SELECT c.job_id, c.idx FROM job_chunks c JOIN jobs j ON j.id = c.job_id
+    WHERE j.status IN ('queued', 'running') AND j.cancel_requested = 0
+      AND (c.status = 'queued' OR (c.status = 'running' AND c.lease_until < :now))
+      AND (SELECT COUNT(*) FROM job_chunks r JOIN jobs rj ON rj.id = r.job_id
+           WHERE rj.email = j.email AND r.status = 'running' AND r.lease_until >= :now) < :per_user
+    ORDER BY j.created_at, c.idx
+    LIMIT 1
+"""
+
+
+def claim(worker_id):
+    """
+    Next task for this worker: ("chunk", job, chunk), ("assemble", job,
+    None) for a job whose assembler vanished, or None when idle.
+    """
+    now = time.time()
+    with _tx() as conn:
+        _reap(conn, now)
+        job = conn.execute("SELECT * FROM jobs WHERE status = 'assembling' AND lease_until < ? LIMIT 1",
+                           (now,)).fetchone()
+        if job is not None:
+            conn.execute("UPDATE jobs SET lease_until = ? WHERE id = ?", (now + JOB_LEASE_SECONDS, job["id"]))
+            return "assemble", dict(job), None
+        row = conn.execute(_CLAIM_CHUNK, {"now": now, "per_user": JOBS_MAX_RUNNING_PER_USER}).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE job_chunks SET status = 'running', worker = ?, lease_until = ?, "
+                     "attempts = attempts + 1, items_done = 0 WHERE job_id = ? AND idx = ?",
+                     (worker_id, now + JOB_LEASE_SECONDS, row["job_id"], row["idx"]))
+        conn.execute("UPDATE jobs SET status = 'running', started_at = COALESCE(started_at, ?) "
+                     "WHERE id = ? AND status = 'queued'", (now, row["job_id"]))
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["job_id"],)).fetchone()
+        chunk = conn.execute("SELECT * FROM job_chunks WHERE job_id = ? AND idx = ?",
+                             (row["job_id"], row["idx"])).fetchone()
+        return "chunk", dict(job), dict(chunk)
+
+
+def _finish_chunk(job_id, idx, worker_id, status, error=None):
+    """
+    Records a chunk's outcome if this worker still holds it. A failure
+    with attempts left goes back to the queue. Returns True when the
+    caller should assemble the job.
+    """
+    with _tx() as conn:
+        chunk = conn.execute("SELECT status, worker, attempts FROM job_chunks WHERE job_id = ? AND idx = ?",
+                             (job_id, idx)).fetchone()
+        if chunk is None or chunk["status"] != "running" or chunk["worker"] != worker_id:
+            return False    # lease lost: another worker has it now
+        attempts = chunk["attempts"]
+        if status == "released":
+            status, attempts = "queued", attempts - 1
+        elif status == "failed" and attempts < JOB_MAX_ATTEMPTS:
+            status = "queued"
+        conn.execute("UPDATE job_chunks SET status = ?, attempts = ?, error = ?, lease_until = NULL "
+                     "WHERE job_id = ? AND idx = ?", (status, attempts, error, job_id, idx))
+        return _settle(conn, job_id)
+
+
+class ChunkProgress:
+    """
+    progress(items_done) for a running chunk: records it (throttled),
+    renews the lease and raises JobCancelled / WorkerStopping when the
+    chunk should stop. `stopping()` says whether the worker is shutting down.
+    """
+
+    def __init__(self, job_id, idx, worker_id, stopping=None):
+        self.job_id, self.idx, self.worker_id = job_id, idx, worker_id
+        self.stopping = stopping
+        self._last = time.monotonic()
+
+    def __call__(self, items_done, force=False):
+        if self.stopping is not None and self.stopping():
+            raise WorkerStopping()
+        now = time.monotonic()
+        if not force and now - self._last < PROGRESS_WRITE_SECONDS:
+            return
+        self._last = now
+        conn = _conn()
+        conn.execute("UPDATE job_chunks SET items_done = ?, lease_until = ? "
+                     "WHERE job_id = ? AND idx = ? AND worker = ? AND status = 'running'",
+                     (items_done, time.time() + JOB_LEASE_SECONDS, self.job_id, self.idx, self.worker_id))
+        row = conn.execute("SELECT j.cancel_requested, c.worker, c.status FROM jobs j "
+                           "JOIN job_chunks c ON c.job_id = j.id WHERE j.id = ? AND c.idx = ?",
+                           (self.job_id, self.idx)).fetchone()
+        if row is None or row["cancel_requested"]:
+            raise JobCancelled("cancelled")
+        if row["worker"] != self.worker_id or row["status"] != "running":
+            raise JobCancelled("lease lost")
+
+
+# ======================================================
+# Running tasks
+# ======================================================
+def _assemble(job):
+    from job_handlers import job_kind
+
+    handler = job_kind(job["kind"])
+    job = {**job, "params": json.loads(job["params"]) if isinstance(job["params"], str) else job["params"]}
+    parts = [part_path(job["id"], i) for i in range(job["total_chunks"])]
+    name = handler.result_name(job)
+    try:
+        handler.assemble(job, parts, job_dir(job["id"]) / name)
+    except Exception as e:
+        logger.error(f"❌ Job {job['id']} assembly failed: {e}", exc_info=True)
+        with _tx() as conn:
+            _finish_job(conn, job["id"], "failed", error=f"assembling the result failed: {e}")
+        return
+    shutil.rmtree(job_dir(job["id"]) / "parts", ignore_errors=True)
+    with _tx() as conn:
+        _finish_job(conn, job["id"], "succeeded", result_name=name)
+    logger.info("✅ Job %s (%s) finished: %s", job["id"], job["kind"], name)
+
+
+def run_task(task, worker_id, stopping=None):
+    from job_handlers import job_kind
+
+    kind, job, chunk = task
+    if kind == "assemble":
+        _assemble(job)
+        return
+    params = json.loads(job["params"])
+    handler = job_kind(job["kind"])
+    out = part_path(job["id"], chunk["idx"])
+    tmp = out.with_name(out.name + ".tmp")
+    progress = ChunkProgress(job["id"], chunk["idx"], worker_id, stopping)
+    try:
+        handler.run_chunk({**job, "params": params, "dir": job_dir(job["id"])},
+                          json.loads(chunk["spec"]), tmp, progress)
+        tmp.replace(out)
+    except WorkerStopping:
+        _finish_chunk(job["id"], chunk["idx"], worker_id, "released")
+        return
+    except JobCancelled:
+        _finish_chunk(job["id"], chunk["idx"], worker_id, "cancelled")
+        return
+    except Exception as e:
+        logger.warning(f"⚠️ Job {job['id']} chunk {chunk['idx']} failed "
+                       f"(attempt {chunk['attempts']}/{JOB_MAX_ATTEMPTS}): {e}", exc_info=True)
+        assemble = _finish_chunk(job["id"], chunk["idx"], worker_id, "failed", error=f"{type(e).__name__}: {e}")
+    else:
+        assemble = _finish_chunk(job["id"], chunk["idx"], worker_id, "done")
+    if assemble:
+        _assemble(job)
+
+
+def worker_main(stop_event):
+    """One worker process: claim, run, repeat until the pool sets stop_event (or goes away)."""
+    pool_pid = os.getppid()
+    terminated = []
+    # Signal handlers only set a flag: Event.set() from a handler can deadlock
+    # with an Event.wait() the handler interrupted
+    signal.signal(signal.SIGINT, signal.SIG_IGN)        # Ctrl-C reaches the pool, which stops us
+    signal.signal(signal.SIGTERM, lambda *_: terminated.append(True))
+
+    def stopping():
+        return bool(terminated) or stop_event.is_set() or os.getppid() != pool_pid
+
+    worker_id = f"{socket.gethostname()[:40]}:{os.getpid()}"
+    while not stopping():
+        try:
+            task = claim(worker_id)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"⚠️ Job claim failed: {e}")
+            task = None
+        if task is None:
+            time.sleep(JOB_POLL_SECONDS)
+            continue
+        run_task(task, worker_id, stopping)
+
+
+def cleanup(now=None):
+    """Deletes the files of jobs past their TTL (status → expired) and forgets them after another TTL."""
+    now = time.time() if now is None else now
+    ttl = JOB_RESULT_TTL_HOURS * 3600
+    with _tx() as conn:
+        expired = [r["id"] for r in conn.execute(
+            f"SELECT id FROM jobs WHERE expires_at < ? AND status IN ({', '.join('?' * len(FINISHED))})",
+            (now, *FINISHED))]
+        for job_id in expired:
+            conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+            conn.execute("UPDATE jobs SET status = 'expired', result_name = NULL WHERE id = ?", (job_id,))
+        conn.execute("DELETE FROM jobs WHERE status = 'expired' AND expires_at < ?", (now - ttl,))
+        known = {r["id"] for r in conn.execute("SELECT id FROM jobs")}
+    for job_id in expired:
+        shutil.rmtree(job_dir(job_id), ignore_errors=True)
+    # Directories of submits that never made it into the store
+    for path in JOBS_DIR.iterdir() if JOBS_DIR.exists() else ():
+        if path.is_dir() and path.name not in known and path.stat().st_mtime < now - 3600:
+            shutil.rmtree(path, ignore_errors=True)
+    return len(expired)
+
+
+# ======================================================
+# Worker pool (one per machine)
+# ======================================================
+POOL_LOCK_PATH = JOBS_DIR / "workers.lock"
+
+
+def _try_lock(path, wait=0.0):
+    """Open file with an exclusive lock held, or None if another process holds it."""
+    if fcntl is None:
+        return open(path, "a")
+    f = open(path, "a")
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return f
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                f.close()
+                return None
+            time.sleep(0.1)
+
+
+def pool_running():
+    """True if a pool holds the lock on this machine (always True without fcntl: can't tell)."""
+    if fcntl is None:
+        return True
+    JOBS_DIR.mkdir(parents=True, exist_ok=True)
+    f = _try_lock(POOL_LOCK_PATH)
+    if f is None:
+        return True
+    f.close()
+    return False
+
+
+def run_pool(processes, exit_with_parent=False):
+    """Runs `processes` workers until SIGTERM / SIGINT; restarts workers that die. False if a pool already runs."""
+    JOBS_DIR.mkdir(parents=True, exist_ok=True)
+    lock = _try_lock(POOL_LOCK_PATH, wait=2.0)
+    if lock is None:
+        return False
+    _conn()     # schema before the workers start
+    ctx = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+    stop = ctx.Event()
+    stop_requested = []
+    signal.signal(signal.SIGTERM, lambda *_: stop_requested.append(True))
+    signal.signal(signal.SIGINT, lambda *_: stop_requested.append(True))
+    parent = os.getppid()
+    procs = {}
+    next_cleanup = 0.0
+    logger.info("🗂️ Job worker pool started: %d processes (%s)", processes, JOBS_DB_PATH)
+    try:
+        while not stop_requested:
+            for i in range(processes):
+                p = procs.get(i)
+                if p is None or not p.is_alive():
+                    if p is not None:
+                        logger.warning(f"⚠️ Job worker {p.pid} exited ({p.exitcode}); restarting")
+                    procs[i] = ctx.Process(target=worker_main, args=(stop,), name=f"job-worker-{i}", daemon=True)
+                    procs[i].start()
+            if time.monotonic() >= next_cleanup:
+                try:
+                    removed = cleanup()
+                    if removed:
+                        logger.info("🧹 Removed %d expired job results", removed)
+                except sqlite3.OperationalError as e:
+                    logger.warning(f"⚠️ Job cleanup failed: {e}")
+                next_cleanup = time.monotonic() + JOB_CLEANUP_SECONDS
+            if exit_with_parent and os.getppid() != parent:
+                break
+            time.sleep(1.0)
+    finally:
+        stop.set()
+        # Running chunks stop at their next progress update and go back to the queue
+        for p in procs.values():
+            p.join(timeout=30)
+            if p.is_alive():
+                p.terminate()
+        lock.close()
+    return True
+
+
+_pool_process = None
+
+
+def ensure_workers(processes=JOB_WORKERS):
+    """Starts `jobs.py worker` in the background unless a pool already runs on this machine."""
+    global _pool_process
+    # poll() reaps the last one we started if it exited (lost the lock race, or its pool stopped)
+    if processes <= 0 or (_pool_process is not None and _pool_process.poll() is None) or pool_running():
+        return False
+    _pool_process = subprocess.Popen([sys.executable, str(Path(__file__).resolve()), "worker",
+                                      "--processes", str(processes), "--exit-with-parent"])
+    return True
+
+
+def watch_workers(processes=JOB_WORKERS, interval=30.0):
+    """Background thread that keeps a pool running (a new one if its owner went away)."""
+    if processes <= 0:
+        return
+
+    def loop():
+        while True:
+            try:
+                ensure_workers(processes)
+            except Exception as e:
+                logger.warning(f"⚠️ Job worker pool not started: {e}")
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name="job-pool-watch", daemon=True).start()
+
+
+# ======================================================
+# CLI
+# ======================================================
+def main():
+    ap = argparse.ArgumentParser(description="Batch job workers")
+    sub = ap.add_subparsers(dest="command", required=True)
+    w = sub.add_parser("worker", help="run a pool of worker processes")
+    w.add_argument("--processes", type=int, default=max(JOB_WORKERS, 1))
+    w.add_argument("--exit-with-parent", action="store_true", help=argparse.SUPPRESS)
+    sub.add_parser("cleanup", help="delete expired job results")
+    args = ap.parse_args()
+
+    from structured_logging import configure_logging
+    configure_logging()
+
+    if args.command == "cleanup":
+        print(f"🧹 Removed {cleanup()} expired job results")
+        return 0
+    if not run_pool(args.processes, exit_with_parent=args.exit_with_parent):
+        print(f"A job worker pool is already running ({POOL_LOCK_PATH})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,25 @@
 """
 Recommender Wrapper
 - Calls the ML recommendation engine
-- Saves results to MySQL recommendation_history
+- Saves results to recommendation_history (and its analytics rollup)
+  through db.get_db (MySQL or embedded SQLite, see db.py), in the
+  compact layout of history_store.py: deduplicated shipments + packed
+  results, rebuilt into the API shape on read
 """
 
 import sys
 from pathlib import Path
-import json
 import logging
+from datetime import datetime
 
 # Add ml directory to path
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 sys.path.append(str(PROJECT_ROOT))
 
 from db import get_db
+from analytics import rollup_entry, apply_rollup
+from history_store import intern_shipments, encode_results, decode_results, shipment_from_columns
+from structured_logging import stage, SAMPLED
 
 logger = logging.getLogger(__name__)
 
@@ -25,116 +31,158 @@ try:
         co2_model,
         cost_model,
         FEATURES_COST,
-        FEATURES_CO2
+        FEATURES_CO2,
+        recommendation_grid,
+        score_reference,
+        sharded_scorer
     )
+    from ml.notebooks.results import REPORT_COLUMNS
     ML_AVAILABLE = True
     logger.info("✅ ML engine loaded")
 except Exception as e:
     ML_AVAILABLE = False
     logger.warning(f"⚠️ ML engine not available: {e}")
 
-def get_recommendations(shipment, top_k=5, sort_by="Sustainability"):
+def get_recommendations(shipment, top_k=5, sort_by="Sustainability", explain=False,
+                        constraints=None, exact=False, normalization="candidates"):
     """
     Generate recommendations using ML engine
     
     Args:
         shipment: dict with shipment details
         top_k: number of recommendations
-        sort_by: sorting criterion (Sustainability, Pred_CO2, Pred_Cost)
+        sort_by: sorting criterion (Sustainability, Pred_CO2, Pred_Cost, or
+            Pareto: non-dominated layers over cost / CO2 / strength /
+            biodegradability, at least top_k rows)
+        explain: attach top SHAP feature contributions per material
+        constraints: hard material constraints, e.g.
+            {"biodegradable_only": True, "max_cost_per_kg": 2.5}
+        exact: always score with the models (skip the precomputed grid)
+        normalization: "candidates" (scores relative to this candidate set)
+            or "global" (fixed reference stats; cacheable, stable across calls)
     
     Returns:
-        list of dicts with recommendations
+        RecommendationSet (ml/notebooks/results.py) of Material_Name,
+        Pred_Cost, Pred_CO2, Biodegradable, Tensile_Strength_MPa,
+        Sustainability (+ Pareto_Rank / Explanation); .records() for JSON
     """
     if not ML_AVAILABLE:
         raise Exception("ML engine not available")
     
     try:
         # Call ML engine
-        df = generate_recommendations(
-            materials_df=materials_df,
-            co2_model=co2_model,
-            cost_model=cost_model,
-            shipment_inputs=shipment,
-            features_cost=FEATURES_COST,
-            features_co2=FEATURES_CO2,
-            top_k=top_k,
-            sort_by=sort_by
-        )
+        with stage("rank"):
+            results = generate_recommendations(
+                materials_df=materials_df,
+                co2_model=co2_model,
+                cost_model=cost_model,
+                shipment_inputs=shipment,
+                features_cost=FEATURES_COST,
+                features_co2=FEATURES_CO2,
+                top_k=top_k,
+                sort_by=sort_by,
+                explain=explain,
+                constraints=constraints,
+                grid=None if exact else recommendation_grid,
+                normalization=normalization,
+                reference=score_reference,
+                scorer=sharded_scorer,
+                as_frame=False
+            )
         
-        # Convert to list of dicts
-        recommendations = df[[
-            "Material_Name",
-            "Pred_Cost",
-            "Pred_CO2",
-            "Biodegradable",
-            "Tensile_Strength_MPa",
-            "Sustainability"
-        ]].to_dict("records")
+        # Fixed columns (Pareto_Rank only exists for sort_by="Pareto")
+        recommendations = results.select(REPORT_COLUMNS + ("Explanation",))
         
-        logger.info(f"✅ Generated {len(recommendations)} recommendations (sorted by {sort_by})")
+        logger.info("✅ Generated %d recommendations (sorted by %s)", len(recommendations), sort_by, extra=SAMPLED)
         return recommendations
         
     except Exception as e:
         logger.error(f"Recommendation error: {e}")
         raise
 
-def save_recommendation(email, session_id, shipment, k_value, sort_by, recommendations):
+_HISTORY_INSERT = """
+    INSERT INTO recommendation_history (
+        email, session_id, created_at, shipment_id,
+        k_value, sort_by, results, recommendations
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def _as_datetime(value):
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+
+def save_recommendations(entries):
     """
-    Save recommendation to MySQL history
-    
+    Batched history write: one transaction, one multi-row INSERT and one
+    rollup upsert for any number of saves. Shipments are interned into
+    shipment_fingerprints; recommendations are stored packed.
+
     Args:
-        email: user email
-        session_id: session identifier
-        shipment: dict with shipment details
-        k_value: number of recommendations requested
-        sort_by: sorting criterion
-        recommendations: list of recommendation dicts
+        entries: list of (email, session_id, shipment, k_value, sort_by,
+            recommendations) tuples, as save_recommendation takes them
     """
+    if not entries:
+        return True
     db = get_db()
     try:
+        # History rows + rollup upsert commit together
+        db.begin()
         with db.cursor() as cur:
-            cur.execute("""
-                INSERT INTO recommendation_history (
-                    email, session_id,
-                    product_category, weight_kg, fragility, shipping_mode,
-                    distance_km, moisture_sensitive,
-                    length_cm, width_cm, height_cm,
-                    k_value, sort_by, recommendations
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                email, session_id,
-                shipment.get("Category_item"),
-                shipment.get("Weight_kg"),
-                shipment.get("Fragility"),
-                shipment.get("Shipping_Mode"),
-                shipment.get("Distance_km"),
-                shipment.get("Moisture_Sens"),
-                shipment.get("Length_cm"),
-                shipment.get("Width_cm"),
-                shipment.get("Height_cm"),
-                k_value,
-                sort_by,
-                json.dumps(recommendations)
-            ))
-        logger.info(f"✅ Saved recommendation to history for {email}")
+            # One database timestamp for the batch, so history and rollup agree on the day
+            cur.execute("SELECT CURRENT_TIMESTAMP AS now")
+            now = _as_datetime(cur.fetchone()["now"])
+            shipment_ids = intern_shipments(cur, [e[2] for e in entries])
+            rows, rollup = [], []
+            for (email, session_id, shipment, k_value, sort_by, recommendations), shipment_id in zip(entries, shipment_ids):
+                rows.append((
+                    email, session_id, now, shipment_id,
+                    k_value, sort_by,
+                    *encode_results(recommendations)
+                ))
+                entry = rollup_entry(now, shipment.get("Category_item"),
+                                     shipment.get("Shipping_Mode"), recommendations)
+                if entry:
+                    rollup.append(entry)
+            cur.executemany(_HISTORY_INSERT, rows)
+            apply_rollup(cur, rollup)
+        db.commit()
+        logger.info("✅ Saved %d recommendation(s) to history", len(entries), extra=SAMPLED)
         return True
     except Exception as e:
+        db.rollback()
         logger.error(f"Save recommendation error: {e}")
         return False
     finally:
         db.close()
 
+
+def save_recommendation(email, session_id, shipment, k_value, sort_by, recommendations):
+    """
+    Save recommendation to history (DB_BACKEND: MySQL or SQLite)
+    
+    Args:
+        email: user email
+        session_id: session identifier
+        shipment: dict with shipment details
+        k_value: number of recommendations requested
+        sort_by: sorting criterion
+        recommendations: list of recommendation dicts
+    """
+    return save_recommendations([(email, session_id, shipment, k_value, sort_by, recommendations)])
+
 def get_user_history(email, limit=10):
     """Get user's recommendation history"""
     db = get_db()
     try:
         with db.cursor() as cur:
             cur.execute("""
-                SELECT id, session_id, created_at, product_category, 
-                       weight_kg, distance_km, k_value, sort_by
-                FROM recommendation_history
-                WHERE email = %s
-                ORDER BY created_at DESC
+                SELECT h.id, h.session_id, h.created_at, s.product_category,
+                       s.weight_kg, s.distance_km, h.k_value, h.sort_by
+                FROM recommendation_history h
+                LEFT JOIN shipment_fingerprints s ON s.id = h.shipment_id
+                WHERE h.email = %s
+                ORDER BY h.created_at DESC
                 LIMIT %s
             """, (email, limit))
             history = cur.fetchall()
@@ -142,5 +190,42 @@ def get_user_history(email, limit=10):
     except Exception as e:
         logger.error(f"Get history error: {e}")
         return []
+    finally:
+        db.close()
+
+
+def get_recommendation(email, history_id):
+    """
+    One saved recommendation in the shape it was returned in:
+    {id, session_id, created_at, shipment, k_value, sort_by, recommendations},
+    or None if it doesn't exist / belongs to another user
+    """
+    db = get_db()
+    try:
+        with db.cursor() as cur:
+            cur.execute("""
+                SELECT h.id, h.session_id, h.created_at, h.k_value, h.sort_by,
+                       h.results, h.recommendations, s.product_category, s.weight_kg,
+                       s.fragility, s.shipping_mode, s.distance_km, s.moisture_sensitive,
+                       s.length_cm, s.width_cm, s.height_cm
+                FROM recommendation_history h
+                LEFT JOIN shipment_fingerprints s ON s.id = h.shipment_id
+                WHERE h.email = %s AND h.id = %s
+            """, (email, history_id))
+            row = cur.fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "session_id": row["session_id"],
+            "created_at": row["created_at"],
+            "shipment": shipment_from_columns(row),
+            "k_value": row["k_value"],
+            "sort_by": row["sort_by"],
+            "recommendations": decode_results(row["results"], row["recommendations"]),
+        }
+    except Exception as e:
+        logger.error(f"Get recommendation error: {e}")
+        return None
     finally:
         db.close()
\ No newline at end of file
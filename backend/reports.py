@@ -0,0 +1,115 @@
+"""
+PDF Reports
+- render_report_pdf(): the EcoPackAI report (header, shipment details,
+  recommendations table, watermark) as PDF bytes. Used by
+  /api/generate-pdf and the pdf_reports batch job (job_handlers.py)
+"""
+
+from io import BytesIO
+
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+
+
+def render_report_pdf(shipment, recommendations):
+    """shipment: API shipment dict (or None); recommendations: RecommendationSet or list of dicts."""
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, pagesize=letter,
+        topMargin=0.75*inch, bottomMargin=0.75*inch,
+        leftMargin=0.75*inch, rightMargin=0.75*inch
+    )
+    elements = []
+    styles   = getSampleStyleSheet()
+
+    # App title — green
+    title_style = ParagraphStyle(
+        "CustomTitle", parent=styles["Title"],
+        fontSize=20, textColor=colors.HexColor("#10b981"), alignment=1
+    )
+    section_style = ParagraphStyle(
+        "Section", parent=styles["Heading2"],
+        fontSize=13, textColor=colors.HexColor("#047857")
+    )
+
+    elements.append(Paragraph("<b>EcoPackAI</b>", title_style))
+    elements.append(Spacer(1, 20))
+
+    # Shipment Details
+    if shipment:
+        elements.append(Paragraph("<b>Shipment Details:</b>", section_style))
+        elements.append(Spacer(1, 8))
+
+        shipment_rows = [
+            ["Category",         str(shipment.get("Category_item", "N/A"))],
+            ["Weight (kg)",      f"{shipment.get('Weight_kg', 0):.2f}"],
+            ["Distance (km)",    f"{shipment.get('Distance_km', 0):.2f}"],
+            ["Shipping Mode",    str(shipment.get("Shipping_Mode", "N/A"))],
+            ["Fragility",        str(shipment.get("Fragility", "N/A"))],
+            ["Moisture Sens.",   "Yes" if shipment.get("Moisture_Sens") else "No"],
+            ["Dimensions (cm)",  (f"{shipment.get('Length_cm', 0)} x "
+                                  f"{shipment.get('Width_cm', 0)} x "
+                                  f"{shipment.get('Height_cm', 0)}")],
+        ]
+
+        st = Table(shipment_rows, colWidths=[2*inch, 4*inch])
+        st.setStyle(TableStyle([
+            ("FONTNAME",  (0, 0), (0, -1), "Helvetica-Bold"),
+            ("FONTSIZE",  (0, 0), (-1, -1), 10),
+            ("ALIGN",     (0, 0), (0, -1), "LEFT"),
+            ("ALIGN",     (1, 0), (1, -1), "CENTER"),
+            ("GRID",      (0, 0), (-1, -1), 0.5, colors.grey),
+            ("VALIGN",    (0, 0), (-1, -1), "MIDDLE"),
+            ("ROWBACKGROUNDS", (0, 0), (-1, -1),
+             [colors.HexColor("#f0fdf4"), colors.white]),
+        ]))
+        elements.append(st)
+        elements.append(Spacer(1, 20))
+
+    # Recommendations table
+    elements.append(Paragraph("<b>Recommendations:</b>", section_style))
+    elements.append(Spacer(1, 8))
+
+    table_data = [["#", "Material", "Cost ($)", "CO₂ (kg)", "Sustainability"]]
+    for i, r in enumerate(recommendations, 1):
+        table_data.append([
+            str(i),
+            str(r.get("Material_Name", "N/A"))[:30],
+            f"{r.get('Pred_Cost', 0):.2f}",
+            f"{r.get('Pred_CO2', 0):.2f}",
+            f"{r.get('Sustainability', 0):.4f}",
+        ])
+
+    rec_table = Table(
+        table_data,
+        colWidths=[0.4*inch, 2.5*inch, 1*inch, 1*inch, 1.3*inch]
+    )
+    rec_table.setStyle(TableStyle([
+        ("BACKGROUND",  (0, 0), (-1, 0),  colors.HexColor("#10b981")),
+        ("TEXTCOLOR",   (0, 0), (-1, 0),  colors.white),
+        ("FONTNAME",    (0, 0), (-1, 0),  "Helvetica-Bold"),
+        ("FONTSIZE",    (0, 0), (-1, 0),  10),
+        ("ALIGN",       (0, 0), (-1, -1), "CENTER"),
+        ("FONTSIZE",    (0, 1), (-1, -1), 9),
+        ("GRID",        (0, 0), (-1, -1), 0.5, colors.grey),
+        ("VALIGN",      (0, 0), (-1, -1), "MIDDLE"),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1),
+         [colors.HexColor("#f0fdf4"), colors.white]),
+    ]))
+    elements.append(rec_table)
+
+    # Faint watermark
+    def add_watermark(c, doc):
+        c.saveState()
+        c.setFillColor(colors.Color(0.1, 0.6, 0.4, alpha=0.05))
+        c.setFont("Helvetica-Bold", 50)
+        c.translate(letter[0] / 2, letter[1] / 2)
+        c.rotate(30)
+        c.drawCentredString(0, 0, "EcoPackAI")
+        c.restoreState()
+
+    doc.build(elements, onFirstPage=add_watermark, onLaterPages=add_watermark)
+    return buffer.getvalue()
@@ -0,0 +1,243 @@
+"""
+Precompressed Static Assets (bi/)
+---------------------------------
+- Each asset is held in memory as identity, gzip and brotli bytes and
+  served by Accept-Encoding (Vary: Accept-Encoding)
+- Strong ETag per representation (content sha256 + encoding);
+  If-None-Match → 304
+- ?v=<content hash> URLs are immutable for a year; the bare URL is
+  revalidated on every load (cheap: 304 with no body)
+- The file is stat'ed at most every STATIC_CHECK_SECONDS and only
+  re-read / re-compressed when its size or mtime changed
+- Compressed bytes are cached on disk by content hash
+  (data/static_cache/). Brotli at quality 11 takes seconds on the 1.2 MB
+  dashboard, so a cache miss compresses it on a background thread and
+  serves gzip until it is ready. Precompress at build time with:
+    python backend/static_assets.py build
+"""
+
+import argparse
+import gzip
+import hashlib
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+BI_DIR = PROJECT_ROOT / "bi"
+COMPRESSED_CACHE_DIR = PROJECT_ROOT / "data" / "static_cache"
+
+STATIC_CHECK_SECONDS = float(os.getenv("STATIC_CHECK_SECONDS", 2))
+GZIP_LEVEL = int(os.getenv("STATIC_GZIP_LEVEL", 9))
+BROTLI_QUALITY = int(os.getenv("STATIC_BROTLI_QUALITY", 11))
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Already-compressed formats (.pbix, .pptx are zip files) are served as-is
+COMPRESSIBLE_SUFFIXES = {".html", ".htm", ".css", ".js", ".json", ".svg", ".txt", ".csv"}
+
+# Server preference when the client accepts several encodings equally
+ENCODING_PREFERENCE = ("br", "gzip", "identity")
+_SUFFIX = {"br": "br", "gzip": "gz"}
+
+
+def _compress(encoding, data):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _cached_compress(encoding, data, version, name, cache_dir):
+    """Compressed bytes from the on-disk cache, compressing (and storing) on a miss."""
+    path = Path(cache_dir) / f"{name}.{version}.{_SUFFIX[encoding]}" if cache_dir else None
+    if path is not None and path.exists():
+        return path.read_bytes()
+    body = _compress(encoding, data)
+    if path is not None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(body)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not cache {path.name}: {e}")
+    return body
+
+
+def parse_accept_encoding(header):
+    """{coding: q} from an Accept-Encoding header."""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class StaticAsset:
+    """One file served from memory in every encoding the server has ready."""
+
+    def __init__(self, path, mimetype, cache_dir=COMPRESSED_CACHE_DIR, check_seconds=STATIC_CHECK_SECONDS,
+                 background=True):
+        self.path = Path(path)
+        self.mimetype = mimetype
+        self.cache_dir = cache_dir
+        self.check_seconds = check_seconds
+        self.background = background
+        self.compressible = self.path.suffix.lower() in COMPRESSIBLE_SUFFIXES
+        # version / last_modified / variants, swapped as one object on reload
+        self._state = {"version": None, "last_modified": None, "variants": {}}
+        self._stamp = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    # --------------------------------------------------
+    # Loading
+    # --------------------------------------------------
+    def current(self):
+        """self when the file exists (reloaded if it changed), else None. Stats at most every check_seconds."""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_seconds:
+            return self if self._stamp else None
+        with self._lock:
+            if now - self._checked_at >= self.check_seconds:
+                try:
+                    st = self.path.stat()
+                    stamp = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    stamp = None
+                if stamp and stamp != self._stamp:
+                    self._load(st)
+                self._stamp = stamp
+                self._checked_at = time.monotonic()
+        return self if self._stamp else None
+
+    def _load(self, st):
+        t0 = time.perf_counter()
+        data = self.path.read_bytes()
+        version = hashlib.sha256(data).hexdigest()[:16]
+        variants = {"identity": data}
+        if self.compressible:
+            variants["gzip"] = _cached_compress("gzip", data, version, self.path.name, self.cache_dir)
+        self._state = {"version": version, "last_modified": st.st_mtime, "variants": variants}
+        if self.compressible and brotli is not None:
+            if self.background:
+                threading.Thread(target=self._add_brotli, args=(data, version), daemon=True).start()
+            else:
+                self._add_brotli(data, version)
+        logger.info(f"📦 Loaded {self.path.name} ({len(data):,} bytes, v{version}) "
+                    f"in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    def _add_brotli(self, data, version):
+        body = _cached_compress("br", data, version, self.path.name, self.cache_dir)
+        state = self._state
+        if state["version"] == version:
+            self._state = {**state, "variants": {**state["variants"], "br": body}}
+
+    @property
+    def version(self):
+        return self._state["version"]
+
+    @property
+    def variants(self):
+        return self._state["variants"]
+
+    # --------------------------------------------------
+    # Serving
+    # --------------------------------------------------
+    def negotiate(self, accept_encoding, variants=None):
+        variants = self.variants if variants is None else variants
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        best, best_q = "identity", 0.0
+        for encoding in ENCODING_PREFERENCE:
+            if encoding not in variants:
+                continue
+            # identity is always acceptable, but only as the last resort unless asked for
+            q = accepted.get(encoding, 0.001 if encoding == "identity" else wildcard)
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def etag(self, encoding, version=None):
+        version = version or self.version
+        return f'"{version}"' if encoding == "identity" else f'"{version}-{_SUFFIX[encoding]}"'
+
+    def url(self, route):
+        return f"{route}?v={self.version}"
+
+    def response(self, request):
+        state = self._state
+        variants, version = state["variants"], state["version"]
+        encoding = self.negotiate(request.headers.get("Accept-Encoding"), variants)
+        etag = self.etag(encoding, version)
+
+        headers = {
+            "ETag": etag,
+            "Vary": "Accept-Encoding",
+            "Cache-Control": (f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+                              if request.args.get("v") == version else "no-cache"),
+        }
+        if_none_match = request.headers.get("If-None-Match", "")
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        response = Response(variants[encoding], mimetype=self.mimetype, headers=headers)
+        response.last_modified = state["last_modified"]
+        return response
+
+
+# ======================================================
+# Build-time precompression
+# ======================================================
+def build(asset_dir=BI_DIR, cache_dir=COMPRESSED_CACHE_DIR, log=print):
+    """Writes gzip + brotli variants of every compressible file in asset_dir to the cache."""
+    if brotli is None:
+        log("⚠️ brotli not installed; writing gzip only (pip install brotli)")
+    for path in sorted(Path(asset_dir).iterdir()):
+        if path.suffix.lower() not in COMPRESSIBLE_SUFFIXES:
+            continue
+        t0 = time.perf_counter()
+        asset = StaticAsset(path, "application/octet-stream", cache_dir, check_seconds=0, background=False)
+        asset.current()
+        sizes = ", ".join(f"{enc} {len(body):,}" for enc, body in asset.variants.items())
+        log(f"✓ {path.name} v{asset.version}: {sizes} bytes ({time.perf_counter() - t0:.1f}s)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Precompress static assets")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="gzip + brotli every compressible file into the cache")
+    p.add_argument("--dir", default=str(BI_DIR))
+    p.add_argument("--cache", default=str(COMPRESSED_CACHE_DIR))
+    args = ap.parse_args()
+
+    if args.command == "build":
+        build(args.dir, args.cache)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+Structured, Non-blocking Logging
+--------------------------------
+- configure_logging() puts one QueueHandler on the root logger; the real
+  handlers (stderr, optional LOG_FILE) run on a QueueListener thread, so
+  request threads never wait on log I/O. Records are formatted there,
+  not on the request thread: call sites pass %-style args, and a
+  disabled level costs one isEnabledFor() check
+- LOG_FORMAT=json (default): one JSON object per line with time, level,
+  logger, message, request_id and any `extra` fields (the access line
+  carries the request's stage() timings as stages_ms); LOG_FORMAT=text
+  keeps the plain console format
+- Sampling: records logged with extra=SAMPLED (the per-request INFO
+  lines) are kept for a LOG_SAMPLE_RATE share of requests, chosen by
+  request id so a sampled request keeps all its lines. WARNING and above
+  are never sampled
+- The queue is bounded (LOG_QUEUE_SIZE); when the listener falls behind,
+  records are dropped and counted instead of blocking the request
+- shutdown_logging() (atexit, so also gunicorn worker exit) drains the
+  queue and stops the listener; forked children start their own
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import secrets
+import sys
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 1.0))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10_000))
+LOG_FILE = os.getenv("LOG_FILE")
+
+TEXT_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+
+# Pass as extra= on high-frequency INFO lines to make them subject to LOG_SAMPLE_RATE
+SAMPLED = {"sampled": True}
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+stages_var = contextvars.ContextVar("stages", default=None)
+
+# LogRecord attributes that aren't `extra` fields
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "sampled", "request_id"}
+
+
+# ======================================================
+# Request context
+# ======================================================
+def new_request_id(incoming=None):
+    """Starts a request: sets (and returns) its id, reusing a sane incoming X-Request-ID."""
+    rid = incoming if incoming and len(incoming) <= 64 and incoming.isprintable() else secrets.token_hex(8)
+    request_id_var.set(rid)
+    stages_var.set({})
+    return rid
+
+
+def current_request_id():
+    return request_id_var.get()
+
+
+def end_request():
+    request_id_var.set(None)
+    stages_var.set(None)
+
+
+@contextmanager
+def stage(name):
+    """Times a block into the current request's stage timings (ms)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = stages_var.get()
+        if stages is not None:
+            stages[name] = round(stages.get(name, 0.0) + (time.perf_counter() - t0) * 1000, 3)
+
+
+def request_stages():
+    return dict(stages_var.get() or {})
+
+
+# ======================================================
+# Handler side
+# ======================================================
+class SamplingFilter(logging.Filter):
+    """Keeps SAMPLED records below WARNING for a `rate` share of requests."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if self.rate >= 1.0 or record.levelno >= logging.WARNING or not getattr(record, "sampled", False):
+            return True
+        rid = request_id_var.get()
+        if rid is None:
+            return random.random() < self.rate
+        return zlib.crc32(rid.encode()) / 2**32 < self.rate
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that stamps the request context and enqueues the record
+    unformatted (the stdlib one formats in prepare(), on the caller's thread).
+    """
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record.request_id = request_id_var.get()
+        if record.exc_info:
+            # Tracebacks keep frames alive; render them now (error path only)
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+# ======================================================
+# Setup / teardown
+# ======================================================
+_state = {"handler": None, "listener": None, "targets": None}
+_lock = threading.Lock()
+
+
+def _target_handlers(fmt):
+    formatter = JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+    targets = [logging.StreamHandler(sys.stderr)]
+    if LOG_FILE:
+        targets.append(logging.FileHandler(LOG_FILE, encoding="utf-8"))
+    for h in targets:
+        h.setFormatter(formatter)
+    return targets
+
+
+class _DrainingListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Block (the stdlib uses put_nowait): a full queue must still drain and stop
+        self.queue.put(self._sentinel)
+
+
+def _start_listener():
+    listener = _DrainingListener(_state["handler"].queue, *_state["targets"],
+                                              respect_handler_level=True)
+    listener.start()
+    _state["listener"] = listener
+
+
+def configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, sample_rate=LOG_SAMPLE_RATE, targets=None):
+    """
+    Routes the root logger through the queue (idempotent). `targets`
+    overrides the handlers the listener writes to (tests / benchmarks).
+    """
+    with _lock:
+        root = logging.getLogger()
+        root.setLevel(level)
+        if _state["handler"] is not None:
+            return _state["handler"]
+        handler = ContextQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        handler.addFilter(SamplingFilter(sample_rate))
+        _state["handler"] = handler
+        _state["targets"] = targets if targets is not None else _target_handlers(fmt)
+        for h in list(root.handlers):
+            root.removeHandler(h)
+        root.addHandler(handler)
+        _start_listener()
+        return handler
+
+
+def shutdown_logging():
+    """Drains queued records through the handlers, then stops the listener thread."""
+    with _lock:
+        listener, handler = _state["listener"], _state["handler"]
+        if listener is None:
+            return
+        listener.stop()
+        _state["listener"] = None
+        for h in _state["targets"]:
+            h.flush()
+        if handler.dropped:
+            sys.stderr.write(f"⚠️ {handler.dropped} log records dropped (queue full)\n")
+
+
+def _after_fork():
+    # The listener thread doesn't survive fork(); a child gets a fresh queue and thread
+    if _state["handler"] is not None:
+        _state["handler"].queue = queue.Queue(LOG_QUEUE_SIZE)
+        _start_listener()
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
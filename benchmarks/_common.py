@@ -0,0 +1,104 @@
+"""
+Benchmark helpers
+- Path setup so benchmarks run from anywhere (python benchmarks/<file>.py)
+- Timing + percentile summaries
+- A representative sample shipment
+- The full material catalogue (data/processed/clean_materials.csv) in
+  the engine's column names, and random shipments from the training data
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "backend"))
+
+SAMPLE_SHIPMENT = {
+    "Category_item": "Electronics",
+    "Weight_kg": 5.0,
+    "Fragility": 8,
+    "Moisture_Sens": True,
+    "Distance_km": 1200.0,
+    "Shipping_Mode": "Air",
+    "Length_cm": 30.0,
+    "Width_cm": 20.0,
+    "Height_cm": 15.0,
+}
+
+
+CATALOGUE_PATH = PROJECT_ROOT / "data" / "processed" / "clean_materials.csv"
+
+
+def load_full_catalogue():
+    """All ~600 materials, renamed to match the engine's materials_df."""
+    return pd.read_csv(CATALOGUE_PATH).rename(columns={
+        "Category": "Category_material",
+        "CO2_Emission_kg": "CO2_Emission_kg_material",
+    })
+
+
+def random_shipments(train_df, n, seed=0):
+    """Shipments resampled from training rows (boxes are cubes of the item volume)."""
+    rows = train_df.sample(n=n, replace=True, random_state=seed)
+    out = []
+    for r in rows.itertuples(index=False):
+        side = float(r.Item_Volume_m3) ** (1 / 3) * 100
+        out.append({
+            "Category_item": r.Category_item,
+            "Weight_kg": float(r.Weight_kg),
+            "Fragility": int(r.Fragility),
+            "Moisture_Sens": bool(r.Moisture_Sens),
+            "Distance_km": float(r.Distance_km),
+            "Shipping_Mode": r.Shipping_Mode,
+            "Length_cm": side,
+            "Width_cm": side,
+            "Height_cm": side,
+        })
+    return out
+
+
+def time_calls(fn, repeat=50, warmup=3):
+    """Call fn() repeatedly, return per-call wall times in seconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def summarize(samples):
+    """p50/p95/p99/mean in milliseconds."""
+    arr = np.asarray(samples, dtype=float) * 1000
+    if arr.size == 0:
+        return {"n": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0}
+    return {
+        "n":       int(arr.size),
+        "p50_ms":  round(float(np.percentile(arr, 50)), 3),
+        "p95_ms":  round(float(np.percentile(arr, 95)), 3),
+        "p99_ms":  round(float(np.percentile(arr, 99)), 3),
+        "mean_ms": round(float(arr.mean()), 3),
+    }
+
+
+def print_table(title, rows):
+    """rows: list of dicts sharing the same keys."""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70)
+    if not rows:
+        print("(no rows)")
+        return
+    cols = list(rows[0].keys())
+    widths = [max(len(str(c)), *(len(str(r.get(c, ""))) for r in rows)) for c in cols]
+    print("  ".join(str(c).ljust(w) for c, w in zip(cols, widths)))
+    print("  ".join("-" * w for w in widths))
+    for r in rows:
+        print("  ".join(str(r.get(c, "")).ljust(w) for c, w in zip(cols, widths)))
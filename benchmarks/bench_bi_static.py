@@ -0,0 +1,132 @@
+"""
+BI dashboard delivery benchmark
+-------------------------------
+/bi/dashboard before (send_file on every request) and after
+(backend/static_assets.py: in-memory, precompressed, ETag / 304), over
+real HTTP on a local werkzeug server.
+
+Per scenario: bytes on the wire (headers + body), time to first byte
+and total time (median of --repeat requests), plus the status code.
+Scenarios: first load without compression, with gzip, with br, and a
+reload that revalidates with If-None-Match. Also times
+/api/bi-dashboard-available (stat per call vs cached check).
+
+Run: python benchmarks/bench_bi_static.py [--repeat 50]
+"""
+
+import argparse
+import http.client
+import logging
+import tempfile
+import threading
+import time
+
+import numpy as np
+from flask import Flask, jsonify, request, send_file
+from werkzeug.serving import make_server
+
+from _common import print_table
+
+from static_assets import BI_DIR, StaticAsset, brotli
+
+HTML = BI_DIR / "EcoPackAI_BI_Dashboard.html"
+
+
+def build_app(cache_dir):
+    app = Flask(__name__)
+    asset = StaticAsset(HTML, "text/html", cache_dir=cache_dir, background=False)
+    asset.current()
+
+    # Before: the previous handlers
+    @app.route("/before/dashboard")
+    def before():
+        return send_file(HTML, mimetype="text/html")
+
+    @app.route("/before/available")
+    def before_available():
+        return jsonify({"available": HTML.exists()})
+
+    # After
+    @app.route("/after/dashboard")
+    def after():
+        return asset.current().response(request)
+
+    @app.route("/after/available")
+    def after_available():
+        current = asset.current()
+        return jsonify({"available": current is not None, "url": current.url("/after/dashboard")})
+
+    return app, asset
+
+
+def fetch(port, path, headers):
+    """(status, wire bytes, ttfb s, total s, response headers)"""
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    t0 = time.perf_counter()
+    conn.request("GET", path, headers=headers)
+    resp = conn.getresponse()
+    first = resp.read(1)
+    ttfb = time.perf_counter() - t0
+    body = first + resp.read()
+    total = time.perf_counter() - t0
+    head = sum(len(k) + len(v) + 4 for k, v in resp.getheaders()) + 17
+    conn.close()
+    return resp.status, head + len(body), ttfb, total, dict(resp.getheaders())
+
+
+def measure(port, path, headers, repeat):
+    runs = [fetch(port, path, headers) for _ in range(repeat)]
+    status, wire, _, _, resp_headers = runs[-1]
+    return {
+        "status": status,
+        "wire_bytes": wire,
+        "ttfb_ms": round(float(np.median([r[2] for r in runs])) * 1000, 2),
+        "total_ms": round(float(np.median([r[3] for r in runs])) * 1000, 2),
+        "encoding": resp_headers.get("Content-Encoding", "identity"),
+        "cache_control": resp_headers.get("Cache-Control", "-"),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args()
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        app, asset = build_app(cache_dir)
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        port = server.server_port
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        versioned = asset.url("/after/dashboard")
+        scenarios = [
+            ("no compression", {}),
+            ("gzip", {"Accept-Encoding": "gzip, deflate"}),
+            ("br", {"Accept-Encoding": "gzip, deflate, br"}),
+        ]
+        rows = []
+        for label, headers in scenarios:
+            for side, path in (("before", "/before/dashboard"), ("after", versioned)):
+                rows.append({"request": label, "side": side, **measure(port, path, headers, args.repeat)})
+
+        # Reload: revalidate with whatever validator the first response carried
+        for side, path in (("before", "/before/dashboard"), ("after", "/after/dashboard")):
+            headers = {"Accept-Encoding": "gzip, deflate, br"}
+            _, _, _, _, first = fetch(port, path, headers)
+            if first.get("ETag"):
+                headers["If-None-Match"] = first["ETag"]
+            rows.append({"request": "reload (If-None-Match)", "side": side,
+                         **measure(port, path, headers, args.repeat)})
+
+        for side in ("before", "after"):
+            rows.append({"request": "available check", "side": side,
+                         **measure(port, f"/{side}/available", {}, args.repeat)})
+        server.shutdown()
+
+    print_table(f"/bi/dashboard ({HTML.stat().st_size:,} bytes; brotli "
+                f"{'available' if brotli else 'not installed'})", rows)
+
+
+if __name__ == "__main__":
+    main()
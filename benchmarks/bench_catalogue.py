@@ -0,0 +1,84 @@
+"""
+Catalogue load benchmark
+------------------------
+CSV parsing vs the compiled Arrow artifacts (ml/notebooks/catalogue.py).
+
+Per dataset:
+- load time: pd.read_csv, memory-mapped Arrow table only, Arrow → DataFrame
+- memory: RSS growth of a fresh process doing each load (Linux /proc),
+  frame size and artifact size (mapped pages are shared between workers)
+
+Run: python ml/notebooks/catalogue.py build && python benchmarks/bench_catalogue.py
+"""
+
+import subprocess
+import sys
+
+import pandas as pd
+
+from _common import PROJECT_ROOT, time_calls, summarize, print_table
+
+from ml.notebooks.catalogue import (
+    COMPILED_SOURCES, artifact_path, artifact_status, read_table, table_to_frame, load_frame
+)
+
+# Current RSS from /proc (ru_maxrss is inherited across fork+exec)
+_RSS_PROBE = """
+import sys
+sys.path.append({root!r})
+import pandas as pd
+from ml.notebooks import catalogue
+def rss_kb():
+    with open("/proc/self/status") as f:
+        return next(int(l.split()[1]) for l in f if l.startswith("VmRSS:"))
+before = rss_kb()
+obj = {expr}
+print(rss_kb() - before)
+"""
+
+
+def _rss_kb(expr):
+    code = _RSS_PROBE.format(root=str(PROJECT_ROOT), expr=expr)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    return int(out.stdout.strip() or 0)
+
+
+def main():
+    rows = []
+    for csv_path in COMPILED_SOURCES:
+        status = artifact_status(csv_path)
+        if status != "fresh":
+            print(f"{csv_path.name}: artifact {status}, run `python ml/notebooks/catalogue.py build`")
+            continue
+
+        csv_df = pd.read_csv(csv_path)
+        arrow_df = load_frame(csv_path)
+        pd.testing.assert_frame_equal(csv_df, arrow_df, check_exact=True)
+
+        p = str(csv_path)
+        variants = {
+            "csv":          (lambda: pd.read_csv(csv_path), f"pd.read_csv({p!r})"),
+            "arrow table":  (lambda: read_table(csv_path), f"catalogue.read_table({p!r})"),
+            "arrow→frame":  (lambda: table_to_frame(read_table(csv_path)), f"catalogue.load_frame({p!r})"),
+        }
+        for name, (fn, expr) in variants.items():
+            s = summarize(time_calls(fn, repeat=20))
+            rows.append({
+                "dataset":   csv_path.name,
+                "loader":    name,
+                "p50_ms":    s["p50_ms"],
+                "p95_ms":    s["p95_ms"],
+                "rss_kb":    _rss_kb(expr),
+            })
+        rows.append({
+            "dataset": csv_path.name,
+            "loader":  "sizes (MB)",
+            "p50_ms":  f"csv {csv_path.stat().st_size / 1e6:.2f}",
+            "p95_ms":  f"arrow {artifact_path(csv_path).stat().st_size / 1e6:.2f}",
+            "rss_kb":  f"frame {csv_df.memory_usage(deep=True).sum() / 1e6:.2f}",
+        })
+    print_table("Catalogue load: CSV vs compiled Arrow (frames verified identical)", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Drift monitor benchmark
+-----------------------
+ml/notebooks/drift_monitor.py on shipments resampled from the training
+data (no models needed; predictions are random log-normal arrays of
+--candidates values per shipment, like the pre-filtered candidate set).
+
+- observe: per-request cost of DriftMonitor.observe (the /api/recommend
+  "monitor" stage), for small and large candidate sets
+- state: serialised size of the monitor after growing amounts of
+  traffic; it levels off instead of growing with the traffic
+- merge / report: merging W worker states (what /api/monitor/drift
+  does) and scoring the result against a reference
+
+Run: python benchmarks/bench_drift.py [--requests 20000] [--workers 8]
+"""
+
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from _common import PROJECT_ROOT, print_table, random_shipments, summarize, time_calls
+from ml.notebooks.drift_monitor import DriftMonitor, drift_report
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=20_000)
+    ap.add_argument("--workers", type=int, default=8)
+    args = ap.parse_args()
+
+    train = pd.read_csv(PROJECT_ROOT / "data" / "processed" / "final_ecopack_dataset_fe.csv")
+    shipments = random_shipments(train, 2000, seed=0)
+    rng = np.random.default_rng(0)
+
+    # Per-request observe cost
+    rows = []
+    for candidates in (8, 64, 600):
+        preds = [(rng.lognormal(1, 1, candidates), rng.lognormal(1.5, 1, candidates)) for _ in range(200)]
+        monitor = DriftMonitor()
+        i = iter(range(10**9))
+
+        def one():
+            n = next(i)
+            monitor.observe(shipments[n % len(shipments)], *preds[n % len(preds)])
+
+        rows.append({"candidates": candidates, **summarize(time_calls(one, repeat=5000, warmup=200))})
+    print_table("DriftMonitor.observe per request (ms)", rows)
+
+    # State size vs traffic
+    rows = []
+    monitor, seen = DriftMonitor(), 0
+    for target in (100, 1000, 10_000, args.requests):
+        while seen < target:
+            monitor.observe(shipments[seen % len(shipments)],
+                            rng.lognormal(1, 1.5, 8), rng.lognormal(1.5, 1.5, 8))
+            seen += 1
+        buckets = sum(len(s.quantiles.pos) + len(s.quantiles.neg) for s in monitor.numeric.values())
+        rows.append({"shipments": seen, "predictions": seen * 16, "quantile_buckets": buckets,
+                     "state_kb": round(len(json.dumps(monitor.to_dict())) / 1024, 1)})
+    print_table("Monitor state size vs traffic", rows)
+
+    # Merge W worker states + report
+    states = []
+    for w in range(args.workers):
+        part = DriftMonitor()
+        for s in shipments[w::args.workers]:
+            part.observe(s, rng.lognormal(1, 1, 8), rng.lognormal(1.5, 1, 8))
+        states.append(part.to_dict())
+    reference = {"monitor": monitor}
+    merged = DriftMonitor.merged(states)
+    rows = [
+        {"step": f"merge {args.workers} worker states (from JSON)",
+         **summarize(time_calls(lambda: DriftMonitor.merged(states), repeat=50))},
+        {"step": "drift_report vs reference",
+         **summarize(time_calls(lambda: drift_report(merged, reference), repeat=50))},
+    ]
+    print_table("Endpoint work (ms)", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Explanation overhead benchmark
+------------------------------
+Recommend latency with explanations off, on (cold: explainer built,
+memo empty), and on (warm: memo hit for a repeated shipment).
+Also checks SHAP additivity: base_value + sum(contributions) ≈ prediction.
+
+Run: python benchmarks/bench_explain.py [--top-k 5] [--repeat 50]
+"""
+
+import argparse
+import time
+
+from _common import SAMPLE_SHIPMENT, time_calls, summarize, print_table
+
+from ml.notebooks import explainer
+from ml.notebooks.recommendation_engine import (
+    generate_recommendations, materials_df, co2_model, cost_model,
+    FEATURES_COST, FEATURES_CO2
+)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--top-k", type=int, default=5)
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args()
+
+    def call(explain, shipment=SAMPLE_SHIPMENT, top_n=5):
+        return generate_recommendations(
+            materials_df, co2_model, cost_model, shipment,
+            FEATURES_COST, FEATURES_CO2, args.top_k, "Sustainability",
+            explain=explain, explain_top_n=top_n
+        )
+
+    rows = []
+
+    off = {"mode": "explain=False"}
+    off.update(summarize(time_calls(lambda: call(False), repeat=args.repeat)))
+    rows.append(off)
+
+    # Cold: first call pays explainer construction
+    explainer._explainers.clear()
+    explainer.clear_cache()
+    t0 = time.perf_counter()
+    call(True)
+    first = {"mode": "explain=True (first call)"}
+    first.update(summarize([time.perf_counter() - t0]))
+    rows.append(first)
+
+    # Uncached: explainers built, every shipment new
+    counter = iter(range(10**9))
+    def uncached():
+        shipment = dict(SAMPLE_SHIPMENT, Distance_km=1000.0 + next(counter))
+        call(True, shipment)
+    miss = {"mode": "explain=True (memo miss)"}
+    miss.update(summarize(time_calls(uncached, repeat=args.repeat)))
+    rows.append(miss)
+
+    hit = {"mode": "explain=True (memo hit)"}
+    hit.update(summarize(time_calls(lambda: call(True), repeat=args.repeat)))
+    rows.append(hit)
+
+    print_table(f"Recommend latency with SHAP explanations (top_k={args.top_k})", rows)
+
+    # Additivity check (all contributions kept)
+    explainer.clear_cache()
+    df = call(True, top_n=10**6)
+    worst = 0.0
+    for _, r in df.iterrows():
+        for target in ("Pred_Cost", "Pred_CO2"):
+            e = r["Explanation"][target]
+            total = e["base_value"] + sum(c["contribution"] for c in e["contributions"])
+            worst = max(worst, abs(total - r[target]))
+    print(f"\nMax |base + Σcontrib − prediction| over top-{args.top_k}: {worst:.6f}")
+
+
+if __name__ == "__main__":
+    main()
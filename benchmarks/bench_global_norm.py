@@ -0,0 +1,158 @@
+"""
+Global normalisation benchmark
+------------------------------
+normalization="candidates" (current: min-max over the candidate set) vs
+normalization="global" (fixed reference stats, ml/models/score_reference.json)
+on the engine's materials and on the full catalogue.
+
+Reports:
+- ranking differences: top-1 / top-3 agreement, Spearman correlation of
+  the full Sustainability ranking, mean |rank shift| per material
+- latency: candidates, global with a cold cache, global with a warm cache
+- catalogue change: share of materials scored again after editing 5% of
+  the catalogue and adding 10 materials
+- early termination: materials scored / skipped per request for each sort_by
+
+Run: python ml/notebooks/score_reference.py build && python benchmarks/bench_global_norm.py
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from _common import time_calls, summarize, print_table, load_full_catalogue, random_shipments
+
+from ml.notebooks.recommendation_engine import (
+    generate_recommendations, materials_df, co2_model, cost_model,
+    FEATURES_COST, FEATURES_CO2, df, score_reference
+)
+from ml.notebooks.score_reference import prediction_cache
+
+
+def recommend(materials, shipment, top_k, sort_by="Sustainability", normalization="candidates", cold=False):
+    if cold:
+        prediction_cache.clear()
+    return generate_recommendations(
+        materials, co2_model, cost_model, shipment, FEATURES_COST, FEATURES_CO2,
+        top_k, sort_by, prefilter=False, normalization=normalization, reference=score_reference
+    )
+
+
+def ranking_rows(label, materials, shipments, k):
+    n = len(materials)
+    top1 = topk = 0
+    rho, shift = [], []
+    for s in shipments:
+        a = recommend(materials, s, n)["Material_ID"].to_numpy()
+        b = recommend(materials, s, n, normalization="global", cold=True)["Material_ID"].to_numpy()
+        top1 += a[0] == b[0]
+        topk += set(a[:k]) == set(b[:k])
+        rank_a = pd.Series(np.arange(n), index=a)
+        rank_b = pd.Series(np.arange(n), index=b).reindex(a)
+        rho.append(np.corrcoef(rank_a.to_numpy(), rank_b.to_numpy())[0, 1])
+        shift.append(np.abs(rank_a.to_numpy() - rank_b.to_numpy()).mean())
+    return {
+        "materials": label,
+        "shipments": len(shipments),
+        "top1_same": f"{top1 / len(shipments):.1%}",
+        f"top{k}_same": f"{topk / len(shipments):.1%}",
+        "spearman_p50": f"{np.median(rho):.3f}",
+        "spearman_min": f"{np.min(rho):.3f}",
+        "mean_rank_shift": f"{np.mean(shift):.2f}",
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--shipments", type=int, default=200)
+    ap.add_argument("--top-k", type=int, default=3)
+    ap.add_argument("--repeat", type=int, default=100)
+    args = ap.parse_args()
+
+    if score_reference is None:
+        print("No score reference; run `python ml/notebooks/score_reference.py build` first")
+        return 1
+
+    catalogue = load_full_catalogue()
+    shipments = random_shipments(df, args.shipments)
+    k = args.top_k
+
+    print_table("Ranking vs normalization='candidates' (all materials ranked, no prefilter)", [
+        ranking_rows(f"engine ({len(materials_df)})", materials_df, shipments, k),
+        ranking_rows(f"catalogue ({len(catalogue)})", catalogue, shipments[:max(1, len(shipments) // 4)], k),
+    ])
+
+    # -----------------------------
+    # Latency
+    rows = []
+    sample = shipments[:100]      # 100 × catalogue fits in the default cache
+    for label, materials in ((f"engine ({len(materials_df)})", materials_df),
+                             (f"catalogue ({len(catalogue)})", catalogue)):
+        it = iter(range(10**9))
+        pick = lambda: sample[next(it) % len(sample)]
+        for name, fn in [
+            ("candidates",        lambda: recommend(materials, pick(), k)),
+            ("global, cold",      lambda: recommend(materials, pick(), k, normalization="global",
+                                                    cold=True)),
+            ("global, warm",      lambda: recommend(materials, pick(), k, normalization="global")),
+        ]:
+            if name == "global, warm":
+                for s in sample:
+                    recommend(materials, s, k, normalization="global")
+            row = {"materials": label, "mode": name}
+            row.update(summarize(time_calls(fn, repeat=args.repeat)))
+            rows.append(row)
+    print_table(f"Latency (top_k={k}, sort_by=Sustainability)", rows)
+
+    # -----------------------------
+    # Catalogue change: edit 5% of the rows, add 10 materials
+    rng = np.random.default_rng(0)
+    s = shipments[0]
+    before = recommend(catalogue, s, len(catalogue), normalization="global", cold=True)
+    edited = catalogue.copy()
+    idx = rng.choice(len(edited), size=len(edited) // 20, replace=False)
+    edited.loc[idx, "Cost_per_kg"] = (edited.loc[idx, "Cost_per_kg"] * 1.1).round(2)
+    new = catalogue.sample(n=10, random_state=1).assign(
+        Material_ID=lambda d: np.arange(10) + catalogue["Material_ID"].max() + 1,
+        Density_kg_m3=lambda d: d["Density_kg_m3"] + 1,
+    )
+    edited = pd.concat([edited, new], ignore_index=True)
+    after = recommend(edited, s, len(edited), normalization="global")
+    unchanged = ~edited["Material_ID"].isin(list(catalogue["Material_ID"].iloc[idx]) + list(new["Material_ID"]))
+    same = np.allclose(
+        before.set_index("Material_ID")["Sustainability"].reindex(edited.loc[unchanged, "Material_ID"]),
+        after.set_index("Material_ID")["Sustainability"].reindex(edited.loc[unchanged, "Material_ID"])
+    )
+    print_table("Catalogue change (warm cache, one shipment, all materials ranked)", [
+        {"step": "initial", "materials": len(catalogue), **_counts(before), "unchanged_scores_equal": ""},
+        {"step": f"{len(idx)} edited + 10 added", "materials": len(edited), **_counts(after),
+         "unchanged_scores_equal": same},
+    ])
+
+    # -----------------------------
+    # Early termination
+    rows = []
+    for materials, label in ((materials_df, "engine"), (catalogue, "catalogue")):
+        for sort_by in ("Sustainability", "Mat_Suit", "Pred_Cost"):
+            scored = skipped = 0
+            for s in shipments[:50]:
+                info = recommend(materials, s, k, sort_by, normalization="global",
+                                 cold=True).attrs["normalization"]
+                scored += info["scored"]
+                skipped += info["skipped"]
+            total = scored + skipped
+            rows.append({"materials": f"{label} ({len(materials)})", "sort_by": sort_by,
+                         "scored_per_request": round(scored / 50, 1),
+                         "skipped": f"{skipped / total:.1%}"})
+    print_table(f"Early termination (cold cache, top_k={k})", rows)
+    return 0
+
+
+def _counts(frame):
+    info = frame.attrs["normalization"]
+    return {"cached": info["cached"], "scored": info["scored"], "scoring_ms": info["scoring_ms"]}
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Recommendation grid benchmark
+-----------------------------
+Random shipments drawn inside the grid (discrete values from the grid,
+continuous axes uniform in their interpolation coordinate; boxes are
+cubes of the sampled volume), scored exactly and through the grid.
+
+Reports:
+- hit rate and fallback reasons
+- accuracy on hits: Pred_Cost / Pred_CO2 error, Sustainability error,
+  top-1 and top-k agreement with exact scoring; the same with the error
+  bounds switched off (every shipment served from the grid)
+- latency: lookup() alone, recommend via grid (hits), exact recommend
+
+Run: python ml/notebooks/recommendation_grid.py build && python benchmarks/bench_grid.py
+"""
+
+import argparse
+from collections import Counter
+
+import numpy as np
+
+from _common import time_calls, summarize, print_table
+
+from ml.notebooks.recommendation_grid import (
+    DISCRETE_AXES, GRID_MAX_SCORE_ERROR, GRID_MAX_PRED_ERROR
+)
+from ml.notebooks.recommendation_engine import (
+    generate_recommendations, materials_df, co2_model, cost_model,
+    FEATURES_COST, FEATURES_CO2, recommendation_grid
+)
+
+
+def random_shipments(grid, n, rng):
+    meta = grid.meta
+    out = []
+    for _ in range(n):
+        s = {a: meta["discrete"][a][rng.integers(len(meta["discrete"][a]))] for a in DISCRETE_AXES}
+        for name, spacing, coords in grid.axes:
+            x = rng.uniform(coords[0], coords[-1])
+            value = float(np.exp(x)) if spacing == "log" else float(x)
+            if name == "Volume_cm3":
+                side = value ** (1 / 3)
+                s.update(Length_cm=side, Width_cm=side, Height_cm=side)
+            else:
+                s[name] = value
+        out.append(s)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--shipments", type=int, default=500)
+    ap.add_argument("--top-k", type=int, default=3)
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    grid = recommendation_grid
+    if grid is None:
+        print("No fresh grid; run `python ml/notebooks/recommendation_grid.py build` first")
+        return 1
+
+    rng = np.random.default_rng(0)
+    shipments = random_shipments(grid, args.shipments, rng)
+    n_mat = len(materials_df)
+
+    def recommend(shipment, use_grid, top_k=n_mat):
+        return generate_recommendations(
+            materials_df, co2_model, cost_model, shipment, FEATURES_COST, FEATURES_CO2,
+            top_k, "Sustainability", prefilter=False, grid=grid if use_grid else None
+        )
+
+    def compare(fast, exact, acc):
+        a = fast.set_index("Material_ID").sort_index()
+        b = exact.set_index("Material_ID").sort_index()
+        acc["cost"].append(np.abs(a["Pred_Cost"] - b["Pred_Cost"]) / np.abs(b["Pred_Cost"]).clip(lower=1e-3))
+        acc["co2"].append(np.abs(a["Pred_CO2"] - b["Pred_CO2"]) / np.abs(b["Pred_CO2"]).clip(lower=1e-3))
+        acc["sust"].append(np.abs(a["Sustainability"] - b["Sustainability"]))
+        acc["top1"] += fast["Material_ID"].iat[0] == exact["Material_ID"].iat[0]
+        acc["topk"] += set(fast["Material_ID"].head(args.top_k)) == set(exact["Material_ID"].head(args.top_k))
+        acc["n"] += 1
+
+    reasons = Counter()
+    bounded = {"cost": [], "co2": [], "sust": [], "top1": 0, "topk": 0, "n": 0}
+    unbounded = {"cost": [], "co2": [], "sust": [], "top1": 0, "topk": 0, "n": 0}
+    hit_shipments = []
+    bounds = (grid.max_score_error, grid.max_pred_error)
+    for s in shipments:
+        exact = recommend(s, False)
+        fast = recommend(s, True)
+        info = fast.attrs.get("grid", {})
+        if info.get("hit"):
+            hit_shipments.append(s)
+            compare(fast, exact, bounded)
+        else:
+            reasons[info.get("reason", "?").split(":")[0]] += 1
+        # Same shipment served from the grid with the error bounds switched off
+        grid.max_score_error = grid.max_pred_error = float("inf")
+        compare(recommend(s, True), exact, unbounded)
+        grid.max_score_error, grid.max_pred_error = bounds
+
+    hits = bounded["n"]
+    print_table(f"Grid coverage ({args.shipments} random in-grid shipments, "
+                f"bounds: score {GRID_MAX_SCORE_ERROR}, prediction {GRID_MAX_PRED_ERROR:.0%})", [
+        {"outcome": "hit", "count": hits, "share": f"{hits / len(shipments):.1%}"},
+    ] + [
+        {"outcome": f"exact: {r}", "count": c, "share": f"{c / len(shipments):.1%}"}
+        for r, c in reasons.most_common()
+    ])
+
+    def accuracy_rows(label, acc):
+        if not acc["n"]:
+            return []
+        rows = []
+        for key, metric in (("cost", "Pred_Cost rel. error"), ("co2", "Pred_CO2 rel. error"),
+                            ("sust", "Sustainability abs. error")):
+            v = np.concatenate([np.asarray(x) for x in acc[key]])
+            rows.append({"served": label, "metric": metric,
+                         "p50": f"{np.percentile(v, 50):.4f}", "p95": f"{np.percentile(v, 95):.4f}",
+                         "max": f"{v.max():.4f}", "top1_same": "", f"top{args.top_k}_same": ""})
+        rows[0]["top1_same"] = f"{acc['top1'] / acc['n']:.1%}"
+        rows[0][f"top{args.top_k}_same"] = f"{acc['topk'] / acc['n']:.1%}"
+        return rows
+
+    print_table("Accuracy vs exact scoring (all materials per shipment)",
+                accuracy_rows(f"grid hits ({hits})", bounded) +
+                accuracy_rows(f"no bound ({unbounded['n']})", unbounded))
+
+    ids = materials_df["Material_ID"].to_numpy()
+    sample = hit_shipments or shipments
+    it = iter(range(10**9))
+    pick = lambda: sample[next(it) % len(sample)]
+    rows = []
+    for name, fn in [
+        ("grid.lookup()",           lambda: grid.lookup(pick(), ids)),
+        ("recommend via grid",      lambda: recommend(pick(), True, args.top_k)),
+        ("recommend exact",         lambda: recommend(pick(), False, args.top_k)),
+    ]:
+        row = {"path": name}
+        row.update(summarize(time_calls(fn, repeat=args.repeat)))
+        rows.append(row)
+    print_table(f"Latency (top_k={args.top_k}, {n_mat} materials)", rows)
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+History export memory benchmark
+-------------------------------
+Streams recommendation_history through backend/history_export.py at
+growing row counts and records the exporting process's peak RSS above
+its baseline (sampled every 10 ms), throughput and output size. Flat
+memory across sizes is the point; "fetchall" runs the same export
+through a buffered cursor + fetchall() for contrast (only up to
+--baseline-max rows, it grows with the result).
+
+History is generated straight into an SQLite file (DB_BACKEND=sqlite):
+10,000 rows per day, 5 packed recommendations each, 200 shipments.
+Each size is selected with a from/to filter, so the date-range pushdown
+is exercised too. Every run is a separate process.
+
+Run: python benchmarks/bench_history_export.py [--rows 100000,1000000]
+         [--formats csv,ndjson,parquet] [--baseline-max 200000]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from _common import PROJECT_ROOT, print_table, random_shipments
+
+ROWS_PER_DAY = 10_000
+FIRST_DAY = date(2025, 1, 1)
+SHIPMENTS = 200
+USERS = 100
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+class PeakRSS(threading.Thread):
+    def __init__(self, interval=0.01):
+        super().__init__(daemon=True)
+        self.interval, self.peak, self._stop = interval, rss_mb(), threading.Event()
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def stop(self):
+        self._stop.set()
+        self.join()
+        self.peak = max(self.peak, rss_mb())
+        return self.peak
+
+
+def populate(rows):
+    """rows history rows over rows / ROWS_PER_DAY days, written directly in the compact layout."""
+    import pandas as pd
+    import db
+    from history_store import intern_shipments, pack_recommendations
+    from ml.notebooks.catalogue import load_frame
+
+    conn = db.get_db()
+    train = pd.read_csv(PROJECT_ROOT / "data" / "processed" / "final_ecopack_dataset_fe.csv")
+    emails = [f"analyst{i}@export.local" for i in range(USERS)]
+    with conn.cursor() as cur:
+        cur.executemany("INSERT INTO users (email, password_hash) VALUES (%s, 'x')", [(e,) for e in emails])
+        shipment_ids = intern_shipments(cur, random_shipments(train, SHIPMENTS))
+
+    materials = load_frame(PROJECT_ROOT / "data" / "processed" / "clean_materials.csv").to_dict("records")
+    rng = random.Random(0)
+    blobs = [pack_recommendations([
+        {"Material_Name": m["Material_Name"], "Pred_Cost": rng.uniform(0.5, 9), "Pred_CO2": rng.uniform(0.1, 4),
+         "Biodegradable": rng.randint(0, 1), "Tensile_Strength_MPa": m["Tensile_Strength_MPa"],
+         "Sustainability": rng.random()}
+        for m in rng.sample(materials, 5)
+    ]) for _ in range(1000)]
+    start = datetime.combine(FIRST_DAY, datetime.min.time())
+    step = 86400 / ROWS_PER_DAY
+    batch = 50_000
+    for lo in range(0, rows, batch):
+        conn.begin()
+        with conn.cursor() as cur:
+            cur.executemany(
+                "INSERT INTO recommendation_history (email, session_id, created_at, shipment_id, "
+                "k_value, sort_by, results) VALUES (%s, 'bench', %s, %s, 5, 'Sustainability', %s)",
+                [(emails[i % USERS], start + timedelta(seconds=i * step), shipment_ids[i % SHIPMENTS],
+                  blobs[i % len(blobs)]) for i in range(lo, min(rows, lo + batch))]
+            )
+        conn.commit()
+
+
+def child(rows, fmt, mode):
+    import history_export
+
+    filters = {"from": FIRST_DAY.isoformat(),
+               "to": (FIRST_DAY + timedelta(days=rows // ROWS_PER_DAY - 1)).isoformat()}
+    if mode == "fetchall":
+        # Same output, but the whole result is fetched and decoded first
+        import db
+        sql, params = history_export.build_query(filters)
+
+        def buffered():
+            conn = db.get_db()
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                rows_ = cur.fetchall()
+            return [history_export.decode_row(r) for r in rows_]
+
+    base = rss_mb()
+    sampler = PeakRSS()
+    sampler.start()
+    t0 = time.perf_counter()
+    if mode == "fetchall":
+        chunks = history_export.WRITERS[fmt](buffered())
+    else:
+        chunks, _, _ = history_export.export_history(filters, fmt)
+    written = sum(len(c) for c in chunks)
+    elapsed = time.perf_counter() - t0
+    peak = sampler.stop()
+    return {"rows": rows, "format": fmt, "mode": mode, "seconds": round(elapsed, 1),
+            "rows_per_s": int(rows / elapsed), "output_mb": round(written / 2**20, 1),
+            "peak_rss_over_base_mb": round(peak - base, 1)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", default="100000,1000000", help="comma list of row counts")
+    ap.add_argument("--formats", default="csv,ndjson,parquet")
+    ap.add_argument("--baseline-max", type=int, default=200_000)
+    ap.add_argument("--child", nargs=3, metavar=("ROWS", "FORMAT", "MODE"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        rows, fmt, mode = args.child
+        print(json.dumps(child(int(rows), fmt, mode)))
+        return
+
+    sizes = sorted(int(n) for n in args.rows.split(","))
+    formats = args.formats.split(",")
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "DB_BACKEND": "sqlite", "SQLITE_PATH": os.path.join(tmp, "export.sqlite3"),
+               "COMPILED_MODELS": "0"}
+        os.environ.update(env)
+        t0 = time.perf_counter()
+        populate(max(sizes))
+        print(f"📦 Generated {max(sizes):,} history rows in {time.perf_counter() - t0:.0f}s")
+
+        results = []
+        for rows in sizes:
+            for fmt in formats:
+                modes = ["stream"] + (["fetchall"] if rows <= args.baseline_max else [])
+                for mode in modes:
+                    out = subprocess.run([sys.executable, __file__, "--child", str(rows), fmt, mode],
+                                         env=env, capture_output=True, text=True)
+                    try:
+                        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+                    except (IndexError, ValueError):
+                        print(out.stderr[-2000:])
+                        raise
+    print_table("History export (SQLite, peak RSS above the process's baseline)", results)
+
+
+if __name__ == "__main__":
+    main()
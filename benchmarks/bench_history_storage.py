@@ -0,0 +1,171 @@
+"""
+History storage layout benchmark
+--------------------------------
+The old recommendation_history layout (nine shipment columns + the
+recommendations as a JSON array in every row) against the compact one
+(backend/history_store.py: shipment_fingerprints + packed results), on
+the embedded SQLite backend.
+
+- storage: bytes per history row (history table, its indexes and the
+  shipment table, after VACUUM)
+- write: one save per call, rollup upsert included in both
+- read: one saved recommendation back in the API shape
+
+Recommendations are the engine's own output (recommender.py
+get_recommendations, as a RecommendationSet; the legacy layout stores
+its records()); shipments repeat from a pool of --shipments distinct
+ones, as returning users' shipments do. Needs the models in ml/models.
+
+Run: python benchmarks/bench_history_storage.py [--rows 5000] [--shipments 200]
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from _common import print_table, random_shipments, summarize
+
+LEGACY_HISTORY_DDL = """
+CREATE TABLE recommendation_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email VARCHAR(255),
+    session_id VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    product_category VARCHAR(100),
+    weight_kg FLOAT,
+    fragility INT,
+    shipping_mode VARCHAR(50),
+    distance_km FLOAT,
+    moisture_sensitive BOOLEAN,
+    length_cm FLOAT,
+    width_cm FLOAT,
+    height_cm FLOAT,
+    k_value INT,
+    sort_by VARCHAR(20),
+    recommendations TEXT,
+    FOREIGN KEY (email) REFERENCES users(email)
+);
+CREATE INDEX idx_history_email_created ON recommendation_history (email, created_at);
+"""
+LEGACY_INSERT = """
+    INSERT INTO recommendation_history (
+        email, session_id, created_at, product_category, weight_kg, fragility, shipping_mode,
+        distance_km, moisture_sensitive, length_cm, width_cm, height_cm,
+        k_value, sort_by, recommendations
+    ) VALUES (%s, %s, CURRENT_TIMESTAMP, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+HISTORY_TABLES = ("recommendation_history", "idx_history_email_created",
+                  "shipment_fingerprints", "sqlite_autoindex_shipment_fingerprints_1")
+USERS = 50
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+def table_bytes(path):
+    conn = sqlite3.connect(path)
+    conn.execute("VACUUM")
+    try:
+        sizes = dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall())
+        return sum(sizes.get(t, 0) for t in HISTORY_TABLES)
+    except sqlite3.OperationalError:        # sqlite built without dbstat
+        return os.path.getsize(path)
+    finally:
+        conn.close()
+
+
+def make_entries(rows, n_shipments, seed=0):
+    import pandas as pd
+    from _common import PROJECT_ROOT
+    from recommender import get_recommendations
+
+    train = pd.read_csv(PROJECT_ROOT / "data" / "processed" / "final_ecopack_dataset_fe.csv")
+    pool = random_shipments(train, n_shipments, seed=seed)
+    results = [get_recommendations(s, top_k=5) for s in pool]
+    rng = random.Random(seed)
+    entries = []
+    for i in range(rows):
+        j = rng.randrange(len(pool))
+        entries.append((f"bench{i % USERS}@history.local", "bench", pool[j], 5, "Sustainability", results[j]))
+    return entries
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=5000)
+    ap.add_argument("--shipments", type=int, default=200)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    legacy_path, compact_path = os.path.join(tmp, "legacy.sqlite3"), os.path.join(tmp, "compact.sqlite3")
+    conn = sqlite3.connect(legacy_path)
+    conn.executescript(LEGACY_HISTORY_DDL)
+    conn.close()
+
+    # Must be set before db.py is imported (it reads them at import)
+    os.environ["DB_BACKEND"], os.environ["SQLITE_PATH"] = "sqlite", compact_path
+    import db
+    from analytics import rollup_entry, apply_rollup
+    from recommender import save_recommendation, get_recommendation
+
+    entries = make_entries(args.rows, args.shipments)
+    emails = sorted({e[0] for e in entries})
+    for path in (legacy_path, compact_path):
+        conn = db._sqlite_connection(path)
+        with conn.cursor() as cur:
+            cur.executemany("INSERT INTO users (email, password_hash) VALUES (%s, 'x')", [(e,) for e in emails])
+
+    legacy = db._sqlite_connection(legacy_path)
+
+    def legacy_save(email, session_id, s, k_value, sort_by, recs):
+        legacy.begin()
+        with legacy.cursor() as cur:
+            cur.execute(LEGACY_INSERT, (email, session_id, s["Category_item"], s["Weight_kg"], s["Fragility"],
+                                        s["Shipping_Mode"], s["Distance_km"], s["Moisture_Sens"], s["Length_cm"],
+                                        s["Width_cm"], s["Height_cm"], k_value, sort_by, json.dumps(recs.records())))
+            cur.execute("SELECT CURRENT_TIMESTAMP AS now")
+            now = cur.fetchone()["now"]
+            apply_rollup(cur, [rollup_entry(now, s["Category_item"], s["Shipping_Mode"], recs)])
+        legacy.commit()
+
+    def legacy_read(email, history_id):
+        with legacy.cursor() as cur:
+            cur.execute("SELECT * FROM recommendation_history WHERE email = %s AND id = %s", (email, history_id))
+            row = cur.fetchone()
+        row["recommendations"] = json.loads(row["recommendations"])
+        return row
+
+    results = {}
+    for name, save, read in (("legacy (JSON + shipment columns)", legacy_save, legacy_read),
+                             ("compact (fingerprint + packed)", save_recommendation, get_recommendation)):
+        writes = [timed(save, *e) for e in entries]
+        reads = [timed(read, entries[i][0], i + 1) for i in range(len(entries))]
+        results[name] = (writes, reads)
+
+    # Rows that fell back to JSON would hide in the compact layout's average
+    conn = sqlite3.connect(compact_path)
+    packed = conn.execute("SELECT COUNT(results) FROM recommendation_history").fetchone()[0]
+    conn.close()
+    sizes = {"legacy (JSON + shipment columns)": (table_bytes(legacy_path), 0),
+             "compact (fingerprint + packed)": (table_bytes(compact_path), packed)}
+    print_table("History storage (bytes per row, SQLite)", [
+        {"layout": name, "bytes/row": round(size / args.rows, 1), "total_kb": round(size / 1024, 1),
+         "packed_rows": packed}
+        for name, (size, packed) in sizes.items()
+    ])
+    rows = []
+    for name, (writes, reads) in results.items():
+        rows.append({"layout": name, "op": "write", **summarize(writes)})
+        rows.append({"layout": name, "op": "read", **summarize(reads)})
+    print_table(f"History latency ({args.rows} rows, {args.shipments} distinct shipments)", rows)
+
+
+if __name__ == "__main__":
+    main()
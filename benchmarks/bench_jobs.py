@@ -0,0 +1,98 @@
+"""
+Batch job store benchmark
+-------------------------
+backend/jobs.py bookkeeping on its own (no models needed; chunks are
+claimed and finished without running the engine), in a temporary
+JOBS_DIR:
+
+- submit: a recommend job from a JSON list of N shipments — manifest
+  written, split into JOB_CHUNK_ROWS-line chunks, job + chunks stored
+- progress: one ChunkProgress call, throttled (no write) and forced
+  (items_done + lease renewal + cancel check)
+- claim + finish: one chunk's round trip through the store, with
+  1..N worker processes claiming from the same queue at once; also
+  checks no chunk was handed out twice
+
+Run: python benchmarks/bench_jobs.py [--lines 1000,10000,100000] [--processes 1,2,4]
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+os.environ["JOBS_DIR"] = tempfile.mkdtemp(prefix="bench_jobs_")
+os.environ.setdefault("JOBS_MAX_ACTIVE_PER_USER", "100000")
+os.environ.setdefault("JOBS_MAX_RUNNING_PER_USER", "100000")
+
+from _common import SAMPLE_SHIPMENT, print_table, summarize, time_calls
+import jobs
+
+
+def drain(worker_id):
+    """Claims and finishes chunks until the queue is empty; returns how many."""
+    done = 0
+    while True:
+        task = jobs.claim(worker_id)
+        if task is None:
+            return done
+        _, job, chunk = task
+        jobs._finish_chunk(job["id"], chunk["idx"], worker_id, "done")
+        done += 1
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lines", default="1000,10000,100000")
+    ap.add_argument("--processes", default="1,2,4")
+    args = ap.parse_args()
+
+    # Submit
+    rows = []
+    for lines in [int(n) for n in args.lines.split(",")]:
+        shipments = [SAMPLE_SHIPMENT] * lines
+        t0 = time.perf_counter()
+        job = jobs.submit("bench@example.com", "recommend", {"shipments": shipments})
+        rows.append({"lines": lines, "chunks": job["progress"]["chunks_total"],
+                     "submit_ms": round((time.perf_counter() - t0) * 1000, 1)})
+    print_table("Submit a recommend job", rows)
+
+    # Progress
+    worker = "bench:progress"
+    _, job, chunk = jobs.claim(worker)
+    progress = jobs.ChunkProgress(job["id"], chunk["idx"], worker)
+    rows = [
+        {"call": "throttled", **summarize(time_calls(lambda: progress(1), repeat=5000))},
+        {"call": "forced write", **summarize(time_calls(lambda: progress(1, force=True), repeat=500))},
+    ]
+    print_table("ChunkProgress per call (ms)", rows)
+    jobs._finish_chunk(job["id"], chunk["idx"], worker, "done")
+
+    # Claim + finish, concurrent workers
+    rows = []
+    ctx = multiprocessing.get_context("fork")
+    for processes in [int(n) for n in args.processes.split(",")]:
+        job = jobs.submit("bench@example.com", "recommend", {"shipments": [SAMPLE_SHIPMENT] * 1000})
+        conn = jobs._conn()
+        conn.execute("UPDATE job_chunks SET status = 'done' WHERE status = 'queued' AND job_id != ?",
+                     (job["job_id"],))
+        # 1000 one-line chunks
+        conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job["job_id"],))
+        conn.executemany("INSERT INTO job_chunks (job_id, idx, spec, items, status) VALUES (?, ?, '{}', 1, 'queued')",
+                         [(job["job_id"], i) for i in range(1000)])
+        t0 = time.perf_counter()
+        with ctx.Pool(processes) as pool:
+            counts = pool.map(drain, [f"bench:{processes}:{i}" for i in range(processes)])
+        elapsed = time.perf_counter() - t0
+        attempts = conn.execute("SELECT MAX(attempts) FROM job_chunks WHERE job_id = ?",
+                                (job["job_id"],)).fetchone()[0]
+        rows.append({"processes": processes, "chunks": sum(counts), "chunks_per_s": round(sum(counts) / elapsed),
+                     "ms_per_chunk": round(elapsed * 1000 / sum(counts), 2), "max_attempts": attempts})
+    print_table("Claim + finish (one-item chunks)", rows)
+    shutil.rmtree(os.environ["JOBS_DIR"], ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Logging pipeline benchmark
+--------------------------
+Per-request logging cost on the request thread: the lines one
+/api/recommend request writes (new session, rate-limit state,
+"Generated N recommendations", access line), timed on the caller.
+
+- before: logging.basicConfig-style synchronous StreamHandler, f-string
+  messages (the previous setup)
+- queue/json: backend/structured_logging.py, LOG_SAMPLE_RATE 1.0 and 0.1
+- queue/json, WARNING: INFO disabled, so nothing is formatted
+
+Each runs against a log file, and against a slow sink (--slow-ms per
+record, like a blocked pipe or a remote collector). Requests are
+--work-ms apart (untimed, sleeping like a request waiting on I/O), which
+is when the listener thread gets to write. "drain" is how long
+shutdown_logging() takes to flush what is still queued. Every setup runs
+in its own process.
+
+Run: python benchmarks/bench_logging.py [--requests 5000] [--slow-ms 0.2] [--work-ms 1]
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from _common import print_table, summarize
+
+SCENARIOS = ["before", "queue/json", "queue/json sample=0.1", "queue/json WARNING"]
+
+
+class SlowFileHandler(logging.FileHandler):
+    """FileHandler that also waits `delay` seconds per record."""
+
+    def __init__(self, path, delay):
+        super().__init__(path, encoding="utf-8")
+        self.delay = delay
+
+    def emit(self, record):
+        if self.delay:
+            time.sleep(self.delay)
+        super().emit(record)
+
+
+def child(scenario, requests, slow_ms, work_ms, path):
+    sink = SlowFileHandler(path, slow_ms / 1000)
+    log = logging.getLogger("EcoPackAI")
+
+    if scenario == "before":
+        sink.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+        logging.basicConfig(level=logging.INFO, handlers=[sink])
+
+        def one_request(i):
+            log.info(f"New session: session-{i}")
+            log.info(f"Rate limit for 10.0.0.{i % 250}: {1}/{3}")
+            log.info(f"✅ Generated {5} recommendations (sorted by {'Sustainability'})")
+            log.info(f"POST /api/recommend 200 {12.5}ms")
+    else:
+        import structured_logging as sl
+        sink.setFormatter(sl.JsonFormatter())
+        rate = 0.1 if "sample" in scenario else 1.0
+        level = "WARNING" if "WARNING" in scenario else "INFO"
+        sl.configure_logging(level=level, sample_rate=rate, targets=[sink])
+
+        def one_request(i):
+            sl.new_request_id()
+            with sl.stage("rank"):
+                pass
+            log.info("New session: %s", f"session-{i}", extra=sl.SAMPLED)
+            log.info("Rate limit for %s: %d/%d", f"10.0.0.{i % 250}", 1, 3, extra=sl.SAMPLED)
+            log.info("✅ Generated %d recommendations (sorted by %s)", 5, "Sustainability", extra=sl.SAMPLED)
+            if log.isEnabledFor(logging.INFO):
+                log.info("%s %s %s %sms", "POST", "/api/recommend", 200, 12.5,
+                         extra={**sl.SAMPLED, "method": "POST", "path": "/api/recommend", "status": 200,
+                                "duration_ms": 12.5, "stages_ms": sl.request_stages()})
+            sl.end_request()
+
+    samples = []
+    for i in range(requests):
+        t0 = time.perf_counter()
+        one_request(i)
+        samples.append(time.perf_counter() - t0)
+        time.sleep(work_ms / 1000)
+
+    t0 = time.perf_counter()
+    dropped = 0
+    if scenario != "before":
+        sl.shutdown_logging()
+        dropped = sl.configure_logging().dropped
+    drain = time.perf_counter() - t0
+    sink.close()
+    with open(path, encoding="utf-8") as f:
+        lines = sum(1 for _ in f)
+    return {**summarize(samples), "drain_s": round(drain, 2),
+            "lines": lines, "dropped": dropped}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=5000)
+    ap.add_argument("--slow-ms", type=float, default=0.2)
+    ap.add_argument("--work-ms", type=float, default=1.0)
+    ap.add_argument("--child", nargs=3, metavar=("SCENARIO", "SLOW_MS", "PATH"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        scenario, slow_ms, path = args.child
+        print(json.dumps(child(scenario, args.requests, float(slow_ms), args.work_ms, path)))
+        return
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for slow_ms in (0.0, args.slow_ms):
+            for scenario in SCENARIOS:
+                path = os.path.join(tmp, "bench.log")
+                out = subprocess.run([sys.executable, __file__, "--requests", str(args.requests),
+                                      "--work-ms", str(args.work_ms), "--child", scenario, str(slow_ms), path],
+                                     capture_output=True, text=True)
+                try:
+                    result = json.loads(out.stdout.strip().splitlines()[-1])
+                except (IndexError, ValueError):
+                    print(out.stderr[-2000:])
+                    raise
+                sink = "file" if not slow_ms else f"slow sink ({slow_ms} ms/record)"
+                rows.append({"sink": sink, "setup": scenario, **result})
+                os.remove(path)
+    print_table(f"Per-request logging cost on the request thread ({args.requests} requests, 4 lines each)", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Login flood benchmark
+---------------------
+Floods password verification from many threads (as concurrent
+/api/auth/login requests would) and measures, at the same time:
+- recommendation latency on the main thread
+- login throughput and how many logins were shed (429)
+
+Modes:
+- inline : bcrypt on every request thread (previous behaviour)
+- pooled : bcrypt on auth.py's bounded pool with load shedding
+
+Run: python benchmarks/bench_login.py [--flood-threads 16] [--seconds 5]
+"""
+
+import argparse
+import threading
+import time
+
+from _common import SAMPLE_SHIPMENT, time_calls, summarize, print_table
+
+import auth
+
+
+def _recommend_fn():
+    from ml.notebooks.recommendation_engine import (
+        generate_recommendations, materials_df, co2_model, cost_model,
+        FEATURES_COST, FEATURES_CO2
+    )
+    return lambda: generate_recommendations(
+        materials_df, co2_model, cost_model, SAMPLE_SHIPMENT,
+        FEATURES_COST, FEATURES_CO2, 5, "Sustainability"
+    )
+
+
+def _flood(mode, stored_hash, stop, counters, lock):
+    while not stop.is_set():
+        try:
+            if mode == "inline":
+                auth._checkpw("correct horse", stored_hash)
+            else:
+                auth.verify_password("correct horse", stored_hash)
+            key = "ok"
+        except auth.HashPoolSaturated:
+            key = "shed"
+            time.sleep(0.005)  # a client backing off after 429
+        with lock:
+            counters[key] += 1
+
+
+def run(mode, recommend, stored_hash, flood_threads, seconds):
+    stop, lock = threading.Event(), threading.Lock()
+    counters = {"ok": 0, "shed": 0}
+    threads = [
+        threading.Thread(target=_flood, args=(mode, stored_hash, stop, counters, lock), daemon=True)
+        for _ in range(flood_threads)
+    ]
+    for t in threads:
+        t.start()
+
+    samples, t_end = [], time.perf_counter() + seconds
+    while time.perf_counter() < t_end:
+        samples += time_calls(recommend, repeat=1, warmup=0)
+
+    stop.set()
+    for t in threads:
+        t.join()
+
+    row = {"mode": mode}
+    row.update(summarize(samples))
+    row["logins_per_s"] = round(counters["ok"] / seconds, 1)
+    row["shed_per_s"]   = round(counters["shed"] / seconds, 1)
+    return row
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--flood-threads", type=int, default=16)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    args = ap.parse_args()
+
+    recommend   = _recommend_fn()
+    stored_hash = auth._hashpw("correct horse")
+
+    idle = {"mode": "idle (no flood)"}
+    idle.update(summarize(time_calls(recommend, repeat=50)))
+    idle.update({"logins_per_s": "-", "shed_per_s": "-"})
+
+    rows = [idle] + [
+        run(mode, recommend, stored_hash, args.flood_threads, args.seconds)
+        for mode in ("inline", "pooled")
+    ]
+    print_table(
+        f"Recommend latency during a login flood "
+        f"({args.flood_threads} threads, bcrypt cost {auth.BCRYPT_ROUNDS}, "
+        f"pool {auth.HASH_POOL_WORKERS}+{auth.HASH_POOL_QUEUE_LIMIT})",
+        rows
+    )
+
+
+if __name__ == "__main__":
+    main()
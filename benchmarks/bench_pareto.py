@@ -0,0 +1,99 @@
+"""
+Pareto mode benchmark
+---------------------
+- End to end: generate_recommendations(sort_by="Pareto") vs
+  sort_by="Sustainability" on the engine's materials and the full catalogue
+- pareto_layers() alone on synthetic candidate sets: the catalogue's
+  predictions for the sample shipment resampled with ±20% jitter on every
+  objective (biodegradability kept), up to 100k materials; compared with
+  the all-pairs dominance check where that is still affordable
+
+Run: python benchmarks/bench_pareto.py [--sizes 1000,10000,100000]
+"""
+
+import argparse
+
+import numpy as np
+
+from _common import SAMPLE_SHIPMENT, time_calls, summarize, print_table, load_full_catalogue
+
+from ml.notebooks.recommendation_engine import (
+    generate_recommendations, materials_df, co2_model, cost_model, FEATURES_COST, FEATURES_CO2
+)
+from ml.notebooks.pareto import objective_matrix, pareto_layers
+
+ALL_PAIRS_MAX_ROWS = 10_000
+
+
+def all_pairs_front(points):
+    """Reference: every point against every other point."""
+    front = np.ones(len(points), dtype=bool)
+    for start in range(0, len(points), 256):
+        p = points[start:start + 256]
+        le = (points[None, :, :] <= p[:, None, :]).all(axis=2)
+        lt = (points[None, :, :] < p[:, None, :]).any(axis=2)
+        front[start:start + 256] = ~(le & lt).any(axis=1)
+    return np.flatnonzero(front)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    ap.add_argument("--top-k", type=int, default=3)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+    k = args.top_k
+    catalogue = load_full_catalogue()
+
+    rows = []
+    for label, materials in ((f"engine ({len(materials_df)})", materials_df),
+                             (f"catalogue ({len(catalogue)})", catalogue)):
+        for sort_by in ("Sustainability", "Pareto"):
+            fn = lambda: generate_recommendations(
+                materials, co2_model, cost_model, SAMPLE_SHIPMENT, FEATURES_COST, FEATURES_CO2,
+                k, sort_by, prefilter=False
+            )
+            top = fn()
+            row = {"materials": label, "sort_by": sort_by, "rows": len(top),
+                   "layers": int(top["Pareto_Rank"].max()) if sort_by == "Pareto" else ""}
+            row.update(summarize(time_calls(fn, repeat=args.repeat)))
+            rows.append(row)
+    print_table(f"generate_recommendations end to end (top_k={k})", rows)
+
+    # Objective points for the synthetic sets
+    full = generate_recommendations(
+        catalogue, co2_model, cost_model, SAMPLE_SHIPMENT, FEATURES_COST, FEATURES_CO2,
+        len(catalogue), "Sustainability", prefilter=False
+    )
+    base = objective_matrix(full)
+    rng = np.random.default_rng(0)
+
+    rows = []
+    for n in [len(base)] + [int(x) for x in args.sizes.split(",")]:
+        if n == len(base):
+            points, label = base, f"{n} (catalogue)"
+        else:
+            points = base[rng.integers(0, len(base), n)].copy()
+            points[:, :3] *= rng.uniform(0.8, 1.2, size=(n, 3))
+            label = f"{n} (synthetic)"
+        repeat = max(3, args.repeat // (1 + n // 10_000))
+
+        layers = summarize(time_calls(lambda: pareto_layers(points, k), repeat=repeat, warmup=1))
+        order, ranks = pareto_layers(points, k)
+        front = order[ranks == 1]
+        row = {"materials": label, "front_size": len(front), "layers_for_top_k": int(ranks.max()),
+               "skyline_p50_ms": layers["p50_ms"], "skyline_p95_ms": layers["p95_ms"],
+               "all_pairs_ms": "", "same_front": ""}
+        if n <= ALL_PAIRS_MAX_ROWS:
+            pairs = summarize(time_calls(lambda: all_pairs_front(points), repeat=max(1, repeat // 3), warmup=0))
+            row["all_pairs_ms"] = pairs["p50_ms"]
+            row["same_front"] = set(front) == set(all_pairs_front(points))
+        rows.append(row)
+
+        ten = summarize(time_calls(lambda: pareto_layers(points, 10 * k), repeat=repeat, warmup=1))
+        row["10x_top_k_p50_ms"] = ten["p50_ms"]
+    print_table(f"pareto_layers (rows until top_k={k}; 10x_top_k peels more layers)", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Preprocessing pipeline benchmark
+--------------------------------
+preprocessing/pipeline.py against the notebooks' approach (read_excel,
+a row-wise fuzzy-match apply, whole-frame feature engineering).
+
+1. Real raw files: notebook-style run, pipeline cold (empty cache),
+   pipeline warm (nothing changed), and a features-only re-run; outputs
+   compared byte-for-byte with the notebook-style run
+2. Synthetic histories (raw rows resampled with jittered weights /
+   distances, stored as parquet): one chunk vs CHUNK_ROWS chunks, with
+   wall time and peak RSS of a fresh process per run
+
+Run: python benchmarks/bench_pipeline.py [--sizes 150000,1500000]
+"""
+
+import argparse
+import filecmp
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+from _common import print_table
+
+from preprocessing import pipeline as pp
+
+
+# ======================================================
+# Notebook-style reference run
+# ======================================================
+def notebook_run(out_dir):
+    materials = pd.read_excel(pp.RAW_MATERIALS_PATH)[pp.MATERIAL_COLUMNS].drop_duplicates().dropna()
+    history = pd.read_excel(pp.RAW_HISTORY_PATH)[pp.HISTORY_COLUMNS].drop_duplicates().dropna()
+
+    names = materials["Material_Name"].tolist()
+
+    def fuzzy_material_id(packaging):
+        _, score, idx = process.extractOne(packaging, names, scorer=fuzz.token_sort_ratio)
+        return materials.iloc[idx]["Material_ID"] if score >= pp.FUZZY_THRESHOLD else np.nan
+
+    history["Material_ID"] = history["Packaging_Used"].apply(fuzzy_material_id)
+    for name, mid in pp.CANONICAL_IDS.items():
+        history.loc[history["Packaging_Used"] == name, "Material_ID"] = mid
+    materials = pd.concat([materials, pd.DataFrame(pp.CANONICAL_MATERIALS)], ignore_index=True)
+
+    materials.to_csv(out_dir / "clean_materials.csv", index=False)
+    history.to_csv(out_dir / "clean_history.csv", index=False)
+    (history[["Packaging_Used", "Material_ID"]].drop_duplicates().sort_values("Material_ID")
+     .to_csv(out_dir / "material_id_lookup.csv", index=False))
+    final = pd.merge(history, materials, on="Material_ID", how="left", suffixes=("_item", "_material"))
+    final.to_csv(out_dir / "final_ecopack_dataset.csv", index=False)
+
+    # Feature stage on one frame (single chunk = the notebook's whole-frame maths)
+    pp.features_stage(out_dir / "final_ecopack_dataset.csv", out_dir / "final_ecopack_dataset_fe.csv",
+                      chunk_rows=len(final) + 1)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return round(time.perf_counter() - t0, 3)
+
+
+# ======================================================
+# Synthetic scale runs
+# ======================================================
+def synthetic_history(n, path, seed=0):
+    raw = pd.read_parquet(path.parent / "source.parquet")
+    rng = np.random.default_rng(seed)
+    df = raw.iloc[rng.integers(0, len(raw), n)].reset_index(drop=True)
+    df["Weight_kg"] = (df["Weight_kg"] * rng.uniform(0.9, 1.1, n)).round(2)
+    df["Distance_km"] = (df["Distance_km"] * rng.uniform(0.9, 1.1, n)).round().astype(np.int64)
+    df.to_parquet(path, index=False)
+
+
+def _run_child(materials, history, out_dir, cache_dir, chunk_rows):
+    t0 = time.perf_counter()
+    results = pp.run_pipeline(materials, history, out_dir, cache_dir,
+                              chunk_rows=chunk_rows, force=True, log=lambda *_: None)
+    elapsed = time.perf_counter() - t0
+    stages = {name: r["seconds"] for name, r in results.items()}
+    return elapsed, stages, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_isolated(*args):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(_run_child, *args).result()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="150000,1500000")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        rows = []
+
+        nb_dir = tmp / "notebook"
+        nb_dir.mkdir()
+        rows.append({"run": "notebook-style", "seconds": timed(lambda: notebook_run(nb_dir)),
+                     "stages_ran": "-", "identical": "-"})
+
+        out_dir, cache_dir = tmp / "pipeline", tmp / "cache"
+        for label, fn in [
+            ("pipeline cold", lambda: pp.run_pipeline(out_dir=out_dir, cache_dir=cache_dir, log=lambda *_: None)),
+            ("pipeline warm", lambda: pp.run_pipeline(out_dir=out_dir, cache_dir=cache_dir, log=lambda *_: None)),
+            ("features output removed", lambda: (out_dir / "final_ecopack_dataset_fe.csv").unlink() or
+             pp.run_pipeline(out_dir=out_dir, cache_dir=cache_dir, log=lambda *_: None)),
+        ]:
+            t0 = time.perf_counter()
+            results = fn()
+            seconds = round(time.perf_counter() - t0, 3)
+            same = all(filecmp.cmp(nb_dir / f, out_dir / f, shallow=False) for f in pp.OUTPUT_FILES.values())
+            rows.append({"run": label, "seconds": seconds,
+                         "stages_ran": f"{sum(r['ran'] for r in results.values())}/{len(results)}",
+                         "identical": same})
+        print_table("Real raw files (15k shipments)", rows)
+
+        # Synthetic histories, fed as parquet (an .xlsx sheet tops out at ~1M rows)
+        scale_dir = tmp / "scale"
+        scale_dir.mkdir()
+        pd.read_parquet(cache_dir / "real_packaging_history.parquet").to_parquet(scale_dir / "source.parquet")
+        pd.read_parquet(cache_dir / "materials_database_600.parquet").to_parquet(scale_dir / "materials.parquet")
+
+        rows = []
+        for n in (int(x) for x in args.sizes.split(",")):
+            history = scale_dir / f"history_{n}.parquet"
+            synthetic_history(n, history)
+            outputs = {}
+            for label, chunk_rows in (("one chunk", n + 1), (f"{pp.CHUNK_ROWS:,}-row chunks", pp.CHUNK_ROWS)):
+                out = scale_dir / f"out_{n}_{chunk_rows}"
+                elapsed, stages, rss_mb = run_isolated(
+                    scale_dir / "materials.parquet", history, out, scale_dir / f"cache_{chunk_rows}", chunk_rows
+                )
+                outputs[label] = out
+                rows.append({
+                    "rows": f"{n:,}", "mode": label, "seconds": round(elapsed, 2),
+                    "history_s": stages["history"], "merge_s": stages["merge"],
+                    "features_s": stages["features"], "peak_rss_mb": round(rss_mb, 1),
+                })
+            a, b = outputs.values()
+            rows[-1]["identical"] = all(filecmp.cmp(a / f, b / f, shallow=False) for f in pp.OUTPUT_FILES.values())
+        rows[0].setdefault("identical", "")
+        print_table("Synthetic histories (parquet input, one process per run)", rows)
+
+
+if __name__ == "__main__":
+    main()
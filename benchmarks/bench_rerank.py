@@ -0,0 +1,70 @@
+"""
+Re-rank benchmark
+-----------------
+Custom-weight re-ranking of a stored result (ml/notebooks/rerank.py) vs
+a fresh generate_recommendations call, on the engine's materials and on
+the full catalogue.
+
+Per candidate count and number of weight vectors: p50/p95 of rerank()
+(matrix product + top-k) and of rerank_records() (what /api/rerank
+returns), in microseconds per call and per weight vector. Also checks
+that the default weights reproduce the Sustainability top-k scores.
+
+Run: python benchmarks/bench_rerank.py
+"""
+
+import argparse
+
+import numpy as np
+
+from _common import SAMPLE_SHIPMENT, time_calls, summarize, print_table, load_full_catalogue
+
+from ml.notebooks.recommendation_engine import (
+    generate_recommendations, materials_df, co2_model, cost_model, FEATURES_COST, FEATURES_CO2
+)
+from ml.notebooks.rerank import COMPONENTS, DEFAULT_WEIGHTS, parse_weights, rerank, rerank_records
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--vectors", default="1,10,100,1000")
+    ap.add_argument("--top-k", type=int, default=3)
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+    k = args.top_k
+    rng = np.random.default_rng(0)
+
+    rows = []
+    for label, materials in ((f"engine ({len(materials_df)})", materials_df),
+                             (f"catalogue ({len(load_full_catalogue())})", load_full_catalogue())):
+        def recommend():
+            return generate_recommendations(
+                materials, co2_model, cost_model, SAMPLE_SHIPMENT, FEATURES_COST, FEATURES_CO2,
+                k, "Sustainability", prefilter=False, keep_scores=True
+            )
+
+        top = recommend()
+        scores = top.attrs["scores"]
+        # Same top-k scores (materials can differ only on exact ties)
+        _, values = rerank(scores, parse_weights(DEFAULT_WEIGHTS), k)
+        same = bool(np.allclose(values[0], top["Sustainability"]))
+
+        base = summarize(time_calls(recommend, repeat=max(10, args.repeat // 10)))
+        rows.append({"candidates": label, "vectors": 1, "path": "generate_recommendations",
+                     "p50_us": round(base["p50_ms"] * 1000, 1), "p95_us": round(base["p95_ms"] * 1000, 1),
+                     "per_vector_us": "", "default_top_k_same": same})
+
+        for v in (int(x) for x in args.vectors.split(",")):
+            W = rng.dirichlet(np.ones(len(COMPONENTS)), size=v)
+            for name, fn in (("rerank()", lambda: rerank(scores, W, k)),
+                             ("rerank_records()", lambda: rerank_records(scores, W, k))):
+                t = summarize(time_calls(fn, repeat=args.repeat))
+                rows.append({"candidates": label, "vectors": v, "path": name,
+                             "p50_us": round(t["p50_ms"] * 1000, 1), "p95_us": round(t["p95_ms"] * 1000, 1),
+                             "per_vector_us": round(t["p50_ms"] * 1000 / v, 2), "default_top_k_same": ""})
+
+    print_table(f"Re-rank vs re-predict (top_k={k})", rows)
+
+
+if __name__ == "__main__":
+    main()
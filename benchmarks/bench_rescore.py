@@ -0,0 +1,49 @@
+"""
+Historical re-scoring scaling benchmark
+---------------------------------------
+Runs the re-scoring job from scratch with 1, 2, 4, ... workers (up to
+the core count) and reports throughput and speedup over one worker.
+
+Run: python benchmarks/bench_rescore.py [--limit 15000] [--chunk-size 500]
+"""
+
+import argparse
+import os
+import tempfile
+
+from _common import print_table
+
+from ml.notebooks.rescore_history import run_job
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--limit", type=int, default=None)
+    ap.add_argument("--chunk-size", type=int, default=500)
+    ap.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    counts, w = [], 1
+    while w < args.max_workers:
+        counts.append(w)
+        w *= 2
+    counts.append(args.max_workers)
+
+    rows, base = [], None
+    for workers in counts:
+        with tempfile.TemporaryDirectory() as out:
+            stats = run_job(out, workers, args.chunk_size, limit=args.limit,
+                            restart=True, log=lambda *_: None)
+        base = base or stats["rows_per_s"]
+        rows.append({
+            "workers":   workers,
+            "rows":      stats["rows_scored"],
+            "elapsed_s": stats["elapsed_s"],
+            "rows_per_s": stats["rows_per_s"],
+            "speedup":   round(stats["rows_per_s"] / base, 2) if base else 0.0,
+        })
+    print_table(f"Re-scoring throughput (chunk size {args.chunk_size})", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Result record benchmark
+-----------------------
+A top-k result carried as a DataFrame turned into per-row dicts (the
+old path: generate_recommendations() -> DataFrame, .to_dict("records")
+for the response and the session) vs a RecommendationSet
+(ml/notebooks/results.py: columns from the engine, records() for the
+response, to_dict() for the session, packed straight from the columns
+for history):
+
+- allocations: blocks and bytes still held per result row, and the
+  peak while building it (tracemalloc), for the session's report
+  columns and for the response records
+- size: the session cookie payload (JSON) for each shape
+- latency: generate + response records + session + history encoding,
+  per engine path (exact; sharded, which skips the DataFrame; the
+  recommendation grid when ml/models has one)
+
+Run: python benchmarks/bench_results.py [--top-k 5,20] [--repeat 50]
+"""
+
+import argparse
+import json
+import tracemalloc
+
+from _common import SAMPLE_SHIPMENT, time_calls, summarize, print_table
+
+from ml.notebooks.recommendation_engine import (
+    generate_recommendations, materials_df, co2_model, cost_model,
+    FEATURES_COST, FEATURES_CO2, recommendation_grid
+)
+from ml.notebooks.results import REPORT_COLUMNS
+from ml.notebooks.sharded_scoring import ShardedScorer
+from history_store import encode_results
+
+
+def traced(fn):
+    """(result, blocks held, bytes held, peak bytes) for one call of fn(), after a warm-up call."""
+    fn()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    diff = tracemalloc.take_snapshot().compare_to(before, "filename")
+    tracemalloc.stop()
+    return (result, sum(d.count_diff for d in diff), sum(d.size_diff for d in diff), peak)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--top-k", default="5,20")
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args()
+
+    scorer = ShardedScorer(materials_df, cost_model, co2_model, FEATURES_COST, FEATURES_CO2,
+                           executor="thread", workers=1)
+    paths = {"exact": {}, "sharded": {"scorer": scorer}}
+    if recommendation_grid is not None:
+        paths["grid"] = {"grid": recommendation_grid}
+
+    def generate(k, as_frame, **kw):
+        return generate_recommendations(
+            materials_df, co2_model, cost_model, SAMPLE_SHIPMENT, FEATURES_COST, FEATURES_CO2,
+            k, "Sustainability", keep_scores=True, as_frame=as_frame, **kw
+        )
+
+    # What /api/recommend does with a result: response records, session, history row
+    def dict_path(k, **kw):
+        df = generate(k, True, **kw)
+        df.attrs.pop("scores", None)
+        records = df.to_dict("records")
+        session = df[[c for c in REPORT_COLUMNS if c in df.columns]].to_dict("records")
+        return records, json.dumps(session), encode_results(records)
+
+    def set_path(k, **kw):
+        results = generate(k, False, **kw)
+        results.attrs.pop("scores", None)
+        session = results.select(REPORT_COLUMNS).to_dict()
+        return results.records(), json.dumps(session), encode_results(results)
+
+    try:
+        alloc_rows, size_rows, latency_rows = [], [], []
+        for k in (int(x) for x in args.top_k.split(",")):
+            df = generate(k, True)
+            results = generate(k, False)
+            shapes = {
+                ("session", "dicts"): lambda: df[[c for c in REPORT_COLUMNS if c in df.columns]].to_dict("records"),
+                ("session", "RecommendationSet"): lambda: results.select(REPORT_COLUMNS),
+                ("response", "to_dict(records)"): lambda: df.to_dict("records"),
+                ("response", "records()"): results.records,
+            }
+            for (use, shape), build in shapes.items():
+                kept, blocks, size, peak = traced(build)
+                alloc_rows.append({"top_k": k, "use": use, "shape": shape, "blocks_per_row": round(blocks / k, 1),
+                                   "bytes_per_row": round(size / k), "peak_bytes": peak})
+            session_dicts = json.dumps(df[[c for c in REPORT_COLUMNS if c in df.columns]].to_dict("records"))
+            session_set = json.dumps(results.select(REPORT_COLUMNS).to_dict())
+            size_rows.append({"top_k": k, "dicts_bytes": len(session_dicts), "columns_bytes": len(session_set),
+                              "ratio": f"{len(session_set) / len(session_dicts):.2f}"})
+
+            for name, kw in paths.items():
+                old = summarize(time_calls(lambda: dict_path(k, **kw), repeat=args.repeat))
+                new = summarize(time_calls(lambda: set_path(k, **kw), repeat=args.repeat))
+                latency_rows.append({
+                    "top_k": k, "path": name, "dicts_p50_ms": old["p50_ms"], "set_p50_ms": new["p50_ms"],
+                    "speedup": f"{old['p50_ms'] / max(new['p50_ms'], 1e-9):.2f}x",
+                    "same_records": dict_path(k, **kw)[0] == set_path(k, **kw)[0],
+                })
+    finally:
+        scorer.close()
+
+    print_table("Result held per request (tracemalloc)", alloc_rows)
+    print_table("Session payload (JSON)", size_rows)
+    print_table("generate + records + session + history encoding", latency_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Sharded scoring benchmark
+-------------------------
+generate_recommendations on synthetic catalogues
+(ml/notebooks/synthetic_catalogue.py): the single-frame path vs
+ShardedScorer with thread and process pools at 1..N workers.
+
+Per catalogue size: p50 latency, speedup over the single-frame path,
+and whether the top-k scores match it. Worker counts default to powers
+of two up to os.cpu_count(), so scaling shows only on multi-core hosts.
+
+Run: python benchmarks/bench_sharded.py [--sizes 1000,10000,100000,1000000]
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from _common import SAMPLE_SHIPMENT, time_calls, summarize, print_table
+
+from ml.notebooks.recommendation_engine import (
+    generate_recommendations, co2_model, cost_model, FEATURES_COST, FEATURES_CO2
+)
+from ml.notebooks.sharded_scoring import ShardedScorer, SHARD_ROWS
+from ml.notebooks.synthetic_catalogue import generate_catalogue
+
+# Keep each case to a few seconds
+TARGET_MATERIALS_PER_CASE = 3_000_000
+
+
+def main():
+    cores = os.cpu_count() or 1
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,100000,1000000")
+    ap.add_argument("--workers", default=",".join(str(2 ** i) for i in range(cores.bit_length()) if 2 ** i <= cores))
+    ap.add_argument("--shard-rows", type=int, default=SHARD_ROWS)
+    ap.add_argument("--top-k", type=int, default=5)
+    ap.add_argument("--repeat", type=int, default=10)
+    args = ap.parse_args()
+    workers = [int(w) for w in args.workers.split(",")]
+    k = args.top_k
+
+    rows = []
+    for n in (int(x) for x in args.sizes.split(",")):
+        catalogue = generate_catalogue(n)
+        repeat = max(1, min(args.repeat, TARGET_MATERIALS_PER_CASE // n))
+
+        def run(scorer=None):
+            return generate_recommendations(
+                catalogue, co2_model, cost_model, SAMPLE_SHIPMENT, FEATURES_COST, FEATURES_CO2,
+                k, "Sustainability", prefilter=False, scorer=scorer
+            )
+
+        reference = run()
+        base = summarize(time_calls(run, repeat=repeat, warmup=1))
+        rows.append({"materials": n, "mode": "single frame", "workers": 1, "shards": 1,
+                     "p50_ms": base["p50_ms"], "speedup": "1.0x", "same_top_k": ""})
+
+        # Shard size scales down for small catalogues so every worker gets one
+        for executor in ("thread", "process"):
+            for w in workers:
+                scorer = ShardedScorer(
+                    catalogue, cost_model, co2_model, FEATURES_COST, FEATURES_CO2,
+                    executor=executor, workers=w, shard_rows=min(args.shard_rows, -(-n // w))
+                )
+                try:
+                    top = run(scorer)
+                    t = summarize(time_calls(lambda: run(scorer), repeat=repeat, warmup=1))
+                finally:
+                    scorer.close()
+                rows.append({
+                    "materials": n, "mode": executor, "workers": w, "shards": top.attrs["sharding"]["shards"],
+                    "p50_ms": t["p50_ms"], "speedup": f"{base['p50_ms'] / max(t['p50_ms'], 1e-9):.2f}x",
+                    "same_top_k": bool(np.allclose(top["Sustainability"], reference["Sustainability"])),
+                })
+
+    print_table(f"Sharded scoring (top_k={k}, sort_by=Sustainability, {cores} CPU cores)", rows)
+
+
+if __name__ == "__main__":
+    main()
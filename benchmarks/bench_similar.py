@@ -0,0 +1,90 @@
+"""
+Similar-materials index benchmark
+---------------------------------
+SimilarityIndex (ml/notebooks/similar_materials.py) on the real
+catalogue and on synthetic catalogues up to 1M materials.
+
+Per size: index build time, p50/p99 of similar() (tree query only) and
+similar_records() (what the API returns), a filtered query
+(biodegradable + one category: first-call tree build, then queries),
+and a brute-force scan for comparison with the same neighbours checked.
+
+Run: python benchmarks/bench_similar.py [--sizes 10000,100000,1000000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from _common import time_calls, summarize, print_table, load_full_catalogue
+
+from ml.notebooks.similar_materials import SimilarityIndex
+from ml.notebooks.synthetic_catalogue import generate_catalogue
+
+
+def brute_force(index, pos, k):
+    d = np.sqrt(((index.points - index.points[pos]) ** 2).sum(axis=1))
+    d[pos] = np.inf
+    rows = np.argpartition(d, k)[:k]
+    return rows[np.argsort(d[rows])], d
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--repeat", type=int, default=500)
+    args = ap.parse_args()
+    k = args.k
+    rng = np.random.default_rng(0)
+
+    catalogues = [("catalogue", load_full_catalogue())] + [
+        ("synthetic", generate_catalogue(int(n))) for n in args.sizes.split(",")
+    ]
+
+    rows = []
+    for label, materials in catalogues:
+        t0 = time.perf_counter()
+        index = SimilarityIndex(materials)
+        build_ms = (time.perf_counter() - t0) * 1000
+
+        ids = index.ids
+        pick = lambda: ids[rng.integers(len(ids))]
+        query = summarize(time_calls(lambda: index.similar(pick(), k), repeat=args.repeat))
+        records = summarize(time_calls(lambda: index.similar_records(pick(), k), repeat=args.repeat))
+
+        category = str(materials.filter(like="Category").iloc[0, 0])
+        t0 = time.perf_counter()
+        index.similar(ids[0], k, category=category, biodegradable=True)
+        filtered_build_ms = (time.perf_counter() - t0) * 1000
+        filtered = summarize(time_calls(
+            lambda: index.similar(pick(), k, category=category, biodegradable=True), repeat=args.repeat
+        ))
+
+        # Brute force on a few materials; same neighbour distances as the tree
+        same = True
+        brute_times = []
+        for _ in range(20):
+            pos = int(rng.integers(len(ids)))
+            t0 = time.perf_counter()
+            expect, d = brute_force(index, pos, k)
+            brute_times.append(time.perf_counter() - t0)
+            got, got_d = index.similar(ids[pos], k)
+            same &= bool(np.allclose(np.sort(d[expect]), np.sort(got_d)))
+        brute = summarize(brute_times)
+
+        rows.append({
+            "materials": f"{len(materials):,} ({label})",
+            "build_ms": round(build_ms, 1),
+            "query_p50_ms": query["p50_ms"], "query_p99_ms": query["p99_ms"],
+            "records_p50_ms": records["p50_ms"],
+            "filtered_build_ms": round(filtered_build_ms, 1), "filtered_p50_ms": filtered["p50_ms"],
+            "brute_p50_ms": brute["p50_ms"], "same_neighbours": same,
+        })
+
+    print_table(f"Similar materials (k={k}; filtered = biodegradable + one category)", rows)
+
+
+if __name__ == "__main__":
+    main()
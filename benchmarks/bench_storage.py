@@ -0,0 +1,115 @@
+"""
+Storage backend benchmark
+-------------------------
+History and login workloads through db.get_db on each backend
+(DB_BACKEND=sqlite on a temp file; DB_BACKEND=mysql when the DB_* env
+points at a reachable server).
+
+- history write: save_recommendation one row per call, and
+  save_recommendations in batches of --batch
+- history read: get_user_history(email, limit=10)
+- login: the statements login_user runs around bcrypt (user lookup +
+  last_login update); bcrypt itself is the same on both backends
+
+Each backend runs in its own process (db.py picks the backend at import).
+
+Run: python benchmarks/bench_storage.py [--rows 2000] [--batch 50]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from _common import PROJECT_ROOT, SAMPLE_SHIPMENT, print_table, summarize
+
+RECOMMENDATIONS = [
+    {"Material_Name": f"Material {i}", "Pred_Cost": 1.0 + i / 10, "Pred_CO2": 0.5 + i / 20,
+     "Biodegradable": "Yes", "Tensile_Strength_MPa": 40.0, "Sustainability": 0.9 - i / 20}
+    for i in range(5)
+]
+USERS = 50
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+def child(rows, batch):
+    sys.path.append(str(PROJECT_ROOT / "backend"))
+    import db
+    from recommender import save_recommendation, save_recommendations, get_user_history
+
+    if not db.test_connection():
+        return {"error": f"{db.DB_BACKEND} not reachable"}
+
+    emails = [f"bench{i}@storage.local" for i in range(USERS)]
+    conn = db.get_db()
+    with conn.cursor() as cur:
+        cur.executemany("INSERT INTO users (email, password_hash, failed_attempts, is_locked) "
+                        "VALUES (%s, 'x', 0, FALSE)", [(e,) for e in emails])
+    conn.close()
+
+    def lookup_and_update(email):
+        conn = db.get_db()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT password_hash, failed_attempts, is_locked FROM users WHERE email=%s", (email,))
+                cur.fetchone()
+                cur.execute("UPDATE users SET failed_attempts=0, last_login=NOW(), "
+                            "password_hash=COALESCE(%s, password_hash) WHERE email=%s", (None, email))
+        finally:
+            conn.close()
+
+    entries = [(emails[i % USERS], "bench", SAMPLE_SHIPMENT, 5, "Sustainability", RECOMMENDATIONS)
+               for i in range(rows)]
+    results = {}
+    results["history write (1 row/call)"] = [timed(save_recommendation, *e) for e in entries]
+    batch_times = [timed(save_recommendations, entries[i:i + batch]) for i in range(0, rows, batch)]
+    results[f"history write ({batch} rows/batch, per row)"] = [t / batch for t in batch_times]
+    results["history read (10 rows)"] = [timed(get_user_history, emails[i % USERS], 10) for i in range(rows)]
+    results["login statements"] = [timed(lookup_and_update, emails[i % USERS]) for i in range(rows)]
+    return {name: summarize(samples) for name, samples in results.items()}
+
+
+def run_backend(backend, rows, batch):
+    env = {**os.environ, "DB_BACKEND": backend, "COMPILED_MODELS": "0"}
+    with tempfile.TemporaryDirectory() as tmp:
+        env["SQLITE_PATH"] = os.path.join(tmp, "bench.sqlite3")
+        out = subprocess.run([sys.executable, __file__, "--child", "--rows", str(rows), "--batch", str(batch)],
+                             env=env, capture_output=True, text=True)
+    try:
+        return json.loads(out.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        return {"error": (out.stderr.strip().splitlines() or ["no output"])[-1]}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=2000)
+    ap.add_argument("--batch", type=int, default=50)
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.rows, args.batch)))
+        return
+
+    rows = []
+    for backend in ("sqlite", "mysql"):
+        result = run_backend(backend, args.rows, args.batch)
+        if "error" in result:
+            rows.append({"backend": backend, "workload": f"skipped: {result['error']}"})
+            continue
+        for workload, stats in result.items():
+            rows.append({"backend": backend, "workload": workload, **stats})
+    print_table(f"Storage backends ({args.rows} operations per workload)", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Tree evaluator benchmark
+------------------------
+model.predict (sklearn / xgboost pipeline) vs the compiled NumPy
+evaluator (ml/notebooks/tree_compiler.py) on the same feature frames.
+Rows are drawn with replacement from the processed dataset.
+
+Per model and batch size: p50/p95 latency of the reference, the compiled
+traversal forced on every size, and predict() (which hands batches past
+COMPILED_MAX_NODE_VISITS back to the reference), plus the max
+|difference| between compiled and reference predictions.
+
+Run: python benchmarks/bench_tree_eval.py [--sizes 10,600,10000,1000000]
+"""
+
+import argparse
+
+import joblib
+import numpy as np
+
+from _common import time_calls, summarize, print_table
+
+from ml.notebooks.catalogue import load_frame
+from ml.notebooks.recommendation_engine import MODEL_DIR, DATA_PATH
+from ml.notebooks.tree_compiler import CompiledModel
+
+# Keep the big batches to a few seconds of reference time
+TARGET_ROWS_PER_CASE = 2_000_000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10,600,10000,1000000")
+    ap.add_argument("--repeat", type=int, default=30)
+    args = ap.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    df = load_frame(DATA_PATH)
+    df["Biodegradable"] = df["Biodegradable"].map(lambda x: 1 if x == "Yes" else 0)
+    rng = np.random.default_rng(0)
+
+    for name in ("cost", "co2"):
+        model = joblib.load(MODEL_DIR / f"{name}_model.pkl")
+        features = joblib.load(MODEL_DIR / f"features_{name}.pkl")
+        compiled = CompiledModel(model)
+        forest = compiled.forest
+
+        rows = []
+        for n in sizes:
+            X = df[features].iloc[rng.integers(0, len(df), n)].reset_index(drop=True)
+            repeat = max(1, min(args.repeat, TARGET_ROWS_PER_CASE // n))
+            warmup = 1 if n >= 100_000 else 3
+
+            ref = summarize(time_calls(lambda: model.predict(X), repeat=repeat, warmup=warmup))
+            fast = summarize(time_calls(lambda: compiled.predict_compiled(X), repeat=repeat, warmup=warmup))
+            auto = summarize(time_calls(lambda: compiled.predict(X), repeat=repeat, warmup=warmup))
+            diff = np.abs(compiled.predict_compiled(X) - np.asarray(model.predict(X), dtype=float)).max()
+            routed = n * forest.n_trees * forest.max_depth > compiled.max_node_visits
+            rows.append({
+                "rows":         n,
+                "runs":         repeat,
+                "ref_p50_ms":   ref["p50_ms"],
+                "ref_p95_ms":   ref["p95_ms"],
+                "comp_p50_ms":  fast["p50_ms"],
+                "comp_p95_ms":  fast["p95_ms"],
+                "speedup":      f"{ref['p50_ms'] / max(fast['p50_ms'], 1e-9):.1f}x",
+                "predict_p50":  auto["p50_ms"],
+                "predict_uses": "reference" if routed else "compiled",
+                "max_abs_diff": f"{diff:.2e}",
+            })
+
+        print_table(
+            f"{name}_model: {compiled.kind}, {forest.n_trees} trees, "
+            f"{forest.n_nodes} nodes, max depth {forest.max_depth}",
+            rows
+        )
+
+
+if __name__ == "__main__":
+    main()
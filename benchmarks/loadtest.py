@@ -0,0 +1,429 @@
+"""
+Load-test harness
+-----------------
+Finds the throughput ceiling of the backend (gunicorn backend.app:app)
+on this machine, entirely offline.
+
+1. Models: the real ml/models pickles when they load; otherwise a
+   deterministic stand-in bundle (XGBoost hist, fixed seed, one thread)
+   is trained once from data/processed into data/loadtest/ and served
+   via MODEL_BUNDLE
+2. Server: gunicorn (--workers) or, without gunicorn, werkzeug's
+   threaded server, started from benchmarks/loadtest_app.py with
+   DISABLE_RATE_LIMITS=1, a fixed session secret (sessions must work
+   across workers) and the embedded SQLite backend instead of MySQL.
+   --url targets an already running server instead
+3. Load: --concurrency virtual users, each with its own cookie session,
+   pick requests by --mix weights. Shipments are sampled from
+   data/processed/clean_history.csv
+4. Report: per endpoint count, throughput, error rate, p50/p95/p99;
+   per server process CPU % and peak RSS; --slo checks (exit 1 on a
+   breach); --json writes everything
+
+Run:
+    python benchmarks/loadtest.py --workers 2 --concurrency 8 --duration 30
+    python benchmarks/loadtest.py --mix recommend=1 --slo recommend:p95=500
+    python benchmarks/loadtest.py --url http://127.0.0.1:5000 --duration 60
+"""
+
+import argparse
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import requests
+
+from _common import PROJECT_ROOT, print_table
+
+BENCH_DIR = Path(__file__).resolve().parent
+HISTORY_PATH = PROJECT_ROOT / "data" / "processed" / "clean_history.csv"
+STANDIN_DIR = PROJECT_ROOT / "data" / "loadtest"
+STANDIN_BUNDLE = "standin-models"
+STANDIN_TREES = 100
+
+DEFAULT_MIX = {"recommend": 4, "materials": 3, "auth_status": 2, "pdf": 0.5, "excel": 0.5, "login": 0}
+MATERIAL_PAGES = 50
+
+
+# ======================================================
+# Models
+# ======================================================
+def real_models_load():
+    import joblib
+    from ml.notebooks.model_bundle import MODEL_DIR
+    try:
+        joblib.load(MODEL_DIR / "cost_model.pkl")
+        joblib.load(MODEL_DIR / "co2_model.pkl")
+        return True
+    except Exception:
+        return False
+
+
+def ensure_standin_bundle(log=print):
+    """Trains (once) a deterministic stand-in bundle; returns its directory."""
+    import joblib
+    from ml.notebooks.model_bundle import BUNDLE_INFO, write_bundle
+    from ml.notebooks import train_models as tm
+
+    bundle = STANDIN_DIR / STANDIN_BUNDLE
+    if (bundle / BUNDLE_INFO).exists():
+        return bundle
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory() as no_parts:
+        df, sources = tm.load_training_data(ingested_dir=no_parts)
+    models = {}
+    for name, (target, features, numeric, categorical) in tm.MODELS.items():
+        pipeline = tm.build_pipeline("xgb_hist", numeric, categorical, jobs=1)
+        pipeline.set_params(model__n_estimators=STANDIN_TREES)
+        models[name] = pipeline.fit(df[features], df[target])
+    write_bundle({
+        "cost_model.pkl": lambda p: joblib.dump(models["cost"], p),
+        "co2_model.pkl": lambda p: joblib.dump(models["co2"], p),
+        "features_cost.pkl": lambda p: joblib.dump(tm.FEATURES_COST, p),
+        "features_co2.pkl": lambda p: joblib.dump(tm.FEATURES_CO2, p),
+    }, {"standin": True, "data": {"rows": len(df)}, "trees": STANDIN_TREES}, STANDIN_BUNDLE, STANDIN_DIR)
+    log(f"📦 Stand-in models trained in {time.perf_counter() - t0:.1f}s → {bundle}")
+    return bundle
+
+
+# ======================================================
+# Server
+# ======================================================
+def start_server(port, workers, threads, db_path, bundle, log=print):
+    env = {
+        **os.environ,
+        "DISABLE_RATE_LIMITS": "1",
+        "APP_SECRET_KEY": "loadtest-secret",
+        "LOADTEST_DB": str(db_path),
+        "PYTHONUNBUFFERED": "1",
+        "JOB_WORKERS": "0",     # gunicorn.conf.py would otherwise start a job pool next to the server
+    }
+    if bundle:
+        env["MODEL_BUNDLE"] = str(bundle)
+    try:
+        import gunicorn  # noqa: F401
+        cmd = [sys.executable, "-m", "gunicorn", "--pythonpath", str(BENCH_DIR),
+               "-w", str(workers), "--threads", str(threads), "-b", f"127.0.0.1:{port}",
+               "--log-level", "warning", "loadtest_app:app"]
+        kind = f"gunicorn ({workers} workers × {threads} threads)"
+    except ImportError:
+        cmd = [sys.executable, str(BENCH_DIR / "loadtest_app.py"), "--port", str(port)]
+        kind = "werkzeug (gunicorn not installed; one process)"
+    log_file = tempfile.NamedTemporaryFile(prefix="loadtest-server-", suffix=".log", delete=False)
+    proc = subprocess.Popen(cmd, env=env, cwd=PROJECT_ROOT, stdout=log_file, stderr=subprocess.STDOUT,
+                            start_new_session=True)
+    log(f"🚀 {kind} on :{port} (log: {log_file.name})")
+    return proc, kind, log_file.name
+
+
+def wait_ready(url, proc=None, timeout=180):
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < timeout:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"Server exited with code {proc.returncode}")
+        try:
+            health = requests.get(f"{url}/api/health", timeout=2)
+            if health.ok:
+                return health.json(), time.monotonic() - t0
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"Server not ready after {timeout}s")
+
+
+def stop_server(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=20)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(proc.pid, signal.SIGKILL)
+
+
+# ======================================================
+# Process stats (/proc, Linux)
+# ======================================================
+_TICKS = os.sysconf("SC_CLK_TCK")
+_PAGE_MB = os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def _proc_stat(pid):
+    """(ppid, cpu seconds, rss MB) or None."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/statm") as f:
+            rss_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return int(fields[1]), (int(fields[11]) + int(fields[12])) / _TICKS, rss_pages * _PAGE_MB
+
+
+def _children(pid):
+    kids = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            stat = _proc_stat(int(entry))
+            if stat and stat[0] == pid:
+                kids.append(int(entry))
+    return kids
+
+
+class ProcessSampler:
+    """CPU seconds and peak RSS of the server master and its workers."""
+
+    def __init__(self, root_pid, interval=0.5):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.stats = {}      # pid → {"role", "cpu_start", "cpu_end", "peak_rss_mb"}
+        self._stop = threading.Event()
+
+    def _sample(self):
+        pids = [(self.root_pid, "master")] + [(p, "worker") for p in _children(self.root_pid)]
+        for pid, role in pids:
+            stat = _proc_stat(pid)
+            if stat is None:
+                continue
+            _, cpu, rss = stat
+            s = self.stats.setdefault(pid, {"role": role, "cpu_start": cpu, "cpu_end": cpu, "peak_rss_mb": rss})
+            s["cpu_end"] = cpu
+            s["peak_rss_mb"] = max(s["peak_rss_mb"], rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._t0 = time.monotonic()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        self.elapsed = time.monotonic() - self._t0
+
+    def rows(self):
+        out = []
+        for pid, s in sorted(self.stats.items(), key=lambda kv: (kv[1]["role"] != "master", kv[0])):
+            cpu = s["cpu_end"] - s["cpu_start"]
+            out.append({"pid": pid, "role": s["role"], "cpu_s": round(cpu, 2),
+                        "cpu_pct": round(100 * cpu / self.elapsed, 1),
+                        "peak_rss_mb": round(s["peak_rss_mb"], 1)})
+        return out
+
+
+# ======================================================
+# Load
+# ======================================================
+def load_shipments(path=HISTORY_PATH):
+    """Request bodies from real shipments (flat items get a 1 cm minimum side)."""
+    df = pd.read_csv(path)
+    return [{
+        "Category_item": r.Category,
+        "Weight_kg": float(r.Weight_kg),
+        "Fragility": int(r.Fragility),
+        "Moisture_Sens": bool(r.Moisture_Sens),
+        "Distance_km": float(r.Distance_km),
+        "Shipping_Mode": r.Shipping_Mode,
+        "Length_cm": max(float(r.L_cm), 1.0),
+        "Width_cm": max(float(r.W_cm), 1.0),
+        "Height_cm": max(float(r.H_cm), 1.0),
+    } for r in df.itertuples(index=False)]
+
+
+def parse_mix(text):
+    mix = dict(DEFAULT_MIX)
+    if text:
+        mix = {k: 0 for k in DEFAULT_MIX}
+        for part in text.split(","):
+            name, _, weight = part.partition("=")
+            if name.strip() not in DEFAULT_MIX:
+                raise SystemExit(f"Unknown mix entry {name!r}; use {sorted(DEFAULT_MIX)}")
+            mix[name.strip()] = float(weight or 1)
+    return {k: v for k, v in mix.items() if v > 0}
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, idx, url, mix, shipments, deadline, records, seed):
+        super().__init__(daemon=True)
+        self.idx, self.url, self.deadline, self.records = idx, url, deadline, records
+        self.shipments = shipments
+        self.rng = random.Random(seed + idx)
+        self.names, self.weights = zip(*mix.items())
+        self.http = requests.Session()
+
+    def _request(self, name):
+        if name == "recommend":
+            body = {**self.rng.choice(self.shipments), "top_k": 5}
+            return self.http.post(f"{self.url}/api/recommend", json=body, timeout=60)
+        if name == "materials":
+            page = self.rng.randint(1, MATERIAL_PAGES)
+            return self.http.get(f"{self.url}/api/materials?page={page}&page_size=12", timeout=60)
+        if name == "auth_status":
+            return self.http.get(f"{self.url}/api/auth/status", timeout=60)
+        if name == "pdf":
+            return self.http.post(f"{self.url}/api/generate-pdf", timeout=60)
+        if name == "excel":
+            return self.http.post(f"{self.url}/api/export-excel", timeout=60)
+        if name == "login":
+            return self.http.post(f"{self.url}/api/auth/login", timeout=60,
+                                  json={"email": f"vu{self.idx}@loadtest.local", "password": "loadtest-pass"})
+        raise ValueError(name)
+
+    def run(self):
+        # Session needs a recommendation before PDF / Excel work (not recorded)
+        try:
+            self._request("recommend")
+        except requests.RequestException:
+            pass
+        while time.monotonic() < self.deadline:
+            name = self.rng.choices(self.names, self.weights)[0]
+            t0 = time.perf_counter()
+            try:
+                resp = self._request(name)
+                resp.content
+                status = resp.status_code
+            except requests.RequestException as e:
+                status = type(e).__name__
+            self.records.append((name, status, time.perf_counter() - t0, time.monotonic()))
+
+
+def run_load(url, mix, shipments, concurrency, duration, seed=0):
+    records = []
+    deadline = time.monotonic() + duration
+    users = [VirtualUser(i, url, mix, shipments, deadline, records, seed) for i in range(concurrency)]
+    t0 = time.monotonic()
+    for u in users:
+        u.start()
+    for u in users:
+        u.join()
+    return records, time.monotonic() - t0
+
+
+# ======================================================
+# Report
+# ======================================================
+def summarize_records(records, elapsed):
+    by_name = defaultdict(list)
+    for name, status, latency, _ in records:
+        by_name[name].append((status, latency))
+    by_name["ALL"] = [(s, l) for n, s, l, _ in records]
+
+    rows = []
+    for name, items in by_name.items():
+        lat = np.asarray([l for _, l in items]) * 1000
+        errors = defaultdict(int)
+        for status, _ in items:
+            if not (isinstance(status, int) and status < 400):
+                errors[str(status)] += 1
+        rows.append({
+            "endpoint": name, "requests": len(items),
+            "rps": round(len(items) / elapsed, 1),
+            "error_rate": round(sum(errors.values()) / len(items), 4),
+            "p50_ms": round(float(np.percentile(lat, 50)), 1),
+            "p95_ms": round(float(np.percentile(lat, 95)), 1),
+            "p99_ms": round(float(np.percentile(lat, 99)), 1),
+            "max_ms": round(float(lat.max()), 1),
+            "errors": ", ".join(f"{k}×{v}" for k, v in sorted(errors.items())) or "-",
+        })
+    return rows
+
+
+def check_slos(rows, slos, max_error_rate):
+    """['recommend p95 612.0 ms > 500 ms', ...] for every breached objective."""
+    by_name = {r["endpoint"]: r for r in rows}
+    breaches = []
+    for slo in slos:
+        target, _, bound = slo.partition("=")
+        name, _, metric = target.partition(":")
+        row = by_name.get(name)
+        if row is None:
+            continue
+        if row[f"{metric}_ms"] > float(bound):
+            breaches.append(f"{name} {metric} {row[f'{metric}_ms']} ms > {bound} ms")
+    for row in rows:
+        if row["error_rate"] > max_error_rate:
+            breaches.append(f"{row['endpoint']} error rate {row['error_rate']:.2%} > {max_error_rate:.2%}")
+    return breaches
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Offline load test for the EcoPackAI backend")
+    ap.add_argument("--url", help="test a running server instead of starting one")
+    ap.add_argument("--port", type=int, default=5055)
+    ap.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    ap.add_argument("--threads", type=int, default=1, help="threads per gunicorn worker")
+    ap.add_argument("--concurrency", type=int, default=8, help="virtual users")
+    ap.add_argument("--duration", type=float, default=30, help="seconds of load")
+    ap.add_argument("--mix", help=f"weights, e.g. recommend=4,materials=3 (default {DEFAULT_MIX})")
+    ap.add_argument("--slo", action="append", default=[], help="e.g. recommend:p95=500 (repeatable)")
+    ap.add_argument("--max-error-rate", type=float, default=0.01)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", help="write the full report here")
+    args = ap.parse_args()
+
+    mix = parse_mix(args.mix)
+    shipments = load_shipments()
+    proc = server_kind = server_log = None
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.url:
+            url, server_kind = args.url.rstrip("/"), "external"
+        else:
+            bundle = None if real_models_load() else ensure_standin_bundle()
+            url = f"http://127.0.0.1:{args.port}"
+            proc, server_kind, server_log = start_server(args.port, args.workers, args.threads,
+                                                         Path(tmp) / "standin.sqlite3", bundle)
+        try:
+            health, startup_s = wait_ready(url, proc)
+            print(f"✓ Ready in {startup_s:.1f}s (ml_available={health.get('ml_available')}, "
+                  f"model_version={health.get('model_version')})")
+            print(f"Load: {args.concurrency} users × {args.duration:.0f}s, mix {mix}")
+            cpu0 = time.process_time()
+            if proc is not None:
+                with ProcessSampler(proc.pid) as sampler:
+                    records, elapsed = run_load(url, mix, shipments, args.concurrency, args.duration, args.seed)
+                process_rows = sampler.rows()
+            else:
+                records, elapsed = run_load(url, mix, shipments, args.concurrency, args.duration, args.seed)
+                process_rows = []
+            # The generator shares the machine; its CPU is load the server did not get
+            gen_cpu = time.process_time() - cpu0
+            process_rows.append({"pid": os.getpid(), "role": "load generator", "cpu_s": round(gen_cpu, 2),
+                                 "cpu_pct": round(100 * gen_cpu / elapsed, 1), "peak_rss_mb": "-"})
+        finally:
+            if proc is not None:
+                stop_server(proc)
+
+    rows = summarize_records(records, elapsed)
+    print_table(f"Requests ({server_kind}, {args.concurrency} users, {elapsed:.1f}s)", rows)
+    print_table("Processes", process_rows)
+    breaches = check_slos(rows, args.slo, args.max_error_rate)
+    for b in breaches:
+        print(f"❌ SLO breach: {b}")
+    if not breaches:
+        print("✅ All SLOs met")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            "server": server_kind, "server_log": server_log, "health": health,
+            "concurrency": args.concurrency, "duration_s": round(elapsed, 2), "mix": mix,
+            "endpoints": rows, "processes": process_rows, "slo_breaches": breaches,
+        }, indent=2))
+    return 1 if breaches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+"""
+App entry point for the load-test harness (benchmarks/loadtest.py)
+- Serves backend/app.py unchanged; with LOADTEST_DB=<path> the embedded
+  SQLite backend (DB_BACKEND=sqlite, see backend/db.py) stores users and
+  history there, so login runs without a MySQL server
+- gunicorn: gunicorn --pythonpath benchmarks loadtest_app:app
+- without gunicorn: python benchmarks/loadtest_app.py --port 5000
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "backend"))
+
+# Must be set before db.py is imported (it reads them at import)
+if os.getenv("LOADTEST_DB"):
+    os.environ["DB_BACKEND"] = "sqlite"
+    os.environ["SQLITE_PATH"] = os.environ["LOADTEST_DB"]
+
+from backend.app import app  # noqa: E402
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=5000)
+    args = ap.parse_args()
+    app.run(host="127.0.0.1", port=args.port, threaded=True, use_reloader=False)
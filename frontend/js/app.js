@@ -560,7 +560,8 @@ const DashboardController = {
             if (!data.available) return;
 
             // If BI dashboard HTML exists, embed it via iframe
-            const src = `${CONFIG.API_URL}${CONFIG.ROUTES.BI_DASHBOARD}`;
+            // Versioned URL (content hash) when the backend provides one → browser-cacheable
+            const src = `${CONFIG.API_URL}${data.url || CONFIG.ROUTES.BI_DASHBOARD}`;
             container.innerHTML = `
                 <div class="dashboard-iframe-wrapper">
                     <iframe
@@ -0,0 +1,25 @@
+"""
+Gunicorn settings (loaded from the working directory, or -c gunicorn.conf.py)
+- The master starts and watches the batch job worker pool
+  (backend/jobs.py) once it's ready: JOB_WORKERS processes, default 1,
+  0 to leave it off. The pool's file lock keeps it to one per machine
+  however many gunicorn masters run, and it exits with the master
+- The pool shares the app's local job store (JOBS_DB_PATH), which is why
+  it runs on the same machine rather than as a separate service
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent / "backend"))
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 1))
+
+
+def when_ready(server):
+    if JOB_WORKERS <= 0:
+        return
+    import jobs
+    jobs.watch_workers(JOB_WORKERS)
+    server.log.info("Job worker pool: %d process(es), watched by the master", JOB_WORKERS)
@@ -0,0 +1,273 @@
+"""
+Candidate pre-filtering
+- Declarative suitability rules (shipment condition → material exclusion)
+- Caller hard constraints (biodegradable_only, max_cost_per_kg, ...)
+- Attribute indexes built once per materials frame (the last
+  MATERIAL_INDEX_CACHE_SIZE frames are kept):
+  sorted tensile / density / cost arrays + boolean masks by
+  Category_material, Biodegradable and name flags (waterproof)
+Pruning happens before any model call in generate_recommendations.
+"""
+
+import operator
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+# ======================================================
+# Suitability rules
+# when    : (shipment field, op, value)
+# exclude : all clauses must hold for a material to be excluded
+#   category_in   → Category_material in list
+#   unless_flag   → ...but keep materials carrying this name flag
+#   tensile_below → Tensile_Strength_MPa < value
+#   density_above → Density_kg_m3 > value
+# ======================================================
+SUITABILITY_RULES = [
+    {
+        "name": "moisture_sensitive_no_plain_paper",
+        "when": ("Moisture_Sens", "==", True),
+        "exclude": {"category_in": ["Paper"], "unless_flag": "waterproof"},
+    },
+    {
+        "name": "high_fragility_min_tensile",
+        "when": ("Fragility", ">=", 9),
+        "exclude": {"tensile_below": 5.0},
+    },
+    {
+        "name": "air_no_heavy_materials",
+        "when": ("Shipping_Mode", "==", "Air"),
+        "exclude": {"density_above": 2000.0},
+    },
+]
+
+# Name tokens that make a material moisture resistant
+NAME_FLAGS = {
+    "waterproof": ("Waterproof", "Laminated"),
+}
+
+HARD_CONSTRAINT_KEYS = {
+    "biodegradable_only", "max_cost_per_kg", "min_tensile_mpa",
+    "categories", "exclude_categories",
+}
+
+MATERIAL_INDEX_CACHE_SIZE = int(os.getenv("MATERIAL_INDEX_CACHE_SIZE", 8))
+
+_OPS = {
+    "==": operator.eq, "!=": operator.ne,
+    ">=": operator.ge, ">": operator.gt,
+    "<=": operator.le, "<": operator.lt,
+}
+
+
+# ======================================================
+# Attribute index
+# ======================================================
+class _SortedColumn:
+    def __init__(self, values):
+        values = np.asarray(values, dtype=float)
+        self.order = np.argsort(values, kind="stable")
+        self.sorted = values[self.order]
+        self.n = len(values)
+
+    def below(self, threshold):
+        mask = np.zeros(self.n, dtype=bool)
+        mask[self.order[:np.searchsorted(self.sorted, threshold, side="left")]] = True
+        return mask
+
+    def above(self, threshold):
+        mask = np.zeros(self.n, dtype=bool)
+        mask[self.order[np.searchsorted(self.sorted, threshold, side="right"):]] = True
+        return mask
+
+
+class MaterialIndex:
+    def __init__(self, materials_df):
+        self.n = len(materials_df)
+        self.tensile = _SortedColumn(materials_df["Tensile_Strength_MPa"])
+        self.density = _SortedColumn(materials_df["Density_kg_m3"])
+        self.cost = _SortedColumn(materials_df["Cost_per_kg"])
+
+        categories = materials_df["Category_material"].astype(str).to_numpy()
+        self.category = {c: categories == c for c in np.unique(categories)}
+
+        bio = materials_df["Biodegradable"]
+        self.biodegradable = np.asarray(
+            (bio == "Yes") | (bio == 1) | (bio == True), dtype=bool
+        )
+
+        names = materials_df["Material_Name"].astype(str)
+        self.flags = {
+            flag: names.str.contains("|".join(tokens), case=False, regex=True).to_numpy()
+            for flag, tokens in NAME_FLAGS.items()
+        }
+
+    def category_mask(self, categories):
+        mask = np.zeros(self.n, dtype=bool)
+        for c in categories:
+            if c in self.category:
+                mask |= self.category[c]
+        return mask
+
+
+_indexes = OrderedDict()    # id(materials_df) -> (weakref to the frame, n_rows, MaterialIndex)
+_indexes_lock = threading.Lock()
+
+
+def get_material_index(materials_df):
+    """
+    Built once per materials frame; rebuilt if its row count changes.
+    The weakref tells a frame apart from a later one that reuses its id();
+    entries for collected frames age out of the LRU.
+    """
+    key = id(materials_df)
+    with _indexes_lock:
+        entry = _indexes.get(key)
+        if entry is not None and entry[0]() is materials_df and entry[1] == len(materials_df):
+            _indexes.move_to_end(key)
+            return entry[2]
+
+    index = MaterialIndex(materials_df)
+    with _indexes_lock:
+        _indexes[key] = (weakref.ref(materials_df), len(materials_df), index)
+        _indexes.move_to_end(key)
+        while len(_indexes) > MATERIAL_INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+# ======================================================
+# Filtering
+# ======================================================
+def validate_constraints(constraints):
+    """Raises ValueError for unknown keys or bad values."""
+    if constraints is not None and not isinstance(constraints, dict):
+        raise ValueError("constraints must be an object")
+    constraints = dict(constraints or {})
+    unknown = set(constraints) - HARD_CONSTRAINT_KEYS
+    if unknown:
+        raise ValueError(f"Unknown constraint(s): {', '.join(sorted(unknown))}")
+    for key in ("max_cost_per_kg", "min_tensile_mpa"):
+        if constraints.get(key) is not None:
+            try:
+                constraints[key] = float(constraints[key])
+            except (TypeError, ValueError):
+                raise ValueError(f"{key} must be a number")
+    for key in ("categories", "exclude_categories"):
+        if constraints.get(key) is not None:
+            if isinstance(constraints[key], str):
+                constraints[key] = [constraints[key]]
+            if not isinstance(constraints[key], (list, tuple)):
+                raise ValueError(f"{key} must be a list of categories")
+            constraints[key] = [str(c) for c in constraints[key]]
+    constraints["biodegradable_only"] = bool(constraints.get("biodegradable_only", False))
+    return constraints
+
+
+def _rule_applies(rule, shipment):
+    field, op, value = rule["when"]
+    if field not in shipment:
+        return False
+    return _OPS[op](shipment[field], value)
+
+
+def _rule_exclusion(rule, index):
+    clauses = rule["exclude"]
+    mask = np.ones(index.n, dtype=bool)
+    if "category_in" in clauses:
+        mask &= index.category_mask(clauses["category_in"])
+    if "unless_flag" in clauses:
+        mask &= ~index.flags[clauses["unless_flag"]]
+    if "tensile_below" in clauses:
+        mask &= index.tensile.below(clauses["tensile_below"])
+    if "density_above" in clauses:
+        mask &= index.density.above(clauses["density_above"])
+    return mask
+
+
+def _hard_mask(constraints, index):
+    keep = np.ones(index.n, dtype=bool)
+    if constraints.get("biodegradable_only"):
+        keep &= index.biodegradable
+    if constraints.get("max_cost_per_kg") is not None:
+        keep &= ~index.cost.above(constraints["max_cost_per_kg"])
+    if constraints.get("min_tensile_mpa") is not None:
+        keep &= ~index.tensile.below(constraints["min_tensile_mpa"])
+    if constraints.get("categories"):
+        keep &= index.category_mask(constraints["categories"])
+    if constraints.get("exclude_categories"):
+        keep &= ~index.category_mask(constraints["exclude_categories"])
+    return keep
+
+
+def prefilter_candidates(materials_df, shipment, constraints=None, min_keep=1,
+                         rules=None):
+    """
+    Returns (candidate_materials_df, stats).
+
+    Hard constraints always apply. Suitability rules are dropped if they
+    would leave fewer than min_keep candidates, so a strict rule set can
+    never starve a request that the catalogue could otherwise answer.
+    """
+    t0 = time.perf_counter()
+    rules = SUITABILITY_RULES if rules is None else rules
+    constraints = validate_constraints(constraints)
+    index = get_material_index(materials_df)
+
+    keep = _hard_mask(constraints, index)
+    hard_keep = keep.copy()
+
+    applied = []
+    for rule in rules:
+        if _rule_applies(rule, shipment):
+            keep &= ~_rule_exclusion(rule, index)
+            applied.append(rule["name"])
+
+    rules_relaxed = False
+    if applied and keep.sum() < min(min_keep, hard_keep.sum()):
+        keep, applied, rules_relaxed = hard_keep, [], True
+
+    candidates = materials_df[keep].reset_index(drop=True)
+    total = index.n
+    pruned = int(total - len(candidates))
+    stats = {
+        "candidates_total":  total,
+        "candidates_scored": len(candidates),
+        "pruned":            pruned,
+        "pruning_rate":      round(pruned / total, 4) if total else 0.0,
+        "rules_applied":     applied,
+        "rules_relaxed":     rules_relaxed,
+        "constraints":       {k: v for k, v in constraints.items()
+                              if v is not None and v is not False and v != []},
+        "filter_ms":         round((time.perf_counter() - t0) * 1000, 3),
+    }
+    return candidates, stats
+
+
+def scenario_exclusions(materials_df, scenarios, rules=None, min_keep=1):
+    """
+    Returns (mask, applied): mask[s, m] is True where a rule that holds for
+    scenario s excludes material m. For rules on a field that differs
+    between scenarios (a swept Shipping_Mode); the others go through
+    prefilter_candidates once. A scenario left with fewer than min_keep
+    materials keeps them all, as prefilter_candidates relaxes its rules.
+    """
+    rules = SUITABILITY_RULES if rules is None else rules
+    index = get_material_index(materials_df)
+    mask = np.zeros((len(scenarios), index.n), dtype=bool)
+    applied = []
+    for rule in rules:
+        field, op, value = rule["when"]
+        if field not in scenarios:
+            continue
+        holds = np.asarray(_OPS[op](scenarios[field].to_numpy(), value), dtype=bool)
+        if holds.any():
+            mask[holds] |= _rule_exclusion(rule, index)
+            applied.append(rule["name"])
+    starved = (~mask).sum(axis=1) < min(min_keep, index.n)
+    mask[starved] = False
+    return mask, applied
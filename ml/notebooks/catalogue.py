@@ -0,0 +1,228 @@
+"""
+Compiled columnar catalogue
+---------------------------
+Compiles the processed CSVs into typed Arrow IPC files that load through
+memory-mapping instead of re-parsing CSV text in every process.
+
+- Text columns   → dictionary-encoded
+- Float columns  → float32 when the CSV values fit in 7 significant
+                   digits (decimals recorded, restored exactly on load)
+- Int columns    → smallest integer type that holds them
+- Schema metadata: schema version, source CSV sha256/size/mtime,
+                   content sha256 and the original pandas dtypes
+
+load_frame() returns the same DataFrame pd.read_csv() would, and falls
+back to the CSV when the artifact is missing, from another schema
+version, or older than its source.
+
+Build:  python ml/notebooks/catalogue.py build
+Check:  python ml/notebooks/catalogue.py status
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+PROCESSED_DIR = PROJECT_ROOT / "data" / "processed"
+ARTIFACT_DIR = PROCESSED_DIR / "compiled"
+
+CATALOGUE_SCHEMA_VERSION = "1"
+
+COMPILED_SOURCES = [
+    PROCESSED_DIR / "final_ecopack_dataset_fe.csv",
+    PROCESSED_DIR / "clean_materials.csv",
+    PROCESSED_DIR / "clean_history.csv",
+]
+
+FLOAT32_MAX_DIGITS = 7
+
+logger = logging.getLogger(__name__)
+
+
+def artifact_path(csv_path, artifact_dir=ARTIFACT_DIR):
+    return Path(artifact_dir) / (Path(csv_path).stem + ".arrow")
+
+
+def _sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# ======================================================
+# Compile
+# ======================================================
+def _float32_decimals(values):
+    """Decimals d if every value fits float32 exactly at d decimals, else None."""
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return 0
+    for d in range(FLOAT32_MAX_DIGITS):
+        if np.array_equal(np.round(finite, d), finite):
+            digits = d + len(str(int(np.abs(finite).max())))
+            return d if digits <= FLOAT32_MAX_DIGITS else None
+    return None
+
+
+def _encode_column(series):
+    """Returns (arrow array, column metadata)."""
+    meta = {"dtype": str(series.dtype)}
+    if pd.api.types.is_bool_dtype(series):
+        return pa.array(series.to_numpy()), meta
+    if pd.api.types.is_integer_dtype(series):
+        narrowed = pd.to_numeric(series, downcast="integer")
+        return pa.array(narrowed.to_numpy()), meta
+    if pd.api.types.is_float_dtype(series):
+        values = series.to_numpy(dtype=np.float64)
+        decimals = _float32_decimals(values)
+        if decimals is not None:
+            meta["decimals"] = decimals
+            return pa.array(values.astype(np.float32), from_pandas=True), meta
+        return pa.array(values, from_pandas=True), meta
+    return pa.array(series.astype(object).where(series.notna(), None)).dictionary_encode(), meta
+
+
+def compile_csv(csv_path, artifact_dir=ARTIFACT_DIR):
+    """CSV → Arrow IPC file with typed, dictionary-encoded columns."""
+    csv_path = Path(csv_path)
+    df = pd.read_csv(csv_path)
+
+    arrays, columns = [], {}
+    for name in df.columns:
+        arr, meta = _encode_column(df[name])
+        arrays.append(arr)
+        columns[name] = meta
+
+    stat = csv_path.stat()
+    metadata = {
+        "ecopack.schema_version": CATALOGUE_SCHEMA_VERSION,
+        "ecopack.source":         csv_path.name,
+        "ecopack.source_sha256":  _sha256_file(csv_path),
+        "ecopack.source_size":    str(stat.st_size),
+        "ecopack.source_mtime_ns": str(stat.st_mtime_ns),
+        "ecopack.content_sha256": hashlib.sha256(
+            pd.util.hash_pandas_object(df, index=False).values.tobytes()
+        ).hexdigest(),
+        "ecopack.columns":        json.dumps(columns),
+    }
+    table = pa.Table.from_arrays(arrays, names=list(df.columns)).replace_schema_metadata(metadata)
+
+    out = artifact_path(csv_path, artifact_dir)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    tmp.replace(out)
+    return out
+
+
+# ======================================================
+# Load
+# ======================================================
+def _metadata(table):
+    return {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items()}
+
+
+def artifact_status(csv_path, artifact_dir=ARTIFACT_DIR):
+    """'fresh', 'missing', 'schema' (version mismatch) or 'stale'."""
+    art = artifact_path(csv_path, artifact_dir)
+    if not art.exists():
+        return "missing"
+    with pa.memory_map(str(art), "r") as source:
+        meta = _metadata(pa.ipc.open_file(source).read_all())
+    return _freshness(Path(csv_path), meta)
+
+
+def _freshness(csv_path, meta):
+    if meta.get("ecopack.schema_version") != CATALOGUE_SCHEMA_VERSION:
+        return "schema"
+    if not csv_path.exists():
+        return "fresh"  # artifact shipped without its source
+    stat = csv_path.stat()
+    if (str(stat.st_size) == meta.get("ecopack.source_size")
+            and str(stat.st_mtime_ns) == meta.get("ecopack.source_mtime_ns")):
+        return "fresh"
+    # mtime moves on checkout/copy; only the content decides
+    return "fresh" if _sha256_file(csv_path) == meta.get("ecopack.source_sha256") else "stale"
+
+
+def read_table(csv_path, artifact_dir=ARTIFACT_DIR):
+    """Memory-mapped Arrow table, or None if missing/stale."""
+    art = artifact_path(csv_path, artifact_dir)
+    if not ARROW_AVAILABLE or not art.exists():
+        return None
+    source = pa.memory_map(str(art), "r")
+    table = pa.ipc.open_file(source).read_all()
+    status = _freshness(Path(csv_path), _metadata(table))
+    if status != "fresh":
+        logger.warning(f"Compiled artifact {art.name} is {status}; using CSV")
+        return None
+    return table
+
+
+def table_to_frame(table):
+    """Arrow table → DataFrame with the dtypes pd.read_csv() produced."""
+    columns = json.loads(_metadata(table)["ecopack.columns"])
+    data = {}
+    for name in table.column_names:
+        meta = columns[name]
+        col = table.column(name)
+        if pa.types.is_dictionary(col.type):
+            col = col.cast(col.type.value_type)
+        series = col.to_pandas()
+        if "decimals" in meta:
+            series = series.astype(np.float64).round(meta["decimals"])
+        data[name] = series.astype(meta["dtype"])
+    return pd.DataFrame(data)
+
+
+def load_frame(csv_path, artifact_dir=ARTIFACT_DIR):
+    """Compiled artifact when fresh, CSV otherwise."""
+    try:
+        table = read_table(csv_path, artifact_dir)
+        if table is not None:
+            return table_to_frame(table)
+    except Exception as e:
+        logger.warning(f"Could not load compiled artifact for {Path(csv_path).name}: {e}")
+    return pd.read_csv(csv_path)
+
+
+# ======================================================
+# CLI
+# ======================================================
+def main():
+    ap = argparse.ArgumentParser(description="Compile processed CSVs to Arrow artifacts")
+    ap.add_argument("command", choices=["build", "status"])
+    ap.add_argument("--out", default=str(ARTIFACT_DIR))
+    args = ap.parse_args()
+
+    for csv_path in COMPILED_SOURCES:
+        if not csv_path.exists():
+            print(f"skip  {csv_path.name} (not found)")
+            continue
+        if args.command == "build":
+            out = compile_csv(csv_path, args.out)
+            print(f"built {out.relative_to(PROJECT_ROOT) if out.is_relative_to(PROJECT_ROOT) else out} "
+                  f"({out.stat().st_size / 1e6:.2f} MB, CSV {csv_path.stat().st_size / 1e6:.2f} MB)")
+        else:
+            print(f"{artifact_status(csv_path, args.out):7s} {csv_path.name}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,625 @@
+"""
+Input / prediction drift monitoring with streaming sketches
+- Every scored shipment is fed into fixed-size, mergeable sketches:
+    numeric features      Moments (count / mean / variance / min / max,
+                          Welford) + QuantileSketch (log-bucketed,
+                          DDSketch-style, 1% relative accuracy, at most
+                          QUANTILE_MAX_BUCKETS buckets)
+    categorical features  CategoryCounter (at most CATEGORY_CAPACITY
+                          values, the rest counted as "__other__")
+    predictions           Pred_Cost / Pred_CO2 of every scored candidate
+- Memory per feature is bounded no matter how much traffic is seen, and
+  merge() is exact for counts and moments, so per-worker / per-window
+  states add up to the same thing one big monitor would have seen
+- The reference is the same sketches over the training data
+  (drift_reference.json in the served model directory, so a
+  MODEL_BUNDLE gets its own); drift_report() compares the two with
+  the population stability index (PSI) over the reference's quantile
+  bins / categories, plus mean shift, quantiles, out-of-range share and
+  unseen categories
+
+Build:  python ml/notebooks/drift_monitor.py build [--shipments 500]
+"""
+
+import argparse
+import json
+import logging
+import math
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from ml.notebooks.model_bundle import resolve_model_dir
+from ml.notebooks.recommendation_grid import file_stamp, stamp_matches
+
+MODEL_DIR = resolve_model_dir()
+DRIFT_REFERENCE_FILE = "drift_reference.json"
+DRIFT_REFERENCE_PATH = MODEL_DIR / DRIFT_REFERENCE_FILE
+DRIFT_SCHEMA_VERSION = "1"
+
+QUANTILE_ALPHA = 0.01            # relative accuracy of QuantileSketch
+QUANTILE_MAX_BUCKETS = 1024
+CATEGORY_CAPACITY = 64
+SMALL_BATCH = 32                 # arrays up to this size are added value by value (cheaper than NumPy calls)
+
+NUMERIC_FEATURES = ["Weight_kg", "Distance_km", "Item_Volume_m3"]
+CATEGORICAL_FEATURES = ["Category_item", "Shipping_Mode", "Fragility", "Moisture_Sens"]
+PREDICTION_FEATURES = ["Pred_Cost", "Pred_CO2"]
+
+# PSI bins: the reference's quantiles at these ranks (tails kept narrow so extremes show up)
+PSI_EDGES = (0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99)
+PSI_EPSILON = 1e-4
+PSI_WARN, PSI_DRIFT = 0.1, 0.25  # usual PSI reading: < 0.1 stable, > 0.25 shifted
+REPORT_QUANTILES = (0.01, 0.5, 0.99)
+
+logger = logging.getLogger(__name__)
+
+
+# ======================================================
+# Sketches
+# ======================================================
+class Moments:
+    """Count, mean, variance (Welford / Chan et al. for batches and merges), min, max."""
+
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count, self.mean, self.m2 = 0, 0.0, 0.0
+        self.min, self.max = math.inf, -math.inf
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def _combine(self, n, mean, m2, lo, hi):
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min, self.max = min(self.min, lo), max(self.max, hi)
+
+    def add_many(self, values):
+        if len(values) <= SMALL_BATCH:
+            for x in values.tolist():
+                self.add(x)
+        else:
+            mean = float(values.mean())
+            self._combine(len(values), mean, float(((values - mean) ** 2).sum()),
+                          float(values.min()), float(values.max()))
+
+    def merge(self, other):
+        if other.count:
+            self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        return self
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean, "m2": self.m2,
+                "min": self.min if self.count else None, "max": self.max if self.count else None}
+
+    @classmethod
+    def from_dict(cls, d):
+        m = cls()
+        m.count, m.mean, m.m2 = d["count"], d["mean"], d["m2"]
+        if m.count:
+            m.min, m.max = d["min"], d["max"]
+        return m
+
+
+class QuantileSketch:
+    """
+    Log-bucketed quantile sketch: value x > 0 lands in bucket
+    ceil(log_gamma(x)), gamma = (1 + alpha) / (1 - alpha), so any quantile
+    is returned within alpha relative error. Negative values use a mirrored
+    store. Past max_buckets the lowest buckets are collapsed together
+    (the high tail, where drift usually shows, stays exact).
+    """
+
+    __slots__ = ("alpha", "max_buckets", "_log_gamma", "pos", "neg", "zero", "count")
+
+    def __init__(self, alpha=QUANTILE_ALPHA, max_buckets=QUANTILE_MAX_BUCKETS):
+        self.alpha, self.max_buckets = alpha, max_buckets
+        self._log_gamma = math.log((1 + alpha) / (1 - alpha))
+        self.pos, self.neg = {}, {}
+        self.zero = 0
+        self.count = 0
+
+    def _index(self, x):
+        return math.ceil(math.log(x) / self._log_gamma)
+
+    def _value(self, index):
+        gamma = math.exp(self._log_gamma)
+        return 2 * gamma ** index / (gamma + 1)
+
+    def add(self, x):
+        self.count += 1
+        if x > 0:
+            i = self._index(x)
+            self.pos[i] = self.pos.get(i, 0) + 1
+            if len(self.pos) > self.max_buckets:
+                self._collapse(self.pos)
+        elif x < 0:
+            i = self._index(-x)
+            self.neg[i] = self.neg.get(i, 0) + 1
+            if len(self.neg) > self.max_buckets:
+                self._collapse(self.neg)
+        else:
+            self.zero += 1
+
+    def add_many(self, values):
+        if len(values) <= SMALL_BATCH:
+            for x in values.tolist():
+                self.add(x)
+            return
+        self.count += len(values)
+        self.zero += int((values == 0).sum())
+        for store, part in ((self.pos, values[values > 0]), (self.neg, -values[values < 0])):
+            if len(part):
+                idx, counts = np.unique(np.ceil(np.log(part) / self._log_gamma).astype(np.int64),
+                                        return_counts=True)
+                for i, c in zip(idx.tolist(), counts.tolist()):
+                    store[i] = store.get(i, 0) + c
+                if len(store) > self.max_buckets:
+                    self._collapse(store)
+
+    def _collapse(self, store):
+        keys = sorted(store)
+        excess = len(keys) - self.max_buckets
+        into = keys[excess]
+        for k in keys[:excess]:
+            store[into] += store.pop(k)
+
+    def merge(self, other):
+        if other.alpha != self.alpha:
+            raise ValueError("QuantileSketch.merge needs the same alpha on both sides")
+        for store, theirs in ((self.pos, other.pos), (self.neg, other.neg)):
+            for i, c in theirs.items():
+                store[i] = store.get(i, 0) + c
+            if len(store) > self.max_buckets:
+                self._collapse(store)
+        self.zero += other.zero
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for i in sorted(self.neg, reverse=True):
+            seen += self.neg[i]
+            if seen > rank:
+                return -self._value(i)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for i in sorted(self.pos):
+            seen += self.pos[i]
+            if seen > rank:
+                return self._value(i)
+        return self._value(max(self.pos)) if self.pos else 0.0
+
+    def cdf(self, x):
+        """Share of values ≤ x (bucket resolution)."""
+        if not self.count:
+            return 0.0
+        if x > 0:
+            i = self._index(x)
+            below = sum(self.neg.values()) + self.zero + sum(c for k, c in self.pos.items() if k <= i)
+        elif x < 0:
+            i = self._index(-x)
+            below = sum(c for k, c in self.neg.items() if k >= i)
+        else:
+            below = sum(self.neg.values()) + self.zero
+        return below / self.count
+
+    def to_dict(self):
+        return {"alpha": self.alpha, "zero": self.zero, "count": self.count,
+                "pos": {str(k): v for k, v in self.pos.items()},
+                "neg": {str(k): v for k, v in self.neg.items()}}
+
+    @classmethod
+    def from_dict(cls, d, max_buckets=QUANTILE_MAX_BUCKETS):
+        s = cls(d["alpha"], max_buckets)
+        s.zero, s.count = d["zero"], d["count"]
+        s.pos = {int(k): v for k, v in d["pos"].items()}
+        s.neg = {int(k): v for k, v in d["neg"].items()}
+        return s
+
+
+class CategoryCounter:
+    """Frequencies of at most `capacity` distinct values; later newcomers count as "__other__"."""
+
+    OTHER = "__other__"
+    __slots__ = ("capacity", "counts", "count")
+
+    def __init__(self, capacity=CATEGORY_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.count = 0
+
+    def add(self, value):
+        key = str(value)
+        self.count += 1
+        if key in self.counts or len(self.counts) < self.capacity:
+            self.counts[key] = self.counts.get(key, 0) + 1
+        else:
+            self.counts[self.OTHER] = self.counts.get(self.OTHER, 0) + 1
+
+    def merge(self, other):
+        for key, c in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + c
+        self.count += other.count
+        if len(self.counts) > self.capacity:
+            # Keep the most frequent; fold the rest into __other__
+            ranked = sorted((k for k in self.counts if k != self.OTHER), key=self.counts.get, reverse=True)
+            for key in ranked[self.capacity - 1:]:
+                self.counts[self.OTHER] = self.counts.get(self.OTHER, 0) + self.counts.pop(key)
+        return self
+
+    def to_dict(self):
+        return {"count": self.count, "counts": dict(self.counts)}
+
+    @classmethod
+    def from_dict(cls, d, capacity=CATEGORY_CAPACITY):
+        c = cls(capacity)
+        c.count, c.counts = d["count"], dict(d["counts"])
+        return c
+
+
+class NumericSketch:
+    __slots__ = ("moments", "quantiles")
+
+    def __init__(self):
+        self.moments, self.quantiles = Moments(), QuantileSketch()
+
+    def add(self, x):
+        if x is not None and math.isfinite(x):
+            self.moments.add(x)
+            self.quantiles.add(x)
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        self.moments.add_many(values)
+        self.quantiles.add_many(values)
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        self.quantiles.merge(other.quantiles)
+        return self
+
+    def to_dict(self):
+        return {"moments": self.moments.to_dict(), "quantiles": self.quantiles.to_dict()}
+
+    @classmethod
+    def from_dict(cls, d):
+        s = cls()
+        s.moments, s.quantiles = Moments.from_dict(d["moments"]), QuantileSketch.from_dict(d["quantiles"])
+        return s
+
+
+# ======================================================
+# Monitor
+# ======================================================
+def shipment_features(shipment):
+    """The monitored inputs of one API shipment (volume as the training data has it)."""
+    try:
+        volume = shipment["Length_cm"] * shipment["Width_cm"] * shipment["Height_cm"] / 1e6
+    except (KeyError, TypeError):
+        volume = None
+    return {
+        "Weight_kg": shipment.get("Weight_kg"),
+        "Distance_km": shipment.get("Distance_km"),
+        "Item_Volume_m3": volume,
+        "Category_item": shipment.get("Category_item"),
+        "Shipping_Mode": shipment.get("Shipping_Mode"),
+        "Fragility": shipment.get("Fragility"),
+        "Moisture_Sens": shipment.get("Moisture_Sens"),
+    }
+
+
+class DriftMonitor:
+    """Thread-safe set of sketches: one per monitored input and prediction."""
+
+    def __init__(self):
+        self.numeric = {name: NumericSketch() for name in NUMERIC_FEATURES + PREDICTION_FEATURES}
+        self.categorical = {name: CategoryCounter() for name in CATEGORICAL_FEATURES}
+        self.shipments = 0
+        self._lock = threading.Lock()
+
+    def observe(self, shipment, pred_cost=None, pred_co2=None):
+        """One scored shipment and the predictions for its candidates (arrays)."""
+        features = shipment_features(shipment)
+        with self._lock:
+            self.shipments += 1
+            for name in NUMERIC_FEATURES:
+                self.numeric[name].add(features[name])
+            for name in CATEGORICAL_FEATURES:
+                self.categorical[name].add(features[name])
+            if pred_cost is not None:
+                self.numeric["Pred_Cost"].add_many(pred_cost)
+            if pred_co2 is not None:
+                self.numeric["Pred_CO2"].add_many(pred_co2)
+
+    def merge(self, other):
+        with self._lock:
+            self.shipments += other.shipments
+            for name, sketch in self.numeric.items():
+                sketch.merge(other.numeric[name])
+            for name, counter in self.categorical.items():
+                counter.merge(other.categorical[name])
+        return self
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "shipments": self.shipments,
+                "numeric": {name: s.to_dict() for name, s in self.numeric.items()},
+                "categorical": {name: c.to_dict() for name, c in self.categorical.items()},
+            }
+
+    @classmethod
+    def from_dict(cls, d):
+        m = cls()
+        m.shipments = d["shipments"]
+        for name, s in d["numeric"].items():
+            if name in m.numeric:
+                m.numeric[name] = NumericSketch.from_dict(s)
+        for name, c in d["categorical"].items():
+            if name in m.categorical:
+                m.categorical[name] = CategoryCounter.from_dict(c)
+        return m
+
+    @classmethod
+    def merged(cls, states):
+        """One monitor from any number of to_dict() states (workers, windows)."""
+        out = cls()
+        for state in states:
+            out.merge(state if isinstance(state, DriftMonitor) else cls.from_dict(state))
+        return out
+
+
+# ======================================================
+# Reference (training data)
+# ======================================================
+def reference_shipments(train_df):
+    """Training rows as API shipments; the box is a cube with the row's volume."""
+    side_cm = np.cbrt(train_df["Item_Volume_m3"].to_numpy(float)) * 100
+    records = train_df[["Category_item", "Weight_kg", "Fragility", "Moisture_Sens",
+                        "Distance_km", "Shipping_Mode"]].to_dict("records")
+    for record, side in zip(records, side_cm):
+        record.update(Length_cm=float(side), Width_cm=float(side), Height_cm=float(side))
+    return records
+
+
+def compute_reference(train_df, score_fn, shipments=500, seed=0):
+    """
+    Reference monitor over the training data. Inputs come from every
+    training row; predictions from score_fn(shipment) -> (pred_cost,
+    pred_co2) over `shipments` sampled rows, scored exactly as live
+    traffic is (all candidates after pre-filtering).
+    """
+    monitor = DriftMonitor()
+    for name in NUMERIC_FEATURES:
+        monitor.numeric[name].add_many(train_df[name].to_numpy(float))
+    for name in CATEGORICAL_FEATURES:
+        counter = monitor.categorical[name]
+        for value, c in train_df[name].map(str).value_counts().items():
+            counter.counts[value] = int(c)
+            counter.count += int(c)
+    monitor.shipments = int(len(train_df))
+
+    sample = train_df.sample(n=min(shipments, len(train_df)), random_state=seed)
+    for shipment in reference_shipments(sample):
+        pred_cost, pred_co2 = score_fn(shipment)
+        monitor.numeric["Pred_Cost"].add_many(pred_cost)
+        monitor.numeric["Pred_CO2"].add_many(pred_co2)
+    return {
+        "schema_version": DRIFT_SCHEMA_VERSION,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "training_rows": int(len(train_df)),
+        "scored_shipments": int(len(sample)),
+        "state": monitor.to_dict(),
+    }
+
+
+def save_drift_reference(reference, path=None, model_dir=MODEL_DIR):
+    """path defaults to drift_reference.json in model_dir."""
+    reference = dict(reference)
+    reference["models"] = {
+        name: file_stamp(Path(model_dir) / name) for name in ("cost_model.pkl", "co2_model.pkl")
+    }
+    path = Path(model_dir) / DRIFT_REFERENCE_FILE if path is None else Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(reference))
+    tmp.replace(path)
+    return path
+
+
+def load_drift_reference(path=None, model_dir=MODEL_DIR):
+    """
+    {"built_at", ..., "monitor": DriftMonitor} if present and built from
+    the current models, else None.
+    """
+    path = Path(model_dir) / DRIFT_REFERENCE_FILE if path is None else Path(path)
+    if not path.exists():
+        return None
+    try:
+        reference = json.loads(path.read_text())
+    except ValueError as e:
+        logger.warning(f"Unreadable drift reference {path.name}: {e}")
+        return None
+    if reference.get("schema_version") != DRIFT_SCHEMA_VERSION:
+        logger.warning("Drift reference schema changed; rebuild it")
+        return None
+    for name, stamp in reference.get("models", {}).items():
+        if not stamp_matches(Path(model_dir) / name, stamp):
+            logger.warning(f"Drift reference was built for a different {name}; rebuild it")
+            return None
+    reference["monitor"] = DriftMonitor.from_dict(reference.pop("state"))
+    return reference
+
+
+# ======================================================
+# Drift scores
+# ======================================================
+def psi(expected, actual):
+    """Population stability index between two share vectors."""
+    e = np.clip(np.asarray(expected, dtype=float), PSI_EPSILON, None)
+    a = np.clip(np.asarray(actual, dtype=float), PSI_EPSILON, None)
+    return float(((a - e) * np.log(a / e)).sum())
+
+
+def _status(score, n, min_samples):
+    if n < min_samples:
+        return "insufficient_data"
+    return "drift" if score > PSI_DRIFT else "warn" if score > PSI_WARN else "ok"
+
+
+def _bin_shares(sketch, edges):
+    cdf = [0.0] + [sketch.cdf(e) for e in edges] + [1.0]
+    return np.diff(cdf)
+
+
+def numeric_drift(live, ref, min_samples):
+    out = {
+        "count": live.moments.count,
+        "mean": live.moments.mean if live.moments.count else None,
+        "std": live.moments.std,
+        "quantiles": {f"p{int(q * 100):02d}": live.quantiles.quantile(q) for q in REPORT_QUANTILES},
+    }
+    if ref is None:
+        return out
+    ref_m = ref.moments
+    out["reference"] = {
+        "mean": ref_m.mean, "std": ref_m.std, "min": ref_m.min, "max": ref_m.max,
+        "quantiles": {f"p{int(q * 100):02d}": ref.quantiles.quantile(q) for q in REPORT_QUANTILES},
+    }
+    if not live.moments.count:
+        out.update(psi=None, status="insufficient_data")
+        return out
+    edges = sorted({ref.quantiles.quantile(q) for q in PSI_EDGES})
+    score = psi(_bin_shares(ref.quantiles, edges), _bin_shares(live.quantiles, edges))
+    below = live.quantiles.cdf(ref_m.min * (1 - QUANTILE_ALPHA)) if ref_m.min > 0 else 0.0
+    above = 1 - live.quantiles.cdf(ref_m.max * (1 + QUANTILE_ALPHA))
+    out.update(
+        psi=round(score, 4),
+        mean_shift_std=round((live.moments.mean - ref_m.mean) / (ref_m.std or 1.0), 4),
+        out_of_range=round(below + above, 4),
+        status=_status(score, live.moments.count, min_samples),
+    )
+    return out
+
+
+def categorical_drift(live, ref, min_samples):
+    total = max(live.count, 1)
+    out = {"count": live.count,
+           "top": dict(sorted(live.counts.items(), key=lambda kv: -kv[1])[:10])}
+    if ref is None:
+        return out
+    if not live.count:
+        out.update(psi=None, status="insufficient_data")
+        return out
+    known = [k for k in ref.counts if k != CategoryCounter.OTHER]
+    unseen = {k: c for k, c in live.counts.items() if k not in ref.counts}
+    expected = [ref.counts[k] / ref.count for k in known] + [0.0]
+    actual = [live.counts.get(k, 0) / total for k in known] + [sum(unseen.values()) / total]
+    score = psi(expected, actual)
+    out.update(
+        psi=round(score, 4),
+        unseen=dict(sorted(unseen.items(), key=lambda kv: -kv[1])[:10]),
+        unseen_share=round(sum(unseen.values()) / total, 4),
+        status=_status(score, live.count, min_samples),
+    )
+    return out
+
+
+def drift_report(monitor, reference=None, min_samples=100):
+    """Per-feature drift of `monitor` against the reference monitor (or plain live stats)."""
+    ref = reference["monitor"] if reference else None
+    features = {}
+    for name, sketch in monitor.numeric.items():
+        features[name] = numeric_drift(sketch, ref.numeric[name] if ref else None, min_samples)
+    for name, counter in monitor.categorical.items():
+        features[name] = categorical_drift(counter, ref.categorical[name] if ref else None, min_samples)
+
+    scored = {name: f["psi"] for name, f in features.items() if f.get("psi") is not None}
+    statuses = [f["status"] for f in features.values() if "status" in f]
+    overall = None
+    if reference:
+        worst = max(scored, key=scored.get) if scored else None
+        overall = {
+            "psi_max": scored[worst] if worst else None,
+            "feature": worst,
+            "status": next((s for s in ("drift", "warn", "ok") if s in statuses), "insufficient_data"),
+        }
+    return {"shipments": monitor.shipments, "overall": overall, "features": features}
+
+
+# ======================================================
+# CLI
+# ======================================================
+def main():
+    ap = argparse.ArgumentParser(description="Build the training-data reference for drift monitoring")
+    ap.add_argument("command", choices=["build", "show"])
+    ap.add_argument("--out", help=f"default: {DRIFT_REFERENCE_FILE} in the served model directory ({MODEL_DIR})")
+    ap.add_argument("--shipments", type=int, default=500,
+                    help="training shipments scored for the prediction reference")
+    args = ap.parse_args()
+
+    if args.command == "show":
+        reference = load_drift_reference(args.out)
+        if reference is None:
+            print(f"no usable drift reference at {args.out or DRIFT_REFERENCE_PATH}")
+            return 1
+        report = drift_report(reference["monitor"])
+        print(f"built {reference['built_at']}: {reference['training_rows']} training rows, "
+              f"{reference['scored_shipments']} scored shipments")
+        print(json.dumps(report["features"], indent=2, default=str))
+        return 0
+
+    from ml.notebooks import recommendation_engine as engine
+
+    def score(shipment):
+        top = engine.generate_recommendations(
+            engine.materials_df, engine.co2_model, engine.cost_model, shipment,
+            engine.FEATURES_COST, engine.FEATURES_CO2, top_k=5, keep_scores=True
+        )
+        scores = top.attrs["scores"]
+        return scores["Pred_Cost"], scores["Pred_CO2"]
+
+    t0 = time.perf_counter()
+    reference = compute_reference(engine.df, score, shipments=args.shipments)
+    path = save_drift_reference(reference, args.out, engine.MODEL_DIR)
+    print(f"wrote {path} in {time.perf_counter() - t0:.1f}s "
+          f"({path.stat().st_size / 1024:.0f} KB)")
+    monitor = DriftMonitor.from_dict(reference["state"])
+    for name, sketch in monitor.numeric.items():
+        q = sketch.quantiles
+        print(f"  {name:16s} n {sketch.moments.count:7d}  p01 {q.quantile(0.01):10.4f}  "
+              f"p50 {q.quantile(0.5):10.4f}  p99 {q.quantile(0.99):10.4f}")
+    for name, counter in monitor.categorical.items():
+        print(f"  {name:16s} {len(counter.counts)} values")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+Recommendation explanations (SHAP)
+- One TreeExplainer per loaded model, built lazily and reused
+- One batched SHAP call per model over the returned top-k rows only
+- One-hot columns folded back into their original feature
+- Results memoised by canonical shipment + returned materials
+"""
+
+from collections import OrderedDict
+import threading
+
+import numpy as np
+
+from ml.notebooks.tree_compiler import reference_model
+
+try:
+    import shap
+    SHAP_AVAILABLE = True
+except ImportError:
+    SHAP_AVAILABLE = False
+
+EXPLAIN_CACHE_SIZE = 256
+
+_explainers = {}                 # id(model) -> _ModelExplainer
+_explainers_lock = threading.Lock()
+
+_cache = OrderedDict()           # memo key -> list of per-row explanations
+_cache_lock = threading.Lock()
+
+
+# ======================================================
+# Canonical shipment (memo key)
+# ======================================================
+def canonical_shipment(shipment):
+    """Hashable, order-independent form of a shipment dict."""
+    items = []
+    for k in sorted(shipment):
+        v = shipment[k]
+        if isinstance(v, bool) or v is None:
+            items.append((k, v))
+        elif isinstance(v, (int, float, np.integer, np.floating)):
+            items.append((k, round(float(v), 6)))
+        else:
+            items.append((k, str(v)))
+    return tuple(items)
+
+
+# ======================================================
+# Per-model explainer
+# ======================================================
+def _find_one_hot(transformer):
+    if hasattr(transformer, "categories_"):
+        return transformer
+    for _, step in getattr(transformer, "steps", []):
+        if hasattr(step, "categories_"):
+            return step
+    return None
+
+
+class _ModelExplainer:
+    def __init__(self, model, features):
+        self.model = model  # keeps id(model) stable while cached
+        model = reference_model(model)  # SHAP needs the library model
+        steps = getattr(model, "steps", None)
+        if steps:
+            self.preprocessor = model[:-1] if len(steps) > 1 else None
+            self.estimator = steps[-1][1]
+        else:
+            self.preprocessor = None
+            self.estimator = model
+
+        self.explainer = shap.TreeExplainer(self.estimator)
+        self.base_value = float(np.ravel(self.explainer.expected_value)[0])
+        self.group_names, self.group_index = self._feature_groups(list(features))
+
+    def _feature_groups(self, features):
+        """Map every transformed column to the input feature it came from."""
+        ct = None
+        if self.preprocessor is not None:
+            ct = self.preprocessor.steps[-1][1]
+        if ct is None or not hasattr(ct, "output_indices_"):
+            return features, np.arange(len(features))
+
+        names, index = [], []
+        for name, trans, cols in ct.transformers_:
+            if trans == "drop" or name not in ct.output_indices_:
+                continue
+            sl = ct.output_indices_[name]
+            width = sl.stop - sl.start
+            if width == 0:
+                continue
+            cols = list(cols) if not isinstance(cols, str) else [cols]
+            widths = [1] * len(cols)
+            if width != len(cols):
+                enc = _find_one_hot(trans)
+                widths = [len(c) for c in enc.categories_] if enc is not None else []
+                if sum(widths) != width:
+                    cols, widths = [name], [width]
+            for col, w in zip(cols, widths):
+                if col not in names:
+                    names.append(col)
+                index += [names.index(col)] * w
+        return names, np.asarray(index)
+
+    def contributions(self, X):
+        """(n_rows, n_input_features) SHAP contributions for a frame X."""
+        Xt = self.preprocessor.transform(X) if self.preprocessor is not None else X
+        if hasattr(Xt, "toarray"):
+            Xt = Xt.toarray()
+        values = np.asarray(self.explainer.shap_values(Xt))
+        grouped = np.zeros((values.shape[0], len(self.group_names)))
+        np.add.at(grouped.T, self.group_index, values.T)
+        return grouped
+
+
+def get_explainer(model, features):
+    """Built once per loaded model object."""
+    key = id(model)
+    explainer = _explainers.get(key)
+    if explainer is None:
+        with _explainers_lock:
+            explainer = _explainers.get(key)
+            if explainer is None:
+                explainer = _ModelExplainer(model, features)
+                _explainers[key] = explainer
+    return explainer
+
+
+# ======================================================
+# Public API
+# ======================================================
+def explain_recommendations(top_df, shipment, targets, top_n=5):
+    """
+    Explain the already-selected top rows.
+
+    Args:
+        top_df: frame of the returned recommendations (model features present)
+        shipment: the shipment dict used for scoring
+        targets: {"Pred_Cost": (cost_model, features_cost), ...}
+        top_n: contributions kept per target, largest |value| first
+
+    Returns:
+        list (one per row) of {target: {"base_value", "contributions": [...]}}
+    """
+    if not SHAP_AVAILABLE:
+        raise RuntimeError("shap is not installed")
+
+    material_ids = tuple(top_df["Material_ID"].tolist()) if "Material_ID" in top_df else None
+    key = (
+        canonical_shipment(shipment), material_ids, top_n,
+        tuple((t, id(m)) for t, (m, _) in sorted(targets.items()))
+    )
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    rows = [dict() for _ in range(len(top_df))]
+    for target, (model, features) in targets.items():
+        explainer = get_explainer(model, features)
+        contrib = explainer.contributions(top_df[features])
+        order = np.argsort(-np.abs(contrib), axis=1)[:, :top_n]
+        for i, row_order in enumerate(order):
+            rows[i][target] = {
+                "base_value": round(explainer.base_value, 6),
+                "contributions": [
+                    {"feature": explainer.group_names[j],
+                     "contribution": round(float(contrib[i, j]), 6)}
+                    for j in row_order
+                ],
+            }
+
+    with _cache_lock:
+        _cache[key] = rows
+        while len(_cache) > EXPLAIN_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return rows
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
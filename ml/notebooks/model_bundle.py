@@ -0,0 +1,80 @@
+"""
+Versioned model bundles
+- ml/models/bundles/<version>/ holds cost_model.pkl, co2_model.pkl,
+  features_cost.pkl and features_co2.pkl (the names ml/models uses, so a
+  bundle directory drops in as MODEL_DIR) plus bundle.json: training
+  data, estimator parameters, metrics, fit timings and inference latency
+- MODEL_BUNDLE picks what serving loads: unset → ml/models,
+  "latest" → the newest bundle, a bundle version, or the path of a
+  bundle directory kept elsewhere
+- promote() copies a bundle's files into ml/models (bundle.json too, so
+  the live version is known)
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+MODEL_DIR = PROJECT_ROOT / "ml" / "models"
+BUNDLES_DIR = MODEL_DIR / "bundles"
+BUNDLE_INFO = "bundle.json"
+
+MODEL_FILES = ("cost_model.pkl", "co2_model.pkl", "features_cost.pkl", "features_co2.pkl")
+
+
+def list_bundles(bundles_dir=BUNDLES_DIR):
+    """Bundle directories, oldest first (versions sort by time)."""
+    bundles_dir = Path(bundles_dir)
+    if not bundles_dir.is_dir():
+        return []
+    return sorted(p for p in bundles_dir.iterdir() if (p / BUNDLE_INFO).exists())
+
+
+def resolve_model_dir(bundle=None, model_dir=MODEL_DIR, bundles_dir=BUNDLES_DIR):
+    bundle = os.getenv("MODEL_BUNDLE", "") if bundle is None else bundle
+    if not bundle:
+        return Path(model_dir)
+    if bundle == "latest":
+        bundles = list_bundles(bundles_dir)
+        if not bundles:
+            raise FileNotFoundError(f"MODEL_BUNDLE=latest but {bundles_dir} has no bundles")
+        return bundles[-1]
+    path = Path(bundle) if os.sep in bundle else Path(bundles_dir) / bundle
+    if not (path / BUNDLE_INFO).exists():
+        raise FileNotFoundError(f"No model bundle {bundle!r} in {bundles_dir}")
+    return path
+
+
+def read_bundle_info(model_dir):
+    path = Path(model_dir) / BUNDLE_INFO
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def write_bundle(files, info, version, bundles_dir=BUNDLES_DIR):
+    """
+    files: {file name: writer(path)}. Written to a temporary directory
+    and renamed, so a bundle either exists complete or not at all.
+    """
+    target = Path(bundles_dir) / version
+    if target.exists():
+        raise FileExistsError(f"Bundle {version} already exists")
+    tmp = Path(bundles_dir) / f".{version}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for name, writer in files.items():
+        writer(tmp / name)
+    (tmp / BUNDLE_INFO).write_text(json.dumps({"version": version, **info}, indent=2, default=str))
+    os.replace(tmp, target)
+    return target
+
+
+def promote(bundle_dir, model_dir=MODEL_DIR):
+    """Copy a bundle into model_dir; each file is replaced atomically."""
+    bundle_dir, model_dir = Path(bundle_dir), Path(model_dir)
+    for name in MODEL_FILES + (BUNDLE_INFO,):
+        tmp = model_dir / f".{name}.tmp"
+        shutil.copy2(bundle_dir / name, tmp)
+        os.replace(tmp, model_dir / name)
+    return model_dir
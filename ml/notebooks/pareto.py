@@ -0,0 +1,98 @@
+"""
+Pareto layers over the packaging objectives
+- Objectives: Pred_Cost ↓, Pred_CO2 ↓, Tensile_Strength_MPa ↑, Biodegradable ↑
+- skyline(): sort-filter-skyline. Points are presorted by the sum of
+  their min-max normalised objectives, so a point can only be dominated
+  by points before it; blocks are checked against the skyline found so
+  far, then the few survivors against each other
+- pareto_layers(): peels skylines until enough rows are collected;
+  rank 1 = non-dominated, rank 2 = non-dominated once rank 1 is removed, …
+Only the layers that are returned get computed.
+"""
+
+import os
+
+import numpy as np
+
+# Objective → direction
+PARETO_OBJECTIVES = {
+    "Pred_Cost": "min",
+    "Pred_CO2": "min",
+    "Tensile_Strength_MPa": "max",
+    "Biodegradable": "max",
+}
+
+PARETO_BLOCK_SIZE = int(os.getenv("PARETO_BLOCK_SIZE", 512))
+
+
+def objective_matrix(columns):
+    """(n, objectives) float array, every objective turned into 'lower is better'."""
+    cols = []
+    for name, direction in PARETO_OBJECTIVES.items():
+        values = np.asarray(columns[name], dtype=float)
+        cols.append(values if direction == "min" else -values)
+    return np.column_stack(cols)
+
+
+def _dominated(points, by, chunk=32):
+    """
+    Mask over points: dominated by at least one row of `by`. Rows of `by`
+    are tried a chunk at a time and points drop out once dominated, so
+    strong rows placed first (lowest key) do most of the work.
+    """
+    mask = np.zeros(len(points), dtype=bool)
+    alive = np.arange(len(points))
+    for start in range(0, len(by), chunk):
+        if len(alive) == 0:
+            break
+        b = by[start:start + chunk]
+        p = points[alive]
+        le = np.ones((len(p), len(b)), dtype=bool)
+        ne = np.zeros((len(p), len(b)), dtype=bool)
+        for d in range(points.shape[1]):
+            le &= b[None, :, d] <= p[:, None, d]
+            ne |= b[None, :, d] != p[:, None, d]
+        hit = (le & ne).any(axis=1)
+        mask[alive[hit]] = True
+        alive = alive[~hit]
+    return mask
+
+
+def skyline(points, order):
+    """Positions (from `order`, presorted) of the non-dominated points."""
+    sky = np.empty(0, dtype=np.int64)
+    for start in range(0, len(order), PARETO_BLOCK_SIZE):
+        block = order[start:start + PARETO_BLOCK_SIZE]
+        block = block[~_dominated(points[block], points[sky])]
+        if len(block) > 1:
+            # Survivors against each other; only earlier points can dominate
+            block = block[~_dominated(points[block], points[block])]
+        sky = np.concatenate([sky, block])
+    return sky
+
+
+def pareto_layers(points, min_rows, tiebreak=None):
+    """
+    (order, ranks): row positions layer by layer until at least min_rows
+    are collected (layers are never cut). Within a layer rows are ordered
+    by tiebreak descending when given.
+    """
+    n = len(points)
+    if n == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    lo, hi = points.min(axis=0), points.max(axis=0)
+    key = ((points - lo) / np.where(hi > lo, hi - lo, 1)).sum(axis=1)
+    remaining = np.argsort(key, kind="stable")
+
+    order, ranks = [], []
+    rank = 0
+    while len(remaining) and sum(len(o) for o in order) < min_rows:
+        rank += 1
+        layer = skyline(points, remaining)
+        if tiebreak is not None:
+            layer = layer[np.argsort(-np.asarray(tiebreak)[layer], kind="stable")]
+        order.append(layer)
+        ranks.append(np.full(len(layer), rank))
+        remaining = remaining[~np.isin(remaining, layer)]
+    return np.concatenate(order), np.concatenate(ranks)
@@ -1,11 +1,33 @@
 import pandas as pd
 import numpy as np
 import joblib
+import os
+import sys
+import time
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(PROJECT_ROOT))
 
-MODEL_DIR = PROJECT_ROOT / "ml" / "models"
+from ml.notebooks.explainer import explain_recommendations
+from ml.notebooks.candidate_filter import prefilter_candidates
+from ml.notebooks.scoring import SUSTAINABILITY_WEIGHTS, MAT_SUIT_WEIGHTS
+from ml.notebooks.catalogue import load_frame
+from ml.notebooks.tree_compiler import compile_with_parity, PARITY_SAMPLE_ROWS
+from ml.notebooks.recommendation_grid import load_grid
+from ml.notebooks.rerank import candidate_scores
+from ml.notebooks.pareto import objective_matrix, pareto_layers
+from ml.notebooks.sharded_scoring import ShardedScorer, SHARDED_SORTS, SHARD_MIN_MATERIALS
+from ml.notebooks.score_reference import (
+    load_reference, global_predictions, materials_scores, NORMALIZATIONS
+)
+from ml.notebooks.model_bundle import resolve_model_dir, read_bundle_info
+from ml.notebooks.drift_monitor import load_drift_reference
+from ml.notebooks.results import RecommendationSet
+
+# ml/models, or a trained bundle (MODEL_BUNDLE=<version> | latest)
+MODEL_DIR = resolve_model_dir()
+MODEL_INFO = read_bundle_info(MODEL_DIR)
 DATA_PATH = PROJECT_ROOT / "data" / "processed" / "final_ecopack_dataset_fe.csv"
 
 cost_model = joblib.load(MODEL_DIR / "cost_model.pkl")
@@ -13,8 +35,25 @@ co2_model  = joblib.load(MODEL_DIR / "co2_model.pkl")
 
 FEATURES_COST = joblib.load(MODEL_DIR / "features_cost.pkl")
 FEATURES_CO2 = joblib.load(MODEL_DIR / "features_co2.pkl")
+if MODEL_INFO is not None:
+    print(f"📦 Model bundle {MODEL_INFO['version']} ({MODEL_DIR})")
+
+# Compiled Arrow artifact when fresh (memory-mapped), CSV otherwise
+df = load_frame(DATA_PATH)
 
-df = pd.read_csv(DATA_PATH)
+# Flat NumPy evaluators for the tree models; the joblib models stay as
+# .reference and are used as-is if the parity check fails
+if os.getenv("COMPILED_MODELS", "1") != "0":
+    parity_sample = df.sample(n=min(PARITY_SAMPLE_ROWS, len(df)), random_state=0)
+    parity_sample = parity_sample.assign(
+        Biodegradable=parity_sample["Biodegradable"].map(lambda x: 1 if x == "Yes" else 0)
+    )
+    cost_model = compile_with_parity(cost_model, parity_sample[FEATURES_COST])
+    co2_model = compile_with_parity(co2_model, parity_sample[FEATURES_CO2])
+    for name, model in (("cost", cost_model), ("co2", co2_model)):
+        if getattr(model, "parity", None):
+            print(f"⚡ Compiled {name} model ({model.kind}, {model.forest.n_trees} trees), "
+                  f"parity max |diff| = {model.parity['max_abs_diff']:.2e}")
 
 # Materials dataframe
 materials_df = (
@@ -32,6 +71,32 @@ materials_df = (
     .reset_index(drop=True)
 )
 
+# Precomputed grid (python ml/notebooks/recommendation_grid.py build);
+# only used when it was built from these models and materials
+recommendation_grid = None
+if os.getenv("RECOMMENDATION_GRID", "1") != "0":
+    recommendation_grid = load_grid(model_dir=MODEL_DIR, materials_df=materials_df)
+    if recommendation_grid is not None:
+        print(f"🟩 Recommendation grid loaded ({recommendation_grid.preds.size // 2:,} predictions per model)")
+
+# Parallel sharded scoring once the catalogue outgrows one pandas frame
+sharded_scorer = None
+if len(materials_df) >= SHARD_MIN_MATERIALS:
+    sharded_scorer = ShardedScorer(materials_df, cost_model, co2_model, FEATURES_COST, FEATURES_CO2)
+    print(f"🟧 Sharded scoring: {sharded_scorer.executor} pool, {sharded_scorer.workers} workers")
+
+# Fixed normalisation stats for normalization="global"
+# (python ml/notebooks/score_reference.py build)
+score_reference = load_reference(model_dir=MODEL_DIR)
+if score_reference is not None:
+    print(f"🟪 Score reference loaded (version {score_reference['version']})")
+
+# Training-data sketches for drift monitoring
+# (python ml/notebooks/drift_monitor.py build)
+drift_reference = load_drift_reference(model_dir=MODEL_DIR)
+if drift_reference is not None:
+    print(f"🟫 Drift reference loaded (built {drift_reference['built_at']})")
+
 # Categorical columns + Fragility
 cat_cols = ["Category_item", "Moisture_Sens", "Shipping_Mode", 
             "Packaging_Used", "Material_Name", "Category_material", 
@@ -71,8 +136,119 @@ def generate_recommendations(
     features_cost,
     features_co2,
     top_k=3,
-    sort_by="Sustainability"
+    sort_by="Sustainability",
+    explain=False,
+    explain_top_n=5,
+    constraints=None,
+    prefilter=True,
+    grid=None,
+    normalization="candidates",
+    reference=None,
+    keep_scores=False,
+    keep_predictions=False,
+    scorer=None,
+    as_frame=True
 ):
+    """
+    Top-k recommendations for one shipment: a DataFrame, or with
+    as_frame=False a RecommendationSet (results.py) built straight from
+    the score arrays where no frame is needed. Either carries .attrs
+    (prefilter / grid / normalization / sharding / scores).
+
+    keep_scores puts every candidate's predictions and components in
+    .attrs["scores"] (re-ranking). With normalization="global" that means
+    scoring every candidate, so early termination only runs when it is off.
+    keep_predictions puts just the (Pred_Cost, Pred_CO2) arrays in
+    .attrs["predictions"] (prediction drift); it never turns early
+    termination off, so materials it skipped are NaN there.
+    """
+    if normalization not in NORMALIZATIONS:
+        raise ValueError(f"normalization must be one of {NORMALIZATIONS}")
+    if normalization == "global" and reference is None:
+        raise ValueError("normalization='global' needs reference stats "
+                         "(python ml/notebooks/score_reference.py build)")
+
+    # -----------------------------
+    # Candidate pre-filtering (before any model call)
+    prefilter_stats = None
+    if prefilter or constraints:
+        materials_df, prefilter_stats = prefilter_candidates(
+            materials_df, shipment_inputs, constraints,
+            min_keep=top_k, rules=None if prefilter else []
+        )
+        if materials_df.empty:
+            empty = materials_df.head(0)
+            empty.attrs["prefilter"] = prefilter_stats
+            return _as_result(empty, as_frame)
+
+    t_score = time.perf_counter()
+
+    # -----------------------------
+    # Global normalisation: scores don't depend on the other candidates, so
+    # predictions are cached per (shipment, material) and materials that
+    # can't reach the top-k are never scored
+    if normalization == "global":
+        pred_cost, pred_co2, norm_info = global_predictions(
+            materials_df, shipment_inputs, cost_model, co2_model, features_cost, features_co2,
+            reference, top_k, sort_by, grid=None if explain else grid,
+            early_stop=not keep_scores   # re-ranking needs every material scored
+        )
+        top = recommend_from_predictions(
+            materials_df, shipment_inputs, pred_cost, pred_co2, top_k, sort_by,
+            reference=reference, keep_scores=keep_scores, keep_predictions=keep_predictions,
+            as_frame=as_frame or explain
+        )
+        if explain:
+            top["Explanation"] = _explain(top, shipment_inputs, cost_model, co2_model,
+                                          features_cost, features_co2, explain_top_n)
+        if prefilter_stats is not None:
+            prefilter_stats["scoring_ms"] = norm_info["scoring_ms"]
+            top.attrs["prefilter"] = prefilter_stats
+        top.attrs["normalization"] = norm_info
+        return _as_result(top, as_frame)
+
+    # -----------------------------
+    # Precomputed grid: lookup + interpolation when the shipment is covered,
+    # exact scoring otherwise (explanations need exact predictions to add up)
+    grid_info = None
+    if grid is not None and not explain and sort_by in SCORE_COLUMNS:
+        preds, grid_info = grid.lookup(shipment_inputs, materials_df["Material_ID"].to_numpy())
+        if preds is not None:
+            top = recommend_from_predictions(materials_df, shipment_inputs, *preds, top_k, sort_by,
+                                             keep_scores=keep_scores, keep_predictions=keep_predictions,
+                                             as_frame=as_frame)
+            if prefilter_stats is not None:
+                prefilter_stats["scoring_ms"] = round((time.perf_counter() - t_score) * 1000, 3)
+                top.attrs["prefilter"] = prefilter_stats
+            top.attrs["grid"] = grid_info
+            top.attrs["normalization"] = {"mode": "candidates"}
+            return _as_result(top, as_frame)
+
+    # -----------------------------
+    # Sharded parallel scoring (large catalogues): per-shard top-k, heap merge
+    rows = False
+    if scorer is not None and sort_by in SHARDED_SORTS:
+        try:
+            rows = scorer.rows_for(materials_df)
+        except KeyError:
+            rows = False   # candidates from another catalogue: score them here
+    if rows is not False:
+        order, pred_cost, pred_co2, shard_info = scorer.score(shipment_inputs, top_k, sort_by, rows=rows)
+        top = recommend_from_predictions(materials_df, shipment_inputs, pred_cost, pred_co2, top_k, sort_by,
+                                         keep_scores=keep_scores, keep_predictions=keep_predictions,
+                                         order=order, as_frame=as_frame or explain)
+        if explain:
+            top["Explanation"] = _explain(top, shipment_inputs, cost_model, co2_model,
+                                          features_cost, features_co2, explain_top_n)
+        if prefilter_stats is not None:
+            prefilter_stats["scoring_ms"] = round((time.perf_counter() - t_score) * 1000, 3)
+            top.attrs["prefilter"] = prefilter_stats
+        if grid_info is not None:
+            top.attrs["grid"] = grid_info
+        top.attrs["sharding"] = shard_info
+        top.attrs["normalization"] = {"mode": "candidates"}
+        return _as_result(top, as_frame)
+
     df = expand_shipment_with_materials(shipment_inputs, materials_df)
 
     # -----------------------------
@@ -107,6 +283,11 @@ def generate_recommendations(
     df["Pred_Cost"] = cost_model.predict(X_cost)
     df["Pred_CO2"]  = co2_model.predict(X_co2)
 
+    if prefilter_stats is not None:
+        per_row_ms = (time.perf_counter() - t_score) * 1000 / max(len(df), 1)
+        prefilter_stats["scoring_ms"] = round(per_row_ms * len(df), 3)
+        prefilter_stats["est_time_saved_ms"] = round(per_row_ms * prefilter_stats["pruned"], 3)
+
     # -----------------------------
     # Normalization helpers
     def normalize(s):
@@ -116,18 +297,138 @@ def generate_recommendations(
     df["Cost_Eff"]   = 1 - normalize(df["Pred_Cost"])
 
     df["Mat_Suit"] = (
-        normalize(df["Tensile_Strength_MPa"]) * 0.6 +
-        normalize(df["Density_kg_m3"]) * 0.4
+        normalize(df["Tensile_Strength_MPa"]) * MAT_SUIT_WEIGHTS["Tensile_Strength_MPa"] +
+        normalize(df["Density_kg_m3"]) * MAT_SUIT_WEIGHTS["Density_kg_m3"]
     )
 
     df["Sustainability"] = (
-        df["Env_Impact"] * 0.5 +
-        df["Cost_Eff"] * 0.3 +
-        df["Biodegradable"] * 0.2
+        df["Env_Impact"] * SUSTAINABILITY_WEIGHTS["Env_Impact"] +
+        df["Cost_Eff"] * SUSTAINABILITY_WEIGHTS["Cost_Eff"] +
+        df["Biodegradable"] * SUSTAINABILITY_WEIGHTS["Biodegradable"]
     )
 
-    ascending = sort_by in ["Pred_Cost", "Pred_CO2"]
-    return df.sort_values(sort_by, ascending=ascending).head(top_k) 
+    if sort_by == "Pareto":
+        # Whole Pareto layers (at least top_k rows), best Sustainability first within a layer
+        order, ranks = pareto_layers(objective_matrix(df), top_k, tiebreak=df["Sustainability"].to_numpy())
+        top = df.iloc[order].assign(Pareto_Rank=ranks)
+    else:
+        ascending = sort_by in ["Pred_Cost", "Pred_CO2"]
+        top = df.sort_values(sort_by, ascending=ascending, kind="stable").head(top_k)
+
+    # Every candidate's predictions + components, for /api/rerank
+    if keep_scores:
+        top.attrs["scores"] = candidate_scores(df)
+
+    # -----------------------------
+    # Optional SHAP explanations (top-k rows only, memoised)
+    if explain:
+        top = top.copy()
+        top["Explanation"] = _explain(top, shipment_inputs, cost_model, co2_model,
+                                      features_cost, features_co2, explain_top_n)
+    if keep_predictions:
+        top.attrs["predictions"] = (df["Pred_Cost"].to_numpy(), df["Pred_CO2"].to_numpy())
+    if prefilter_stats is not None:
+        top.attrs["prefilter"] = prefilter_stats
+    if grid_info is not None:
+        top.attrs["grid"] = grid_info
+    top.attrs["normalization"] = {"mode": "candidates"}
+    return _as_result(top, as_frame)
+
+
+def _as_result(top, as_frame):
+    if as_frame or isinstance(top, RecommendationSet):
+        return top
+    return RecommendationSet.from_frame(top)
+
+
+def _explain(top, shipment_inputs, cost_model, co2_model, features_cost, features_co2, top_n):
+    return explain_recommendations(
+        top, shipment_inputs,
+        {"Pred_Cost": (cost_model, features_cost),
+         "Pred_CO2": (co2_model, features_co2)},
+        top_n=top_n
+    )
+
+
+SCORE_COLUMNS = ["Pred_Cost", "Pred_CO2", "Env_Impact", "Cost_Eff", "Mat_Suit", "Sustainability"]
+
+# Scores from ready-made predictions (grid hits)
+def recommend_from_predictions(materials_df, shipment_inputs, pred_cost, pred_co2,
+                               top_k=3, sort_by="Sustainability", reference=None, keep_scores=False,
+                               keep_predictions=False, order=None, as_frame=True):
+    """
+    Same frame generate_recommendations builds, scored on arrays;
+    only the top-k rows are materialised. With reference stats the scores
+    are normalised globally and NaN predictions (skipped) sort last.
+    order: ready-made top-k positions (sharded scoring's heap merge).
+    as_frame=False: the columns as a RecommendationSet, no DataFrame.
+    """
+    bio = (materials_df["Biodegradable"] == "Yes").to_numpy().astype("int64")
+
+    def norm(a):
+        return (a - a.min()) / (a.max() - a.min() + 1e-6)
+
+    if reference is not None:
+        scores = materials_scores(materials_df, pred_cost, pred_co2, reference)
+    else:
+        scores = {"Pred_Cost": np.asarray(pred_cost, float), "Pred_CO2": np.asarray(pred_co2, float)}
+        scores["Env_Impact"] = 1 - norm(scores["Pred_CO2"])
+        scores["Cost_Eff"] = 1 - norm(scores["Pred_Cost"])
+        scores["Mat_Suit"] = (
+            norm(materials_df["Tensile_Strength_MPa"].to_numpy(float)) * MAT_SUIT_WEIGHTS["Tensile_Strength_MPa"] +
+            norm(materials_df["Density_kg_m3"].to_numpy(float)) * MAT_SUIT_WEIGHTS["Density_kg_m3"]
+        )
+        scores["Sustainability"] = (
+            scores["Env_Impact"] * SUSTAINABILITY_WEIGHTS["Env_Impact"] +
+            scores["Cost_Eff"] * SUSTAINABILITY_WEIGHTS["Cost_Eff"] +
+            bio * SUSTAINABILITY_WEIGHTS["Biodegradable"]
+        )
+
+    ranks = None
+    if order is not None:
+        order = np.asarray(order)
+    elif sort_by == "Pareto":
+        order, ranks = pareto_layers(
+            objective_matrix({**scores, "Biodegradable": bio,
+                              "Tensile_Strength_MPa": materials_df["Tensile_Strength_MPa"]}),
+            top_k, tiebreak=scores["Sustainability"]
+        )
+    else:
+        # Stable, like the exact path: tied scores stay in catalogue order, so skipping
+        # materials that can't reach the top-k (early termination) can't reorder them
+        ascending = sort_by in ["Pred_Cost", "Pred_CO2"]
+        order = pd.Series(scores[sort_by]).sort_values(ascending=ascending, kind="stable").index[:top_k].to_numpy()
+
+    # One constructor call; columns in the exact path's order
+    k = len(order)
+    columns = {key: [value] * k for key, value in shipment_inputs.items()}
+    for col in materials_df.columns:
+        if col != "_key":   # left behind by expand_shipment_with_materials
+            columns[col] = materials_df[col].to_numpy()[order]
+    columns["Item_Volume_m3"] = [(
+        shipment_inputs["Length_cm"] / 100
+        * shipment_inputs["Width_cm"] / 100
+        * shipment_inputs["Height_cm"] / 100
+    )] * k
+    columns["Volumetric_Weight_kg"] = [(
+        shipment_inputs["Length_cm"]
+        * shipment_inputs["Width_cm"]
+        * shipment_inputs["Height_cm"]
+    ) / 5000] * k
+    columns["Biodegradable"] = bio[order]
+    for col in SCORE_COLUMNS:
+        columns[col] = scores[col][order]
+    if ranks is not None:
+        columns["Pareto_Rank"] = ranks
+    top = pd.DataFrame(columns, index=order) if as_frame else RecommendationSet(columns)
+    if keep_scores:
+        top.attrs["scores"] = candidate_scores({
+            **scores, "Biodegradable": bio,
+            "Material_ID": materials_df["Material_ID"], "Material_Name": materials_df["Material_Name"],
+        })
+    if keep_predictions:
+        top.attrs["predictions"] = (scores["Pred_Cost"], scores["Pred_CO2"])
+    return top
     
 # Example usage
 shipment_input = {
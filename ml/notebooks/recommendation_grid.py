@@ -0,0 +1,395 @@
+"""
+Precomputed recommendation grid
+- Offline: evaluate both models over a grid of the shipment space
+    discrete    Category_item × Shipping_Mode × Fragility × Moisture_Sens
+    continuous  Distance_km × Weight_kg × Volume_cm3 (L·W·H)
+  and store Pred_Cost / Pred_CO2 per material per grid point (float32)
+- Per grid cell: interpolation error measured against exact scoring at
+  the cell centre, max over materials and both targets, as
+    score error      change in the normalised Env_Impact / Cost_Eff
+                     components (normalize() over all materials)
+    prediction error |interpolated − exact| / |exact| of Pred_Cost / Pred_CO2
+- Online: lookup + trilinear interpolation along the continuous axes.
+  lookup() returns None (→ exact model scoring) when the shipment is
+  off-grid, a material is not in the grid, or the cell error is above
+  the bound
+The models only see the box through its volume (Item_Volume_m3,
+Volumetric_Weight_kg), so one volume axis covers every L/W/H.
+
+Build:    python ml/notebooks/recommendation_grid.py build [--points 12]
+Check:    python ml/notebooks/recommendation_grid.py status
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from ml.notebooks.scoring import MATERIAL_COLS, predict_matrix
+
+GRID_PATH = PROJECT_ROOT / "data" / "grid" / "recommendation_grid.npz"
+GRID_SCHEMA_VERSION = "2"
+
+# Cells whose measured centre error (change in the 0–1 Env_Impact /
+# Cost_Eff components) is above this fall back to exact scoring
+GRID_MAX_SCORE_ERROR = float(os.getenv("GRID_MAX_SCORE_ERROR", 0.05))
+GRID_MAX_PRED_ERROR = float(os.getenv("GRID_MAX_PRED_ERROR", 0.10))
+GRID_BUILD_CHUNK_ROWS = 250_000      # shipment × material rows per predict call
+
+DISCRETE_AXES = ["Category_item", "Shipping_Mode", "Fragility", "Moisture_Sens"]
+
+# name → (spacing, start, stop); points per axis come from the builder
+CONTINUOUS_AXES = {
+    "Distance_km": ("linear", 50.0, 3000.0),
+    "Weight_kg":   ("log", 0.1, 80.0),
+    "Volume_cm3":  ("log", 10.0, 2_000_000.0),
+}
+
+logger = logging.getLogger(__name__)
+
+
+# ======================================================
+# Fingerprints (grid is only valid for the models + materials it was built from)
+# ======================================================
+def file_stamp(path):
+    stat = Path(path).stat()
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return {"sha256": h.hexdigest(), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def stamp_matches(path, stamp):
+    path = Path(path)
+    if not path.exists():
+        return False
+    stat = path.stat()
+    if stat.st_size == stamp["size"] and stat.st_mtime_ns == stamp["mtime_ns"]:
+        return True
+    return file_stamp(path)["sha256"] == stamp["sha256"]
+
+
+def materials_fingerprint(materials_df):
+    cols = [c for c in MATERIAL_COLS if c in materials_df]
+    frame = materials_df[cols].reset_index(drop=True)
+    return hashlib.sha256(pd.util.hash_pandas_object(frame, index=False).values.tobytes()).hexdigest()
+
+
+# ======================================================
+# Axes
+# ======================================================
+def axis_values(spacing, start, stop, points):
+    if spacing == "log":
+        return np.geomspace(start, stop, points)
+    return np.linspace(start, stop, points)
+
+
+def _coord(spacing, values):
+    """Coordinate the interpolation is linear in."""
+    return np.log(values) if spacing == "log" else np.asarray(values, dtype=float)
+
+
+def shipment_volume_cm3(shipment):
+    if all(k in shipment for k in ("Length_cm", "Width_cm", "Height_cm")):
+        return float(shipment["Length_cm"]) * float(shipment["Width_cm"]) * float(shipment["Height_cm"])
+    return float(shipment["Item_Volume_m3"]) * 1e6
+
+
+def _shipment_frame(discrete_combos, continuous):
+    """One row per (discrete combo, continuous grid point), C-order."""
+    names = list(continuous)
+    mesh = np.meshgrid(*(continuous[n] for n in names), indexing="ij")
+    points = {n: m.ravel() for n, m in zip(names, mesh)}
+    n_points = len(points[names[0]])
+
+    frame = {}
+    for i, axis in enumerate(DISCRETE_AXES):
+        frame[axis] = np.repeat([c[i] for c in discrete_combos], n_points)
+    for n in names:
+        frame[n] = np.tile(points[n], len(discrete_combos))
+    df = pd.DataFrame(frame)
+    df["Item_Volume_m3"] = df["Volume_cm3"] / 1e6
+    df["Volumetric_Weight_kg"] = df["Volume_cm3"] / 5000
+    return df.drop(columns="Volume_cm3")
+
+
+def _centres(continuous, spacing):
+    out = {}
+    for n, values in continuous.items():
+        if spacing[n] == "log":
+            out[n] = np.sqrt(values[:-1] * values[1:])
+        else:
+            out[n] = (values[:-1] + values[1:]) / 2
+    return out
+
+
+# ======================================================
+# Build
+# ======================================================
+def _predict_points(shipments, materials, cost_model, co2_model, features_cost, features_co2):
+    """(S, M, 2) float32 Pred_Cost / Pred_CO2, scored in chunks."""
+    M = len(materials)
+    out = np.empty((len(shipments), M, 2), dtype=np.float32)
+    chunk = max(1, GRID_BUILD_CHUNK_ROWS // M)
+    for start in range(0, len(shipments), chunk):
+        part = shipments.iloc[start:start + chunk]
+        pred_cost, pred_co2, _ = predict_matrix(
+            part, materials, cost_model, co2_model, features_cost, features_co2
+        )
+        out[start:start + len(part), :, 0] = pred_cost
+        out[start:start + len(part), :, 1] = pred_co2
+    return out
+
+
+def _normalize_materials(a):
+    """normalize() from the engine, over the material axis."""
+    lo = a.min(axis=-2, keepdims=True)
+    hi = a.max(axis=-2, keepdims=True)
+    return (a - lo) / (hi - lo + 1e-6)
+
+
+def _trilinear_centres(preds):
+    """Interpolated value at every cell centre: mean of the 8 corners."""
+    return (
+        preds[:, :-1, :-1, :-1] + preds[:, 1:, :-1, :-1] +
+        preds[:, :-1, 1:, :-1] + preds[:, :-1, :-1, 1:] +
+        preds[:, 1:, 1:, :-1] + preds[:, 1:, :-1, 1:] +
+        preds[:, :-1, 1:, 1:] + preds[:, 1:, 1:, 1:]
+    ) / 8
+
+
+def build_grid(materials_df, cost_model, co2_model, features_cost, features_co2,
+               discrete, points=12, model_dir=None, out_path=GRID_PATH, log=print):
+    """
+    discrete: {axis: [values]} for every DISCRETE_AXES entry
+    points:   grid points per continuous axis (int or {axis: int})
+    """
+    t0 = time.perf_counter()
+    materials = materials_df[[c for c in MATERIAL_COLS if c in materials_df]].reset_index(drop=True)
+    if not isinstance(points, dict):
+        points = {n: points for n in CONTINUOUS_AXES}
+    spacing = {n: CONTINUOUS_AXES[n][0] for n in CONTINUOUS_AXES}
+    continuous = {
+        n: axis_values(s, a, b, points[n]) for n, (s, a, b) in CONTINUOUS_AXES.items()
+    }
+    combos = list(itertools.product(*(discrete[a] for a in DISCRETE_AXES)))
+    shape = [len(combos)] + [len(continuous[n]) for n in CONTINUOUS_AXES]
+    M = len(materials)
+    log(f"Grid: {len(combos)} discrete combos × {' × '.join(str(s) for s in shape[1:])} "
+        f"points × {M} materials = {np.prod(shape) * M:,} predictions per model")
+
+    preds = _predict_points(
+        _shipment_frame(combos, continuous), materials,
+        cost_model, co2_model, features_cost, features_co2
+    ).reshape(shape + [M, 2])
+    log(f"  grid points scored in {time.perf_counter() - t0:.1f}s")
+
+    # Interpolation error at cell centres, against exact scoring
+    t1 = time.perf_counter()
+    centres = _centres(continuous, spacing)
+    exact = _predict_points(
+        _shipment_frame(combos, centres), materials,
+        cost_model, co2_model, features_cost, features_co2
+    ).reshape([len(combos)] + [len(centres[n]) for n in CONTINUOUS_AXES] + [M, 2])
+    interp = _trilinear_centres(preds)
+    score_err = np.abs(_normalize_materials(interp) - _normalize_materials(exact))
+    pred_err = np.abs(interp - exact) / np.maximum(np.abs(exact), 1e-3)
+    cell_error = np.stack(
+        [score_err.max(axis=(-2, -1)), pred_err.max(axis=(-2, -1))], axis=-1
+    ).astype(np.float32)
+    usable = (cell_error[..., 0] <= GRID_MAX_SCORE_ERROR) & (cell_error[..., 1] <= GRID_MAX_PRED_ERROR)
+    log(f"  cell centres scored in {time.perf_counter() - t1:.1f}s; cells within bounds "
+        f"(score {GRID_MAX_SCORE_ERROR}, prediction {GRID_MAX_PRED_ERROR:.0%}): {usable.mean():.1%}")
+
+    meta = {
+        "schema_version": GRID_SCHEMA_VERSION,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "discrete": {a: [v.item() if hasattr(v, "item") else v for v in discrete[a]] for a in DISCRETE_AXES},
+        "continuous": {n: {"spacing": spacing[n], "values": continuous[n].tolist()} for n in CONTINUOUS_AXES},
+        "materials_sha256": materials_fingerprint(materials),
+        "models": {},
+        "features_cost": list(features_cost),
+        "features_co2": list(features_co2),
+        "build_s": round(time.perf_counter() - t0, 2),
+    }
+    if model_dir is not None:
+        for name in ("cost_model.pkl", "co2_model.pkl"):
+            meta["models"][name] = file_stamp(Path(model_dir) / name)
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_name(out_path.stem + ".tmp.npz")
+    np.savez(
+        tmp, preds=preds, cell_error=cell_error,
+        material_ids=materials["Material_ID"].to_numpy(dtype=float),
+        meta=np.array(json.dumps(meta)),
+    )
+    tmp.replace(out_path)
+    log(f"  wrote {out_path} ({out_path.stat().st_size / 1e6:.1f} MB)")
+    return out_path
+
+
+# ======================================================
+# Lookup
+# ======================================================
+class RecommendationGrid:
+    def __init__(self, preds, cell_error, material_ids, meta):
+        self.preds = preds
+        self.cell_error = cell_error
+        self.meta = meta
+        self.max_score_error = GRID_MAX_SCORE_ERROR
+        self.max_pred_error = GRID_MAX_PRED_ERROR
+
+        self.discrete_index = [
+            {self._key(v): i for i, v in enumerate(meta["discrete"][a])} for a in DISCRETE_AXES
+        ]
+        self.discrete_shape = [len(meta["discrete"][a]) for a in DISCRETE_AXES]
+        self.axes = []       # (name, spacing, grid coords)
+        for name in CONTINUOUS_AXES:
+            axis = meta["continuous"][name]
+            self.axes.append((name, axis["spacing"], _coord(axis["spacing"], np.asarray(axis["values"]))))
+        self.material_col = {float(m): j for j, m in enumerate(material_ids)}
+
+    @staticmethod
+    def _key(value):
+        if isinstance(value, (bool, np.bool_)):
+            return bool(value)
+        if isinstance(value, (int, float, np.integer, np.floating)):
+            return float(value)
+        return str(value)
+
+    def _discrete_cell(self, shipment):
+        idx = []
+        for axis, index in zip(DISCRETE_AXES, self.discrete_index):
+            i = index.get(self._key(shipment.get(axis)))
+            if i is None:
+                return None, axis
+            idx.append(i)
+        return int(np.ravel_multi_index(idx, self.discrete_shape)), None
+
+    def _continuous_value(self, name, shipment):
+        return shipment_volume_cm3(shipment) if name == "Volume_cm3" else float(shipment[name])
+
+    def lookup(self, shipment, material_ids):
+        """
+        Returns ((pred_cost, pred_co2) arrays aligned with material_ids, info),
+        or (None, info) when exact scoring is needed; info["reason"] says why.
+        """
+        t0 = time.perf_counter()
+
+        d, axis = self._discrete_cell(shipment)
+        if d is None:
+            return None, {"hit": False, "reason": f"off-grid: {axis}"}
+
+        lo, w = [], []
+        for name, spacing, coords in self.axes:
+            x = _coord(spacing, self._continuous_value(name, shipment))
+            if not coords[0] <= x <= coords[-1]:
+                return None, {"hit": False, "reason": f"off-grid: {name}"}
+            i = min(int(np.searchsorted(coords, x, side="right")) - 1, len(coords) - 2)
+            lo.append(i)
+            w.append((x - coords[i]) / (coords[i + 1] - coords[i]))
+
+        score_err, pred_err = (float(e) for e in self.cell_error[(d, *lo)])
+        errors = {"cell_score_error": round(score_err, 4), "cell_pred_error": round(pred_err, 4)}
+        if score_err > self.max_score_error or pred_err > self.max_pred_error:
+            return None, {"hit": False, "reason": "error bound", **errors}
+
+        cols = [self.material_col.get(float(m)) for m in material_ids]
+        if any(c is None for c in cols):
+            return None, {"hit": False, "reason": "material not in grid"}
+
+        i, j, k = lo
+        corners = self.preds[d, i:i + 2, j:j + 2, k:k + 2][:, :, :, cols, :]
+        weights = np.einsum("i,j,k->ijk", [1 - w[0], w[0]], [1 - w[1], w[1]], [1 - w[2], w[2]])
+        values = np.tensordot(weights, corners.astype(np.float64), axes=3)
+        return (values[:, 0], values[:, 1]), {
+            "hit": True,
+            **errors,
+            "lookup_ms": round((time.perf_counter() - t0) * 1000, 4),
+        }
+
+
+def grid_status(path=GRID_PATH, model_dir=None, materials_df=None):
+    """'fresh', 'missing', 'schema', 'models' or 'materials' (what changed)."""
+    path = Path(path)
+    if not path.exists():
+        return "missing", None
+    with np.load(path) as data:
+        meta = json.loads(str(data["meta"]))
+    if meta.get("schema_version") != GRID_SCHEMA_VERSION:
+        return "schema", meta
+    if model_dir is not None:
+        for name, stamp in meta["models"].items():
+            if not stamp_matches(Path(model_dir) / name, stamp):
+                return "models", meta
+    if materials_df is not None and materials_fingerprint(materials_df) != meta["materials_sha256"]:
+        return "materials", meta
+    return "fresh", meta
+
+
+def load_grid(path=GRID_PATH, model_dir=None, materials_df=None):
+    """RecommendationGrid if built for these models and materials, else None."""
+    try:
+        status, meta = grid_status(path, model_dir, materials_df)
+        if status != "fresh":
+            if status != "missing":
+                logger.warning(f"Recommendation grid is stale ({status}); using exact scoring")
+            return None
+        with np.load(path) as data:
+            return RecommendationGrid(data["preds"], data["cell_error"], data["material_ids"], meta)
+    except Exception as e:
+        logger.warning(f"Could not load recommendation grid: {e}")
+        return None
+
+
+# ======================================================
+# CLI
+# ======================================================
+def main():
+    ap = argparse.ArgumentParser(description="Build the precomputed recommendation grid")
+    ap.add_argument("command", choices=["build", "status"])
+    ap.add_argument("--points", type=int, default=12, help="grid points per continuous axis")
+    ap.add_argument("--out", default=str(GRID_PATH))
+    args = ap.parse_args()
+
+    os.environ.setdefault("RECOMMENDATION_GRID", "0")    # don't load the grid being rebuilt
+    from ml.notebooks import recommendation_engine as engine
+
+    if args.command == "status":
+        status, meta = grid_status(args.out, engine.MODEL_DIR, engine.materials_df)
+        print(f"{status:9s} {args.out}")
+        if meta:
+            print(f"built {meta['built_at']} in {meta['build_s']}s")
+        return 0 if status == "fresh" else 1
+
+    df = engine.df
+    discrete = {
+        "Category_item": sorted(df["Category_item"].unique().tolist()),
+        "Shipping_Mode": sorted(df["Shipping_Mode"].unique().tolist()),
+        "Fragility":     list(range(1, 11)),
+        "Moisture_Sens": [False, True],
+    }
+    build_grid(
+        engine.materials_df, engine.cost_model, engine.co2_model,
+        engine.FEATURES_COST, engine.FEATURES_CO2, discrete,
+        points=args.points, model_dir=engine.MODEL_DIR, out_path=args.out
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
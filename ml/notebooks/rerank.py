@@ -0,0 +1,165 @@
+"""
+Re-ranking stored results with custom objective weights
+- candidate_scores(): compact per-material arrays (predictions + the
+  normalised components) kept from a generate_recommendations call
+- ResultStore: in-memory LRU of those arrays by result id (with a TTL),
+  owned by the session that produced them and bounded by bytes
+  (RERANK_STORE_MAX_MB); results over RERANK_MAX_CANDIDATES candidates
+  aren't stored. Per process, so under several gunicorn workers a
+  re-rank that lands on another worker finds nothing
+- rerank(): one matrix product for any number of weight vectors, then a
+  row-wise top-k; no model calls
+Scores are Σ weight × component over Env_Impact, Cost_Eff, Biodegradable
+and Mat_Suit; the default weights reproduce the Sustainability ranking.
+"""
+
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from ml.notebooks.scoring import SUSTAINABILITY_WEIGHTS
+
+COMPONENTS = ["Env_Impact", "Cost_Eff", "Biodegradable", "Mat_Suit"]
+DEFAULT_WEIGHTS = {**SUSTAINABILITY_WEIGHTS, "Mat_Suit": 0.0}
+
+RERANK_STORE_SIZE = int(os.getenv("RERANK_STORE_SIZE", 2000))        # stored results
+RERANK_STORE_MAX_MB = float(os.getenv("RERANK_STORE_MAX_MB", 256))    # their arrays, per process
+RERANK_MAX_CANDIDATES = int(os.getenv("RERANK_MAX_CANDIDATES", 50_000))
+RERANK_TTL_SECONDS = int(os.getenv("RERANK_TTL_SECONDS", 6 * 3600))
+RERANK_MAX_WEIGHT_VECTORS = int(os.getenv("RERANK_MAX_WEIGHT_VECTORS", 10_000))
+
+
+# ======================================================
+# Stored candidates
+# ======================================================
+def candidate_scores(columns):
+    """
+    columns: DataFrame or dict with Material_ID, Material_Name,
+    Pred_Cost, Pred_CO2 and the COMPONENTS, one entry per candidate.
+    """
+    out = {
+        "Material_ID": np.asarray(columns["Material_ID"]),
+        "Material_Name": np.asarray(columns["Material_Name"], dtype=object),
+        "Pred_Cost": np.asarray(columns["Pred_Cost"], dtype=float),
+        "Pred_CO2": np.asarray(columns["Pred_CO2"], dtype=float),
+    }
+    # (components, materials), ready for the weight product
+    out["matrix"] = np.vstack([np.asarray(columns[c], dtype=float) for c in COMPONENTS])
+    return out
+
+
+def scores_nbytes(scores):
+    # Names count as pointers: the strings themselves are the catalogue's
+    return sum(a.nbytes for a in scores.values())
+
+
+class ResultStore:
+    def __init__(self, max_entries=RERANK_STORE_SIZE, ttl_seconds=RERANK_TTL_SECONDS,
+                 max_bytes=int(RERANK_STORE_MAX_MB * 1024 * 1024), max_candidates=RERANK_MAX_CANDIDATES):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_candidates = max_candidates
+        self.nbytes = 0
+        self._data = OrderedDict()     # result id -> (expires_at, owner, scores, nbytes)
+        self._lock = threading.Lock()
+
+    def put(self, scores, owner):
+        """New result id, or None when the result has too many candidates to keep."""
+        if not owner:
+            raise ValueError("Stored results need an owner (session id)")
+        size = scores_nbytes(scores)
+        if len(scores["Material_ID"]) > self.max_candidates or size > self.max_bytes:
+            return None
+        result_id = secrets.token_urlsafe(12)
+        with self._lock:
+            self._data[result_id] = (time.monotonic() + self.ttl_seconds, owner, scores, size)
+            self.nbytes += size
+            while len(self._data) > self.max_entries or self.nbytes > self.max_bytes:
+                self.nbytes -= self._data.popitem(last=False)[1][3]
+        return result_id
+
+    def get(self, result_id, owner):
+        """Stored scores, or None if unknown, expired or owned by someone else."""
+        with self._lock:
+            entry = self._data.get(result_id)
+            if entry is None:
+                return None
+            expires_at, entry_owner, scores, size = entry
+            if time.monotonic() > expires_at:
+                del self._data[result_id]
+                self.nbytes -= size
+                return None
+            if entry_owner != owner:
+                return None
+            self._data.move_to_end(result_id)
+            return scores
+
+    def __len__(self):
+        return len(self._data)
+
+
+result_store = ResultStore()
+
+
+# ======================================================
+# Re-ranking
+# ======================================================
+def parse_weights(weights):
+    """dict or list of dicts -> (V, len(COMPONENTS)) array; missing keys are 0."""
+    if isinstance(weights, dict):
+        weights = [weights]
+    if not isinstance(weights, list) or not weights:
+        raise ValueError("weights must be an object or a non-empty list of objects")
+    if len(weights) > RERANK_MAX_WEIGHT_VECTORS:
+        raise ValueError(f"At most {RERANK_MAX_WEIGHT_VECTORS} weight vectors per request")
+
+    W = np.zeros((len(weights), len(COMPONENTS)))
+    for i, w in enumerate(weights):
+        if not isinstance(w, dict):
+            raise ValueError("Each weight vector must be an object")
+        unknown = set(w) - set(COMPONENTS)
+        if unknown:
+            raise ValueError(f"Unknown weight(s): {', '.join(sorted(unknown))}; use {COMPONENTS}")
+        for j, c in enumerate(COMPONENTS):
+            value = float(w.get(c, 0.0))
+            if not np.isfinite(value) or value < 0:
+                raise ValueError(f"Weight {c} must be a non-negative number")
+            W[i, j] = value
+    return W
+
+
+def rerank(scores, W, top_k=3):
+    """(indices, values), each (V, k): best materials per weight vector."""
+    S = W @ scores["matrix"]                      # (V, M)
+    S = np.where(np.isnan(S), -np.inf, S)
+    k = min(top_k, S.shape[1])
+    part = np.argpartition(-S, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(-S, part, axis=1).argsort(axis=1, kind="stable")
+    idx = np.take_along_axis(part, order, axis=1)
+    return idx, np.take_along_axis(S, idx, axis=1)
+
+
+def rerank_records(scores, W, top_k=3):
+    """JSON-ready rankings, one list per weight vector."""
+    idx, values = rerank(scores, W, top_k)
+    comps = scores["matrix"]
+    # Materials repeat across weight vectors; build each record once
+    base = {
+        i: {
+            "Material_ID": scores["Material_ID"][i].item(),
+            "Material_Name": scores["Material_Name"][i],
+            "Pred_Cost": float(scores["Pred_Cost"][i]),
+            "Pred_CO2": float(scores["Pred_CO2"][i]),
+            **{c: float(comps[j, i]) for j, c in enumerate(COMPONENTS)},
+        }
+        for i in np.unique(idx).tolist()
+    }
+    return [
+        [{**base[i], "Score": round(v, 6)} for i, v in zip(row_idx, row_vals)]
+        for row_idx, row_vals in zip(idx.tolist(), values.tolist())
+    ]
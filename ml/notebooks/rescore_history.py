@@ -0,0 +1,314 @@
+"""
+Historical re-scoring job
+-------------------------
+Re-scores every historical shipment through the recommendation models
+and compares the recommended top-1 / top-k against what was shipped.
+
+- Chunks of shipments are scored in a process pool; each chunk is one
+  vectorized (shipments × materials) prediction per model
+- Every finished chunk is written atomically to
+  <out>/shipments/part-NNNNN.parquet, so a re-run resumes from the last
+  completed chunk
+- Aggregated savings by category, shipping mode and material are
+  written next to them once all chunks are done
+
+Usage:
+    python ml/notebooks/rescore_history.py --workers 4 --chunk-size 500
+    python ml/notebooks/rescore_history.py --source db   # feature_dataset table
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(PROJECT_ROOT))
+
+from ml.notebooks.scoring import MATERIAL_COLS, cross_features, predict_matrix, top_indices
+from ml.notebooks.tree_compiler import compile_with_parity
+
+MODEL_DIR = PROJECT_ROOT / "ml" / "models"
+DATA_PATH = PROJECT_ROOT / "data" / "processed" / "final_ecopack_dataset_fe.csv"
+DEFAULT_OUT_DIR = PROJECT_ROOT / "data" / "rescoring"
+
+SHIPMENT_COLS = [
+    "Category_item", "Weight_kg", "Volumetric_Weight_kg", "Item_Volume_m3",
+    "Fragility", "Moisture_Sens", "Shipping_Mode", "Distance_km",
+]
+ACTUAL_COLS = ["Packaging_Used", "Material_ID", "Cost_USD", "CO2_Emission_kg_item"]
+
+# feature_dataset (sql/schema.sql) → dataset column names
+DB_COLUMN_MAP = {
+    "category_item": "Category_item", "weight_kg": "Weight_kg",
+    "volumetric_weight_kg": "Volumetric_Weight_kg", "item_volume_m3": "Item_Volume_m3",
+    "fragility": "Fragility", "moisture_sens": "Moisture_Sens",
+    "shipping_mode": "Shipping_Mode", "distance_km": "Distance_km",
+    "packaging_used": "Packaging_Used", "material_id": "Material_ID",
+    "cost_usd": "Cost_USD", "co2_emission_kg_item": "CO2_Emission_kg_item",
+    "material_name": "Material_Name", "category_material": "Category_material",
+    "density_kg_m3": "Density_kg_m3", "tensile_strength_mpa": "Tensile_Strength_MPa",
+    "cost_per_kg": "Cost_per_kg", "co2_emission_kg_material": "CO2_Emission_kg_material",
+    "biodegradable": "Biodegradable",
+}
+
+
+# ======================================================
+# Inputs
+# ======================================================
+def load_history(source="csv", path=DATA_PATH):
+    if source == "db":
+        sys.path.append(str(PROJECT_ROOT / "backend"))
+        from db import get_db
+        db = get_db()
+        try:
+            with db.cursor() as cur:
+                cur.execute(f"SELECT {', '.join(DB_COLUMN_MAP)} FROM feature_dataset ORDER BY id")
+                df = pd.DataFrame(cur.fetchall())
+        finally:
+            db.close()
+        return df.rename(columns=DB_COLUMN_MAP)
+    return pd.read_csv(path)
+
+
+def materials_from_history(df):
+    """Same catalogue the engine builds from the processed dataset."""
+    return df[MATERIAL_COLS].drop_duplicates().reset_index(drop=True)
+
+
+def _fingerprint(history, materials, top_k, chunk_size, model_dir=MODEL_DIR):
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(history[SHIPMENT_COLS + ACTUAL_COLS], index=False).values.tobytes())
+    h.update(pd.util.hash_pandas_object(materials, index=False).values.tobytes())
+    for name in ("cost_model.pkl", "co2_model.pkl"):
+        p = Path(model_dir) / name
+        if p.exists():
+            h.update(f"{name}:{p.stat().st_size}:{p.stat().st_mtime_ns}".encode())
+    h.update(f"{top_k}:{chunk_size}".encode())
+    return h.hexdigest()
+
+
+# ======================================================
+# Worker side
+# ======================================================
+_worker = {}
+
+
+def _single_threaded(model):
+    # One process per core already; keep models from spawning their own threads
+    for _, step in getattr(model, "steps", [(None, model)]):
+        if hasattr(step, "n_jobs"):
+            try:
+                step.set_params(n_jobs=1)
+            except Exception:
+                pass
+    return model
+
+
+def _init_worker(model_dir, materials, parity_shipments):
+    model_dir = Path(model_dir)
+    features_cost = joblib.load(model_dir / "features_cost.pkl")
+    features_co2 = joblib.load(model_dir / "features_co2.pkl")
+    # Compiled NumPy evaluators, checked against the loaded models
+    sample = cross_features(parity_shipments, materials)
+    _worker["cost_model"] = compile_with_parity(
+        _single_threaded(joblib.load(model_dir / "cost_model.pkl")), sample[features_cost]
+    )
+    _worker["co2_model"] = compile_with_parity(
+        _single_threaded(joblib.load(model_dir / "co2_model.pkl")), sample[features_co2]
+    )
+    _worker["features_cost"] = features_cost
+    _worker["features_co2"] = features_co2
+    _worker["materials"] = materials
+
+
+def score_chunk(chunk, materials, cost_model, co2_model, features_cost, features_co2, top_k):
+    """Per-shipment comparison frame for one chunk of history rows."""
+    shipments = chunk[SHIPMENT_COLS].reset_index(drop=True)
+    pred_cost, pred_co2, sust = predict_matrix(
+        shipments, materials, cost_model, co2_model, features_cost, features_co2
+    )
+    idx = top_indices(pred_cost, pred_co2, sust, top_k)
+    rows = np.arange(len(shipments))
+    top1 = idx[:, 0]
+
+    mat_ids = materials["Material_ID"].to_numpy(dtype=float)
+    mat_names = materials["Material_Name"].to_numpy()
+    col_of = {mid: j for j, mid in enumerate(mat_ids)}
+    used_ids = chunk["Material_ID"].to_numpy(dtype=float)
+    used_col = np.array([col_of.get(mid, -1) for mid in used_ids])
+    known = used_col >= 0
+    safe_col = np.where(known, used_col, 0)
+
+    # Rank of the shipped material in the full Sustainability order (1 = best)
+    used_sust = sust[rows, safe_col]
+    used_rank = np.where(known, (sust > used_sust[:, None]).sum(axis=1) + 1, -1)
+
+    out = chunk[["row_id", "Category_item", "Shipping_Mode"] + ACTUAL_COLS].reset_index(drop=True)
+    out["Pred_Cost_Used"] = np.where(known, pred_cost[rows, safe_col], np.nan)
+    out["Pred_CO2_Used"] = np.where(known, pred_co2[rows, safe_col], np.nan)
+    out["Top1_Material_ID"] = mat_ids[top1]
+    out["Top1_Material_Name"] = mat_names[top1]
+    out["Top1_Pred_Cost"] = pred_cost[rows, top1]
+    out["Top1_Pred_CO2"] = pred_co2[rows, top1]
+    out["Top1_Sustainability"] = sust[rows, top1]
+    out["TopK_Material_IDs"] = [",".join(str(int(mat_ids[j])) for j in r) for r in idx]
+    out["Used_Rank"] = used_rank
+    out["Used_In_TopK"] = known & (used_rank <= idx.shape[1])
+
+    # Against what was actually paid / emitted
+    out["Cost_Saving_USD"] = out["Cost_USD"] - out["Top1_Pred_Cost"]
+    out["CO2_Saving_kg"] = out["CO2_Emission_kg_item"] - out["Top1_Pred_CO2"]
+    # Model-consistent: predicted shipped material vs predicted top-1
+    out["Cost_Saving_Pred_USD"] = out["Pred_Cost_Used"] - out["Top1_Pred_Cost"]
+    out["CO2_Saving_Pred_kg"] = out["Pred_CO2_Used"] - out["Top1_Pred_CO2"]
+    return out
+
+
+def _worker_run(chunk_id, chunk, part_path, top_k):
+    t0 = time.perf_counter()
+    out = score_chunk(
+        chunk, _worker["materials"], _worker["cost_model"], _worker["co2_model"],
+        _worker["features_cost"], _worker["features_co2"], top_k
+    )
+    tmp = part_path.with_name(f".{part_path.name}.tmp")  # hidden: parquet readers skip it
+    out.to_parquet(tmp, index=False)
+    os.replace(tmp, part_path)  # chunk only counts once fully written
+    return chunk_id, len(out), time.perf_counter() - t0
+
+
+# ======================================================
+# Aggregation
+# ======================================================
+def _aggregate(df, by):
+    g = df.groupby(by, observed=True)
+    return g.agg(
+        shipments=("row_id", "size"),
+        actual_cost_usd=("Cost_USD", "sum"),
+        top1_pred_cost_usd=("Top1_Pred_Cost", "sum"),
+        cost_saving_usd=("Cost_Saving_USD", "sum"),
+        cost_saving_pred_usd=("Cost_Saving_Pred_USD", "sum"),
+        actual_co2_kg=("CO2_Emission_kg_item", "sum"),
+        top1_pred_co2_kg=("Top1_Pred_CO2", "sum"),
+        co2_saving_kg=("CO2_Saving_kg", "sum"),
+        co2_saving_pred_kg=("CO2_Saving_Pred_kg", "sum"),
+        used_in_topk_rate=("Used_In_TopK", "mean"),
+    ).reset_index()
+
+
+def write_aggregates(out_dir):
+    out_dir = Path(out_dir)
+    df = pd.read_parquet(out_dir / "shipments")
+    summaries = {
+        "savings_by_category.parquet":           "Category_item",
+        "savings_by_shipping_mode.parquet":      "Shipping_Mode",
+        "savings_by_used_material.parquet":      "Packaging_Used",
+        "savings_by_recommended_material.parquet": "Top1_Material_Name",
+    }
+    for filename, by in summaries.items():
+        _aggregate(df, by).to_parquet(out_dir / filename, index=False)
+    total = _aggregate(df.assign(_all="all"), "_all").drop(columns="_all")
+    total.to_parquet(out_dir / "savings_total.parquet", index=False)
+    return total.iloc[0].to_dict()
+
+
+# ======================================================
+# Driver
+# ======================================================
+def run_job(out_dir=DEFAULT_OUT_DIR, workers=None, chunk_size=500, top_k=3,
+            source="csv", restart=False, limit=None, model_dir=MODEL_DIR, log=print):
+    out_dir = Path(out_dir)
+    parts_dir = out_dir / "shipments"
+    workers = workers or os.cpu_count() or 1
+
+    history = load_history(source)
+    if limit:
+        history = history.head(limit)
+    history = history.reset_index(drop=True)
+    history["row_id"] = np.arange(len(history))
+    materials = materials_from_history(history)
+
+    fingerprint = _fingerprint(history, materials, top_k, chunk_size, model_dir)
+    manifest_path = out_dir / "manifest.json"
+    if manifest_path.exists() and not restart:
+        manifest = json.loads(manifest_path.read_text())
+        if manifest.get("fingerprint") != fingerprint:
+            raise SystemExit(
+                f"{out_dir} holds a run with different inputs/settings; "
+                "use --restart to discard it"
+            )
+    if restart and out_dir.exists():
+        shutil.rmtree(out_dir)
+    parts_dir.mkdir(parents=True, exist_ok=True)
+
+    n_chunks = (len(history) + chunk_size - 1) // chunk_size
+    manifest_path.write_text(json.dumps({
+        "fingerprint": fingerprint, "rows": len(history), "materials": len(materials),
+        "chunk_size": chunk_size, "chunks": n_chunks, "top_k": top_k, "source": source,
+    }, indent=2))
+
+    pending = []
+    for c in range(n_chunks):
+        part = parts_dir / f"part-{c:05d}.parquet"
+        if not part.exists():
+            pending.append((c, part))
+    log(f"{n_chunks} chunks total, {n_chunks - len(pending)} already done, "
+        f"{len(pending)} to score on {workers} worker(s)")
+
+    t0 = time.perf_counter()
+    done_rows = 0
+    if pending:
+        parity_shipments = history[SHIPMENT_COLS].head(64)
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(str(model_dir), materials, parity_shipments)
+        ) as pool:
+            futures = [
+                pool.submit(_worker_run, c, history.iloc[c * chunk_size:(c + 1) * chunk_size], part, top_k)
+                for c, part in pending
+            ]
+            for fut in as_completed(futures):
+                c, n, secs = fut.result()
+                done_rows += n
+                log(f"  chunk {c:05d}: {n} rows in {secs:.2f}s")
+    elapsed = time.perf_counter() - t0
+
+    total = write_aggregates(out_dir)
+    stats = {
+        "rows_scored": done_rows,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(done_rows / elapsed, 1) if elapsed and done_rows else 0.0,
+        "workers": workers,
+    }
+    log(f"Scored {done_rows} rows in {elapsed:.2f}s ({stats['rows_per_s']} rows/s)")
+    log(f"Total cost saving vs actual: {total['cost_saving_usd']:.2f} USD, "
+        f"CO2 saving vs actual: {total['co2_saving_kg']:.2f} kg, "
+        f"shipped material in top-{top_k}: {total['used_in_topk_rate']:.1%}")
+    return stats
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Re-score historical shipments and report savings")
+    ap.add_argument("--out", default=str(DEFAULT_OUT_DIR))
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--chunk-size", type=int, default=500)
+    ap.add_argument("--top-k", type=int, default=3)
+    ap.add_argument("--source", choices=["csv", "db"], default="csv")
+    ap.add_argument("--limit", type=int, default=None, help="only the first N shipments")
+    ap.add_argument("--restart", action="store_true", help="discard previous progress")
+    args = ap.parse_args()
+    run_job(args.out, args.workers, args.chunk_size, args.top_k,
+            args.source, args.restart, args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Recommendation result sets
+- RecommendationSet: a top-k result as columns (one numpy array or list
+  per field, all k long) instead of k dicts of ~25 keys. The engine
+  builds it straight from its score arrays
+  (generate_recommendations(..., as_frame=False)); recommender.py, the
+  PDF / Excel reports, batch jobs and history saving read its columns
+- Recommendation: slotted read-only view of one row (rec["Pred_Cost"],
+  rec.get(...)), for code that walks rows
+- records(): the API's list of dicts, same values as
+  DataFrame.to_dict("records") at a fraction of the cost; to_dict() /
+  from_dict(): compact columnar JSON (what the session keeps); packed
+  bytes for history via history_store.encode_results
+"""
+
+from collections.abc import Mapping
+
+import numpy as np
+
+# What reports and history need from a result (= recommender.py's columns)
+REPORT_COLUMNS = ("Material_Name", "Pred_Cost", "Pred_CO2", "Biodegradable",
+                  "Tensile_Strength_MPa", "Sustainability", "Pareto_Rank")
+
+
+def _tolist(column):
+    # ndarray.tolist() gives Python scalars (int / float / bool / str) in one C call
+    return column.tolist() if isinstance(column, np.ndarray) else list(column)
+
+
+def _native(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class Recommendation(Mapping):
+    __slots__ = ("_columns", "_i")
+
+    def __init__(self, columns, i):
+        self._columns = columns
+        self._i = i
+
+    def __getitem__(self, key):
+        return _native(self._columns[key][self._i])
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+    def __repr__(self):
+        return f"Recommendation({dict(self)!r})"
+
+
+class RecommendationSet:
+    __slots__ = ("columns", "attrs", "_n")
+
+    def __init__(self, columns, attrs=None):
+        self.columns = dict(columns)
+        lengths = {len(c) for c in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"RecommendationSet columns differ in length: {sorted(lengths)}")
+        self._n = lengths.pop() if lengths else 0
+        self.attrs = dict(attrs or {})
+
+    # --------------------------------------------------
+    # Construction
+    # --------------------------------------------------
+    @classmethod
+    def from_frame(cls, df):
+        return cls({c: df[c].to_numpy() for c in df.columns}, df.attrs)
+
+    @classmethod
+    def from_records(cls, records):
+        names = {}
+        for rec in records:
+            names.update(dict.fromkeys(rec))
+        return cls({name: [rec.get(name) for rec in records] for name in names})
+
+    @classmethod
+    def from_dict(cls, columns):
+        return cls(columns)
+
+    @classmethod
+    def coerce(cls, value):
+        """A RecommendationSet from one, from to_dict() output or from a list of record dicts."""
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, dict):
+            return cls.from_dict(value)
+        return cls.from_records(value or [])
+
+    # --------------------------------------------------
+    # Access
+    # --------------------------------------------------
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        if not -self._n <= i < self._n:
+            raise IndexError(i)
+        return Recommendation(self.columns, i % self._n)
+
+    def __iter__(self):
+        columns = self.columns
+        return (Recommendation(columns, i) for i in range(self._n))
+
+    def __repr__(self):
+        return f"RecommendationSet({self._n} × {list(self.columns)})"
+
+    def rows(self, *names):
+        """Tuples of Python values for the named columns (None for a column the set doesn't have)."""
+        return zip(*(_tolist(self.columns[n]) if n in self.columns else [None] * self._n for n in names))
+
+    def select(self, names):
+        """The named columns that are present, in that order."""
+        return RecommendationSet({n: self.columns[n] for n in names if n in self.columns}, self.attrs)
+
+    # --------------------------------------------------
+    # Serialisation
+    # --------------------------------------------------
+    def records(self):
+        """List of dicts (the API shape)."""
+        names = list(self.columns)
+        return [dict(zip(names, row)) for row in zip(*(_tolist(c) for c in self.columns.values()))]
+
+    def to_dict(self):
+        """{column: [values]}: JSON-ready, about a third of records()' size."""
+        return {name: _tolist(c) for name, c in self.columns.items()}
+
+    def to_frame(self):
+        import pandas as pd
+
+        df = pd.DataFrame(self.columns)
+        df.attrs.update(self.attrs)
+        return df
@@ -0,0 +1,336 @@
+"""
+Global score normalisation
+- Reference statistics computed once and stored with the models
+  (score_reference.json in the model directory the engine serves from,
+  so a MODEL_BUNDLE gets its own):
+    Pred_Cost / Pred_CO2            min / max of the model predictions
+                                    over the training rows
+    Tensile_Strength_MPa / Density  min / max over the material catalogue
+- normalize_global(): (x − min) / (max − min), clipped to [0, 1], so a
+  material's Env_Impact / Cost_Eff / Mat_Suit / Sustainability depend
+  only on its own features and the shipment, not on the other candidates
+- PredictionCache: per-(shipment, material) predictions. Material keys
+  hash every material attribute, so after a catalogue change only new or
+  edited materials are scored again
+- global_predictions(): cached predictions first, then the grid, then
+  the models; materials are scored best-bound first and the rest are
+  skipped once no bound can beat the current k-th score
+
+Build:  python ml/notebooks/score_reference.py build
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from ml.notebooks.explainer import canonical_shipment
+from ml.notebooks.model_bundle import resolve_model_dir
+from ml.notebooks.recommendation_grid import file_stamp, stamp_matches
+from ml.notebooks.scoring import (
+    MATERIAL_COLS, SUSTAINABILITY_WEIGHTS, MAT_SUIT_WEIGHTS, predict_matrix
+)
+
+MODEL_DIR = resolve_model_dir()
+REFERENCE_FILE = "score_reference.json"
+REFERENCE_PATH = MODEL_DIR / REFERENCE_FILE
+REFERENCE_SCHEMA_VERSION = "1"
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", 100_000))   # (shipment, material) entries
+
+NORMALIZATIONS = ("candidates", "global")
+
+logger = logging.getLogger(__name__)
+
+
+# ======================================================
+# Reference statistics
+# ======================================================
+def _range(values):
+    values = np.asarray(values, dtype=float)
+    return {
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "p01": float(np.percentile(values, 1)),
+        "p99": float(np.percentile(values, 99)),
+    }
+
+
+def compute_reference(train_df, materials_df, cost_model, co2_model, features_cost, features_co2):
+    """Stats dict; predictions use the same feature encoding as the engine."""
+    train = train_df.assign(
+        Biodegradable=train_df["Biodegradable"].map(lambda x: 1 if x == "Yes" else 0)
+    )
+    columns = {
+        "Pred_Cost":            _range(cost_model.predict(train[features_cost])),
+        "Pred_CO2":             _range(co2_model.predict(train[features_co2])),
+        "Tensile_Strength_MPa": _range(materials_df["Tensile_Strength_MPa"]),
+        "Density_kg_m3":        _range(materials_df["Density_kg_m3"]),
+    }
+    version = hashlib.sha256(json.dumps(columns, sort_keys=True).encode()).hexdigest()[:12]
+    return {
+        "schema_version": REFERENCE_SCHEMA_VERSION,
+        "version": version,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "training_rows": int(len(train_df)),
+        "materials": int(len(materials_df)),
+        "columns": columns,
+    }
+
+
+def save_reference(reference, path=None, model_dir=MODEL_DIR):
+    """path defaults to score_reference.json in model_dir."""
+    reference = dict(reference)
+    reference["models"] = {
+        name: file_stamp(Path(model_dir) / name) for name in ("cost_model.pkl", "co2_model.pkl")
+    }
+    path = Path(model_dir) / REFERENCE_FILE if path is None else Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(reference, indent=2))
+    tmp.replace(path)
+    return path
+
+
+def load_reference(path=None, model_dir=MODEL_DIR):
+    """Reference stats if present and built from the current models, else None."""
+    path = Path(model_dir) / REFERENCE_FILE if path is None else Path(path)
+    if not path.exists():
+        return None
+    try:
+        reference = json.loads(path.read_text())
+    except ValueError as e:
+        logger.warning(f"Unreadable score reference {path.name}: {e}")
+        return None
+    if reference.get("schema_version") != REFERENCE_SCHEMA_VERSION:
+        logger.warning("Score reference schema changed; rebuild it")
+        return None
+    for name, stamp in reference.get("models", {}).items():
+        if not stamp_matches(Path(model_dir) / name, stamp):
+            logger.warning(f"Score reference was built for a different {name}; rebuild it")
+            return None
+    return reference
+
+
+# ======================================================
+# Scoring against the reference
+# ======================================================
+def normalize_global(values, reference, column):
+    stats = reference["columns"][column]
+    lo, hi = stats["min"], stats["max"]
+    return np.clip((np.asarray(values, dtype=float) - lo) / (hi - lo + 1e-6), 0.0, 1.0)
+
+
+def global_scores(pred_cost, pred_co2, tensile, density, bio, reference):
+    """Env_Impact, Cost_Eff, Mat_Suit, Sustainability arrays."""
+    env = 1 - normalize_global(pred_co2, reference, "Pred_CO2")
+    cost_eff = 1 - normalize_global(pred_cost, reference, "Pred_Cost")
+    mat_suit = (
+        normalize_global(tensile, reference, "Tensile_Strength_MPa") * MAT_SUIT_WEIGHTS["Tensile_Strength_MPa"] +
+        normalize_global(density, reference, "Density_kg_m3") * MAT_SUIT_WEIGHTS["Density_kg_m3"]
+    )
+    sustainability = (
+        env * SUSTAINABILITY_WEIGHTS["Env_Impact"] +
+        cost_eff * SUSTAINABILITY_WEIGHTS["Cost_Eff"] +
+        bio * SUSTAINABILITY_WEIGHTS["Biodegradable"]
+    )
+    return env, cost_eff, mat_suit, sustainability
+
+
+def materials_scores(materials_df, pred_cost, pred_co2, reference):
+    bio = (materials_df["Biodegradable"] == "Yes").to_numpy().astype("int64")
+    env, cost_eff, mat_suit, sustainability = global_scores(
+        pred_cost, pred_co2,
+        materials_df["Tensile_Strength_MPa"].to_numpy(float),
+        materials_df["Density_kg_m3"].to_numpy(float),
+        bio, reference
+    )
+    return {
+        "Pred_Cost": np.asarray(pred_cost, float), "Pred_CO2": np.asarray(pred_co2, float),
+        "Env_Impact": env, "Cost_Eff": cost_eff, "Mat_Suit": mat_suit, "Sustainability": sustainability,
+    }
+
+
+def score_upper_bound(materials_df, sort_by, reference):
+    """
+    Highest score each material can reach before its predictions are known,
+    or None when sort_by has no useful bound. Env_Impact / Cost_Eff are at
+    most 1 once clipped; Mat_Suit does not depend on the models at all.
+    """
+    if sort_by == "Sustainability":
+        w = SUSTAINABILITY_WEIGHTS
+        bio = (materials_df["Biodegradable"] == "Yes").to_numpy().astype(float)
+        return w["Env_Impact"] + w["Cost_Eff"] + bio * w["Biodegradable"]
+    if sort_by == "Mat_Suit":
+        return materials_scores(
+            materials_df, np.zeros(len(materials_df)), np.zeros(len(materials_df)), reference
+        )["Mat_Suit"]
+    return None
+
+
+# ======================================================
+# Per-(shipment, material) prediction cache
+# ======================================================
+def material_keys(materials_df):
+    """One key per material over all its attributes (edited rows get new keys)."""
+    cols = [c for c in MATERIAL_COLS if c in materials_df]
+    keys = np.empty(len(materials_df), dtype=object)
+    keys[:] = list(materials_df[cols].itertuples(index=False, name=None))
+    return keys
+
+
+class PredictionCache:
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def shipment_key(shipment, models):
+        return (canonical_shipment(shipment), tuple(id(m) for m in models))
+
+    def get_many(self, shipment_key, mat_keys):
+        """(n, 2) array of (Pred_Cost, Pred_CO2); NaN rows are misses."""
+        out = np.full((len(mat_keys), 2), np.nan)
+        with self._lock:
+            for i, mk in enumerate(mat_keys):
+                value = self._data.get((shipment_key, mk))
+                if value is not None:
+                    self._data.move_to_end((shipment_key, mk))
+                    out[i] = value
+        found = int((~np.isnan(out[:, 0])).sum())
+        self.hits += found
+        self.misses += len(mat_keys) - found
+        return out
+
+    def put_many(self, shipment_key, mat_keys, pred_cost, pred_co2):
+        with self._lock:
+            for mk, c, o in zip(mat_keys, pred_cost, pred_co2):
+                self._data[(shipment_key, mk)] = (float(c), float(o))
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+prediction_cache = PredictionCache()
+
+
+# ======================================================
+# Predictions for global mode
+# ======================================================
+def global_predictions(materials_df, shipment, cost_model, co2_model, features_cost, features_co2,
+                       reference, top_k=3, sort_by="Sustainability", grid=None, cache=None,
+                       early_stop=True):
+    """
+    (pred_cost, pred_co2, info) aligned with materials_df. Materials that
+    cannot reach the top-k are left as NaN (counted in info["skipped"])
+    unless early_stop is off.
+    """
+    cache = prediction_cache if cache is None else cache
+    t0 = time.perf_counter()
+    n = len(materials_df)
+    keys = material_keys(materials_df)
+    ship_key = cache.shipment_key(shipment, (cost_model, co2_model))
+
+    preds = cache.get_many(ship_key, keys)
+    info = {"mode": "global", "reference": reference["version"],
+            "cached": int((~np.isnan(preds[:, 0])).sum()), "grid": 0, "scored": 0, "skipped": 0}
+
+    missing = np.isnan(preds[:, 0])
+    if missing.any() and grid is not None:
+        grid_preds, grid_info = grid.lookup(shipment, materials_df["Material_ID"].to_numpy())
+        if grid_preds is not None:
+            fill = np.column_stack(grid_preds)
+            preds[missing] = fill[missing]
+            info["grid"] = int(missing.sum())
+            missing[:] = False
+
+    todo = np.flatnonzero(missing)
+    bound = score_upper_bound(materials_df, sort_by, reference) if early_stop else None
+    tensile = materials_df["Tensile_Strength_MPa"].to_numpy(float)
+    density = materials_df["Density_kg_m3"].to_numpy(float)
+    bio = (materials_df["Biodegradable"] == "Yes").to_numpy().astype("int64")
+    if bound is not None and len(todo):
+        todo = todo[np.argsort(-bound[todo], kind="stable")]
+    shipment_df = pd.DataFrame([shipment])
+
+    while len(todo):
+        if bound is None:
+            block, todo = todo, todo[:0]
+        else:
+            known = np.flatnonzero(~np.isnan(preds[:, 0]))
+            if len(known) >= top_k:
+                env, cost_eff, mat_suit, sustainability = global_scores(
+                    preds[known, 0], preds[known, 1], tensile[known], density[known], bio[known], reference
+                )
+                scores = sustainability if sort_by == "Sustainability" else mat_suit
+                kth = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+                # Strictly below: a tie could still win on catalogue order
+                if bound[todo].max() < kth:
+                    info["skipped"] = len(todo)
+                    break
+            # Everything that can score at least as well as the k-th remaining bound
+            cut = bound[todo[min(top_k, len(todo)) - 1]]
+            take = bound[todo] >= cut
+            block, todo = todo[take], todo[~take]
+
+        pred_cost, pred_co2, _ = predict_matrix(
+            shipment_df, materials_df.iloc[block], cost_model, co2_model, features_cost, features_co2
+        )
+        preds[block, 0], preds[block, 1] = pred_cost[0], pred_co2[0]
+        cache.put_many(ship_key, keys[block], pred_cost[0], pred_co2[0])
+        info["scored"] += len(block)
+
+    info["scoring_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+    return preds[:, 0], preds[:, 1], info
+
+
+# ======================================================
+# CLI
+# ======================================================
+def main():
+    ap = argparse.ArgumentParser(description="Build reference stats for global score normalisation")
+    ap.add_argument("command", choices=["build", "show"])
+    ap.add_argument("--out", help=f"default: {REFERENCE_FILE} in the served model directory ({MODEL_DIR})")
+    args = ap.parse_args()
+
+    if args.command == "show":
+        reference = load_reference(args.out)
+        print(json.dumps(reference, indent=2) if reference else f"no usable reference at {args.out or REFERENCE_PATH}")
+        return 0 if reference else 1
+
+    from ml.notebooks import recommendation_engine as engine
+    reference = compute_reference(
+        engine.df, engine.materials_df, engine.cost_model, engine.co2_model,
+        engine.FEATURES_COST, engine.FEATURES_CO2
+    )
+    path = save_reference(reference, args.out, engine.MODEL_DIR)
+    print(f"wrote {path} (version {reference['version']})")
+    for col, stats in reference["columns"].items():
+        print(f"  {col:22s} min {stats['min']:.4f}  max {stats['max']:.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Shared scoring pieces (no models, no data loading at import)
+- Score weights used by every scorer
+- Shipment × material cross-join feature frame
+- Row-wise normalisation + sustainability for (shipments, materials)
+  shaped prediction matrices
+- Row-wise top-k selection
+Used by the sweep API and the batch jobs so they score exactly like
+generate_recommendations without importing the engine module.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Score weights
+SUSTAINABILITY_WEIGHTS = {"Env_Impact": 0.5, "Cost_Eff": 0.3, "Biodegradable": 0.2}
+MAT_SUIT_WEIGHTS = {"Tensile_Strength_MPa": 0.6, "Density_kg_m3": 0.4}
+
+MATERIAL_COLS = [
+    "Material_ID", "Material_Name", "Category_material", "Density_kg_m3",
+    "Tensile_Strength_MPa", "Cost_per_kg", "CO2_Emission_kg_material", "Biodegradable"
+]
+
+
+def cross_features(shipments, materials):
+    """
+    One row per (shipment, material), shipment-major.
+    Item_Volume_m3 / Volumetric_Weight_kg are derived from the box
+    dimensions when the shipments carry Length/Width/Height_cm.
+    """
+    S, M = len(shipments), len(materials)
+    cols = {}
+    for col in shipments.columns:
+        if col not in MATERIAL_COLS:
+            cols[col] = np.repeat(shipments[col].to_numpy(), M)
+    for col in MATERIAL_COLS:
+        if col in materials:
+            cols[col] = np.tile(materials[col].to_numpy(), S)
+    df = pd.DataFrame(cols)
+
+    # Same derived features as generate_recommendations
+    if {"Length_cm", "Width_cm", "Height_cm"} <= set(df.columns):
+        L, W, H = df["Length_cm"], df["Width_cm"], df["Height_cm"]
+        df["Item_Volume_m3"] = L / 100 * W / 100 * H / 100
+        df["Volumetric_Weight_kg"] = L * W * H / 5000
+    df["Biodegradable"] = (df["Biodegradable"] == "Yes").astype(int)
+    return df
+
+
+def normalize_rows(a):
+    # NaN cells (excluded materials) don't count towards a row's range
+    lo = np.nanmin(a, axis=1, keepdims=True)
+    hi = np.nanmax(a, axis=1, keepdims=True)
+    return (a - lo) / (hi - lo + 1e-6)
+
+
+def sustainability_matrix(pred_cost, pred_co2, bio, weights=None):
+    """(S, M) Sustainability, normalised within each shipment row."""
+    w = weights or SUSTAINABILITY_WEIGHTS
+    return (
+        (1 - normalize_rows(pred_co2)) * w["Env_Impact"] +
+        (1 - normalize_rows(pred_cost)) * w["Cost_Eff"] +
+        bio * w["Biodegradable"]
+    )
+
+
+def predict_matrix(shipments, materials, cost_model, co2_model, features_cost, features_co2, exclude=None):
+    """
+    Returns (pred_cost, pred_co2, sustainability), each shaped (S, M).
+    exclude: (S, M) bool, cells that are NaN in all three and left out of
+    their row's normalisation (materials a row's rules rule out).
+    """
+    S, M = len(shipments), len(materials)
+    df = cross_features(shipments, materials)
+
+    pred_cost = np.asarray(cost_model.predict(df[features_cost]), dtype=float).reshape(S, M)
+    pred_co2 = np.asarray(co2_model.predict(df[features_co2]), dtype=float).reshape(S, M)
+    if exclude is not None and exclude.any():
+        pred_cost = np.where(exclude, np.nan, pred_cost)
+        pred_co2 = np.where(exclude, np.nan, pred_co2)
+    bio = df["Biodegradable"].to_numpy().reshape(S, M)
+    return pred_cost, pred_co2, sustainability_matrix(pred_cost, pred_co2, bio)
+
+
+def top_indices(pred_cost, pred_co2, sustainability, top_k, sort_by="Sustainability"):
+    """(S, k) material column indices, best first; NaN cells sort last."""
+    if sort_by == "Pred_Cost":
+        key = pred_cost
+    elif sort_by == "Pred_CO2":
+        key = pred_co2
+    elif sort_by == "Sustainability":
+        key = -sustainability
+    else:
+        raise ValueError(f"Unsupported sort_by: {sort_by}")
+    k = min(top_k, key.shape[1])
+    part = np.argpartition(key, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(key, part, axis=1).argsort(axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
@@ -0,0 +1,282 @@
+"""
+Sharded scoring for large material catalogues
+- ShardedScorer binds one catalogue + models. Each call splits the
+  candidates into shards of SHARD_ROWS materials and scores them in
+  parallel:
+    thread  - shards share the parent's frames (models that release the
+              GIL: compiled NumPy trees, xgboost, sklearn forests)
+    process - the catalogue is copied once into shared memory; workers
+              attach to it, rebuild their shard and write predictions
+              into a shared output buffer
+- Two phases: predict + per-shard min/max, then per-shard top-k on the
+  globally normalised scores, merged with a heap
+- The engine builds one for its own materials once the catalogue has at
+  least SHARD_MIN_MATERIALS rows; rebuild it when the catalogue changes
+"""
+
+import heapq
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from ml.notebooks.scoring import (
+    MATERIAL_COLS, SUSTAINABILITY_WEIGHTS, MAT_SUIT_WEIGHTS, predict_matrix
+)
+from ml.notebooks.tree_compiler import CompiledModel, reference_model
+
+SHARD_ROWS = int(os.getenv("SHARD_ROWS", 50_000))
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", os.cpu_count() or 1))
+SHARD_EXECUTOR = os.getenv("SHARD_EXECUTOR", "auto")          # auto | thread | process
+SHARD_MIN_MATERIALS = int(os.getenv("SHARD_MIN_MATERIALS", 20_000))
+
+# Material_Name isn't a model feature; keeping it out saves shipping every name to the workers
+SHARED_COLS = [c for c in MATERIAL_COLS if c != "Material_Name"]
+
+SHARDED_SORTS = ["Pred_Cost", "Pred_CO2", "Env_Impact", "Cost_Eff", "Mat_Suit", "Sustainability"]
+
+# Estimator modules whose predict runs without the GIL
+_NOGIL_MODULES = ("xgboost", "lightgbm", "sklearn.ensemble", "sklearn.tree")
+
+
+def releases_gil(model):
+    if isinstance(model, CompiledModel):
+        return True
+    model = reference_model(model)
+    est = getattr(model, "steps", [(None, model)])[-1][1]
+    return type(est).__module__.startswith(_NOGIL_MODULES)
+
+
+# ======================================================
+# Catalogue in shared memory
+# ======================================================
+class SharedCatalogue:
+    """
+    Material columns as shared NumPy arrays; text columns are stored as
+    integer codes plus their categories. .spec is what workers attach with.
+    """
+
+    def __init__(self, materials_df=None, spec=None):
+        self._blocks = []
+        self.columns = {}
+        if spec is not None:
+            self.spec, self.owner = spec, False
+            for name, (shm_name, dtype, n, categories) in spec.items():
+                self.columns[name] = (self._attach(shm_name, dtype, n), categories)
+            return
+
+        self.spec, self.owner = {}, True
+        for name in (c for c in SHARED_COLS if c in materials_df):
+            values = materials_df[name]
+            categories = None
+            if values.dtype == object or str(values.dtype) in ("str", "string", "category"):
+                codes, uniques = pd.factorize(values)
+                values, categories = codes.astype(np.int32), list(uniques)
+            arr = np.asarray(values)
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            self._blocks.append(shm)
+            view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+            view[:] = arr
+            self.columns[name] = (view, categories)
+            self.spec[name] = (shm.name, arr.dtype.str, len(arr), categories)
+
+    def _attach(self, shm_name, dtype, n):
+        shm = shared_memory.SharedMemory(name=shm_name)
+        self._blocks.append(shm)
+        return np.ndarray((n,), dtype=np.dtype(dtype), buffer=shm.buf)
+
+    def frame(self, rows):
+        cols = {}
+        for name, (values, categories) in self.columns.items():
+            values = values[rows]
+            cols[name] = np.asarray(categories, dtype=object)[values] if categories is not None else values
+        return pd.DataFrame(cols)
+
+    def close(self):
+        self.columns = {}
+        for shm in self._blocks:
+            shm.close()
+            if self.owner:
+                shm.unlink()
+        self._blocks = []
+
+
+def _shared_buffer(n):
+    shm = shared_memory.SharedMemory(create=True, size=max(n * 2 * 8, 1))
+    return shm, np.ndarray((n, 2), dtype=np.float64, buffer=shm.buf)
+
+
+# ======================================================
+# Worker side (process executor)
+# ======================================================
+_worker = {}
+
+
+def _init_worker(spec, models, features_cost, features_co2):
+    _worker["catalogue"] = SharedCatalogue(spec=spec)
+    _worker["models"] = models
+    _worker["features"] = (features_cost, features_co2)
+
+
+def _predict_shard_process(shipment, rows, out_name, out_rows, offset):
+    shm = shared_memory.SharedMemory(name=out_name)
+    out = np.ndarray((out_rows, 2), dtype=np.float64, buffer=shm.buf)
+    try:
+        materials = _worker["catalogue"].frame(rows)
+        return _predict_into(shipment, materials, out, offset, *_worker["models"], *_worker["features"])
+    finally:
+        del out
+        shm.close()
+
+
+def _predict_into(shipment, materials, out, offset, cost_model, co2_model, features_cost, features_co2):
+    pred_cost, pred_co2, _ = predict_matrix(
+        pd.DataFrame([shipment]), materials, cost_model, co2_model, features_cost, features_co2
+    )
+    n = len(materials)
+    out[offset:offset + n, 0] = pred_cost[0]
+    out[offset:offset + n, 1] = pred_co2[0]
+    return (pred_cost.min(), pred_cost.max(), pred_co2.min(), pred_co2.max())
+
+
+# ======================================================
+# Scorer
+# ======================================================
+class ShardedScorer:
+    def __init__(self, materials_df, cost_model, co2_model, features_cost, features_co2,
+                 executor=SHARD_EXECUTOR, workers=SHARD_WORKERS, shard_rows=SHARD_ROWS):
+        if executor == "auto":
+            executor = "thread" if releases_gil(cost_model) and releases_gil(co2_model) else "process"
+        if executor not in ("thread", "process"):
+            raise ValueError("executor must be 'auto', 'thread' or 'process'")
+
+        self.materials = materials_df.reset_index(drop=True)
+        self.models = (cost_model, co2_model)
+        self.features = (features_cost, features_co2)
+        self.executor = executor
+        self.workers = max(1, int(workers))
+        self.shard_rows = max(1, int(shard_rows))
+        self.ids = pd.Index(self.materials["Material_ID"])
+
+        # Score inputs that don't depend on the shipment
+        self.bio = (self.materials["Biodegradable"] == "Yes").to_numpy().astype(np.int64)
+        self.mat_cols = {col: self.materials[col].to_numpy(float) for col in MAT_SUIT_WEIGHTS}
+        self.mat_suit = _mat_suit(self.mat_cols)
+
+        self._threads = ThreadPoolExecutor(max_workers=self.workers)
+        self._processes = self._shared = None
+        self._lock = threading.Lock()
+        if executor == "process":
+            self._shared = SharedCatalogue(self.materials)
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker,
+                initargs=(self._shared.spec, self.models, features_cost, features_co2)
+            )
+
+    def rows_for(self, materials_df):
+        """Positions of materials_df's rows in the bound catalogue (None = all of it)."""
+        if materials_df is self.materials:
+            return None
+        if len(materials_df) == len(self.materials) and \
+                np.array_equal(materials_df["Material_ID"].to_numpy(), self.ids.to_numpy()):
+            return None
+        rows = self.ids.get_indexer(materials_df["Material_ID"])
+        if (rows < 0).any():
+            raise KeyError("Candidates are not part of this scorer's catalogue")
+        return rows
+
+    def _predict(self, shipment, rows):
+        rows = np.arange(len(self.materials)) if rows is None else np.asarray(rows)
+        shards = [(start, rows[start:start + self.shard_rows])
+                  for start in range(0, len(rows), self.shard_rows)]
+
+        if self.executor == "thread":
+            out = np.empty((len(rows), 2))
+            stats = list(self._threads.map(
+                lambda s: _predict_into(shipment, self.materials.iloc[s[1]], out, s[0],
+                                        *self.models, *self.features),
+                shards
+            ))
+            return out, stats, len(shards)
+
+        # One call at a time owns the shared output buffer
+        with self._lock:
+            shm, out = _shared_buffer(len(rows))
+            try:
+                futures = [self._processes.submit(_predict_shard_process, shipment, r, shm.name, len(rows), start)
+                           for start, r in shards]
+                stats = [f.result() for f in futures]
+                return out.copy(), stats, len(shards)
+            finally:
+                del out
+                shm.close()
+                shm.unlink()
+
+    def score(self, shipment, top_k=3, sort_by="Sustainability", rows=None):
+        """
+        (order, pred_cost, pred_co2, info): order holds the top-k positions
+        into the candidates (rows of the catalogue, or all of it), best first.
+        """
+        if sort_by not in SHARDED_SORTS:
+            raise ValueError(f"Sharded scoring supports sort_by in {SHARDED_SORTS}")
+        t0 = time.perf_counter()
+        preds, stats, n_shards = self._predict(shipment, rows)
+        t_predict = time.perf_counter()
+
+        # Global min / max over every shard, then per-shard keys (lower is better)
+        stats = np.asarray(stats)
+        cost_lo, cost_hi = stats[:, 0].min(), stats[:, 1].max()
+        co2_lo, co2_hi = stats[:, 2].min(), stats[:, 3].max()
+        bio = self.bio if rows is None else self.bio[rows]
+        # Mat_Suit is min-max normalised over the candidates, like the exact path
+        mat_suit = self.mat_suit if rows is None else _mat_suit({c: v[rows] for c, v in self.mat_cols.items()})
+
+        def shard_top(start):
+            stop = min(start + self.shard_rows, len(preds))
+            cost, co2 = preds[start:stop, 0], preds[start:stop, 1]
+            if sort_by in ("Pred_Cost", "Cost_Eff"):
+                key = cost
+            elif sort_by in ("Pred_CO2", "Env_Impact"):
+                key = co2
+            elif sort_by == "Mat_Suit":
+                key = -mat_suit[start:stop]
+            else:
+                w = SUSTAINABILITY_WEIGHTS
+                key = -(
+                    (1 - (co2 - co2_lo) / (co2_hi - co2_lo + 1e-6)) * w["Env_Impact"] +
+                    (1 - (cost - cost_lo) / (cost_hi - cost_lo + 1e-6)) * w["Cost_Eff"] +
+                    bio[start:stop] * w["Biodegradable"]
+                )
+            k = min(top_k, len(key))
+            part = np.argpartition(key, k - 1)[:k]
+            part = part[np.argsort(key[part], kind="stable")]
+            return [(key[i], start + i) for i in part.tolist()]
+
+        per_shard = list(self._threads.map(shard_top, range(0, len(preds), self.shard_rows)))
+        order = np.array([i for _, i in heapq.merge(*per_shard)][:top_k], dtype=np.int64)
+
+        info = {
+            "executor": self.executor, "workers": self.workers, "shards": n_shards,
+            "candidates": len(preds),
+            "predict_ms": round((t_predict - t0) * 1000, 3),
+            "merge_ms": round((time.perf_counter() - t_predict) * 1000, 3),
+        }
+        return order, preds[:, 0], preds[:, 1], info
+
+    def close(self):
+        self._threads.shutdown()
+        if self._processes is not None:
+            self._processes.shutdown()
+            self._shared.close()
+
+
+def _norm(a):
+    return (a - a.min()) / (a.max() - a.min() + 1e-6)
+
+
+def _mat_suit(cols):
+    return sum(w * _norm(cols[col]) for col, w in MAT_SUIT_WEIGHTS.items())
@@ -0,0 +1,109 @@
+"""
+"Similar materials" nearest-neighbour index
+- KD-tree (scipy cKDTree) over z-scored Density_kg_m3,
+  Tensile_Strength_MPa, Cost_per_kg and CO2_Emission_kg
+- Category / biodegradable filters get their own tree, built on first
+  use and kept with the index; a category the catalogue doesn't have
+  returns nothing and builds nothing
+- Built once per catalogue frame; the API rebuilds it when the catalogue
+  is reloaded
+Accepts the raw catalogue columns (Category, CO2_Emission_kg) or the
+engine's (Category_material, CO2_Emission_kg_material).
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+SIMILARITY_FEATURES = ["Density_kg_m3", "Tensile_Strength_MPa", "Cost_per_kg", "CO2_Emission_kg"]
+COLUMN_ALIASES = {"Category_material": "Category", "CO2_Emission_kg_material": "CO2_Emission_kg"}
+MAX_SIMILAR_K = 100
+
+
+class SimilarityIndex:
+    def __init__(self, materials_df, leafsize=32):
+        df = materials_df.rename(columns={
+            k: v for k, v in COLUMN_ALIASES.items() if k in materials_df and v not in materials_df
+        })
+        X = df[SIMILARITY_FEATURES].to_numpy(dtype=float)
+        self.mean = np.nanmean(X, axis=0)
+        std = np.nanstd(X, axis=0)
+        self.std = np.where(std > 0, std, 1.0)
+        # Missing properties sit at the mean rather than dropping the material
+        self.points = np.nan_to_num((X - self.mean) / self.std)
+
+        self.materials = materials_df
+        # Plain column arrays: building a few records from these is ~10x cheaper than iloc + to_dict
+        self._columns = [(c, materials_df[c].to_numpy()) for c in materials_df.columns]
+        self.ids = df["Material_ID"].to_numpy()
+        self.positions = pd.Index(self.ids)
+        self.category = df["Category"].astype(str).to_numpy() if "Category" in df else None
+        self.categories = frozenset(self.category) if self.category is not None else frozenset()
+        self.biodegradable = (df["Biodegradable"] == "Yes").to_numpy()
+        self.leafsize = leafsize
+
+        self._trees = {(None, None): (cKDTree(self.points, leafsize=leafsize), None)}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _tree(self, category, biodegradable):
+        if category is not None:
+            if self.category is None:
+                raise ValueError("Catalogue has no category column")
+            if category not in self.categories:
+                # Not cached: ?category= is client input, one tree per catalogue category at most
+                return None, None
+        key = (category, biodegradable)
+        with self._lock:
+            if key not in self._trees:
+                mask = np.ones(len(self.ids), dtype=bool)
+                if category is not None:
+                    mask &= self.category == category
+                if biodegradable is not None:
+                    mask &= self.biodegradable == biodegradable
+                rows = np.flatnonzero(mask)
+                tree = cKDTree(self.points[rows], leafsize=self.leafsize) if len(rows) else None
+                self._trees[key] = (tree, rows)
+            return self._trees[key]
+
+    def similar(self, material_id, k=5, category=None, biodegradable=None):
+        """
+        (rows, distances): catalogue positions of the k nearest other
+        materials, nearest first. KeyError for an unknown material_id.
+        """
+        if not 1 <= k <= MAX_SIMILAR_K:
+            raise ValueError(f"k must be between 1 and {MAX_SIMILAR_K}")
+        pos = self.positions.get_indexer([material_id])[0]
+        if pos < 0:
+            raise KeyError(material_id)
+
+        tree, rows = self._tree(category, biodegradable)
+        if tree is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        n = tree.n
+        dist, idx = tree.query(self.points[pos], k=min(k + 1, n))
+        dist, idx = np.atleast_1d(dist), np.atleast_1d(idx)
+        found = idx if rows is None else rows[idx]
+        keep = found != pos
+        return found[keep][:k], dist[keep][:k]
+
+    def record(self, row):
+        return {c: _py(values[row]) for c, values in self._columns}
+
+    def similar_records(self, material_id, k=5, category=None, biodegradable=None):
+        rows, dist = self.similar(material_id, k, category, biodegradable)
+        out = []
+        for row, d in zip(rows.tolist(), dist.tolist()):
+            rec = self.record(row)
+            rec["Distance"] = round(d, 6)
+            out.append(rec)
+        return out
+
+
+def _py(value):
+    # NumPy scalars → Python (jsonify can't serialise np.int64)
+    return value.item() if isinstance(value, np.generic) else value
@@ -0,0 +1,264 @@
+"""
+What-if sweeps
+- Expand a base shipment over ranges/lists of Distance_km, Weight_kg,
+  Shipping_Mode and box dimensions (full cartesian grid)
+- Score the whole scenario × material grid as one feature matrix,
+  one predict() call per model (per chunk when streaming)
+- Per-scenario top-k + per-material Pred_Cost / Pred_CO2 curves
+- Suitability rules apply as in generate_recommendations: rules on fields
+  the sweep doesn't vary prune the catalogue once; a rule on a swept
+  axis (Shipping_Mode) excludes materials per scenario, and their cells
+  are null
+Scores are normalised within each scenario over its candidates, exactly
+like generate_recommendations does for a single shipment.
+"""
+
+import itertools
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from ml.notebooks.candidate_filter import SUITABILITY_RULES, prefilter_candidates, scenario_exclusions
+from ml.notebooks.scoring import predict_matrix, top_indices
+
+SWEEP_AXES = ["Distance_km", "Weight_kg", "Shipping_Mode", "Length_cm", "Width_cm", "Height_cm"]
+MAX_SWEEP_CELLS = int(os.getenv("MAX_SWEEP_CELLS", 2_000_000))      # scenarios × materials
+MAX_SWEEP_AXIS_POINTS = 1000
+SWEEP_STREAM_MIN_SCENARIOS = int(os.getenv("SWEEP_STREAM_MIN_SCENARIOS", 500))
+SWEEP_CHUNK_CELLS = 250_000
+
+
+# ======================================================
+# Grid construction
+# ======================================================
+def axis_length(name, spec):
+    """
+    Number of points expand_axis(name, spec) gives, worked out from the
+    spec alone, so an oversized axis is rejected before numpy builds it.
+    """
+    if isinstance(spec, dict):
+        start, stop = float(spec["start"]), float(spec["stop"])
+        if not (math.isfinite(start) and math.isfinite(stop)):
+            raise ValueError(f"{name}: start and stop must be finite")
+        if "num" in spec:
+            n = int(spec["num"])
+        elif "step" in spec:
+            step = float(spec["step"])
+            if not 0 < step < math.inf:
+                raise ValueError(f"{name}: step must be positive")
+            # len(np.arange(start, stop + step / 2, step)); inf for a vanishing step
+            steps = (stop + step / 2 - start) / step
+            n = math.ceil(steps) if steps <= MAX_SWEEP_AXIS_POINTS else MAX_SWEEP_AXIS_POINTS + 1
+        else:
+            raise ValueError(f"{name}: range needs 'num' or 'step'")
+    elif isinstance(spec, (list, tuple)):
+        n = len(spec)
+    else:
+        n = 1
+
+    if n < 1:
+        raise ValueError(f"{name}: no values")
+    if n > MAX_SWEEP_AXIS_POINTS:
+        raise ValueError(f"{name}: at most {MAX_SWEEP_AXIS_POINTS} points per axis")
+    return n
+
+
+def expand_axis(name, spec):
+    """
+    spec forms:
+      [v1, v2, ...]                       explicit values
+      {"start": a, "stop": b, "num": n}   n evenly spaced points, inclusive
+      {"start": a, "stop": b, "step": s}  a, a+s, ... up to b inclusive
+      scalar                              single value
+    """
+    axis_length(name, spec)
+    if isinstance(spec, dict):
+        start, stop = float(spec["start"]), float(spec["stop"])
+        if "num" in spec:
+            values = np.linspace(start, stop, int(spec["num"]))
+        else:
+            step = float(spec["step"])
+            values = np.arange(start, stop + step / 2, step)
+        # arange's own rounding can land one point either side of axis_length
+        values = values[:MAX_SWEEP_AXIS_POINTS].tolist()
+    elif isinstance(spec, (list, tuple)):
+        values = list(spec)
+    else:
+        values = [spec]
+
+    if not values:
+        raise ValueError(f"{name}: no values")
+    if name == "Shipping_Mode":
+        return [str(v) for v in values]
+    return [float(v) for v in values]
+
+
+def build_scenarios(base_shipment, sweep, n_materials=None):
+    """
+    Cartesian product of the swept axes over the base shipment. With
+    n_materials, the grid size is checked against MAX_SWEEP_CELLS before
+    any axis or scenario is built.
+    """
+    n_scenarios = count_scenarios(sweep)
+    if n_materials is not None:
+        check_grid_size(n_scenarios, n_materials)
+
+    axes = {name: expand_axis(name, sweep[name]) for name in SWEEP_AXES if name in sweep}
+    names = list(axes)
+    combos = list(itertools.product(*(axes[n] for n in names))) if names else [()]
+
+    scenarios = pd.DataFrame(combos, columns=names)
+    for key, value in base_shipment.items():
+        if key not in scenarios.columns:
+            scenarios[key] = value
+    return axes, scenarios
+
+
+def count_scenarios(sweep):
+    """Number of scenarios a sweep spec expands to (validates the spec without expanding it)."""
+    unknown = set(sweep) - set(SWEEP_AXES)
+    if unknown:
+        raise ValueError(f"Cannot sweep: {', '.join(sorted(unknown))}")
+    n = 1
+    for name in SWEEP_AXES:
+        if name in sweep:
+            n *= axis_length(name, sweep[name])
+    return n
+
+
+def check_grid_size(n_scenarios, n_materials):
+    cells = n_scenarios * n_materials
+    if cells > MAX_SWEEP_CELLS:
+        raise ValueError(
+            f"Sweep grid too large: {n_scenarios} scenarios × {n_materials} "
+            f"materials = {cells} cells (max {MAX_SWEEP_CELLS})"
+        )
+    return cells
+
+
+# ======================================================
+# Output shaping
+# ======================================================
+def _scenario_records(scenarios, axes, offset, idx, materials, pred_cost, pred_co2, sustainability):
+    ids = materials["Material_ID"].to_numpy()
+    names = materials["Material_Name"].to_numpy()
+    records = []
+    for i, row in enumerate(idx):
+        s = offset + i
+        rec = {"scenario": s}
+        for name in axes:
+            value = scenarios[name].iat[s]
+            rec[name] = value.item() if hasattr(value, "item") else value
+        rec["top"] = [
+            {
+                "Material_ID":    float(ids[j]),
+                "Material_Name":  str(names[j]),
+                "Pred_Cost":      round(float(pred_cost[i, j]), 4),
+                "Pred_CO2":       round(float(pred_co2[i, j]), 4),
+                "Sustainability": round(float(sustainability[i, j]), 4),
+            }
+            for j in row
+        ]
+        records.append(rec)
+    return records
+
+
+def _material_curves(materials, cost_curves, co2_curves):
+    return [
+        {
+            "Material_ID":   float(mid),
+            "Material_Name": str(name),
+            "Pred_Cost":     _curve(cost_curves[:, j]),
+            "Pred_CO2":      _curve(co2_curves[:, j]),
+        }
+        for j, (mid, name) in enumerate(zip(materials["Material_ID"], materials["Material_Name"]))
+    ]
+
+
+def _curve(values):
+    # Excluded cells (NaN) → null
+    return [None if v != v else v for v in np.round(values.astype(float), 4).tolist()]
+
+
+def _prepare(materials_df, base_shipment, sweep, constraints, top_k):
+    """(axes, scenarios, materials, exclude mask or None, rules info)."""
+    fixed = [r for r in SUITABILITY_RULES if r["when"][0] not in sweep]
+    varying = [r for r in SUITABILITY_RULES if r["when"][0] in sweep]
+    materials, stats = prefilter_candidates(materials_df, base_shipment, constraints,
+                                            min_keep=top_k, rules=fixed)
+    if materials.empty:
+        raise ValueError("No materials satisfy the given constraints")
+    axes, scenarios = build_scenarios(base_shipment, sweep, len(materials))
+    exclude, per_scenario = scenario_exclusions(materials, scenarios, varying, min_keep=top_k)
+    rules = {"rules_applied": stats["rules_applied"], "rules_relaxed": stats["rules_relaxed"],
+             "scenario_rules": per_scenario}
+    return axes, scenarios, materials, exclude if exclude.any() else None, rules
+
+
+def run_sweep(materials_df, cost_model, co2_model, base_shipment, sweep,
+              features_cost, features_co2, top_k=3, sort_by="Sustainability",
+              constraints=None):
+    """Whole grid in one feature matrix; returns a JSON-ready dict."""
+    axes, scenarios, materials, exclude, rules = _prepare(materials_df, base_shipment, sweep, constraints, top_k)
+
+    t0 = time.perf_counter()
+    pred_cost, pred_co2, sustainability = predict_matrix(
+        scenarios, materials, cost_model, co2_model, features_cost, features_co2, exclude=exclude
+    )
+    predict_ms = (time.perf_counter() - t0) * 1000
+
+    idx = top_indices(pred_cost, pred_co2, sustainability, top_k, sort_by)
+    return {
+        "axes": axes,
+        "grid": {
+            "scenarios":  len(scenarios),
+            "materials":  len(materials),
+            "cells":      len(scenarios) * len(materials),
+            "predict_ms": round(predict_ms, 3),
+            **rules,
+        },
+        "scenarios": _scenario_records(
+            scenarios, axes, 0, idx, materials, pred_cost, pred_co2, sustainability
+        ),
+        "materials": _material_curves(materials, pred_cost, pred_co2),
+    }
+
+
+def iter_sweep(materials_df, cost_model, co2_model, base_shipment, sweep,
+               features_cost, features_co2, top_k=3, sort_by="Sustainability",
+               constraints=None):
+    """
+    Streaming variant: yields JSON-ready dicts
+      {"type": "meta", ...}, one {"type": "scenario", ...} per scenario,
+      one {"type": "material", ...} per material (curves), {"type": "end", ...}
+    Scenarios are scored in chunks of ~SWEEP_CHUNK_CELLS cells.
+    """
+    axes, scenarios, materials, exclude, rules = _prepare(materials_df, base_shipment, sweep, constraints, top_k)
+    S, M = len(scenarios), len(materials)
+    yield {"type": "meta", "axes": axes, "grid": {"scenarios": S, "materials": M, "cells": S * M, **rules}}
+
+    chunk = max(1, SWEEP_CHUNK_CELLS // M)
+    cost_curves = np.empty((S, M), dtype=np.float32)
+    co2_curves = np.empty((S, M), dtype=np.float32)
+    t0 = time.perf_counter()
+    for start in range(0, S, chunk):
+        part = scenarios.iloc[start:start + chunk]
+        pred_cost, pred_co2, sustainability = predict_matrix(
+            part, materials, cost_model, co2_model, features_cost, features_co2,
+            exclude=None if exclude is None else exclude[start:start + len(part)]
+        )
+        cost_curves[start:start + len(part)] = pred_cost
+        co2_curves[start:start + len(part)] = pred_co2
+        idx = top_indices(pred_cost, pred_co2, sustainability, top_k, sort_by)
+        for rec in _scenario_records(scenarios, axes, start, idx, materials,
+                                     pred_cost, pred_co2, sustainability):
+            rec["type"] = "scenario"
+            yield rec
+
+    for rec in _material_curves(materials, cost_curves, co2_curves):
+        rec["type"] = "material"
+        yield rec
+    yield {"type": "end", "elapsed_ms": round((time.perf_counter() - t0) * 1000, 3)}
@@ -0,0 +1,83 @@
+"""
+Synthetic material catalogues for scale tests
+- Rows are resampled from data/processed/clean_materials.csv; every
+  numeric property gets independent ±JITTER noise (clipped to the
+  observed range, rounded like the source), category and
+  biodegradability are kept, IDs are 1..n and names get a variant suffix
+- Columns use the engine's names (Category_material,
+  CO2_Emission_kg_material), so the result drops into
+  generate_recommendations as materials_df
+
+Usage:
+    python ml/notebooks/synthetic_catalogue.py --rows 1000000
+    → data/synthetic/materials_1000000.parquet
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+SOURCE_PATH = PROJECT_ROOT / "data" / "processed" / "clean_materials.csv"
+DEFAULT_OUT_DIR = PROJECT_ROOT / "data" / "synthetic"
+
+JITTER = 0.15
+
+# Numeric column → decimals in the source data
+NUMERIC_COLS = {
+    "Density_kg_m3": 0,
+    "Tensile_Strength_MPa": 2,
+    "Cost_per_kg": 2,
+    "CO2_Emission_kg_material": 3,
+}
+
+
+def load_source(path=SOURCE_PATH):
+    return pd.read_csv(path).rename(columns={
+        "Category": "Category_material",
+        "CO2_Emission_kg": "CO2_Emission_kg_material",
+    })
+
+
+def generate_catalogue(n, seed=0, source=None, jitter=JITTER):
+    source = load_source() if source is None else source
+    rng = np.random.default_rng(seed)
+    pick = rng.integers(0, len(source), n)
+
+    out = {"Material_ID": np.arange(1, n + 1)}
+    names = source["Material_Name"].to_numpy(dtype=object)[pick]
+    out["Material_Name"] = names + " #" + out["Material_ID"].astype(str).astype(object)
+    out["Category_material"] = source["Category_material"].to_numpy(dtype=object)[pick]
+    for col, decimals in NUMERIC_COLS.items():
+        values = source[col].to_numpy(float)
+        noisy = values[pick] * rng.uniform(1 - jitter, 1 + jitter, n)
+        out[col] = np.clip(noisy, values.min(), values.max()).round(decimals)
+    out["Biodegradable"] = source["Biodegradable"].to_numpy(dtype=object)[pick]
+    return pd.DataFrame(out)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Write a synthetic material catalogue")
+    ap.add_argument("--rows", type=int, required=True)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=None, help="default: data/synthetic/materials_<rows>.parquet")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    df = generate_catalogue(args.rows, args.seed)
+    out = Path(args.out) if args.out else DEFAULT_OUT_DIR / f"materials_{args.rows}.parquet"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    if out.suffix == ".csv":
+        df.to_csv(out, index=False)
+    else:
+        df.to_parquet(out, index=False)
+    print(f"wrote {out} ({len(df):,} materials, {time.perf_counter() - t0:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
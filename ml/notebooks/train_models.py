@@ -0,0 +1,463 @@
+"""
+Headless model training
+-----------------------
+Scripted model_training.ipynb: same targets, features, preprocessing
+(StandardScaler + one-hot) and 60/20/20 split, trained on every core
+with histogram-based trees.
+
+- Data: data/processed/final_ecopack_dataset_fe.csv plus, with --db,
+  labelled rows from the feature_dataset table. Only rows past the last
+  ingested id are fetched; they are kept as parquet parts under
+  data/training/feature_dataset/, so each run pulls what is new.
+  (recommendation_history only stores model predictions, never observed
+  cost / CO2, so it is not a label source)
+- Estimators: xgb_hist (XGBoost, tree_method="hist"; default for both
+  models) or rf (the notebook's RandomForest). --tune runs the
+  notebook's GridSearchCV grids
+- Every run writes a bundle (model_bundle.py) with val/test metrics,
+  fit wall time, peak RSS and inference latency of the form serving
+  runs (compiled trees when parity holds), next to the current models.
+  --promote copies it into ml/models only if it passes the promotion
+  gate: p99 latency and test MAE against the current models
+
+Usage:
+    python ml/notebooks/train_models.py
+    python ml/notebooks/train_models.py --db --promote
+    python ml/notebooks/train_models.py --cost-estimator rf --tune
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from xgboost import XGBRegressor
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(PROJECT_ROOT))
+
+from ml.notebooks.model_bundle import MODEL_DIR, BUNDLES_DIR, write_bundle, promote, read_bundle_info
+from ml.notebooks.rescore_history import DB_COLUMN_MAP
+from ml.notebooks.tree_compiler import CompiledModel, compile_with_parity, PARITY_SAMPLE_ROWS
+
+DATA_PATH = PROJECT_ROOT / "data" / "processed" / "final_ecopack_dataset_fe.csv"
+INGESTED_DIR = PROJECT_ROOT / "data" / "training" / "feature_dataset"
+
+TRAIN_JOBS = int(os.getenv("TRAIN_JOBS", -1))                      # -1 = every core
+DB_FETCH_ROWS = int(os.getenv("TRAIN_DB_FETCH_ROWS", 50_000))
+
+# Promotion gate for --promote: p99 of one request's batch (a shipment × the
+# full material catalogue) in the serving form, over enough timed batches that
+# p99 is not just the slowest one; and test MAE vs the current models
+LATENCY_BATCH_ROWS = int(os.getenv("TRAIN_LATENCY_BATCH_ROWS", 602))
+LATENCY_REPEAT = int(os.getenv("TRAIN_LATENCY_REPEAT", 300))
+MAX_LATENCY_MS = float(os.getenv("TRAIN_MAX_LATENCY_MS", 25))
+MAX_SLOWDOWN = float(os.getenv("TRAIN_MAX_SLOWDOWN", 1.5))         # vs the current models
+MAX_MAE_REGRESSION = float(os.getenv("TRAIN_MAX_MAE_REGRESSION", 0.10))  # test MAE may worsen 10%
+THROUGHPUT_ROWS = 100_000
+
+# ======================================================
+# Targets + features (model_training.ipynb)
+# ======================================================
+TARGET_COST = "Cost_USD"
+TARGET_CO2 = "CO2_Emission_kg_item"
+
+NUMERIC_FEATURES_COST = [
+    "Weight_kg", "Volumetric_Weight_kg", "Item_Volume_m3", "Fragility",
+    "Density_kg_m3", "Tensile_Strength_MPa", "Cost_per_kg",
+]
+CATEGORICAL_FEATURES_COST = ["Category_item", "Category_material", "Biodegradable"]
+FEATURES_COST = [
+    "Weight_kg", "Volumetric_Weight_kg", "Item_Volume_m3", "Fragility", "Moisture_Sens",
+    "Category_material", "Density_kg_m3", "Tensile_Strength_MPa", "Cost_per_kg",
+    "Biodegradable", "Category_item",
+]
+
+NUMERIC_FEATURES_CO2 = [
+    "Weight_kg", "Volumetric_Weight_kg", "Item_Volume_m3", "Distance_km",
+    "Density_kg_m3", "CO2_Emission_kg_material",
+]
+CATEGORICAL_FEATURES_CO2 = ["Shipping_Mode", "Category_item", "Category_material", "Biodegradable"]
+FEATURES_CO2 = [
+    "Weight_kg", "Volumetric_Weight_kg", "Item_Volume_m3", "Distance_km", "Shipping_Mode",
+    "Density_kg_m3", "CO2_Emission_kg_material", "Biodegradable", "Category_item",
+    "Category_material",
+]
+
+MODELS = {
+    "cost": (TARGET_COST, FEATURES_COST, NUMERIC_FEATURES_COST, CATEGORICAL_FEATURES_COST),
+    "co2": (TARGET_CO2, FEATURES_CO2, NUMERIC_FEATURES_CO2, CATEGORICAL_FEATURES_CO2),
+}
+
+
+# ======================================================
+# Estimators
+# ======================================================
+def _xgb_hist(jobs):
+    return XGBRegressor(
+        n_estimators=300, learning_rate=0.05, max_depth=6, subsample=0.8, colsample_bytree=0.8,
+        tree_method="hist", max_bin=256, objective="reg:squarederror", random_state=42, n_jobs=jobs,
+    )
+
+
+def _rf(jobs):
+    return RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=jobs)
+
+
+ESTIMATORS = {"xgb_hist": _xgb_hist, "rf": _rf}
+
+# The notebook's GridSearchCV grids
+PARAM_GRIDS = {
+    "xgb_hist": {
+        "model__n_estimators": [300, 500],
+        "model__max_depth": [4, 6, 8],
+        "model__learning_rate": [0.03, 0.05, 0.1],
+        "model__subsample": [0.8, 1.0],
+        "model__colsample_bytree": [0.8, 1.0],
+    },
+    "rf": {
+        "model__n_estimators": [200, 400],
+        "model__max_depth": [None, 10, 20],
+        "model__min_samples_leaf": [1, 3, 5],
+    },
+}
+
+
+def build_pipeline(estimator, numeric, categorical, jobs=TRAIN_JOBS):
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ("num", Pipeline(steps=[("scaler", StandardScaler())]), numeric),
+            ("cat", Pipeline(steps=[("encoder", OneHotEncoder(handle_unknown="ignore", sparse_output=True))]),
+             categorical),
+        ],
+        remainder="drop",
+    )
+    return Pipeline(steps=[("preprocessor", preprocessor), ("model", ESTIMATORS[estimator](jobs))])
+
+
+# ======================================================
+# Data
+# ======================================================
+def ingest_feature_dataset(ingested_dir=INGESTED_DIR, fetch_rows=DB_FETCH_ROWS, log=print):
+    """Appends feature_dataset rows past the last ingested id as one new parquet part."""
+    sys.path.append(str(PROJECT_ROOT / "backend"))
+    from db import get_db
+
+    ingested_dir = Path(ingested_dir)
+    ingested_dir.mkdir(parents=True, exist_ok=True)
+    last_id = max((int(p.stem.split("-")[-1]) for p in ingested_dir.glob("part-*.parquet")), default=0)
+
+    db = get_db()
+    rows = []
+    try:
+        with db.cursor() as cur:
+            while True:
+                cur.execute(
+                    f"SELECT id, {', '.join(DB_COLUMN_MAP)} FROM feature_dataset "
+                    "WHERE id > %s AND cost_usd IS NOT NULL AND co2_emission_kg_item IS NOT NULL "
+                    "ORDER BY id LIMIT %s",
+                    (last_id, fetch_rows),
+                )
+                batch = cur.fetchall()
+                if not batch:
+                    break
+                rows.extend(batch)
+                last_id = batch[-1]["id"]
+    finally:
+        db.close()
+
+    if not rows:
+        log("feature_dataset: no new rows")
+        return 0
+    part = pd.DataFrame(rows).rename(columns=DB_COLUMN_MAP)
+    name = f"part-{int(part['id'].iloc[0]):010d}-{int(part['id'].iloc[-1]):010d}.parquet"
+    tmp = ingested_dir / f".{name}.tmp"
+    part.to_parquet(tmp, index=False)
+    os.replace(tmp, ingested_dir / name)
+    log(f"feature_dataset: ingested {len(part):,} new rows (through id {last_id})")
+    return len(part)
+
+
+def load_training_data(path=DATA_PATH, ingested_dir=INGESTED_DIR):
+    """
+    Processed dataset + ingested rows with the notebook's boolean encoding.
+    Ingested rows already in the processed dataset (or ingested twice) are
+    dropped; the processed rows are kept as they are, like the notebook.
+    """
+    cols = list(dict.fromkeys(FEATURES_COST + FEATURES_CO2 + [TARGET_COST, TARGET_CO2]))
+    df = pd.read_csv(path)[cols]
+    sources = {"processed_rows": len(df), "ingested_rows": 0, "ingested_parts": []}
+
+    parts = sorted(Path(ingested_dir).glob("part-*.parquet"))
+    if parts:
+        new = pd.concat([pd.read_parquet(p, columns=cols) for p in parts], ignore_index=True).dropna()
+        new["Moisture_Sens"] = new["Moisture_Sens"].astype(bool)
+        new = new.astype(df.dtypes.to_dict()).drop_duplicates()
+        known = set(pd.util.hash_pandas_object(df, index=False))
+        new = new[~pd.util.hash_pandas_object(new, index=False).isin(known).to_numpy()]
+        df = pd.concat([df, new], ignore_index=True)
+        sources.update(ingested_rows=len(new), ingested_parts=[p.name for p in parts])
+
+    df["Moisture_Sens"] = df["Moisture_Sens"].astype(int)
+    df["Biodegradable"] = df["Biodegradable"].map({"Yes": 1, "No": 0})
+    return df, sources
+
+
+def split(X, y):
+    """60 / 20 / 20, random_state=42, as in the notebook."""
+    X_train, X_temp, y_train, y_temp = train_test_split(X, y, test_size=0.4, random_state=42)
+    X_val, X_test, y_val, y_test = train_test_split(X_temp, y_temp, test_size=0.5, random_state=42)
+    return X_train, X_val, X_test, y_train, y_val, y_test
+
+
+# ======================================================
+# Measurements
+# ======================================================
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class PeakRSS:
+    """Samples resident memory on a thread; .peak_mb / .delta_mb after the block."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.base_mb = self.peak_mb = 0.0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, _rss_mb())
+
+    def __enter__(self):
+        self.base_mb = self.peak_mb = _rss_mb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, _rss_mb())
+
+    @property
+    def delta_mb(self):
+        return self.peak_mb - self.base_mb
+
+
+def metrics(y_true, y_pred):
+    return {
+        "mae": round(float(mean_absolute_error(y_true, y_pred)), 6),
+        "rmse": round(float(np.sqrt(mean_squared_error(y_true, y_pred))), 6),
+        "r2": round(float(r2_score(y_true, y_pred)), 6),
+    }
+
+
+def inference_latency(model, X, batch_rows=LATENCY_BATCH_ROWS, repeat=LATENCY_REPEAT,
+                      throughput_rows=THROUGHPUT_ROWS):
+    """p50 / p99 ms of one request-sized batch and rows/s on a large one."""
+    rng = np.random.default_rng(0)
+    batch = X.iloc[rng.integers(0, len(X), batch_rows)]
+    model.predict(batch)
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        model.predict(batch)
+        samples.append(time.perf_counter() - t0)
+    big = X.iloc[rng.integers(0, len(X), throughput_rows)]
+    t0 = time.perf_counter()
+    model.predict(big)
+    big_s = time.perf_counter() - t0
+    samples = np.asarray(samples) * 1000
+    return {
+        "batch_rows": batch_rows,
+        "batches": repeat,
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p99_ms": round(float(np.percentile(samples, 99)), 3),
+        "rows_per_s": round(throughput_rows / big_s),
+    }
+
+
+def serving_form(model, X):
+    """What the engine runs: compiled trees when they match the model on a sample."""
+    sample = X.sample(n=min(PARITY_SAMPLE_ROWS, len(X)), random_state=0)
+    return compile_with_parity(model, sample)
+
+
+# ======================================================
+# Training
+# ======================================================
+def train_model(name, df, estimator, tune=False, jobs=TRAIN_JOBS, log=print):
+    target, features, numeric, categorical = MODELS[name]
+    X_train, X_val, X_test, y_train, y_val, y_test = split(df[features], df[target])
+
+    pipeline = build_pipeline(estimator, numeric, categorical, jobs)
+    t0 = time.perf_counter()
+    with PeakRSS() as mem:
+        if tune:
+            grid = GridSearchCV(pipeline, PARAM_GRIDS[estimator], cv=3,
+                                scoring="neg_mean_absolute_error", n_jobs=jobs)
+            grid.fit(X_train, y_train)
+            model = grid.best_estimator_
+        else:
+            model = pipeline.fit(X_train, y_train)
+    fit_s = time.perf_counter() - t0
+
+    serving = serving_form(model, X_test)
+    report = {
+        "estimator": estimator,
+        "params": {k: v for k, v in model.named_steps["model"].get_params().items()
+                   if k in ("n_estimators", "max_depth", "learning_rate", "subsample",
+                            "colsample_bytree", "min_samples_leaf", "tree_method", "max_bin")},
+        "best_params": grid.best_params_ if tune else None,
+        "rows": {"train": len(X_train), "val": len(X_val), "test": len(X_test)},
+        "val": metrics(y_val, model.predict(X_val)),
+        "test": metrics(y_test, model.predict(X_test)),
+        "fit_s": round(fit_s, 3),
+        "peak_rss_mb": round(mem.peak_mb, 1),
+        "fit_rss_delta_mb": round(mem.delta_mb, 1),
+        "serving_form": f"compiled {serving.kind}" if isinstance(serving, CompiledModel) else "model.predict",
+        "latency": inference_latency(serving, X_test),
+    }
+    log(f"✓ {name}: {estimator} in {report['fit_s']:.1f}s (peak RSS {report['peak_rss_mb']:.0f} MB), "
+        f"test MAE {report['test']['mae']:.4f}, R² {report['test']['r2']:.4f}, "
+        f"p99 {report['latency']['p99_ms']:.2f} ms / {LATENCY_BATCH_ROWS} rows")
+    return model, report
+
+
+def evaluate_current(name, df, model_dir=MODEL_DIR):
+    """Same test split scored by the models in model_dir (None if they can't be loaded)."""
+    target, _, _, _ = MODELS[name]
+    try:
+        model = joblib.load(Path(model_dir) / f"{name}_model.pkl")
+        features = joblib.load(Path(model_dir) / f"features_{name}.pkl")
+    except Exception:
+        return None
+    _, _, X_test, _, _, y_test = split(df[features], df[target])
+    serving = serving_form(model, X_test)
+    info = read_bundle_info(model_dir) or {}
+    return {
+        "version": info.get("version", "unversioned"),
+        "test": metrics(y_test, model.predict(X_test)),
+        "latency": inference_latency(serving, X_test),
+    }
+
+
+def promotion_gate(reports, current, max_latency_ms=MAX_LATENCY_MS, max_slowdown=MAX_SLOWDOWN,
+                   max_mae_regression=MAX_MAE_REGRESSION):
+    """Reasons the new models are too slow or less accurate to ship (empty list = pass)."""
+    problems = []
+    for name, report in reports.items():
+        p99 = report["latency"]["p99_ms"]
+        if p99 > max_latency_ms:
+            problems.append(f"{name}: p99 {p99:.2f} ms > {max_latency_ms:.2f} ms")
+        if current.get(name):
+            limit = current[name]["latency"]["p99_ms"] * max_slowdown
+            if p99 > limit:
+                problems.append(f"{name}: p99 {p99:.2f} ms > {max_slowdown:.1f}x current "
+                                f"({current[name]['latency']['p99_ms']:.2f} ms)")
+            mae, current_mae = report["test"]["mae"], current[name]["test"]["mae"]
+            if mae > current_mae * (1 + max_mae_regression):
+                problems.append(f"{name}: test MAE {mae:.4f} > current {current_mae:.4f} "
+                                f"+ {max_mae_regression:.0%}")
+    return problems
+
+
+def run_training(cost_estimator="xgb_hist", co2_estimator="xgb_hist", tune=False, db=False,
+                 do_promote=False, force=False, jobs=TRAIN_JOBS, data_path=DATA_PATH,
+                 bundles_dir=BUNDLES_DIR, model_dir=MODEL_DIR, log=print):
+    t0 = time.perf_counter()
+    if db:
+        ingest_feature_dataset(log=log)
+    df, sources = load_training_data(data_path)
+    log(f"Training rows: {len(df):,} ({sources['processed_rows']:,} processed + "
+        f"{sources['ingested_rows']:,} new ingested)")
+
+    models, reports, current = {}, {}, {}
+    for name, estimator in (("cost", cost_estimator), ("co2", co2_estimator)):
+        models[name], reports[name] = train_model(name, df, estimator, tune, jobs, log)
+        current[name] = evaluate_current(name, df, model_dir)
+
+    problems = promotion_gate(reports, current)
+    version = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    info = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "data": {"rows": len(df), **sources},
+        "jobs": jobs if jobs > 0 else os.cpu_count(),
+        "models": reports,
+        "current": current,
+        "promotion_gate": {"max_latency_ms": MAX_LATENCY_MS, "max_slowdown": MAX_SLOWDOWN,
+                           "max_mae_regression": MAX_MAE_REGRESSION,
+                           "passed": not problems, "problems": problems},
+        "total_s": round(time.perf_counter() - t0, 3),
+    }
+    bundle = write_bundle({
+        "cost_model.pkl": lambda p: joblib.dump(models["cost"], p),
+        "co2_model.pkl": lambda p: joblib.dump(models["co2"], p),
+        "features_cost.pkl": lambda p: joblib.dump(FEATURES_COST, p),
+        "features_co2.pkl": lambda p: joblib.dump(FEATURES_CO2, p),
+    }, info, version, bundles_dir)
+    log(f"📦 Bundle {version} written to {bundle}")
+
+    for problem in problems:
+        log(f"⚠️ Promotion gate: {problem}")
+    if do_promote:
+        if problems and not force:
+            log("❌ Not promoted (promotion gate failed; --force to override)")
+        else:
+            promote(bundle, model_dir)
+            log(f"✅ Promoted {version} to {model_dir}")
+    return bundle, info
+
+
+def print_report(info):
+    rows = []
+    for name, r in info["models"].items():
+        rows.append((f"{name} (new {r['estimator']})", r["test"], r["latency"], r["fit_s"], r["peak_rss_mb"]))
+        cur = info["current"].get(name)
+        if cur:
+            rows.append((f"{name} (current {cur['version']})", cur["test"], cur["latency"], None, None))
+    print(f"\n{'model':32} {'MAE':>9} {'RMSE':>9} {'R²':>7} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'rows/s':>10} {'fit s':>7} {'RSS MB':>7}")
+    for label, m, lat, fit_s, rss in rows:
+        print(f"{label:32} {m['mae']:9.4f} {m['rmse']:9.4f} {m['r2']:7.4f} {lat['p50_ms']:8.3f} "
+              f"{lat['p99_ms']:8.3f} {lat['rows_per_s']:10,} {'' if fit_s is None else f'{fit_s:7.1f}':>7} "
+              f"{'' if rss is None else f'{rss:7.0f}':>7}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Train the cost / CO2 models into a versioned bundle")
+    ap.add_argument("--cost-estimator", choices=sorted(ESTIMATORS), default="xgb_hist")
+    ap.add_argument("--co2-estimator", choices=sorted(ESTIMATORS), default="xgb_hist")
+    ap.add_argument("--tune", action="store_true", help="GridSearchCV over the notebook's grids")
+    ap.add_argument("--db", action="store_true", help="ingest new feature_dataset rows first")
+    ap.add_argument("--jobs", type=int, default=TRAIN_JOBS)
+    ap.add_argument("--promote", action="store_true", help="copy the bundle into ml/models if it passes the gate")
+    ap.add_argument("--force", action="store_true", help="promote even if the promotion gate fails")
+    args = ap.parse_args()
+
+    _, info = run_training(args.cost_estimator, args.co2_estimator, args.tune, args.db,
+                           args.promote, args.force, args.jobs)
+    print_report(info)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
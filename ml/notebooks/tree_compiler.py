@@ -0,0 +1,350 @@
+"""
+Compiled tree-ensemble evaluator
+- Flattens a fitted Pipeline(ColumnTransformer → RandomForest / XGBoost)
+  into plain NumPy arrays:
+    preprocessing → (column, mean, scale) blocks + one-hot category tables
+    trees         → feature / threshold / left / right / value arrays,
+                    all trees concatenated, leaves pointing at themselves
+- predict() walks every tree for every row at once, one vectorised step
+  per tree level, instead of going through sklearn/xgboost dispatch and
+  DataFrame validation on each call
+- The original model stays as .reference; compile_with_parity() only
+  swaps in the compiled form if both agree on a sample within tolerance
+- Wins on request-sized batches (10–600 rows) where dispatch dominates;
+  past COMPILED_MAX_NODE_VISITS (rows × trees × depth) the libraries'
+  native loops are faster, so predict() hands big batches to .reference
+
+Split semantics follow the libraries exactly:
+  sklearn  go left if float32(x) <= threshold (float64)
+  xgboost  go left if float32(x) <  threshold (float32), NaN → default
+           child; with sparse preprocessing output, zeros count as missing
+"""
+
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+PARITY_RTOL = 1e-4
+PARITY_ATOL = 1e-3
+PARITY_SAMPLE_ROWS = 512
+
+# Above this many rows × trees × depth, predict() uses the reference model
+COMPILED_MAX_NODE_VISITS = int(os.getenv("COMPILED_MAX_NODE_VISITS", 1_000_000))
+
+# Rows × trees evaluated per traversal block (bounds the node-index matrix)
+TRAVERSAL_BLOCK_CELLS = 1 << 21
+
+# Losses whose prediction is the raw margin
+XGB_IDENTITY_OBJECTIVES = {
+    "reg:squarederror", "reg:pseudohubererror", "reg:absoluteerror", "reg:quantileerror",
+}
+
+logger = logging.getLogger(__name__)
+
+
+# ======================================================
+# Preprocessing
+# ======================================================
+def _unwrap(transformer):
+    """Single-step Pipelines (e.g. Pipeline([("scaler", StandardScaler())])) → the step."""
+    steps = getattr(transformer, "steps", None)
+    if steps is not None:
+        if len(steps) != 1:
+            raise NotImplementedError(f"Multi-step transformer pipeline: {[n for n, _ in steps]}")
+        return steps[0][1]
+    return transformer
+
+
+class CompiledPreprocessor:
+    """ColumnTransformer of StandardScaler / OneHotEncoder / passthrough blocks."""
+
+    def __init__(self, ct):
+        self.blocks = []    # (kind, columns, params, output offset)
+        self.sparse_output = bool(getattr(ct, "sparse_output_", False))
+
+        width = 0
+        for name, trans, cols in ct.transformers_:
+            if isinstance(trans, str) and trans == "drop":
+                continue
+            sl = ct.output_indices_[name]
+            if sl.stop == sl.start:
+                continue
+            cols = [cols] if isinstance(cols, str) else list(cols)
+            # remainder columns are positions on older sklearn, names on newer
+            cols = [ct.feature_names_in_[c] if isinstance(c, (int, np.integer)) else c for c in cols]
+            self.blocks.append(self._compile_block(trans, cols, sl.start))
+            width = max(width, sl.stop)
+        self.n_features = width
+
+    @staticmethod
+    def _compile_block(trans, cols, offset):
+        if isinstance(trans, str) and trans == "passthrough":
+            return ("passthrough", cols, None, offset)
+        step = _unwrap(trans)
+        kind = type(step).__name__
+        if kind == "FunctionTransformer" and step.func is None:
+            return ("passthrough", cols, None, offset)    # fitted "passthrough"
+        if kind == "StandardScaler":
+            mean = step.mean_ if step.with_mean else np.zeros(len(cols))
+            scale = step.scale_ if step.with_std else np.ones(len(cols))
+            return ("scale", cols, (np.asarray(mean, float), np.asarray(scale, float)), offset)
+        if kind == "OneHotEncoder":
+            if getattr(step, "drop_idx_", None) is not None:
+                raise NotImplementedError("OneHotEncoder(drop=...) is not supported")
+            if any(c is not None for c in (getattr(step, "infrequent_categories_", None) or [])):
+                raise NotImplementedError("OneHotEncoder infrequent categories are not supported")
+            cats = [np.asarray(c) for c in step.categories_]
+            starts = offset + np.concatenate([[0], np.cumsum([len(c) for c in cats])[:-1]])
+            return ("onehot", cols, list(zip(cats, starts.tolist())), offset)
+        raise NotImplementedError(f"Unsupported transformer: {kind}")
+
+    def transform(self, X):
+        """DataFrame → dense float64 (n_rows, n_features)."""
+        out = np.zeros((len(X), self.n_features), dtype=np.float64)
+        for kind, cols, params, offset in self.blocks:
+            if kind == "onehot":
+                for col, (cats, start) in zip(cols, params):
+                    values = X[col].to_numpy()
+                    # unknown category → all zeros (handle_unknown="ignore")
+                    for j, cat in enumerate(cats):
+                        out[:, start + j] = values == cat
+                continue
+            for i, col in enumerate(cols):
+                values = X[col].to_numpy(dtype=np.float64)
+                if kind == "scale":
+                    mean, scale = params
+                    values = (values - mean[i]) / scale[i]
+                out[:, offset + i] = values
+        return out
+
+
+# ======================================================
+# Tree ensembles
+# ======================================================
+class CompiledForest:
+    """
+    All trees concatenated into flat node arrays. Leaves point at
+    themselves, so running max_depth steps lands every row on its leaf.
+    """
+
+    def __init__(self, trees, strict, threshold_dtype, aggregate, base_score=0.0,
+                 missing_zero=False):
+        # trees: list of dicts with per-tree local arrays
+        offsets = np.concatenate([[0], np.cumsum([len(t["feature"]) for t in trees])[:-1]])
+        feature, threshold, left, right, default_left, value, is_leaf = [], [], [], [], [], [], []
+        for t, off in zip(trees, offsets):
+            node = np.arange(len(t["feature"]))
+            leaf = t["left"] < 0
+            feature.append(np.where(leaf, 0, t["feature"]))
+            threshold.append(t["threshold"])
+            left.append(np.where(leaf, node, t["left"]) + off)
+            right.append(np.where(leaf, node, t["right"]) + off)
+            default_left.append(t.get("default_left", np.zeros(len(node), dtype=bool)))
+            value.append(t["value"])
+            is_leaf.append(leaf)
+
+        self.roots = offsets.astype(np.int64)
+        self.feature = np.concatenate(feature).astype(np.int64)
+        self.threshold = np.concatenate(threshold).astype(threshold_dtype)
+        self.left = np.concatenate(left).astype(np.int64)
+        self.right = np.concatenate(right).astype(np.int64)
+        self.default_left = np.concatenate(default_left).astype(bool)
+        self.value = np.concatenate(value).astype(np.float64)
+        self.is_leaf = np.concatenate(is_leaf)
+        self.max_depth = max(t["depth"] for t in trees)
+        self.n_trees = len(trees)
+        self.n_nodes = len(self.feature)
+
+        self.strict = strict            # xgboost: x < thr ; sklearn: x <= thr
+        self.aggregate = aggregate      # "mean" (forest) or "sum" (boosting)
+        self.base_score = float(base_score)
+        self.missing_zero = missing_zero
+
+    def _leaves(self, X32):
+        n, n_cols = X32.shape
+        flat = X32.ravel()
+        row_base = (np.arange(n, dtype=np.int64) * n_cols)[:, None]
+        missing_any = np.isnan(flat).any() or (self.missing_zero and (flat == 0).any())
+
+        node = np.broadcast_to(self.roots, (n, self.n_trees)).copy()
+        for depth in range(self.max_depth):
+            x = np.take(flat, row_base + np.take(self.feature, node))
+            thr = np.take(self.threshold, node)
+            go_left = x < thr if self.strict else x <= thr
+            if missing_any:
+                missing = np.isnan(x)
+                if self.missing_zero:
+                    missing |= x == 0
+                go_left = np.where(missing, np.take(self.default_left, node), go_left)
+            node = np.where(go_left, np.take(self.left, node), np.take(self.right, node))
+            # Shallow paths finish early; check every few levels
+            if depth % 4 == 3 and np.take(self.is_leaf, node).all():
+                break
+        return np.take(self.value, node)
+
+    def predict_transformed(self, Xt):
+        X32 = np.ascontiguousarray(Xt, dtype=np.float32)
+        out = np.empty(X32.shape[0], dtype=np.float64)
+        block = max(1, TRAVERSAL_BLOCK_CELLS // self.n_trees)
+        for start in range(0, X32.shape[0], block):
+            leaves = self._leaves(X32[start:start + block])
+            if self.aggregate == "mean":
+                out[start:start + block] = leaves.mean(axis=1)
+            else:
+                out[start:start + block] = leaves.sum(axis=1) + self.base_score
+        return out
+
+
+def _tree_depth(left, right):
+    depth = np.zeros(len(left), dtype=np.int64)
+    stack = [0]
+    while stack:
+        node = stack.pop()
+        if left[node] >= 0:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+            stack += [left[node], right[node]]
+    return int(depth.max())
+
+
+def _compile_sklearn_forest(est):
+    trees = []
+    for tree_est in getattr(est, "estimators_", [est]):
+        tree = tree_est.tree_
+        if tree.n_outputs != 1:
+            raise NotImplementedError("Multi-output trees are not supported")
+        left = tree.children_left.astype(np.int64)
+        right = tree.children_right.astype(np.int64)
+        trees.append({
+            "feature": tree.feature, "threshold": tree.threshold,
+            "left": left, "right": right,
+            "value": tree.value[:, 0, 0],
+            "depth": _tree_depth(left, right),
+        })
+    return trees
+
+
+def _compile_xgboost(est):
+    booster = est.get_booster()
+    model = json.loads(booster.save_raw(raw_format="json"))
+    learner = model["learner"]
+    gbm = learner["gradient_booster"]
+    if gbm["name"] != "gbtree":
+        raise NotImplementedError(f"Unsupported booster: {gbm['name']}")
+    objective = learner["objective"]["name"]
+    if objective not in XGB_IDENTITY_OBJECTIVES:
+        raise NotImplementedError(f"Unsupported objective: {objective}")
+    if int(learner["learner_model_param"].get("num_target", "1")) > 1:
+        raise NotImplementedError("Multi-target boosters are not supported")
+    base_score = float(learner["learner_model_param"]["base_score"].strip("[]"))
+
+    raw_trees = gbm["model"]["trees"]
+    best = getattr(est, "best_iteration", None)
+    if best is not None:
+        per_round = int(gbm["model"]["gbtree_model_param"].get("num_parallel_tree", "1"))
+        raw_trees = raw_trees[:(best + 1) * per_round]
+
+    trees = []
+    for t in raw_trees:
+        if any(t["split_type"]):
+            raise NotImplementedError("Categorical splits are not supported")
+        left = np.asarray(t["left_children"], dtype=np.int64)
+        right = np.asarray(t["right_children"], dtype=np.int64)
+        cond = np.asarray(t["split_conditions"], dtype=np.float32)
+        trees.append({
+            "feature": np.asarray(t["split_indices"], dtype=np.int64),
+            "threshold": cond,
+            "left": left, "right": right,
+            "default_left": np.asarray(t["default_left"], dtype=bool),
+            "value": np.where(left < 0, cond, 0.0),   # leaves store their value in split_conditions
+            "depth": _tree_depth(left, right),
+        })
+    return trees, base_score
+
+
+# ======================================================
+# Public API
+# ======================================================
+class CompiledModel:
+    """Drop-in .predict(X_df) for a fitted pipeline; .reference is the original."""
+
+    def __init__(self, reference):
+        steps = getattr(reference, "steps", None)
+        if steps:
+            if len(steps) > 2:
+                raise NotImplementedError("Only Pipeline(preprocessor, estimator) is supported")
+            self.preprocessor = CompiledPreprocessor(steps[0][1]) if len(steps) == 2 else None
+            est = steps[-1][1]
+        else:
+            self.preprocessor, est = None, reference
+
+        kind = type(est).__name__
+        sparse = self.preprocessor is not None and self.preprocessor.sparse_output
+        if kind in ("RandomForestRegressor", "ExtraTreesRegressor", "DecisionTreeRegressor"):
+            self.forest = CompiledForest(
+                _compile_sklearn_forest(est), strict=False,
+                threshold_dtype=np.float64, aggregate="mean"
+            )
+        elif kind == "XGBRegressor":
+            trees, base_score = _compile_xgboost(est)
+            self.forest = CompiledForest(
+                trees, strict=True, threshold_dtype=np.float32, aggregate="sum",
+                base_score=base_score, missing_zero=sparse
+            )
+        else:
+            raise NotImplementedError(f"Unsupported estimator: {kind}")
+
+        self.reference = reference
+        self.kind = kind
+        self.max_node_visits = COMPILED_MAX_NODE_VISITS
+        self.parity = None
+
+    def predict(self, X):
+        if len(X) * self.forest.n_trees * self.forest.max_depth > self.max_node_visits:
+            return np.asarray(self.reference.predict(X), dtype=np.float64)
+        return self.predict_compiled(X)
+
+    def predict_compiled(self, X):
+        if self.preprocessor is not None:
+            X = self.preprocessor.transform(X)
+        elif isinstance(X, pd.DataFrame):
+            X = X.to_numpy(dtype=np.float64)
+        return self.forest.predict_transformed(X)
+
+    def check_parity(self, X, rtol=PARITY_RTOL, atol=PARITY_ATOL):
+        """Compares against the reference model; raises AssertionError on mismatch."""
+        expected = np.asarray(self.reference.predict(X), dtype=np.float64)
+        got = self.predict_compiled(X)
+        diff = np.abs(got - expected)
+        self.parity = {
+            "rows": int(len(expected)),
+            "max_abs_diff": float(diff.max()) if len(diff) else 0.0,
+            "rtol": rtol, "atol": atol,
+        }
+        if not np.allclose(got, expected, rtol=rtol, atol=atol):
+            raise AssertionError(
+                f"{self.kind}: compiled predictions differ from reference "
+                f"(max abs diff {self.parity['max_abs_diff']:.6g})"
+            )
+        return self.parity
+
+
+def reference_model(model):
+    """The original library model behind a compiled one (or the model itself)."""
+    return getattr(model, "reference", model)
+
+
+def compile_with_parity(model, sample, rtol=PARITY_RTOL, atol=PARITY_ATOL):
+    """
+    CompiledModel when it compiles and matches the reference on sample,
+    the original model otherwise (logged, never raised).
+    """
+    try:
+        compiled = CompiledModel(model)
+        compiled.check_parity(sample, rtol=rtol, atol=atol)
+    except (NotImplementedError, AssertionError, KeyError, ValueError) as e:
+        logger.warning(f"Using reference model ({type(reference_model(model)).__name__}): {e}")
+        return model
+    return compiled
@@ -0,0 +1,456 @@
+"""
+Preprocessing pipeline: data/raw → data/processed
+-------------------------------------------------
+Scripted version of data_cleaning.ipynb + feature_engineering.ipynb:
+same column selection, cleaning, fuzzy material matching, canonical
+profiles, merge and feature formulas, written to the same files.
+
+- Stages: extract → materials → history → merge → features. Each one
+  records the sha256 of its inputs in <cache>/manifest.json and is
+  skipped while those (and its own outputs) are unchanged
+- extract converts the raw .xlsx files to parquet once; later stages
+  read the parquet copy (a .parquet raw file is used as is)
+- History is streamed in chunks of CHUNK_ROWS: duplicates are tracked by
+  64-bit row hash across chunks, fuzzy matching runs once per distinct
+  Packaging_Used, and the global min-max / percentile steps of the
+  feature stage keep only a few numeric columns in memory
+
+Usage:
+    python preprocessing/pipeline.py                  # rebuild what changed
+    python preprocessing/pipeline.py --force          # every stage
+    python preprocessing/pipeline.py --out /tmp/processed --chunk-rows 50000
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from rapidfuzz import fuzz, process
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT))
+
+from ml.notebooks.recommendation_grid import file_stamp
+
+RAW_MATERIALS_PATH = PROJECT_ROOT / "data" / "raw" / "materials_database_600.xlsx"
+RAW_HISTORY_PATH = PROJECT_ROOT / "data" / "raw" / "real_packaging_history.xlsx"
+DEFAULT_OUT_DIR = PROJECT_ROOT / "data" / "processed"
+DEFAULT_CACHE_DIR = PROJECT_ROOT / "data" / "pipeline"
+
+# Bump when a stage's logic changes so cached outputs are rebuilt
+PIPELINE_VERSION = "1"
+CHUNK_ROWS = int(os.getenv("PIPELINE_CHUNK_ROWS", 100_000))
+
+OUTPUT_FILES = {
+    "clean_materials": "clean_materials.csv",
+    "clean_history": "clean_history.csv",
+    "lookup": "material_id_lookup.csv",
+    "final": "final_ecopack_dataset.csv",
+    "features": "final_ecopack_dataset_fe.csv",
+}
+
+# ======================================================
+# Cleaning rules (data_cleaning.ipynb)
+# ======================================================
+MATERIAL_COLUMNS = [
+    "Material_ID", "Material_Name", "Category", "Density_kg_m3",
+    "Tensile_Strength_MPa", "Cost_per_kg", "CO2_Emission_kg", "Biodegradable",
+]
+HISTORY_COLUMNS = [
+    "Category", "Weight_kg", "Volumetric_Weight_kg", "L_cm", "W_cm", "H_cm",
+    "Fragility", "Moisture_Sens", "Shipping_Mode", "Distance_km",
+    "Packaging_Used", "Cost_USD", "CO2_Emission_kg",
+]
+
+FUZZY_THRESHOLD = 58
+
+# Packaging with no close match in the database gets its own profile
+CANONICAL_MATERIALS = [
+    {"Material_ID": 601, "Material_Name": "Mushroom Pkg (Mycelium)", "Category": "Bio-based",
+     "Density_kg_m3": 95, "Tensile_Strength_MPa": 12.0, "Cost_per_kg": 3.20,
+     "CO2_Emission_kg": 0.18, "Biodegradable": "Yes"},
+    {"Material_ID": 602, "Material_Name": "Honeycomb Paper", "Category": "Paper",
+     "Density_kg_m3": 380, "Tensile_Strength_MPa": 42.0, "Cost_per_kg": 1.95,
+     "CO2_Emission_kg": 0.75, "Biodegradable": "Yes"},
+]
+CANONICAL_IDS = {m["Material_Name"]: m["Material_ID"] for m in CANONICAL_MATERIALS}
+
+# ======================================================
+# Feature rules (feature_engineering.ipynb)
+# ======================================================
+SHIPPING_MULTIPLIER = {"Air": 1.5, "Road": 1.0, "Sea": 0.8}
+BIODEGRADABLE_PENALTY = {"Yes": 0.7, "No": 1.3}
+MOISTURE_SAFE_CATEGORIES = ["Plastic", "Metal", "Bio-based"]
+RATING_BINS = [0, 0.2, 0.4, 0.6, 0.8, 1.0]
+RATING_LABELS = ["E", "D", "C", "B", "A"]
+
+
+# ======================================================
+# Inputs
+# ======================================================
+def extract(raw_path, out_path):
+    """Parquet copy of a raw .xlsx, so later runs don't pay for the Excel parser."""
+    df = pd.read_excel(raw_path)
+    tmp = Path(out_path).with_suffix(".tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, out_path)
+    return {"rows": len(df)}
+
+
+def read_chunks(path, columns=None, chunk_rows=CHUNK_ROWS):
+    """DataFrames of at most chunk_rows rows from a parquet or CSV file."""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+
+
+class ChunkWriter:
+    """Appends chunks to one CSV (header once); moved into place on close."""
+
+    def __init__(self, path, columns=None):
+        self.path = Path(path)
+        self.tmp = self.path.with_suffix(".tmp")
+        self.columns = columns
+        self.rows = 0
+        self._f = open(self.tmp, "w", newline="")
+        self._header = True
+
+    def write(self, df):
+        df.to_csv(self._f, index=False, header=self._header)
+        self._header = False
+        self.rows += len(df)
+
+    def close(self):
+        if self._header:
+            pd.DataFrame(columns=self.columns).to_csv(self._f, index=False)
+        self._f.close()
+        os.replace(self.tmp, self.path)
+
+
+# ======================================================
+# Stage: materials
+# ======================================================
+def clean_materials(raw):
+    """Selected columns, no duplicates / nulls; canonical profiles not yet appended."""
+    return raw[MATERIAL_COLUMNS].drop_duplicates().dropna()
+
+
+def materials_stage(raw_path, out_path):
+    materials = clean_materials(pd.read_parquet(raw_path, columns=MATERIAL_COLUMNS))
+    materials = pd.concat([materials, pd.DataFrame(CANONICAL_MATERIALS)], ignore_index=True)
+    tmp = Path(out_path).with_suffix(".tmp")
+    materials.to_csv(tmp, index=False)
+    os.replace(tmp, out_path)
+    return {"materials": len(materials)}
+
+
+# ======================================================
+# Stage: history
+# ======================================================
+class MaterialResolver:
+    """Packaging_Used → Material_ID, fuzzy-matched once per distinct name."""
+
+    def __init__(self, materials, threshold=FUZZY_THRESHOLD):
+        # Matching only sees the database materials, not the canonical profiles
+        materials = materials[~materials["Material_ID"].isin(CANONICAL_IDS.values())]
+        self.names = materials["Material_Name"].tolist()
+        self.ids = materials["Material_ID"].tolist()
+        self.threshold = threshold
+        self.cache = {}
+
+    def _resolve(self, packaging):
+        if packaging in CANONICAL_IDS:
+            return float(CANONICAL_IDS[packaging])
+        if not isinstance(packaging, str):
+            return np.nan
+        _, score, idx = process.extractOne(packaging, self.names, scorer=fuzz.token_sort_ratio)
+        return float(self.ids[idx]) if score >= self.threshold else np.nan
+
+    def __call__(self, packaging):
+        for name in packaging.unique():
+            if name not in self.cache:
+                self.cache[name] = self._resolve(name)
+        return packaging.map(self.cache).astype(float)
+
+
+def history_stage(raw_path, materials_path, out_path, lookup_path, chunk_rows=CHUNK_ROWS):
+    resolve = MaterialResolver(pd.read_csv(materials_path))
+    writer = ChunkWriter(out_path, HISTORY_COLUMNS + ["Material_ID"])
+    seen = set()
+    pairs = {}
+    read = 0
+    try:
+        for chunk in read_chunks(raw_path, HISTORY_COLUMNS, chunk_rows):
+            read += len(chunk)
+            chunk = chunk[HISTORY_COLUMNS]
+            # drop_duplicates over the whole file: keep a row only the first time its hash appears
+            hashes = pd.util.hash_pandas_object(chunk, index=False).tolist()
+            first = [h not in seen and not seen.add(h) for h in hashes]
+            chunk = chunk[np.array(first, dtype=bool)].dropna()
+            chunk["Material_ID"] = resolve(chunk["Packaging_Used"])
+            for pkg, mid in chunk[["Packaging_Used", "Material_ID"]].drop_duplicates().itertuples(index=False):
+                pairs.setdefault((pkg, None if mid != mid else mid), (pkg, mid))
+            writer.write(chunk)
+    finally:
+        writer.close()
+
+    lookup = pd.DataFrame(list(pairs.values()), columns=["Packaging_Used", "Material_ID"])
+    lookup["Material_ID"] = lookup["Material_ID"].astype(float)
+    tmp = Path(lookup_path).with_suffix(".tmp")
+    lookup.sort_values("Material_ID").to_csv(tmp, index=False)
+    os.replace(tmp, lookup_path)
+    unmatched = sum(1 for (_, mid) in pairs if mid is None)
+    return {"rows_read": read, "rows": writer.rows, "packaging_types": len(resolve.cache),
+            "unmatched_packaging": unmatched}
+
+
+# ======================================================
+# Stage: merge
+# ======================================================
+def merge_stage(history_path, materials_path, out_path, chunk_rows=CHUNK_ROWS):
+    materials = pd.read_csv(materials_path)
+    writer = ChunkWriter(out_path)
+    try:
+        for chunk in read_chunks(history_path, chunk_rows=chunk_rows):
+            writer.write(pd.merge(chunk, materials, on="Material_ID", how="left",
+                                  suffixes=("_item", "_material")))
+    finally:
+        writer.close()
+    return {"rows": writer.rows}
+
+
+# ======================================================
+# Stage: features
+# ======================================================
+def _scale(raw, lo, hi):
+    return (raw - lo) / (hi - lo) * 100
+
+
+def _to_index(values):
+    return values.clip(0, 100).round(2)
+
+
+def raw_indices(df):
+    """Per-row raw values of the four min-max normalised indices."""
+    multiplier = df["Shipping_Mode"].map(SHIPPING_MULTIPLIER).fillna(1.0)
+    co2_raw = np.log1p(df["CO2_Emission_kg_item"] + (df["CO2_Emission_kg_material"] * df["Weight_kg"])) * multiplier
+
+    expected_cost = df["Cost_per_kg"] * df[["Weight_kg", "Volumetric_Weight_kg"]].max(axis=1)
+    cost_raw = df["Fragility"] / ((df["Cost_USD"] / expected_cost) + 1e-6)
+
+    moisture_fit = np.where(
+        (df["Moisture_Sens"] == True) & (df["Category_material"].isin(MOISTURE_SAFE_CATEGORIES)),  # noqa: E712
+        1.2, 1.0
+    )
+    suit_raw = (df["Tensile_Strength_MPa"] / (df["Fragility"] + 1)) * moisture_fit
+    return co2_raw, cost_raw, suit_raw
+
+
+def environmental_raw(df, co2_index):
+    penalty = df["Biodegradable"].map(BIODEGRADABLE_PENALTY).fillna(1.0)
+    return (100 - co2_index) * penalty * np.log1p(df["Density_kg_m3"])
+
+
+def sustainability_score(biodegradable, environmental, cost_efficiency):
+    return (
+        (1 / (environmental + 1e-6)) *
+        cost_efficiency *
+        np.where(biodegradable, 1.2, 0.8)
+    )
+
+
+class _Range:
+    def __init__(self):
+        self.lo, self.hi = np.inf, -np.inf
+
+    def update(self, values):
+        if values.notna().any():
+            self.lo, self.hi = min(self.lo, values.min()), max(self.hi, values.max())
+
+
+def feature_indices(df, ranges):
+    """Normalised index columns for one chunk, given the global raw ranges."""
+    co2_raw, cost_raw, suit_raw = raw_indices(df)
+    co2 = _to_index(100 - _scale(co2_raw, ranges["co2"].lo, ranges["co2"].hi))
+    cost = _to_index(_scale(cost_raw, ranges["cost"].lo, ranges["cost"].hi))
+    suit = _to_index(_scale(suit_raw, ranges["suit"].lo, ranges["suit"].hi))
+    return co2, cost, suit
+
+
+def _concat(parts, dtype=float):
+    return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+
+def features_stage(final_path, out_path, chunk_rows=CHUNK_ROWS):
+    ranges = {name: _Range() for name in ("co2", "cost", "suit", "env")}
+
+    # Pass 1: raw ranges of the indices that only depend on the row
+    for chunk in read_chunks(final_path, chunk_rows=chunk_rows):
+        for name, values in zip(("co2", "cost", "suit"), raw_indices(chunk)):
+            ranges[name].update(values)
+
+    # Pass 2: the environmental range needs co2_impact_index, and the sustainability
+    # percentile needs every row, so these three columns are kept for the whole file
+    env_raw, cost_eff, bio = [], [], []
+    for chunk in read_chunks(final_path, chunk_rows=chunk_rows):
+        co2, cost, _ = feature_indices(chunk, ranges)
+        env = environmental_raw(chunk, co2)
+        ranges["env"].update(env)
+        env_raw.append(env.to_numpy())
+        cost_eff.append(cost.to_numpy())
+        bio.append((chunk["Biodegradable"] == "Yes").to_numpy())
+    env_score = _to_index(pd.Series(_scale(_concat(env_raw), ranges["env"].lo, ranges["env"].hi))).to_numpy()
+    score = sustainability_score(_concat(bio, bool), env_score, _concat(cost_eff))
+    del env_raw, cost_eff, bio
+    ratings = pd.cut(pd.Series(score).rank(pct=True), bins=RATING_BINS, labels=RATING_LABELS).array
+
+    # Pass 3: write, row-wise columns recomputed per chunk
+    writer = ChunkWriter(out_path)
+    start = 0
+    try:
+        for chunk in read_chunks(final_path, chunk_rows=chunk_rows):
+            stop = start + len(chunk)
+            co2, cost, suit = feature_indices(chunk, ranges)
+            out = chunk.drop(columns=["L_cm", "W_cm", "H_cm"])
+            out["co2_impact_index"] = co2
+            out["cost_efficiency_index"] = cost
+            out["environmental_impact_score"] = env_score[start:stop]
+            out["material_suitability_score"] = suit
+            out["sustainability_score"] = score[start:stop]
+            out["sustainability_rating"] = ratings[start:stop]
+            out["Item_Volume_m3"] = (chunk["L_cm"] * chunk["W_cm"] * chunk["H_cm"]) / 1_000_000
+            writer.write(out)
+            start = stop
+    finally:
+        writer.close()
+    counts = pd.Series(ratings).value_counts()
+    return {"rows": writer.rows, "ratings": {str(k): int(v) for k, v in counts.items()}}
+
+
+# ======================================================
+# Stage cache
+# ======================================================
+class StageCache:
+    """
+    manifest.json: sha256 of every file a stage read or wrote, plus its
+    stats. A stage re-runs when its input hashes (or the pipeline version)
+    change, or when one of its outputs was modified or removed.
+    """
+
+    def __init__(self, cache_dir):
+        self.dir = Path(cache_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.dir / "manifest.json"
+        self.manifest = json.loads(self.path.read_text()) if self.path.exists() else {}
+        self.manifest.setdefault("files", {})
+        self.manifest.setdefault("stages", {})
+
+    def sha256(self, path):
+        # Files whose size and mtime match the recorded stamp aren't hashed again
+        path = Path(path)
+        if not path.exists():
+            return None
+        known = self.manifest["files"].get(str(path))
+        stat = path.stat()
+        if not known or (known["size"], known["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+            known = self.manifest["files"][str(path)] = file_stamp(path)
+        return known["sha256"]
+
+    def _save(self):
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.manifest, indent=2))
+        os.replace(tmp, self.path)
+
+    def run(self, name, inputs, outputs, fn, force=False):
+        """(ran, record): runs fn() unless the recorded inputs and outputs still match."""
+        key = hashlib.sha256(json.dumps(
+            [PIPELINE_VERSION, name, [self.sha256(p) for p in inputs]]
+        ).encode()).hexdigest()
+        record = self.manifest["stages"].get(name)
+        if not force and record and record["key"] == key and \
+                all(record["outputs"].get(str(p)) == self.sha256(p) for p in outputs):
+            return False, record
+
+        t0 = time.perf_counter()
+        stats = fn()
+        record = {
+            "key": key,
+            "outputs": {str(p): self.sha256(p) for p in outputs},
+            "seconds": round(time.perf_counter() - t0, 3),
+            "stats": stats,
+        }
+        self.manifest["stages"][name] = record
+        self._save()
+        return True, record
+
+
+# ======================================================
+# Driver
+# ======================================================
+def run_pipeline(raw_materials=RAW_MATERIALS_PATH, raw_history=RAW_HISTORY_PATH,
+                 out_dir=DEFAULT_OUT_DIR, cache_dir=DEFAULT_CACHE_DIR,
+                 chunk_rows=CHUNK_ROWS, force=False, log=print):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out = {name: out_dir / fname for name, fname in OUTPUT_FILES.items()}
+    cache = StageCache(cache_dir)
+    results = {}
+
+    def stage(name, inputs, outputs, fn):
+        ran, record = cache.run(name, inputs, outputs, fn, force)
+        results[name] = {"ran": ran, **record}
+        if ran:
+            log(f"✓ {name}: {record['stats']} ({record['seconds']:.2f}s)")
+        else:
+            log(f"• {name}: inputs unchanged, skipped")
+
+    raw = {}
+    for label, path in (("materials", Path(raw_materials)), ("history", Path(raw_history))):
+        if path.suffix == ".parquet":
+            raw[label] = path
+            continue
+        raw[label] = cache.dir / f"{path.stem}.parquet"
+        stage(f"extract_{label}", [path], [raw[label]],
+              lambda path=path, target=raw[label]: extract(path, target))
+
+    stage("materials", [raw["materials"]], [out["clean_materials"]],
+          lambda: materials_stage(raw["materials"], out["clean_materials"]))
+    stage("history", [raw["history"], out["clean_materials"]], [out["clean_history"], out["lookup"]],
+          lambda: history_stage(raw["history"], out["clean_materials"], out["clean_history"],
+                                out["lookup"], chunk_rows))
+    stage("merge", [out["clean_history"], out["clean_materials"]], [out["final"]],
+          lambda: merge_stage(out["clean_history"], out["clean_materials"], out["final"], chunk_rows))
+    stage("features", [out["final"]], [out["features"]],
+          lambda: features_stage(out["final"], out["features"], chunk_rows))
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Rebuild data/processed from the raw datasets")
+    ap.add_argument("--materials", default=str(RAW_MATERIALS_PATH), help=".xlsx or .parquet")
+    ap.add_argument("--history", default=str(RAW_HISTORY_PATH), help=".xlsx or .parquet")
+    ap.add_argument("--out", default=str(DEFAULT_OUT_DIR))
+    ap.add_argument("--cache", default=str(DEFAULT_CACHE_DIR))
+    ap.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    ap.add_argument("--force", action="store_true", help="run every stage")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    results = run_pipeline(args.materials, args.history, args.out, args.cache, args.chunk_rows, args.force)
+    ran = sum(r["ran"] for r in results.values())
+    print(f"Pipeline done in {time.perf_counter() - t0:.2f}s ({ran}/{len(results)} stages ran)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,15 +6,14 @@ CREATE TABLE IF NOT EXISTS users (
     password_hash VARCHAR(255),
     failed_attempts INT DEFAULT 0,
     is_locked BOOLEAN DEFAULT FALSE,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_login TIMESTAMP NULL
 );
 
--- RECOMMENDATION HISTORY
-CREATE TABLE IF NOT EXISTS recommendation_history (
+-- SHIPMENTS (one row per distinct shipment; see backend/history_store.py)
+CREATE TABLE IF NOT EXISTS shipment_fingerprints (
     id BIGINT AUTO_INCREMENT PRIMARY KEY,
-    email VARCHAR(255),
-    session_id VARCHAR(100),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    fingerprint BINARY(20) NOT NULL UNIQUE,
 
     product_category VARCHAR(100),
     weight_kg FLOAT,
@@ -25,11 +24,55 @@ CREATE TABLE IF NOT EXISTS recommendation_history (
     length_cm FLOAT,
     width_cm FLOAT,
     height_cm FLOAT,
+
+    INDEX idx_shipment_category_mode (product_category, shipping_mode)
+);
+
+-- RECOMMENDATION HISTORY
+CREATE TABLE IF NOT EXISTS recommendation_history (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    email VARCHAR(255),
+    session_id VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    shipment_id BIGINT,
     k_value INT,
+    sort_by VARCHAR(20),
+
+    results BLOB,           -- packed (material_id, pred_cost, pred_co2, score) records
+    recommendations JSON,   -- only for results the packed form can't hold
+
+    FOREIGN KEY (email) REFERENCES users(email),
+    FOREIGN KEY (shipment_id) REFERENCES shipment_fingerprints(id),
+    INDEX idx_history_email_created (email, created_at),
+    INDEX idx_history_created (created_at),
+    INDEX idx_history_shipment (shipment_id)
+);
+
+-- RECOMMENDATION ROLLUP (analytics; maintained by backend/analytics.py)
+CREATE TABLE IF NOT EXISTS recommendation_rollup (
+    day DATE NOT NULL,
+    product_category VARCHAR(100) NOT NULL,
+    shipping_mode VARCHAR(50) NOT NULL,
+    top_material VARCHAR(100) NOT NULL,
+
+    requests INT NOT NULL DEFAULT 0,
+    sum_pred_cost DOUBLE NOT NULL DEFAULT 0,
+    sum_pred_co2 DOUBLE NOT NULL DEFAULT 0,
+    sum_sustainability DOUBLE NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (day, product_category, shipping_mode, top_material)
+);
 
-    recommendation JSON,
+-- DRIFT MONITOR STATE (one sketch state per worker and window; see backend/drift_store.py)
+CREATE TABLE IF NOT EXISTS drift_monitor_state (
+    worker_id VARCHAR(64) NOT NULL,
+    window_start BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    state JSON NOT NULL,
 
-    FOREIGN KEY (email) REFERENCES users(email)
+    PRIMARY KEY (worker_id, window_start),
+    INDEX idx_drift_window (window_start)
 );
 
 -- FEATURES 
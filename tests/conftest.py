@@ -0,0 +1,39 @@
+"""
+Test setup
+- backend/ and the project root on sys.path, as the app and benchmarks
+  have them
+- Every test session gets its own embedded SQLite database (DB_BACKEND /
+  SQLITE_PATH are read when db.py is imported, so they are set here
+  first) and never reaches a MySQL server from .env
+- Rate limits off, so app tests aren't throttled
+- `client`: a Flask test client, skipped when the models aren't present
+  (importing the app loads them)
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "backend"))
+
+_tmp = tempfile.mkdtemp(prefix="ecopack_tests_")
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(_tmp, "test.sqlite3")
+os.environ["JOBS_DIR"] = os.path.join(_tmp, "jobs")
+os.environ["JOB_WORKERS"] = "0"
+os.environ["DISABLE_RATE_LIMITS"] = "1"
+
+
+@pytest.fixture
+def client():
+    recommender = pytest.importorskip("recommender")
+    if not recommender.ML_AVAILABLE:
+        pytest.skip("ML engine not available (models not present)")
+    import app
+    app.app.config["TESTING"] = True
+    return app.app.test_client()
@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+import auth
+from db import get_db
+
+
+@pytest.fixture(autouse=True)
+def fast_bcrypt(monkeypatch):
+    monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 4)
+
+
+def stored_hash(email):
+    db = get_db()
+    try:
+        with db.cursor() as cur:
+            cur.execute("SELECT password_hash FROM users WHERE email = %s", (email,))
+            return cur.fetchone()["password_hash"]
+    finally:
+        db.close()
+
+
+def stored_attempts(email):
+    db = get_db()
+    try:
+        with db.cursor() as cur:
+            cur.execute("SELECT failed_attempts FROM users WHERE email = %s", (email,))
+            return cur.fetchone()["failed_attempts"]
+    finally:
+        db.close()
+
+
+def slow(fn):
+    def run(*args):
+        time.sleep(0.3)
+        return fn(*args)
+    return run
+
+
+def test_register_login_and_lockout():
+    assert auth.register_email("auth-flow@test.local")[1] == 201
+    assert auth.register_email("auth-flow@test.local")[1] == 409
+    result, status = auth.login_user("auth-flow@test.local", "s3cret")
+    assert status == 200 and result["first_login"]
+    assert auth.login_user("auth-flow@test.local", "s3cret")[1] == 200
+    assert auth.login_user("auth-flow@test.local", "wrong")[1] == 401
+    assert auth.login_user("auth-flow@test.local", "wrong")[1] == 401
+    assert auth.login_user("auth-flow@test.local", "wrong") == ({"error": "ACCESS DENIED", "locked": True}, 403)
+    assert auth.login_user("auth-flow@test.local", "s3cret")[1] == 403
+    assert auth.unlock_account("auth-flow@test.local")[1] == 200
+    assert auth.login_user("auth-flow@test.local", "s3cret")[1] == 200
+
+
+def test_rehash_on_login(monkeypatch):
+    auth.login_user("rehash@test.local", "pw")
+    monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 5)
+    assert auth.login_user("rehash@test.local", "pw")[1] == 200
+    assert stored_hash("rehash@test.local").startswith("$2b$05$")
+
+
+def test_verify_timeout_is_503(monkeypatch):
+    auth.login_user("slow-verify@test.local", "pw")
+    monkeypatch.setattr(auth, "HASH_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(auth, "_checkpw", slow(auth._checkpw))
+    result, status = auth.login_user("slow-verify@test.local", "pw")
+    assert status == 503 and result["retry"]
+
+
+def test_hash_timeout_on_first_login_is_503(monkeypatch):
+    monkeypatch.setattr(auth, "HASH_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(auth, "_hashpw", slow(auth._hashpw))
+    assert auth.login_user("slow-hash@test.local", "pw")[1] == 503
+
+
+def test_rehash_timeout_skips_the_upgrade(monkeypatch):
+    auth.login_user("slow-rehash@test.local", "pw")
+    before = stored_hash("slow-rehash@test.local")
+    monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 5)
+    monkeypatch.setattr(auth, "HASH_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(auth, "_hashpw", slow(auth._hashpw))
+    assert auth.login_user("slow-rehash@test.local", "pw")[1] == 200
+    assert stored_hash("slow-rehash@test.local") == before
+
+
+def test_saturated_pool_is_429(monkeypatch):
+    class Full:
+        def acquire(self, blocking=True):
+            return False
+
+    auth.login_user("busy@test.local", "pw")
+    monkeypatch.setattr(auth, "_hash_slots", Full())
+    assert auth.login_user("busy@test.local", "pw")[1] == 429
+
+
+def test_concurrent_failures_all_count(monkeypatch):
+    # Both requests read failed_attempts=0 before either writes
+    auth.login_user("racy@test.local", "pw")
+    barrier, checkpw = threading.Barrier(2, timeout=5), auth._checkpw
+
+    def check(password, hashed):
+        barrier.wait()
+        return False
+
+    monkeypatch.setattr(auth, "_checkpw", check)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(auth.login_user("racy@test.local", "wrong")))
+               for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert [status for _, status in results] == [401, 401]
+    assert stored_attempts("racy@test.local") == 2
+    monkeypatch.setattr(auth, "_checkpw", checkpw)
+    assert auth.login_user("racy@test.local", "wrong") == ({"error": "ACCESS DENIED", "locked": True}, 403)
@@ -0,0 +1,55 @@
+import gc
+
+import pandas as pd
+import pytest
+
+from ml.notebooks import candidate_filter
+from ml.notebooks.candidate_filter import get_material_index, prefilter_candidates, validate_constraints
+
+
+def materials(tensile):
+    n = len(tensile)
+    return pd.DataFrame({
+        "Material_Name": [f"M{i}" for i in range(n)],
+        "Category_material": ["Paper", "Plastic", "Eco"][:n],
+        "Biodegradable": [1, 0, 1][:n],
+        "Tensile_Strength_MPa": tensile,
+        "Density_kg_m3": [700.0, 950.0, 2500.0][:n],
+        "Cost_per_kg": [1.0, 2.0, 3.0][:n],
+    })
+
+
+def test_index_not_reused_for_a_new_frame_of_the_same_length():
+    # Frames built and dropped one after another tend to reuse the same id()
+    for i in range(20):
+        tensile, expected = ([1.0, 50.0, 100.0], ["M1", "M2"]) if i % 2 else ([100.0, 50.0, 1.0], ["M0", "M1"])
+        df = materials(tensile)
+        keep, _ = prefilter_candidates(df, {}, {"min_tensile_mpa": 10.0}, rules=[])
+        assert list(keep["Material_Name"]) == expected
+        del df, keep
+        gc.collect()
+
+
+def test_index_cache_is_bounded():
+    frames = [materials([1.0, 2.0, 3.0]) for _ in range(candidate_filter.MATERIAL_INDEX_CACHE_SIZE * 3)]
+    for df in frames:
+        get_material_index(df)
+    assert len(candidate_filter._indexes) <= candidate_filter.MATERIAL_INDEX_CACHE_SIZE
+    assert get_material_index(frames[-1]) is get_material_index(frames[-1])
+
+
+@pytest.mark.parametrize("constraints", [
+    "biodegradable_only", ["biodegradable_only"], 5,
+    {"max_cost_per_kg": "cheap"}, {"min_tensile_mpa": [1]},
+    {"categories": 5}, {"colour": "green"},
+])
+def test_bad_constraints_raise_value_error(constraints):
+    with pytest.raises(ValueError):
+        validate_constraints(constraints)
+
+
+def test_constraints_normalised():
+    assert validate_constraints({"categories": "Eco", "max_cost_per_kg": "2.5"}) == {
+        "categories": ["Eco"], "max_cost_per_kg": 2.5, "biodegradable_only": False,
+    }
+    assert validate_constraints(None) == {"biodegradable_only": False}
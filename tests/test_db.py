@@ -0,0 +1,212 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import auth
+import db
+from analytics import query_rollups
+from db import get_db, insert_ignore_sql, translate_schema, translate_sql, upsert_add_sql
+from drift_store import DriftRecorder
+from history_export import export_history
+from ml.notebooks.drift_monitor import DriftMonitor
+from ml.notebooks.results import RecommendationSet
+from recommender import get_recommendation, get_user_history, save_recommendation, save_recommendations
+
+SHIPMENT = {"Category_item": "Electronics", "Weight_kg": 5.0, "Fragility": 8, "Moisture_Sens": True,
+            "Distance_km": 1200.0, "Shipping_Mode": "Air", "Length_cm": 30.0, "Width_cm": 20.0,
+            "Height_cm": 15.0}
+
+
+def recommendation(material_id, name, score, pred_cost=2.5, pred_co2=1.25):
+    return {"Material_ID": material_id, "Material_Name": name, "Pred_Cost": pred_cost, "Pred_CO2": pred_co2,
+            "Biodegradable": 1, "Tensile_Strength_MPa": 42.0, "Sustainability": score}
+
+
+RECOMMENDATIONS = [recommendation(7, "Kraft Paper", 0.9), recommendation(3, "PLA", 0.8, 3.0, 0.5)]
+
+
+@pytest.fixture(scope="module")
+def user():
+    email = "history@test.local"
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(auth, "BCRYPT_ROUNDS", 4)
+        auth.register_email(email)
+        assert auth.login_user(email, "s3cret")[1] == 200
+    return email
+
+
+# ======================================================
+# Translation (pure)
+# ======================================================
+def test_translate_sql():
+    assert translate_sql("UPDATE users SET last_login = NOW() WHERE email = %s") == \
+        "UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE email = ?"
+
+
+def test_translate_schema():
+    ddl = translate_schema(
+        "USE ecopack;\n"
+        "CREATE TABLE t (\n"
+        "    id BIGINT AUTO_INCREMENT PRIMARY KEY,\n"
+        "    doc JSON,\n"
+        "    email VARCHAR(255),\n"
+        "    INDEX idx_t_email (email)\n"
+        ");"
+    )
+    assert "USE" not in ddl and "JSON" not in ddl and "INDEX idx_t_email" not in ddl.split(";")[0]
+    assert "CREATE TABLE IF NOT EXISTS t (" in ddl
+    assert "id INTEGER PRIMARY KEY AUTOINCREMENT" in ddl
+    assert "CREATE INDEX IF NOT EXISTS idx_t_email ON t (email);" in ddl
+
+
+def test_dialect_helpers_for_sqlite():
+    assert db.DB_BACKEND == "sqlite"
+    assert upsert_add_sql("r", ("k",), ("n",)) == \
+        "INSERT INTO r (k, n) VALUES (%s, %s) ON CONFLICT (k) DO UPDATE SET n = n + excluded.n"
+    assert insert_ignore_sql("r", ("k",)) == "INSERT OR IGNORE INTO r (k) VALUES (%s)"
+
+
+def test_connection_surface():
+    conn = get_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("CREATE TABLE IF NOT EXISTS scratch (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                        "day DATE, at TIMESTAMP, flag BOOLEAN)")
+        conn.begin()
+        with conn.cursor() as cur:
+            cur.executemany("INSERT INTO scratch (day, at, flag) VALUES (%s, %s, %s)",
+                            [(date(2026, 1, 2), datetime(2026, 1, 2, 3, 4, 5), True)] * 2)
+            cur.execute("INSERT INTO scratch (day, at, flag) VALUES (%s, %s, %s)", (date(2026, 1, 3), None, False))
+            assert cur.lastrowid == 3
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) AS n FROM scratch")
+            assert cur.fetchone() == {"n": 0}
+            cur.execute("INSERT INTO scratch (day, at, flag) VALUES (%s, %s, %s)",
+                        (date(2026, 1, 2), datetime(2026, 1, 2, 3, 4, 5), True))
+            cur.execute("SELECT day, at, flag FROM scratch")
+            assert cur.fetchall() == [{"day": date(2026, 1, 2), "at": datetime(2026, 1, 2, 3, 4, 5), "flag": 1}]
+    finally:
+        conn.close()
+
+
+# ======================================================
+# Round trips
+# ======================================================
+def test_history_round_trip(user):
+    assert save_recommendation(user, "sid-1", SHIPMENT, 2, "Sustainability", RECOMMENDATIONS)
+    history = get_user_history(user)
+    assert len(history) == 1
+    row = history[0]
+    assert (row["session_id"], row["product_category"], row["k_value"]) == ("sid-1", "Electronics", 2)
+    assert isinstance(row["created_at"], datetime)
+
+    saved = get_recommendation(user, row["id"])
+    assert saved["shipment"] == SHIPMENT
+    assert saved["recommendations"] == RECOMMENDATIONS
+    assert get_recommendation("someone-else@test.local", row["id"]) is None
+
+
+def test_unknown_user_rolls_back():
+    # users(email) foreign key: neither the history row nor the rollup is written
+    before = query_rollups({"category": "Ghost"})["totals"]["requests"]
+    assert not save_recommendation("ghost@test.local", "sid", {**SHIPMENT, "Category_item": "Ghost"}, 2,
+                                   "Sustainability", RECOMMENDATIONS)
+    assert query_rollups({"category": "Ghost"})["totals"]["requests"] == before
+
+
+def test_rollup_upsert(user):
+    shipment = {**SHIPMENT, "Category_item": "Toys"}
+    save_recommendations([(user, "sid-2", shipment, 2, "Sustainability", RECOMMENDATIONS)] * 2)
+    save_recommendation(user, "sid-3", shipment, 1, "Sustainability", [recommendation(3, "PLA", 0.5, 1.0, 1.0)])
+    report = query_rollups({"category": "Toys", "group_by": "material"})
+    assert report["rows"] == [
+        {"material": "Kraft Paper", "requests": 2, "avg_pred_cost": 2.5, "avg_pred_co2": 1.25,
+         "avg_sustainability": 0.9},
+        {"material": "PLA", "requests": 1, "avg_pred_cost": 1.0, "avg_pred_co2": 1.0, "avg_sustainability": 0.5},
+    ]
+    assert report["totals"]["requests"] == 3
+
+
+def test_history_export(user):
+    save_recommendation(user, "sid-4", {**SHIPMENT, "Category_item": "Books"}, 2, "Sustainability",
+                        RECOMMENDATIONS)
+    chunks, mimetype, ext = export_history({"email": user, "category": "Books"}, "ndjson")
+    rows = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+    assert (mimetype, ext) == ("application/x-ndjson", "ndjson")
+    assert len(rows) == 1 and rows[0]["recommendations"] == RECOMMENDATIONS
+    assert rows[0]["product_category"] == "Books" and rows[0]["moisture_sensitive"] is True
+
+    chunks, _, _ = export_history({"email": user, "category": "Books"}, "csv")
+    records = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert [(r["rank"], r["material_name"]) for r in records] == [("1", "Kraft Paper"), ("2", "PLA")]
+
+    with pytest.raises(ValueError):
+        export_history({"from": "2026-02-01", "to": "2026-01-01"})
+
+
+def test_history_export_parquet(user):
+    pq = pytest.importorskip("pyarrow.parquet")
+    # Engine-shaped: Biodegradable is int64 0/1, packed; the Explanation forces the JSON fallback
+    frame = pd.DataFrame({
+        "Material_Name": ["Kraft Paper", "PET"], "Pred_Cost": [2.5, 3.0], "Pred_CO2": [1.25, 0.5],
+        "Biodegradable": np.array([1, 0], dtype=np.int64), "Tensile_Strength_MPa": [42.0, 55.0],
+        "Sustainability": [0.9, 0.4],
+    })
+    packed = RecommendationSet.from_frame(frame)
+    explained = packed.records()
+    explained[0]["Explanation"] = "Weight_kg +0.12"
+    for session_id, recommendations in (("sid-5", packed), ("sid-6", explained)):
+        assert save_recommendation(user, session_id, {**SHIPMENT, "Category_item": "Garden"}, 2,
+                                   "Sustainability", recommendations)
+
+    chunks, mimetype, ext = export_history({"email": user, "category": "Garden"}, "parquet")
+    table = pq.read_table(io.BytesIO(b"".join(chunks)))
+    assert (mimetype, ext) == ("application/vnd.apache.parquet", "parquet")
+    assert table.column("session_id").to_pylist() == ["sid-5", "sid-5", "sid-6", "sid-6"]
+    assert table.column("biodegradable").to_pylist() == [1, 0, 1, 0]
+    assert table.column("material_name").to_pylist() == ["Kraft Paper", "PET"] * 2
+
+
+# ======================================================
+# Drift sketches
+# ======================================================
+def observed(seed, n):
+    monitor = DriftMonitor()
+    rng = np.random.default_rng(seed)
+    for weight in rng.uniform(1, 50, n):
+        monitor.observe({**SHIPMENT, "Weight_kg": float(weight)}, rng.uniform(1, 5, 10), rng.uniform(0, 2, 10))
+    return monitor
+
+
+def test_sketch_merge_is_exact():
+    a, b = observed(0, 200), observed(1, 300)
+    both = DriftMonitor.merged([a.to_dict(), json.loads(json.dumps(b.to_dict()))])
+    assert both.shipments == 500
+    weights = both.numeric["Weight_kg"]
+    assert weights.moments.count == 500
+    assert weights.quantiles.count == a.numeric["Weight_kg"].quantiles.count + b.numeric["Weight_kg"].quantiles.count
+    assert both.numeric["Pred_Cost"].moments.count == 5000
+    expected = (a.numeric["Weight_kg"].moments.mean * 200 + b.numeric["Weight_kg"].moments.mean * 300) / 500
+    assert weights.moments.mean == pytest.approx(expected)
+    assert both.categorical["Shipping_Mode"].to_dict() == DriftMonitor.merged([a, b]).categorical[
+        "Shipping_Mode"].to_dict()
+
+
+def test_drift_state_shared_across_workers():
+    first, second = DriftRecorder(flush_seconds=3600), DriftRecorder(flush_seconds=3600)
+    for recorder, n in ((first, 3), (second, 2)):
+        for _ in range(n):
+            recorder.observe(SHIPMENT, [1.0, 2.0], [0.5])
+    # Different processes in production; here, distinct ids sharing one database
+    second.worker_id += "-b"
+    first.flush()
+    second.flush()
+    states, workers, shared = first.states()
+    assert shared and workers == {first.worker_id, second.worker_id}
+    assert DriftMonitor.merged(states).shipments == 5
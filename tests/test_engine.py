@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+SHIPMENT = {"Category_item": "Electronics", "Weight_kg": 5.0, "Fragility": 8, "Moisture_Sens": True,
+            "Distance_km": 1200.0, "Shipping_Mode": "Air", "Length_cm": 30.0, "Width_cm": 20.0,
+            "Height_cm": 15.0}
+
+
+@pytest.fixture(scope="module")
+def engine():
+    recommender = pytest.importorskip("recommender")
+    if not recommender.ML_AVAILABLE:
+        pytest.skip("ML engine not available (models not present)")
+    from ml.notebooks import recommendation_engine
+    return recommendation_engine
+
+
+def test_reference_lives_in_the_model_dir(tmp_path):
+    from ml.notebooks.score_reference import REFERENCE_SCHEMA_VERSION, load_reference, save_reference
+    for name in ("cost_model.pkl", "co2_model.pkl"):
+        (tmp_path / name).write_bytes(b"model")
+    reference = {"schema_version": REFERENCE_SCHEMA_VERSION, "columns": {}}
+    assert save_reference(reference, model_dir=tmp_path) == tmp_path / "score_reference.json"
+    assert load_reference(model_dir=tmp_path)["columns"] == {}
+    (tmp_path / "cost_model.pkl").write_bytes(b"retrained")
+    assert load_reference(model_dir=tmp_path) is None
+
+
+def test_drift_reference_lives_in_the_model_dir(tmp_path):
+    from ml.notebooks.drift_monitor import DRIFT_SCHEMA_VERSION, DriftMonitor, load_drift_reference, \
+        save_drift_reference
+    for name in ("cost_model.pkl", "co2_model.pkl"):
+        (tmp_path / name).write_bytes(b"model")
+    reference = {"schema_version": DRIFT_SCHEMA_VERSION, "state": DriftMonitor().to_dict()}
+    assert save_drift_reference(reference, model_dir=tmp_path) == tmp_path / "drift_reference.json"
+    assert isinstance(load_drift_reference(model_dir=tmp_path)["monitor"], DriftMonitor)
+
+
+def generate(engine, **kw):
+    return engine.generate_recommendations(
+        engine.materials_df, engine.co2_model, engine.cost_model, SHIPMENT,
+        engine.FEATURES_COST, engine.FEATURES_CO2, 5, "Sustainability", as_frame=False, **kw
+    )
+
+
+def test_global_early_termination_matches_full_scoring(engine):
+    if engine.score_reference is None:
+        pytest.skip("no score_reference.json (python ml/notebooks/score_reference.py build)")
+    early = generate(engine, normalization="global", reference=engine.score_reference)
+    full = generate(engine, normalization="global", reference=engine.score_reference, keep_scores=True)
+    assert "scores" not in early.attrs and "scores" in full.attrs
+    assert early.records() == full.records()
+
+
+def test_keep_scores_covers_every_candidate(engine):
+    results = generate(engine, keep_scores=True, prefilter=False)
+    assert len(results.attrs["scores"]["Pred_Cost"]) == len(engine.materials_df)
+
+
+@pytest.mark.parametrize("normalization", ["candidates", "global"])
+def test_predictions_without_scores(engine, normalization):
+    if normalization == "global" and engine.score_reference is None:
+        pytest.skip("no score_reference.json (python ml/notebooks/score_reference.py build)")
+    results = generate(engine, normalization=normalization, reference=engine.score_reference,
+                       keep_predictions=True)
+    assert "scores" not in results.attrs
+    pred_cost, pred_co2 = results.attrs["predictions"]
+    assert len(pred_cost) == len(pred_co2) > 0
+    if normalization == "global":
+        # Early termination still ran: skipped materials have no prediction
+        assert results.attrs["normalization"]["skipped"] == int(np.isnan(pred_cost).sum())
@@ -0,0 +1,79 @@
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from history_store import decode_results, encode_results, pack_recommendations, unpack_recommendations
+from ml.notebooks.results import RecommendationSet
+
+
+def engine_frame(n=3, pareto=False):
+    """A top-k frame with the engine's dtypes (Biodegradable is int64 0/1, not the catalogue's Yes/No)."""
+    df = pd.DataFrame({
+        "Material_Name": [f"Material {i} – recycled" for i in range(n)],
+        "Pred_Cost": np.linspace(0.5, 3.25, n),
+        "Pred_CO2": np.linspace(0.1, 1.7, n),
+        "Biodegradable": np.array([1, 0, 1][:n], dtype=np.int64),
+        "Tensile_Strength_MPa": np.array([30.47, 59.17, 12.0][:n]),
+        "Sustainability": np.linspace(0.9, 0.4, n),
+    })
+    if pareto:
+        df["Pareto_Rank"] = np.arange(1, n + 1, dtype=np.int64)
+    return df
+
+
+@pytest.mark.parametrize("pareto", [False, True])
+def test_recommendation_set_round_trip(pareto):
+    results = RecommendationSet.from_frame(engine_frame(pareto=pareto))
+    blob = pack_recommendations(results)
+    assert blob is not None
+    assert unpack_recommendations(blob) == results.records()
+    assert encode_results(results) == (blob, None)
+
+
+def test_packed_is_smaller_than_json():
+    results = RecommendationSet.from_frame(engine_frame())
+    assert len(pack_recommendations(results)) < len(json.dumps(results.records())) / 2
+
+
+def test_list_of_dicts_and_empty_pack():
+    records = RecommendationSet.from_frame(engine_frame()).records()
+    assert unpack_recommendations(pack_recommendations(records)) == records
+    assert unpack_recommendations(pack_recommendations([])) == []
+
+
+@pytest.mark.parametrize("change", [
+    {"Biodegradable": "Yes"},               # catalogue string, not the engine's 0/1
+    {"Biodegradable": 2},
+    {"Explanation": "Weight_kg +0.12"},     # no packed layout has it
+    {"Material_Name": "x" * 300},           # longer than the uint8 length
+    {"Pred_Cost": None},
+])
+def test_unpackable_results_fall_back_to_json(change):
+    records = RecommendationSet.from_frame(engine_frame()).records()
+    records[0].update(change)
+    results, recs_json = encode_results(records)
+    assert results is None
+    assert decode_results(results, recs_json) == records
+
+
+@pytest.mark.parametrize("layout_id", [1, 2, 250])
+def test_unknown_layout(layout_id):
+    with pytest.raises(ValueError):
+        unpack_recommendations(bytes([layout_id]) + struct.pack("<i3d", 7, 1.0, 0.5, 0.8))
+
+
+def test_engine_results_pack():
+    recommender = pytest.importorskip("recommender")
+    if not recommender.ML_AVAILABLE:
+        pytest.skip("ML engine not available (models not present)")
+    shipment = {"Category_item": "Electronics", "Weight_kg": 5.0, "Fragility": 8, "Moisture_Sens": True,
+                "Distance_km": 1200.0, "Shipping_Mode": "Air", "Length_cm": 30.0, "Width_cm": 20.0,
+                "Height_cm": 15.0}
+    for sort_by in ("Sustainability", "Pareto"):
+        results = recommender.get_recommendations(shipment, top_k=3, sort_by=sort_by)
+        blob, recs_json = encode_results(results)
+        assert recs_json is None
+        assert unpack_recommendations(blob) == results.records()
@@ -0,0 +1,26 @@
+import pytest
+
+import jobs
+
+
+def test_pool_running_follows_the_lock():
+    assert not jobs.pool_running()
+    lock = jobs._try_lock(jobs.POOL_LOCK_PATH)
+    try:
+        assert jobs.pool_running()
+    finally:
+        lock.close()
+    assert not jobs.pool_running()
+
+
+def test_ensure_workers_off_at_zero():
+    assert jobs.ensure_workers(0) is False
+
+
+@pytest.mark.parametrize("running, status", [(False, 503), (True, 202)])
+def test_submit_needs_a_worker_pool(client, monkeypatch, running, status):
+    monkeypatch.setattr(jobs, "pool_running", lambda: running)
+    with client.session_transaction() as s:
+        s["user_email"] = f"jobs-{running}@test.local"
+    response = client.post("/api/jobs", json={"kind": "history_export", "format": "csv"})
+    assert response.status_code == status, response.get_json()
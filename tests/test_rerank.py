@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from ml.notebooks.rerank import ResultStore, candidate_scores, rerank_records, scores_nbytes
+
+SHIPMENT = {"Category_item": "Electronics", "Weight_kg": 5.0, "Fragility": 8, "Moisture_Sens": True,
+            "Distance_km": 1200.0, "Shipping_Mode": "Air", "Length_cm": 30.0, "Width_cm": 20.0,
+            "Height_cm": 15.0}
+
+
+def scores():
+    return candidate_scores({
+        "Material_ID": [1, 2, 3], "Material_Name": ["A", "B", "C"],
+        "Pred_Cost": [1.0, 2.0, 3.0], "Pred_CO2": [0.5, 0.2, 0.9],
+        "Env_Impact": [0.2, 1.0, 0.0], "Cost_Eff": [1.0, 0.5, 0.0],
+        "Biodegradable": [0.0, 1.0, 1.0], "Mat_Suit": [0.1, 0.2, 0.3],
+    })
+
+
+def test_result_store_is_owned():
+    store = ResultStore()
+    result_id = store.put(scores(), owner="sid-a")
+    assert store.get(result_id, owner="sid-a") is not None
+    assert store.get(result_id, owner="sid-b") is None
+    assert store.get(result_id, owner=None) is None
+    with pytest.raises(ValueError):
+        store.put(scores(), owner=None)
+
+
+def test_result_store_lru_and_ttl():
+    store = ResultStore(max_entries=2, ttl_seconds=3600)
+    first, second = store.put(scores(), "s"), store.put(scores(), "s")
+    store.get(first, "s")
+    store.put(scores(), "s")
+    assert store.get(second, "s") is None and store.get(first, "s") is not None
+    expired = ResultStore(ttl_seconds=-1)
+    assert expired.get(expired.put(scores(), "s"), "s") is None
+
+
+def test_result_store_bounded_by_bytes_and_candidates():
+    size = scores_nbytes(scores())
+    store = ResultStore(max_bytes=2 * size, max_candidates=3)
+    ids = [store.put(scores(), "s") for _ in range(3)]
+    assert len(store) == 2 and store.nbytes == 2 * size
+    assert store.get(ids[0], "s") is None and store.get(ids[2], "s") is not None
+    assert ResultStore(max_candidates=2).put(scores(), "s") is None
+    assert ResultStore(max_bytes=size - 1).put(scores(), "s") is None
+
+
+def test_rerank_records():
+    (ranking,) = rerank_records(scores(), np.array([[0, 0, 0, 1.0]]), 2)
+    assert [r["Material_ID"] for r in ranking] == [3, 2]
+
+
+def test_result_id_is_opt_in(client):
+    assert client.post("/api/recommend", json=SHIPMENT).get_json()["result_id"] is None
+
+
+def test_result_id_is_bound_to_a_new_session(client):
+    # No prior request: /api/recommend has to create the session it stores the result under
+    response = client.post("/api/recommend", json={**SHIPMENT, "rerank": True})
+    result_id = response.get_json()["result_id"]
+    assert result_id
+    weights = {"result_id": result_id, "weights": {"Mat_Suit": 1}}
+    assert client.post("/api/rerank", json=weights).status_code == 200
+
+    other = client.application.test_client()
+    assert other.post("/api/rerank", json=weights).status_code == 404
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.notebooks.similar_materials import SimilarityIndex
+
+
+def catalogue():
+    rng = np.random.default_rng(0)
+    n = 40
+    return pd.DataFrame({
+        "Material_ID": np.arange(1, n + 1),
+        "Material_Name": [f"M{i}" for i in range(n)],
+        "Category": np.where(np.arange(n) % 2, "Plastic", "Paper"),
+        "Biodegradable": np.where(np.arange(n) % 3, "Yes", "No"),
+        "Density_kg_m3": rng.uniform(50, 1500, n),
+        "Tensile_Strength_MPa": rng.uniform(1, 80, n),
+        "Cost_per_kg": rng.uniform(0.5, 10, n),
+        "CO2_Emission_kg": rng.uniform(0.1, 6, n),
+    })
+
+
+def test_category_filter():
+    index = SimilarityIndex(catalogue())
+    rows, dist = index.similar(1, k=5, category="Plastic")
+    assert len(rows) == 5 and list(dist) == sorted(dist)
+    assert set(index.category[rows]) == {"Plastic"}
+
+
+def test_unknown_category_is_empty_and_not_cached():
+    index = SimilarityIndex(catalogue())
+    before = len(index._trees)
+    for i in range(50):
+        rows, dist = index.similar(1, k=5, category=f"nope-{i}")
+        assert len(rows) == 0 and len(dist) == 0
+    assert index.similar_records(1, category="nope") == []
+    assert len(index._trees) == before
+
+
+def test_filter_trees_bounded_by_catalogue():
+    index = SimilarityIndex(catalogue())
+    for category in ("Paper", "Plastic", None):
+        for bio in (True, False, None):
+            index.similar(2, k=3, category=category, biodegradable=bio)
+            index.similar(3, k=3, category=category, biodegradable=bio)
+    assert len(index._trees) == 9
+
+
+def test_unknown_material():
+    with pytest.raises(KeyError):
+        SimilarityIndex(catalogue()).similar(999)
@@ -0,0 +1,139 @@
+import tracemalloc
+
+import pandas as pd
+import pytest
+
+from ml.notebooks.sweep import (
+    MAX_SWEEP_AXIS_POINTS, MAX_SWEEP_CELLS, axis_length, build_scenarios, count_scenarios, expand_axis,
+    iter_sweep, run_sweep
+)
+
+
+@pytest.mark.parametrize("spec, n", [
+    ({"start": 500, "stop": 5000, "num": 10}, 10),
+    ({"start": 0, "stop": 1, "step": 0.1}, 11),
+    ({"start": 0, "stop": 0.3, "step": 0.1}, 4),
+    ({"start": 2, "stop": 2, "step": 1}, 1),
+    ([1, 2, 3], 3),
+    (7, 1),
+])
+def test_axis_length_matches_expansion(spec, n):
+    assert axis_length("Distance_km", spec) == n
+    assert len(expand_axis("Distance_km", spec)) == n
+
+
+@pytest.mark.parametrize("spec, message", [
+    ({"start": 0, "stop": 1, "num": 10 ** 9}, "at most"),
+    ({"start": 0, "stop": 1e9, "step": 1}, "at most"),
+    ({"start": 0, "stop": 1, "step": 1e-320}, "at most"),
+    ({"start": 0, "stop": 1, "step": 0}, "positive"),
+    ({"start": 0, "stop": 1, "step": float("inf")}, "positive"),
+    ({"start": 0, "stop": float("nan"), "num": 3}, "finite"),
+    ({"start": 5, "stop": 1, "step": 1}, "no values"),
+    ({"start": 0, "stop": 1, "num": 0}, "no values"),
+    ({"start": 0, "stop": 1}, "num' or 'step"),
+    (list(range(MAX_SWEEP_AXIS_POINTS + 1)), "at most"),
+])
+def test_oversized_or_invalid_axis_rejected_before_allocation(spec, message):
+    tracemalloc.start()
+    try:
+        with pytest.raises(ValueError, match=message):
+            expand_axis("Distance_km", spec)
+        assert tracemalloc.get_traced_memory()[1] < 1_000_000
+    finally:
+        tracemalloc.stop()
+
+
+def test_grid_size_checked_before_product():
+    sweep = {axis: {"start": 1, "stop": 1000, "num": 1000}
+             for axis in ("Distance_km", "Weight_kg", "Length_cm", "Width_cm", "Height_cm")}
+    assert count_scenarios(sweep) == 1000 ** 5
+    with pytest.raises(ValueError, match="too large"):
+        build_scenarios({}, sweep, n_materials=600)
+
+
+def test_build_scenarios():
+    sweep = {"Distance_km": [100, 200], "Shipping_Mode": ["Air", "Sea", "Road"]}
+    axes, scenarios = build_scenarios({"Weight_kg": 2.0, "Distance_km": 1.0}, sweep, n_materials=10)
+    assert axes == {"Distance_km": [100.0, 200.0], "Shipping_Mode": ["Air", "Sea", "Road"]}
+    assert len(scenarios) == 6
+    assert set(scenarios["Weight_kg"]) == {2.0}
+    assert MAX_SWEEP_CELLS >= 6 * 10
+
+
+def test_unknown_axis():
+    with pytest.raises(ValueError, match="Cannot sweep"):
+        count_scenarios({"Fragility": [1, 2]})
+
+
+# ======================================================
+# Suitability rules (stand-in models: linear in a few columns)
+# ======================================================
+class Linear:
+    def __init__(self, **weights):
+        self.weights = weights
+
+    def predict(self, X):
+        return sum(X[c].to_numpy(float) * w for c, w in self.weights.items())
+
+
+FEATURES_COST, FEATURES_CO2 = ["Weight_kg", "Cost_per_kg"], ["Distance_km", "CO2_Emission_kg_material"]
+MODELS = (Linear(Weight_kg=0.1, Cost_per_kg=1.0), Linear(Distance_km=0.001, CO2_Emission_kg_material=1.0))
+BASE = {"Category_item": "Electronics", "Weight_kg": 2.0, "Fragility": 3, "Moisture_Sens": False,
+        "Distance_km": 800.0, "Shipping_Mode": "Road", "Length_cm": 30.0, "Width_cm": 20.0, "Height_cm": 10.0}
+
+
+def catalogue():
+    return pd.DataFrame({
+        "Material_ID": [1, 2, 3, 4, 5],
+        "Material_Name": ["Kraft Paper", "Laminated Paper", "Thin Film", "Steel Can", "PLA Tray"],
+        "Category_material": ["Paper", "Paper", "Plastic", "Metal", "Plastic"],
+        "Density_kg_m3": [700.0, 800.0, 900.0, 7800.0, 1250.0],
+        "Tensile_Strength_MPa": [20.0, 25.0, 3.0, 400.0, 50.0],
+        "Cost_per_kg": [0.5, 0.9, 0.3, 0.4, 1.5],
+        "CO2_Emission_kg_material": [0.2, 0.4, 0.3, 0.1, 0.9],
+        "Biodegradable": ["Yes", "Yes", "No", "No", "Yes"],
+    })
+
+
+def sweep(base, spec, top_k=2):
+    return run_sweep(catalogue(), *MODELS, base, spec, FEATURES_COST, FEATURES_CO2, top_k=top_k)
+
+
+def names(result):
+    return [m["Material_Name"] for m in result["materials"]]
+
+
+def test_fixed_rules_prune_like_recommend():
+    base = {**BASE, "Moisture_Sens": True, "Fragility": 9}
+    result = sweep(base, {"Distance_km": [500]})
+    assert result["grid"]["rules_applied"] == ["moisture_sensitive_no_plain_paper", "high_fragility_min_tensile"]
+    assert names(result) == ["Laminated Paper", "Steel Can", "PLA Tray"]
+
+
+def test_swept_mode_rule_applies_per_scenario():
+    result = sweep(BASE, {"Shipping_Mode": ["Road", "Air"]}, top_k=4)
+    assert result["grid"]["rules_applied"] == [] and result["grid"]["scenario_rules"] == ["air_no_heavy_materials"]
+    steel = next(m for m in result["materials"] if m["Material_Name"] == "Steel Can")
+    assert steel["Pred_Cost"][0] is not None and steel["Pred_Cost"][1] is None
+    road, air = result["scenarios"]
+    assert "Steel Can" in [m["Material_Name"] for m in road["top"]]
+    assert "Steel Can" not in [m["Material_Name"] for m in air["top"]]
+
+    # The Air scenario ranks and normalises exactly like a sweep that never had the steel can
+    alone = sweep({**BASE, "Shipping_Mode": "Air"}, {"Distance_km": [BASE["Distance_km"]]}, top_k=4)
+    assert air["top"] == alone["scenarios"][0]["top"]
+
+    # Like prefilter_candidates: a rule that would leave fewer than top_k materials is relaxed
+    relaxed = sweep(BASE, {"Shipping_Mode": ["Road", "Air"]}, top_k=5)
+    assert "Steel Can" in [m["Material_Name"] for m in relaxed["scenarios"][1]["top"]]
+
+
+def test_streamed_sweep_applies_the_same_rules():
+    spec = {"Shipping_Mode": ["Road", "Air"], "Distance_km": [100, 900]}
+    whole = sweep(BASE, spec, top_k=3)
+    streamed = list(iter_sweep(catalogue(), *MODELS, BASE, spec, FEATURES_COST, FEATURES_CO2, top_k=3))
+    assert streamed[0]["grid"]["scenario_rules"] == ["air_no_heavy_materials"]
+    assert [r["top"] for r in streamed if r["type"] == "scenario"] == [s["top"] for s in whole["scenarios"]]
+    curves = {r["Material_Name"]: r["Pred_Cost"] for r in streamed if r["type"] == "material"}
+    assert curves["Steel Can"][1] is None and curves["Steel Can"][0] is not None
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from ml.notebooks.train_models import inference_latency, promotion_gate
+
+
+def report(mae, p99_ms):
+    return {"test": {"mae": mae, "rmse": mae, "r2": 0.9}, "latency": {"p99_ms": p99_ms}}
+
+
+def test_gate_rejects_less_accurate_models():
+    # A faster model that is far less accurate must not pass on latency alone
+    current = {"cost": {"version": "v1", **report(0.0065, 2.0)}}
+    problems = promotion_gate({"cost": report(0.0955, 1.0)}, current)
+    assert len(problems) == 1 and "test MAE" in problems[0]
+    assert promotion_gate({"cost": report(0.0070, 1.0)}, current) == []
+    assert promotion_gate({"cost": report(0.0955, 1.0)}, current, max_mae_regression=20) == []
+
+
+def test_gate_without_current_models():
+    assert promotion_gate({"co2": report(1.0, 5.0)}, {"co2": None}) == []
+    assert promotion_gate({"co2": report(1.0, 50.0)}, {"co2": None}, max_latency_ms=25)
+
+
+def test_latency_over_many_batches():
+    class Model:
+        def predict(self, X):
+            return np.zeros(len(X))
+
+    latency = inference_latency(Model(), pd.DataFrame({"x": np.arange(10.0)}), batch_rows=8, repeat=300,
+                                throughput_rows=100)
+    assert latency["batches"] == 300 and latency["p50_ms"] <= latency["p99_ms"]